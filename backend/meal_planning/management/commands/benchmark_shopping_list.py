@@ -0,0 +1,190 @@
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from meal_planning.models import DailyMeals, MealAssignment, MealPlan, ShoppingList
+from meal_planning.quantity_totals import NUMPY_AVAILABLE, sum_quantities
+from meal_planning.shopping_list_engine import build_shopping_list_items, consolidate, load_contributions
+from meal_planning.shopping_list_reference import reference_build_items
+from recipes.models import CanonicalIngredient, Ingredient, MealType, Recipe
+
+INGREDIENT_NAMES = [
+    ('ui', 'produce'), ('knoflook', 'produce'), ('tomaten', 'produce'), ('paprika', 'produce'),
+    ('wortel', 'produce'), ('courgette', 'produce'), ('spinazie', 'produce'), ('aardappelen', 'produce'),
+    ('kipfilet', 'meat'), ('rundergehakt', 'meat'), ('zalm', 'meat'), ('spekjes', 'meat'),
+    ('melk', 'dairy'), ('boter', 'dairy'), ('eieren', 'dairy'), ('geraspte kaas', 'dairy'),
+    ('pasta', 'pantry'), ('rijst', 'pantry'), ('bloem', 'pantry'), ('kikkererwten', 'pantry'),
+    ('olijfolie', 'condiments'), ('sojasaus', 'condiments'), ('zout', 'condiments'), ('peper', 'condiments'),
+    ('paprikapoeder', 'spices'), ('komijn', 'spices'), ('brood', 'bakery'), ('doperwten', 'frozen'),
+]
+AMOUNTS = [
+    ('200 gram', 200, 'g'), ('2 el', 2, 'tbsp'), ('1', 1, ''), ('500 ml', 500, 'ml'), ('1 tl', 1, 'tsp'),
+    ('1 kg', 1, 'kg'), ('snufje', None, 'pinch'), ('naar smaak', None, ''),
+]
+MEAL_TYPES = [MealType.BREAKFAST, MealType.LUNCH, MealType.DINNER]
+
+
+def create_sample_plan(user, weeks: int, recipe_count: int = 40, ingredients_per_recipe: int = 10) -> MealPlan:
+    """
+    Create recipes and a meal plan of a number of weeks with three meals a day
+
+    Recipes draw their ingredients from a shared pool, so most shopping list
+    items combine several recipes, and every fourth meal is planned for a
+    different number of servings than the recipe.
+    """
+    recipes = Recipe.objects.bulk_create([
+        Recipe(user=user, title=f'Benchmark recipe {number}', servings=4) for number in range(recipe_count)
+    ])
+    Ingredient.objects.bulk_create([
+        Ingredient(
+            recipe=recipe,
+            name=INGREDIENT_NAMES[(number * 7 + position) % len(INGREDIENT_NAMES)][0],
+            category=INGREDIENT_NAMES[(number * 7 + position) % len(INGREDIENT_NAMES)][1],
+            amount=AMOUNTS[position % len(AMOUNTS)][0],
+            quantity=AMOUNTS[position % len(AMOUNTS)][1],
+            unit=AMOUNTS[position % len(AMOUNTS)][2],
+            order=position
+        )
+        for number, recipe in enumerate(recipes)
+        for position in range(ingredients_per_recipe)
+    ])
+
+    start_date = date(2024, 1, 1)
+    days = weeks * 7
+    meal_plan = MealPlan.objects.create(
+        user=user, name=f'{weeks} weeks', start_date=start_date, end_date=start_date + timedelta(days=days - 1)
+    )
+    daily_meals = DailyMeals.objects.bulk_create([
+        DailyMeals(meal_plan=meal_plan, date=start_date + timedelta(days=day)) for day in range(days)
+    ])
+    MealAssignment.objects.bulk_create([
+        MealAssignment(
+            daily_meals=daily,
+            recipe=recipes[(day * len(MEAL_TYPES) + slot) % recipe_count],
+            meal_type=meal_type,
+            servings_planned=6 if (day + slot) % 4 == 0 else None
+        )
+        for day, daily in enumerate(daily_meals)
+        for slot, meal_type in enumerate(MEAL_TYPES)
+    ])
+    return meal_plan
+
+
+def item_snapshot(shopping_list: ShoppingList):
+    """Comparable content of the items of a shopping list, without amounts (the per-row loop joins them as text)"""
+    return sorted(
+        (item.ingredient_name, item.category,
+         tuple(sorted(str(recipe_id) for recipe_id in item.source_recipes.values_list('id', flat=True))))
+        for item in shopping_list.items.all()
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare query count and time of set-based shopping list generation with the per-row loop, '
+        'and of summing quantities with NumPy and in Python'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--weeks',
+            type=int,
+            nargs='+',
+            default=[4, 8, 52],
+            help='Meal plan lengths to generate a shopping list for',
+        )
+        parser.add_argument(
+            '--recipes',
+            type=int,
+            default=40,
+            help='Number of distinct recipes in the meal plans',
+        )
+        parser.add_argument(
+            '--ingredients',
+            type=int,
+            default=10,
+            help='Number of ingredients per recipe',
+        )
+
+    def handle(self, *args, **options):
+        if min(options['weeks']) < 1 or options['recipes'] < 1 or options['ingredients'] < 1:
+            raise CommandError('--weeks, --recipes and --ingredients must be at least 1')
+
+        self.stdout.write(
+            f"📊 Generating shopping lists for {', '.join(map(str, options['weeks']))} week plans, "
+            f"3 meals a day from {options['recipes']} recipes of {options['ingredients']} ingredients"
+        )
+
+        # Sample data is rolled back, nothing is left in the database
+        with transaction.atomic():
+            user = User.objects.create_user(username='benchmark-shopping-list')
+            for weeks in options['weeks']:
+                self._benchmark(user, weeks, options['recipes'], options['ingredients'])
+            transaction.set_rollback(True)
+
+    def _benchmark(self, user, weeks: int, recipe_count: int, ingredient_count: int):
+        meal_plan = create_sample_plan(user, weeks, recipe_count, ingredient_count)
+        results = {}
+        for label, build in [
+            ('per-row loop', lambda shopping_list: reference_build_items(shopping_list, [meal_plan])),
+            ('set-based engine', lambda shopping_list: build_shopping_list_items(shopping_list, [meal_plan.id])),
+        ]:
+            shopping_list = ShoppingList.objects.create(
+                user=user, name=label, start_date=meal_plan.start_date, end_date=meal_plan.end_date
+            )
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                build(shopping_list)
+                elapsed = time.perf_counter() - started
+            results[label] = (len(queries), elapsed, item_snapshot(shopping_list))
+
+        item_count = len(results['set-based engine'][2])
+        self.stdout.write(f'\n🔍 {weeks} weeks ({weeks * 7 * len(MEAL_TYPES)} meals, {item_count} items)')
+        for label, (query_count, elapsed, _) in results.items():
+            self.stdout.write(f'   {label + ":":<18}{query_count:6} queries {elapsed * 1000:10.1f} ms')
+
+        (_, reference_time, reference_items), (_, engine_time, engine_items) = results.values()
+        self.stdout.write(self.style.SUCCESS(f'   ⚡ Speedup: {reference_time / engine_time:.1f}x'))
+        if CanonicalIngredient.objects.exists():
+            # The loop groups by name, the engine by canonical ingredient
+            self.stdout.write(
+                f'   🔗 {len(reference_items)} items by name, {len(engine_items)} by canonical ingredient'
+            )
+        elif reference_items == engine_items:
+            self.stdout.write(self.style.SUCCESS('   ✅ Same items, categories and source recipes'))
+        else:
+            self.stdout.write(self.style.ERROR('   ❌ Items differ'))
+
+        self._benchmark_totals(meal_plan)
+
+    def _benchmark_totals(self, meal_plan: MealPlan):
+        """Time the quantity pass alone, over the contributions of all items"""
+        contributions = load_contributions([meal_plan.id], meal_plan.start_date, meal_plan.end_date)
+        keys, quantities, units = [], [], []
+        for key, consolidation in consolidate(contributions).items():
+            for contribution in consolidation['contributions']:
+                _, quantity, unit, _ = contribution.stored_values()
+                if quantity is not None:
+                    keys.append(key)
+                    quantities.append(float(quantity))
+                    units.append(unit)
+
+        self.stdout.write(f'   📐 Summing {len(keys)} quantities')
+        results = {}
+        for label, use_numpy in [('python loop', False), ('numpy', True)]:
+            if use_numpy and not NUMPY_AVAILABLE:
+                self.stdout.write(self.style.WARNING('   ⚠️  NumPy is not installed'))
+                continue
+            started = time.perf_counter()
+            results[label] = sum_quantities(keys, quantities, units, use_numpy=use_numpy)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f'   {label + ":":<18}{elapsed * 1000:17.2f} ms')
+
+        if len(set(map(repr, results.values()))) == 1:
+            self.stdout.write(self.style.SUCCESS('   ✅ Identical totals'))
+        else:
+            self.stdout.write(self.style.ERROR('   ❌ Totals differ'))
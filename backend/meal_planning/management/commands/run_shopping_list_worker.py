@@ -0,0 +1,47 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from meal_planning.shopping_list_refresh import claim_due_lists, refresh_shopping_list
+
+
+class Command(BaseCommand):
+    help = 'Regenerate shopping lists marked for a refresh once their window has passed'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=5,
+            help='Seconds to wait between checks when nothing is due',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Refresh all lists that are due and exit instead of running forever',
+        )
+
+    def handle(self, *args, **options):
+        poll_interval = options['poll_interval']
+        self.stdout.write(
+            f'🛒 Shopping list worker started, refresh window {settings.SHOPPING_LIST_REFRESH_WINDOW}s'
+        )
+
+        refreshed = 0
+        while True:
+            claimed = claim_due_lists()
+            if not claimed:
+                if options['once']:
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            for shopping_list in claimed:
+                if refresh_shopping_list(shopping_list):
+                    refreshed += 1
+                    self.stdout.write(f'🔄 Refreshed {shopping_list.name} ({shopping_list.id})')
+                else:
+                    self.stdout.write(self.style.ERROR(f'❌ Failed to refresh {shopping_list.name} ({shopping_list.id})'))
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Refreshed {refreshed} shopping lists'))
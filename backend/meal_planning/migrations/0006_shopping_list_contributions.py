@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-18 06:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meal_planning', '0005_mealplan_family_mealplan_is_shared_and_more'),
+        ('recipes', '0018_add_ingredient_classification'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shoppinglist',
+            name='contributions_tracked',
+            field=models.BooleanField(default=False, help_text='Whether items record the meal assignments they come from, so meal changes are applied as deltas'),
+        ),
+        migrations.CreateModel(
+            name='ShoppingListContribution',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField(default=0, help_text='Position of the ingredient in its recipe')),
+                ('note', models.CharField(blank=True, help_text="Amount as shown in the item total, e.g. '200 gram (from Pasta) x1.5'", max_length=255)),
+                ('unit', models.CharField(blank=True, max_length=50)),
+                ('category', models.CharField(choices=[('produce', 'Groenten & Fruit'), ('meat', 'Vlees & Vis'), ('dairy', 'Zuivel & Eieren'), ('pantry', 'Voorraadkast'), ('frozen', 'Diepvries'), ('bakery', 'Bakkerij'), ('beverages', 'Dranken'), ('condiments', 'Kruiden & Sauzen'), ('spices', 'Specerijen & Kruiden'), ('other', 'Overig')], default='other', max_length=20)),
+                ('assignment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list_contributions', to='meal_planning.mealassignment')),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contributions', to='meal_planning.shoppinglistitem')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list_contributions', to='recipes.recipe')),
+            ],
+            options={
+                'ordering': ['-assignment__daily_meals__meal_plan__start_date', 'assignment__daily_meals__meal_plan_id', 'assignment__daily_meals__date', 'assignment__meal_type', 'position'],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-18 06:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('families', '0002_familymember_age_familymember_can_suggest_meals_and_more'),
+        ('meal_planning', '0006_shopping_list_contributions'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shoppinglist',
+            name='refresh_requested_at',
+            field=models.DateTimeField(blank=True, help_text='First meal plan change not yet reflected in the items', null=True),
+        ),
+        migrations.AddField(
+            model_name='shoppinglist',
+            name='refresh_started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='shoppinglist',
+            name='refreshed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='shoppinglist',
+            index=models.Index(fields=['refresh_requested_at'], name='meal_planni_refresh_390d0d_idx'),
+        ),
+    ]
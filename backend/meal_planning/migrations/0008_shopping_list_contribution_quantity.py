@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 06:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meal_planning', '0007_shopping_list_refresh'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shoppinglistcontribution',
+            name='quantity',
+            field=models.DecimalField(blank=True, decimal_places=3, help_text='Quantity for the planned servings, in unit', max_digits=12, null=True),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-18 06:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meal_planning', '0008_shopping_list_contribution_quantity'),
+        ('recipes', '0019_canonical_ingredient'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shoppinglistitem',
+            name='canonical_ingredient',
+            field=models.ForeignKey(blank=True, help_text='Dictionary entry the ingredients of this item resolved to', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='shopping_list_items', to='recipes.canonicalingredient'),
+        ),
+    ]
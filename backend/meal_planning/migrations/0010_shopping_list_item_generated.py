@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-18 06:49
+
+from django.db import migrations, models
+
+
+def mark_generated_items(apps, schema_editor):
+    # Items with contributions were generated, as was every item of a list generated before they were tracked
+    ShoppingListItem = apps.get_model('meal_planning', 'ShoppingListItem')
+    ShoppingListItem.objects.filter(contributions__isnull=False).update(generated=True)
+    ShoppingListItem.objects.filter(shopping_list__contributions_tracked=False).update(generated=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meal_planning', '0009_shopping_list_item_canonical_ingredient'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shoppinglistitem',
+            name='generated',
+            field=models.BooleanField(default=False, help_text='Generated from meal plans; items added by hand are never changed or removed by regeneration'),
+        ),
+        migrations.RunPython(mark_generated_items, migrations.RunPython.noop),
+    ]
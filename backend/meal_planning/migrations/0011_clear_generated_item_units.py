@@ -0,0 +1,20 @@
+from django.db import migrations
+
+
+def clear_units_shown_in_total(apps, schema_editor):
+    # Generated totals carry their units ('2.1 kg'), the unit field would show them twice
+    ShoppingListItem = apps.get_model('meal_planning', 'ShoppingListItem')
+    items = ShoppingListItem.objects.filter(generated=True).exclude(unit='').only('id', 'total_amount', 'unit')
+    cleared = [item.id for item in items.iterator() if f" {item.unit}" in item.total_amount]
+    ShoppingListItem.objects.filter(id__in=cleared).update(unit='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meal_planning', '0010_shopping_list_item_generated'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_units_shown_in_total, migrations.RunPython.noop),
+    ]
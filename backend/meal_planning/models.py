@@ -1,7 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
-from recipes.models import Recipe, MealType, IngredientCategory
+from recipes.models import Recipe, MealType, IngredientCategory, CanonicalIngredient
 import uuid
 
 
@@ -174,6 +174,18 @@ class ShoppingList(models.Model):
         related_name='shopping_lists',
         help_text="Meal plans included in this shopping list"
     )
+    contributions_tracked = models.BooleanField(
+        default=False,
+        help_text="Whether items record the meal assignments they come from, so meal changes are applied as deltas"
+    )
+    
+    # Coalesced background refresh (see meal_planning/shopping_list_refresh.py)
+    refresh_requested_at = models.DateTimeField(
+        null=True, blank=True,
+        help_text="First meal plan change not yet reflected in the items"
+    )
+    refresh_started_at = models.DateTimeField(null=True, blank=True)
+    refreshed_at = models.DateTimeField(null=True, blank=True)
     
     class Meta:
         ordering = ['-generated_at']
@@ -184,10 +196,16 @@ class ShoppingList(models.Model):
             models.Index(fields=['start_date']),
             models.Index(fields=['end_date']),
             models.Index(fields=['generated_at']),
+            models.Index(fields=['refresh_requested_at']),
         ]
     
     def __str__(self):
         return f"{self.name} ({self.start_date} to {self.end_date})"
+    
+    @property
+    def is_refreshing(self):
+        """Whether the items are about to be or being regenerated"""
+        return self.refresh_requested_at is not None or self.refresh_started_at is not None
 
 
 class ShoppingListItem(models.Model):
@@ -202,6 +220,13 @@ class ShoppingListItem(models.Model):
     
     # Ingredient information (consolidated from multiple recipes)
     ingredient_name = models.CharField(max_length=200)
+    canonical_ingredient = models.ForeignKey(
+        CanonicalIngredient,
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name='shopping_list_items',
+        help_text="Dictionary entry the ingredients of this item resolved to"
+    )
     total_amount = models.CharField(
         max_length=100,
         help_text="Consolidated amount needed"
@@ -219,6 +244,10 @@ class ShoppingListItem(models.Model):
     
     # Notes and source tracking
     notes = models.TextField(blank=True)
+    generated = models.BooleanField(
+        default=False,
+        help_text="Generated from meal plans; items added by hand are never changed or removed by regeneration"
+    )
     source_recipes = models.ManyToManyField(
         Recipe,
         related_name='shopping_list_items',
@@ -237,6 +266,57 @@ class ShoppingListItem(models.Model):
         return f"{self.ingredient_name} - {self.total_amount}"
 
 
+class ShoppingListContribution(models.Model):
+    """Share of one planned meal in a shopping list item"""
+    
+    item = models.ForeignKey(
+        ShoppingListItem,
+        on_delete=models.CASCADE,
+        related_name='contributions'
+    )
+    assignment = models.ForeignKey(
+        MealAssignment,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_contributions'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_contributions'
+    )
+    position = models.PositiveIntegerField(
+        default=0,
+        help_text="Position of the ingredient in its recipe"
+    )
+    note = models.CharField(
+        max_length=255,
+        blank=True,
+        help_text="Amount as shown in the item total, e.g. '200 gram (from Pasta) x1.5'"
+    )
+    quantity = models.DecimalField(
+        max_digits=12,
+        decimal_places=3,
+        null=True,
+        blank=True,
+        help_text="Quantity for the planned servings, in unit"
+    )
+    unit = models.CharField(max_length=50, blank=True)
+    category = models.CharField(
+        max_length=20,
+        choices=IngredientCategory.choices,
+        default=IngredientCategory.OTHER
+    )
+    
+    class Meta:
+        ordering = [
+            '-assignment__daily_meals__meal_plan__start_date', 'assignment__daily_meals__meal_plan_id',
+            'assignment__daily_meals__date', 'assignment__meal_type', 'position'
+        ]
+    
+    def __str__(self):
+        return f"{self.item.ingredient_name}: {self.note or self.recipe_id}"
+
+
 class MealPrepSession(models.Model):
     """Meal prep session for batch cooking"""
     
@@ -0,0 +1,177 @@
+"""
+Unit-aware totals of shopping list quantities
+
+Every canonical unit of quantity_parser belongs to a dimension with a base
+unit: mass in grams (g, kg, mg, pond, oz, lb), volume in millilitres (ml, cl, dl,
+l, fl oz, cup) and spoon measures in teaspoons (el/tbsp, tl/tsp and
+snufje/pinch). Ingredients without a unit are counted as pieces; other
+units (clove, can, bunch, ...) are counted in that unit.
+
+sum_quantities adds up the quantities of many rows per group and dimension
+in one pass: rows are coded as (group, dimension) pairs, converted to base
+units with one multiplication and summed with numpy.bincount. Totals are
+shown in the largest unit of their dimension they reach (1500 g is 1.5 kg,
+6 tl is 2 el), with the Dutch names of spoon and other kitchen units. Without NumPy the same sums are made in a Python loop, in the
+same order, so both give identical results.
+"""
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:  # pragma: no cover - numpy is in requirements.txt
+    np = None
+    NUMPY_AVAILABLE = False
+
+PIECES = 'piece'
+
+# Canonical unit -> (dimension, size in the base unit of the dimension)
+UNIT_CONVERSIONS = {
+    'mg': ('mass', 0.001),
+    'g': ('mass', 1.0),
+    'kg': ('mass', 1000.0),
+    'oz': ('mass', 28.3495),
+    'lb': ('mass', 453.592),
+    # Dutch pound
+    'pond': ('mass', 500.0),
+    'ml': ('volume', 1.0),
+    'cl': ('volume', 10.0),
+    'dl': ('volume', 100.0),
+    'l': ('volume', 1000.0),
+    'fl oz': ('volume', 29.5735),
+    # A cup (kop) as in English recipes, not a Dutch coffee cup
+    'cup': ('volume', 240.0),
+    'pinch': ('spoon', 1 / 16),
+    'tsp': ('spoon', 1.0),
+    'tbsp': ('spoon', 3.0),
+    '': (PIECES, 1.0),
+    PIECES: (PIECES, 1.0),
+}
+
+# Units a total is shown in, largest first; other dimensions keep their unit
+DISPLAY_UNITS = {
+    'mass': [('kg', 1000.0), ('g', 1.0)],
+    'volume': [('l', 1000.0), ('ml', 1.0)],
+    'spoon': [('tbsp', 3.0), ('tsp', 1.0), ('pinch', 1 / 16)],
+    PIECES: [('', 1.0)],
+}
+
+
+# Canonical units shown by their Dutch name, as written in the recipes
+UNIT_LABELS = {
+    'tbsp': 'el',
+    'tsp': 'tl',
+    'pinch': 'snufje',
+    'cup': 'kop',
+    'dash': 'scheut',
+    'can': 'blik',
+    'jar': 'pot',
+    'bunch': 'bos',
+    'slice': 'plak',
+    'handful': 'handvol',
+    'package': 'pak',
+}
+
+
+class Total(NamedTuple):
+    """Summed quantity in a display unit ('' for pieces)"""
+    quantity: float
+    unit: str
+
+
+@lru_cache(maxsize=None)
+def conversion(unit: str) -> Tuple[str, float]:
+    """Dimension and base unit size of a canonical unit, unknown units are their own dimension"""
+    return UNIT_CONVERSIONS.get(unit, (unit, 1.0))
+
+
+def display_total(dimension: str, quantity: float) -> Total:
+    """Show a quantity in base units in the largest unit of its dimension it reaches"""
+    units = DISPLAY_UNITS.get(dimension, [(dimension, 1.0)])
+    for unit, size in units:
+        if quantity >= size:
+            return Total(quantity / size, unit)
+    unit, size = units[-1]
+    return Total(quantity / size, unit)
+
+
+def format_quantity(quantity: float) -> str:
+    """Round a quantity to the precision worth buying (333.33 -> '333', 2.50 -> '2.5')"""
+    places = 0 if quantity >= 100 else 1 if quantity >= 10 else 2
+    text = f"{quantity:.{places}f}"
+    return text.rstrip('0').rstrip('.') if '.' in text else text
+
+
+def format_totals(totals: List[Total]) -> str:
+    """Totals as shown in a shopping list, e.g. '1.2 kg + 2 el + 3'"""
+    return ' + '.join(
+        f"{format_quantity(total.quantity)} {UNIT_LABELS.get(total.unit, total.unit)}".strip() for total in totals
+    )
+
+
+def _sum_python(keys: Sequence, quantities: Sequence[float], units: Sequence[str]) -> Dict[Tuple[Any, str], float]:
+    sums = {}
+    for key, quantity, unit in zip(keys, quantities, units):
+        dimension, size = conversion(unit)
+        sums[key, dimension] = sums.get((key, dimension), 0.0) + quantity * size
+    return sums
+
+
+def _sum_numpy(keys: Sequence, quantities: Sequence[float], units: Sequence[str]) -> Dict[Tuple[Any, str], float]:
+    key_codes, unit_codes = {}, {}
+    key_index = np.fromiter(
+        (key_codes.setdefault(key, len(key_codes)) for key in keys), dtype=np.int64, count=len(keys)
+    )
+    unit_index = np.fromiter(
+        (unit_codes.setdefault(unit, len(unit_codes)) for unit in units), dtype=np.int64, count=len(units)
+    )
+
+    dimension_codes = {}
+    unit_dimension = np.array(
+        [dimension_codes.setdefault(conversion(unit)[0], len(dimension_codes)) for unit in unit_codes],
+        dtype=np.int64
+    )
+    unit_size = np.array([conversion(unit)[1] for unit in unit_codes], dtype=np.float64)
+
+    pairs = key_index * len(dimension_codes) + unit_dimension[unit_index]
+    groups, first, inverse = np.unique(pairs, return_index=True, return_inverse=True)
+    # bincount adds the rows of a group in row order, like the Python loop
+    sums = np.bincount(
+        inverse, weights=np.asarray(quantities, dtype=np.float64) * unit_size[unit_index], minlength=len(groups)
+    )
+
+    key_list, dimension_list = list(key_codes), list(dimension_codes)
+    return {
+        (key_list[groups[group] // len(dimension_codes)], dimension_list[groups[group] % len(dimension_codes)]):
+            float(sums[group])
+        for group in np.argsort(first, kind='stable')
+    }
+
+
+def sum_quantities(keys: Sequence, quantities: Sequence[float], units: Sequence[str],
+                   use_numpy: Optional[bool] = None) -> Dict[Any, List[Total]]:
+    """
+    Sum quantities per group and dimension in one pass
+
+    Args:
+        keys: Group of each row, e.g. a shopping list item
+        quantities: Quantity of each row, in its unit
+        units: Canonical unit of each row
+        use_numpy: Sum with NumPy, by default when it is installed
+
+    Returns:
+        Dict of group -> totals in display units, dimensions in order of
+        their first row
+    """
+    if not keys:
+        return {}
+    if use_numpy is None:
+        use_numpy = NUMPY_AVAILABLE
+    sums = (_sum_numpy if use_numpy else _sum_python)(keys, quantities, units)
+
+    totals = defaultdict(list)
+    for (key, dimension), quantity in sums.items():
+        totals[key].append(display_total(dimension, quantity))
+    return dict(totals)
@@ -119,14 +119,16 @@ class ShoppingListSerializer(serializers.ModelSerializer):
     meal_plans = MealPlanListSerializer(many=True, read_only=True)
     total_items = serializers.SerializerMethodField()
     purchased_items = serializers.SerializerMethodField()
+    refreshing = serializers.ReadOnlyField(source='is_refreshing')
     
     class Meta:
         model = ShoppingList
         fields = [
             'id', 'name', 'start_date', 'end_date', 'generated_at',
-            'items', 'meal_plans', 'total_items', 'purchased_items'
+            'items', 'meal_plans', 'total_items', 'purchased_items',
+            'refreshing', 'refreshed_at'
         ]
-        read_only_fields = ['id', 'generated_at']
+        read_only_fields = ['id', 'generated_at', 'refreshed_at']
     
     def get_total_items(self, obj):
         """Get total number of items in the shopping list"""
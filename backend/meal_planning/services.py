@@ -1,11 +1,17 @@
 from typing import List, Dict, Any
 from datetime import date, timedelta
 from collections import defaultdict
+from django.conf import settings
 from django.db import transaction
 from django.utils import timezone
 
-from .models import MealPlan, DailyMeals, MealAssignment, ShoppingList, ShoppingListItem
+from .models import MealPlan, DailyMeals, MealAssignment, ShoppingList, ShoppingListContribution, ShoppingListItem
 from recipes.models import Recipe, Ingredient, IngredientCategory
+from . import shopping_list_delta
+from .shopping_list_refresh import request_refresh_for_meal_plan
+from .shopping_list_engine import (
+    build_shopping_list_items, is_malformed_ingredient_name, item_keys, rebuild_shopping_list_items
+)
 
 
 class MealPlanningService:
@@ -98,14 +104,15 @@ class MealPlanningService:
             notes=notes
         )
         
-        # Trigger shopping list updates for this meal plan
+        # Add the ingredients of this meal to the shopping lists of this meal plan
         try:
-            self.trigger_shopping_list_updates(meal_plan_id)
+            self.trigger_shopping_list_updates(meal_plan_id, added=assignment)
         except Exception as e:
-            # Log error but don't fail the meal assignment
+            # Log error but don't fail the meal assignment, the lists are refreshed later
             import logging
             logger = logging.getLogger(__name__)
             logger.warning(f"Failed to update shopping lists for meal plan {meal_plan_id}: {str(e)}")
+            request_refresh_for_meal_plan(meal_plan_id)
         
         return assignment
     
@@ -120,19 +127,21 @@ class MealPlanningService:
             True if removed, False if not found
         """
         try:
-            assignment = MealAssignment.objects.get(id=assignment_id)
-            meal_plan_id = str(assignment.daily_meals.meal_plan.id)
-            assignment.delete()
+            assignment = MealAssignment.objects.select_related('daily_meals').get(id=assignment_id)
+            meal_plan_id = str(assignment.daily_meals.meal_plan_id)
             
-            # Trigger shopping list updates for this meal plan
+            # Take the ingredients of this meal out of the shopping lists before
+            # deleting it, which also deletes its contributions
             try:
-                self.trigger_shopping_list_updates(meal_plan_id)
+                self.trigger_shopping_list_updates(meal_plan_id, removed=assignment)
             except Exception as e:
-                # Log error but don't fail the removal
+                # Log error but don't fail the removal, the lists are refreshed later
                 import logging
                 logger = logging.getLogger(__name__)
                 logger.warning(f"Failed to update shopping lists for meal plan {meal_plan_id}: {str(e)}")
+                request_refresh_for_meal_plan(meal_plan_id)
             
+            assignment.delete()
             return True
         except MealAssignment.DoesNotExist:
             return False
@@ -179,18 +188,30 @@ class MealPlanningService:
             'completion_percentage': (total_assignments / (total_days * 3)) * 100 if total_days > 0 else 0
         }
     
-    def trigger_shopping_list_updates(self, meal_plan_id: str):
+    def trigger_shopping_list_updates(self, meal_plan_id: str, added: MealAssignment = None,
+                                      removed: MealAssignment = None):
         """
         Trigger updates for all shopping lists that include the specified meal plan
         
+        A single added or removed assignment is applied as a delta to the lists
+        it falls in (unless SHOPPING_LIST_DELTA_UPDATES is off); otherwise the
+        lists are marked for a coalesced background refresh.
+        
         Args:
             meal_plan_id: ID of the meal plan that was changed
+            added: Assignment that was just created (optional)
+            removed: Assignment that is about to be deleted (optional)
             
         Returns:
-            List of updated shopping lists
+            List of updated or marked shopping lists
         """
-        shopping_service = ShoppingListService()
-        return shopping_service.update_shopping_lists_for_meal_plan(meal_plan_id)
+        if settings.SHOPPING_LIST_DELTA_UPDATES:
+            if added is not None:
+                return shopping_list_delta.add_assignment(added)
+            if removed is not None:
+                return shopping_list_delta.remove_assignment(removed)
+        
+        return request_refresh_for_meal_plan(meal_plan_id)
 
 
 class ShoppingListService:
@@ -237,78 +258,13 @@ class ShoppingListService:
                 name=name,
                 start_date=start_date,
                 end_date=end_date,
-                user=user
+                user=user,
+                contributions_tracked=True
             )
             shopping_list.meal_plans.set(meal_plans)
             
-            # Collect ingredients from all meal assignments in the date range
-            ingredient_consolidation = defaultdict(lambda: {
-                'total_amount': '',
-                'unit': '',
-                'category': IngredientCategory.OTHER,
-                'recipes': set(),
-                'notes': []
-            })
-            
-            for meal_plan in meal_plans:
-                # Get daily meals within the date range
-                daily_meals = meal_plan.daily_meals.filter(
-                    date__gte=start_date,
-                    date__lte=end_date
-                )
-                
-                for daily in daily_meals:
-                    for assignment in daily.meal_assignments.select_related('recipe').all():
-                        recipe = assignment.recipe
-                        servings_multiplier = assignment.effective_servings / (recipe.servings or 1)
-                        
-                        # Add ingredients from this recipe
-                        for ingredient in recipe.ingredients.all():
-                            # Skip ingredients with obviously malformed names
-                            if self._is_malformed_ingredient_name(ingredient.name):
-                                continue
-                                
-                            key = ingredient.name.lower().strip()
-                            consolidation = ingredient_consolidation[key]
-                            
-                            # Track which recipes use this ingredient
-                            consolidation['recipes'].add(recipe)
-                            
-                            # Use the first category we encounter (could be improved)
-                            if consolidation['category'] == IngredientCategory.OTHER:
-                                consolidation['category'] = ingredient.category
-                            
-                            # For now, just collect amounts as text (proper consolidation would need unit parsing)
-                            if ingredient.amount:
-                                amount_text = f"{ingredient.amount} (from {recipe.title})"
-                                if servings_multiplier != 1:
-                                    amount_text += f" x{servings_multiplier:.1f}"
-                                consolidation['notes'].append(amount_text)
-                            
-                            # Use the most common unit
-                            if ingredient.unit and not consolidation['unit']:
-                                consolidation['unit'] = ingredient.unit
-            
-            # Create shopping list items
-            for ingredient_name, consolidation in ingredient_consolidation.items():
-                # Create a consolidated amount description (max 100 chars)
-                if consolidation['notes']:
-                    total_amount = '; '.join(consolidation['notes'])
-                    if len(total_amount) > 100:
-                        total_amount = total_amount[:97] + "..."
-                else:
-                    total_amount = "As needed"
-                
-                item = ShoppingListItem.objects.create(
-                    shopping_list=shopping_list,
-                    ingredient_name=ingredient_name.title(),
-                    total_amount=total_amount,
-                    unit=consolidation['unit'] or '',
-                    category=consolidation['category'] or 'other'
-                )
-                
-                # Link to source recipes
-                item.source_recipes.set(consolidation['recipes'])
+            # All assignments and ingredients of the range in a fixed number of queries
+            build_shopping_list_items(shopping_list, [meal_plan.id for meal_plan in meal_plans])
             
             return shopping_list
     
@@ -376,57 +332,7 @@ class ShoppingListService:
         Returns:
             True if the name appears to be malformed
         """
-        if not name or not name.strip():
-            return True
-            
-        name = name.strip()
-        
-        # Very short names that are likely parsing errors
-        if len(name) <= 2:
-            return True
-            
-        # Names that are only numbers
-        if name.isdigit():
-            return True
-            
-        # Names that are only numbers, spaces, and punctuation
-        if not any(c.isalpha() for c in name):
-            return True
-            
-        # Names that contain obvious instruction text (common Dutch/English cooking terms)
-        instruction_indicators = [
-            'bereidingswijze', 'bereiding', 'instructie', 'stap', 'minuten', 'graden',
-            'instructions', 'directions', 'step', 'minutes', 'degrees', 'method',
-            'snijd', 'voeg toe', 'meng', 'bak', 'kook', 'roer', 'haal', 'doe',
-            'cut', 'add', 'mix', 'fry', 'cook', 'stir', 'heat', 'serve',
-            'bereid het', 'snijd de', 'voeg de', 'haal de', 'doe de', 'meng de',
-            'was en', 'breek ze', 'stoom de', 'pureer met', 'giet een',
-            'verwijder de', 'ondersteboven', 'wasbak', 'kloppen', 'sprinkel',
-            'bewaar de', 'eventueel', 'tot een', 'zoals gewenst'
-        ]
-        
-        name_lower = name.lower()
-        if any(indicator in name_lower for indicator in instruction_indicators):
-            return True
-            
-        # Names that are suspiciously long (likely contain instructions)
-        if len(name) > 100:
-            return True
-            
-        # Names that contain multiple sentences (likely instructions)
-        if '. ' in name and len(name) > 50:
-            return True
-            
-        # Names that start with instruction-like phrases
-        instruction_starters = [
-            'bereid het', 'snijd de', 'voeg de', 'haal de', 'doe de', 'meng de',
-            'was en', 'verwijder', 'pureer', 'giet', 'bewaar', 'serveer'
-        ]
-        
-        if any(name_lower.startswith(starter) for starter in instruction_starters):
-            return True
-            
-        return False
+        return is_malformed_ingredient_name(name)
     
     def update_shopping_lists_for_meal_plan(self, meal_plan_id):
         """
@@ -449,24 +355,9 @@ class ShoppingListService:
         
         for shopping_list in affected_shopping_lists:
             try:
-                # Get the meal plan IDs for regeneration
-                meal_plan_ids = list(shopping_list.meal_plans.values_list('id', flat=True))
-                
-                # Clear existing items
-                shopping_list.items.all().delete()
-                
-                # Regenerate the shopping list with updated meal plan data
-                updated_shopping_list = self.generate_shopping_list(
-                    name=shopping_list.name,
-                    start_date=shopping_list.start_date,
-                    end_date=shopping_list.end_date,
-                    meal_plan_ids=[str(mp_id) for mp_id in meal_plan_ids],
-                    user=shopping_list.user
-                )
-                
-                # Update the existing shopping list instead of creating a new one
-                shopping_list.items.set(updated_shopping_list.items.all())
-                shopping_list.save()
+                # Regenerate the items in place, keeping purchased flags and notes
+                with transaction.atomic():
+                    rebuild_shopping_list_items(shopping_list)
                 
                 updated_lists.append(shopping_list)
                 
@@ -480,7 +371,7 @@ class ShoppingListService:
     
     def remove_duplicates(self, shopping_list_id: str) -> int:
         """
-        Remove duplicate items from a shopping list based on ingredient name
+        Remove duplicate items from a shopping list based on canonical ingredient
         
         Args:
             shopping_list_id: ID of the shopping list to clean up
@@ -494,19 +385,19 @@ class ShoppingListService:
             raise ValueError("Shopping list not found")
         
         # Get all items for this shopping list
-        items = shopping_list.items.all().order_by('ingredient_name', 'id')
+        items = list(shopping_list.items.all().order_by('ingredient_name', 'id'))
         
-        # Group items by normalized ingredient name
+        # Group items by canonical ingredient ('Uien' and 'Rode ui' are 'Ui'),
+        # names without one by their lowercase name
+        keys = item_keys(items)
         ingredient_groups = defaultdict(list)
         for item in items:
-            # Normalize ingredient name for comparison (lowercase, stripped)
-            normalized_name = item.ingredient_name.lower().strip()
-            ingredient_groups[normalized_name].append(item)
+            ingredient_groups[keys[item.id]].append(item)
         
         duplicates_removed = 0
         
         with transaction.atomic():
-            for normalized_name, item_list in ingredient_groups.items():
+            for item_list in ingredient_groups.values():
                 if len(item_list) > 1:
                     # Keep the first item (oldest) and merge information from duplicates
                     primary_item = item_list[0]
@@ -537,11 +428,16 @@ class ShoppingListService:
                         if len(primary_item.notes) > 500:
                             primary_item.notes = primary_item.notes[:497] + "..."
                     
+                    # Contributions of generated duplicates move to the primary item
+                    primary_item.generated = any(item.generated for item in item_list)
                     primary_item.save()
                     
                     # Update source recipes
                     primary_item.source_recipes.set(all_recipes)
                     
+                    # Meal changes update the primary item from now on
+                    ShoppingListContribution.objects.filter(item__in=duplicate_items).update(item=primary_item)
+                    
                     # Delete duplicate items
                     for duplicate in duplicate_items:
                         duplicate.delete()
@@ -0,0 +1,188 @@
+"""
+Incremental maintenance of shopping lists on meal changes
+
+When a meal is assigned or removed, only the contributions of that meal are
+applied to the shopping lists that include its meal plan and date. The work
+is proportional to the ingredients of its recipe: a fixed number of queries
+that touch the items of those ingredients, whose total amount, unit and
+category are recomputed from their stored contributions. The items keep
+their id, purchased flag and notes.
+
+Lists generated before contributions were tracked are rebuilt in place once
+(see shopping_list_engine.rebuild_shopping_list_items) and maintained
+incrementally from then on.
+"""
+import logging
+from collections import defaultdict
+from datetime import date
+from typing import Dict, Iterable, List
+
+from django.db import transaction
+from django.db.models import Q
+
+from .models import MealAssignment, ShoppingList, ShoppingListContribution, ShoppingListItem
+from .shopping_list_engine import (
+    ASSIGNMENT_FIELDS, assignment_contributions, consolidate, contribution_rows, item_fields, item_keys,
+    rebuild_shopping_list_items
+)
+
+logger = logging.getLogger(__name__)
+
+
+def affected_shopping_lists(meal_plan_id, day: date) -> List[ShoppingList]:
+    """Shopping lists that include a meal plan and whose date range covers a day"""
+    return list(
+        ShoppingList.objects
+        .filter(meal_plans__id=meal_plan_id, start_date__lte=day, end_date__gte=day)
+        .distinct()
+    )
+
+
+def _contributions_by_item(item_ids: Iterable) -> Dict[object, List[tuple]]:
+    """Stored (recipe id, note, quantity, unit, category) per item, in shopping list order"""
+    contributions = defaultdict(list)
+    rows = (
+        ShoppingListContribution.objects
+        .filter(item_id__in=list(item_ids))
+        .values_list('item_id', 'recipe_id', 'note', 'quantity', 'unit', 'category')
+    )
+    for item_id, *contribution in rows:
+        contributions[item_id].append(contribution)
+    return contributions
+
+
+def _refresh_items(items: List[ShoppingListItem], contributions: Dict[object, List[tuple]]):
+    """Recompute total amount, unit and category of items, one bulk update"""
+    fields = item_fields({item.id: [row[1:] for row in contributions[item.id]] for item in items})
+    for item in items:
+        for field, value in fields[item.id].items():
+            setattr(item, field, value)
+    if items:
+        ShoppingListItem.objects.bulk_update(items, ['total_amount', 'unit', 'category'])
+
+
+def _rebuild_untracked(shopping_lists: List[ShoppingList]) -> List[ShoppingList]:
+    """Rebuild the lists without contributions and return the others"""
+    tracked = []
+    for shopping_list in shopping_lists:
+        if shopping_list.contributions_tracked:
+            tracked.append(shopping_list)
+        else:
+            rebuild_shopping_list_items(shopping_list)
+    return tracked
+
+
+@transaction.atomic
+def add_assignment(assignment: MealAssignment) -> List[ShoppingList]:
+    """
+    Add the ingredients of a new meal assignment to the shopping lists it falls in
+
+    Args:
+        assignment: Saved meal assignment
+
+    Returns:
+        Updated shopping lists
+    """
+    shopping_lists = affected_shopping_lists(assignment.daily_meals.meal_plan_id, assignment.daily_meals.date)
+    # A rebuild already includes the new assignment
+    tracked = _rebuild_untracked(shopping_lists)
+    if not tracked:
+        return shopping_lists
+
+    rows = list(MealAssignment.objects.filter(id=assignment.id).values_list(*ASSIGNMENT_FIELDS))
+    consolidated = consolidate(assignment_contributions(rows))
+    if not consolidated:
+        return shopping_lists
+
+    # Items saved before they had a canonical ingredient are found by name; items added by hand are left alone
+    candidates = list(ShoppingListItem.objects.filter(
+        Q(canonical_ingredient_id__in=[c['canonical_id'] for c in consolidated.values() if c['canonical_id']])
+        | Q(ingredient_name__in=[c['name'].title() for c in consolidated.values()]),
+        shopping_list__in=tracked,
+        generated=True
+    ))
+    keys = item_keys(candidates)
+    existing = {}
+    for item in candidates:
+        existing.setdefault((item.shopping_list_id, keys[item.id]), item)
+
+    fields = item_fields({
+        key: [contribution.stored_values() for contribution in consolidation['contributions']]
+        for key, consolidation in consolidated.items()
+    })
+    SourceRecipe = ShoppingListItem.source_recipes.through
+    new_items, touched, links, contribution_objects = [], [], [], []
+    for shopping_list in tracked:
+        for key, consolidation in consolidated.items():
+            item = existing.get((shopping_list.id, key))
+            if item is None:
+                item = ShoppingListItem(
+                    shopping_list=shopping_list,
+                    ingredient_name=consolidation['name'].title(),
+                    canonical_ingredient_id=consolidation['canonical_id'],
+                    generated=True,
+                    **fields[key]
+                )
+                new_items.append(item)
+            else:
+                touched.append(item)
+            links.append(SourceRecipe(shoppinglistitem_id=item.id, recipe_id=assignment.recipe_id))
+            contribution_objects.extend(contribution_rows(item, consolidation['contributions']))
+
+    ShoppingListItem.objects.bulk_create(new_items)
+    SourceRecipe.objects.bulk_create(links, ignore_conflicts=True)
+    ShoppingListContribution.objects.bulk_create(contribution_objects)
+    _refresh_items(touched, _contributions_by_item(item.id for item in touched))
+
+    logger.info(
+        f"Added meal assignment {assignment.id} to {len(tracked)} shopping lists: "
+        f"{len(new_items)} new items, {len(touched)} updated"
+    )
+    return shopping_lists
+
+
+@transaction.atomic
+def remove_assignment(assignment: MealAssignment) -> List[ShoppingList]:
+    """
+    Take the ingredients of a meal assignment out of the shopping lists it falls in
+
+    Must run before the assignment is deleted, which would delete its
+    contributions. Items left without contributions are deleted unless they
+    were purchased.
+
+    Args:
+        assignment: Meal assignment about to be removed
+
+    Returns:
+        Updated shopping lists
+    """
+    shopping_lists = affected_shopping_lists(assignment.daily_meals.meal_plan_id, assignment.daily_meals.date)
+    _rebuild_untracked(shopping_lists)
+
+    contributions = ShoppingListContribution.objects.filter(assignment_id=assignment.id)
+    item_ids = set(contributions.values_list('item_id', flat=True))
+    if not item_ids:
+        return shopping_lists
+    contributions.delete()
+
+    remaining = _contributions_by_item(item_ids)
+    emptied = [item_id for item_id in item_ids if not remaining[item_id]]
+    ShoppingListItem.objects.filter(id__in=emptied, purchased=False, generated=True).delete()
+
+    # The recipe stays a source of items that another of its meals contributes to
+    unlinked = [
+        item_id for item_id in item_ids
+        if all(recipe_id != assignment.recipe_id for recipe_id, *_ in remaining[item_id])
+    ]
+    ShoppingListItem.source_recipes.through.objects.filter(
+        shoppinglistitem_id__in=unlinked, recipe_id=assignment.recipe_id
+    ).delete()
+
+    items = list(ShoppingListItem.objects.filter(id__in=[item_id for item_id in item_ids if remaining[item_id]]))
+    _refresh_items(items, remaining)
+
+    logger.info(
+        f"Removed meal assignment {assignment.id} from {len(shopping_lists)} shopping lists: "
+        f"{len(items)} items updated, {len(emptied)} emptied"
+    )
+    return shopping_lists
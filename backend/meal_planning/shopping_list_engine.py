@@ -0,0 +1,474 @@
+"""
+Set-based shopping list generation
+
+Shopping list items are built from all meal assignments of a set of meal plans
+in a date range with a fixed number of queries, however long the range is:
+
+1. one query for the assignments with their recipe servings and title
+2. one query for the ingredients of all assigned recipes
+3. consolidation in memory, keyed by canonical ingredient (see
+   recipes.ingredient_index), or by lowercase name for names without one
+4. one pass that sums the quantities of all items, scaled by the servings
+   of their meals and converted to canonical units (see quantity_totals)
+5. one bulk insert each for the items, their source recipe links and their
+   contributions (the share of every planned meal in an item)
+
+Items, categories and source recipes are the same as those of the per-day,
+per-recipe loop that ShoppingListService.generate_shopping_list used before
+(kept in meal_planning.shopping_list_reference for the benchmark and tests);
+the loop only joined the amounts as text. Contributions let
+meal_planning.shopping_list_delta apply a single meal change to a list
+without regenerating it.
+"""
+import logging
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from recipes.ingredient_index import resolve_many
+from recipes.keyword_matcher import get_matcher
+from recipes.models import Ingredient, IngredientCategory
+from recipes.quantity_parser import QUANTITY_PLACES, canonical_unit, parse_amount
+
+from .models import MealAssignment, ShoppingList, ShoppingListContribution, ShoppingListItem
+from .quantity_totals import Total, format_totals, sum_quantities
+
+logger = logging.getLogger(__name__)
+
+MAX_TOTAL_AMOUNT = 100
+# ShoppingListContribution.quantity is a DecimalField(max_digits=12, decimal_places=3)
+MAX_SCALED_QUANTITY = Decimal('999999999')
+
+
+class Contribution(NamedTuple):
+    """One ingredient of one planned meal, with the servings multiplier of that meal"""
+    assignment_id: Any
+    recipe_id: Any
+    recipe_title: str
+    position: int
+    name: str
+    amount: str
+    quantity: Optional[Decimal]
+    unit: str
+    category: str
+    multiplier: float
+
+    @property
+    def note(self) -> str:
+        """Amount as shown in the item total, empty when the ingredient has no amount"""
+        if not self.amount:
+            return ''
+        note = f"{self.amount} (from {self.recipe_title})"
+        if self.multiplier != 1:
+            note += f" x{self.multiplier:.1f}"
+        return note
+
+    @property
+    def scaled_quantity(self) -> Optional[Decimal]:
+        """Quantity for the planned servings, None when the amount has no number"""
+        if self.quantity is None:
+            return None
+        scaled = (self.quantity * Decimal(self.multiplier)).quantize(QUANTITY_PLACES)
+        return scaled if scaled <= MAX_SCALED_QUANTITY else None
+
+    def stored_values(self) -> tuple:
+        """(note, scaled quantity, unit, category) as stored in ShoppingListContribution"""
+        return (
+            self.note[:255], self.scaled_quantity, (self.unit or '')[:50], self.category or IngredientCategory.OTHER
+        )
+
+
+def is_malformed_ingredient_name(name: str) -> bool:
+    """
+    Check if an ingredient name appears to be malformed from poor PDF parsing
+
+    Args:
+        name: The ingredient name to check
+
+    Returns:
+        True if the name appears to be malformed
+    """
+    if not name or not name.strip():
+        return True
+
+    name = name.strip()
+
+    # Very short names that are likely parsing errors
+    if len(name) <= 2:
+        return True
+
+    # Names that are only numbers
+    if name.isdigit():
+        return True
+
+    # Names that are only numbers, spaces, and punctuation
+    if not any(c.isalpha() for c in name):
+        return True
+
+    # Names that contain obvious instruction text (common Dutch/English cooking terms)
+    name_lower = name.lower()
+    if get_matcher('malformed_ingredient_indicators').search(name_lower):
+        return True
+
+    # Names that are suspiciously long (likely contain instructions)
+    if len(name) > 100:
+        return True
+
+    # Names that contain multiple sentences (likely instructions)
+    if '. ' in name and len(name) > 50:
+        return True
+
+    # Names that start with instruction-like phrases
+    if get_matcher('malformed_ingredient_starters').startswith(name_lower):
+        return True
+
+    return False
+
+
+def servings_multiplier(servings_planned, recipe_servings) -> float:
+    """Scale of a planned meal relative to its recipe, as MealAssignment.effective_servings"""
+    return (servings_planned or recipe_servings or 1) / (recipe_servings or 1)
+
+
+def recipe_ingredients(recipe_ids: Iterable) -> Dict[Any, List[tuple]]:
+    """
+    Ingredient rows (name, amount, quantity, unit, category) per recipe, in recipe order, in one query
+
+    Ingredients stored before quantities were parsed get theirs from the
+    amount, parsed once per distinct amount.
+    """
+    ingredients = defaultdict(list)
+    parsed = {}
+    rows = (
+        Ingredient.objects
+        .filter(recipe_id__in=set(recipe_ids))
+        .order_by('recipe_id', 'order', 'name')
+        .values_list('recipe_id', 'name', 'amount', 'quantity', 'unit', 'category')
+    )
+    for recipe_id, name, amount, quantity, unit, category in rows:
+        if quantity is None and amount:
+            if amount not in parsed:
+                parsed[amount] = parse_amount(amount)
+            quantity, parsed_unit = parsed[amount]
+            unit = canonical_unit(unit) if unit else parsed_unit
+        ingredients[recipe_id].append((name, amount, quantity, unit, category))
+    return ingredients
+
+
+def assignment_contributions(assignments: List[tuple]) -> List[Contribution]:
+    """
+    Contributions of assignment rows (id, recipe id, recipe title, servings planned, recipe servings)
+
+    Returns:
+        Contributions in assignment order, then ingredient order
+    """
+    if not assignments:
+        return []
+
+    ingredients = recipe_ingredients(recipe_id for _, recipe_id, *_ in assignments)
+    return [
+        Contribution(
+            assignment_id, recipe_id, title, position, name, amount, quantity, unit, category,
+            servings_multiplier(planned, servings)
+        )
+        for assignment_id, recipe_id, title, planned, servings in assignments
+        for position, (name, amount, quantity, unit, category) in enumerate(ingredients[recipe_id])
+    ]
+
+
+ASSIGNMENT_FIELDS = ('id', 'recipe_id', 'recipe__title', 'servings_planned', 'recipe__servings')
+
+
+def load_contributions(meal_plan_ids: Iterable, start_date: date, end_date: date) -> List[Contribution]:
+    """
+    Ingredients of all meals planned in a date range, in two queries
+
+    Args:
+        meal_plan_ids: Meal plans to include
+        start_date: First day to include
+        end_date: Last day to include
+
+    Returns:
+        Contributions in meal plan, date and meal type order, then ingredient order
+    """
+    assignments = list(
+        MealAssignment.objects
+        .filter(
+            daily_meals__meal_plan_id__in=list(meal_plan_ids),
+            daily_meals__date__gte=start_date,
+            daily_meals__date__lte=end_date,
+        )
+        .order_by('-daily_meals__meal_plan__start_date', 'daily_meals__meal_plan_id', 'daily_meals__date', 'meal_type')
+        .values_list(*ASSIGNMENT_FIELDS)
+    )
+    return assignment_contributions(assignments)
+
+
+def ingredient_key(name: str) -> str:
+    """Key of ingredient names without a canonical ingredient"""
+    return name.lower().strip()
+
+
+def ingredient_keys(names: Iterable[str]) -> Dict[str, Tuple[Any, str, Optional[int]]]:
+    """
+    Keys that ingredient names are consolidated under, in one resolve_many call
+
+    Returns:
+        Dict of name -> (key, item name, canonical ingredient id). Names that
+        resolve are keyed by their canonical ingredient id and named after
+        it, the others by ingredient_key.
+    """
+    keys = {}
+    for name, match in resolve_many(names).items():
+        if match is None:
+            keys[name] = (ingredient_key(name), ingredient_key(name), None)
+        else:
+            keys[name] = (match.id, match.name, match.id)
+    return keys
+
+
+def item_keys(items: Iterable[ShoppingListItem]) -> Dict[Any, Any]:
+    """Consolidation key per item id, resolving the names of items saved without a canonical ingredient"""
+    items = list(items)
+    keys = ingredient_keys(item.ingredient_name for item in items if item.canonical_ingredient_id is None)
+    return {
+        item.id: item.canonical_ingredient_id or keys[item.ingredient_name][0]
+        for item in items
+    }
+
+
+def consolidate(contributions: Iterable[Contribution]) -> Dict[Any, Dict[str, Any]]:
+    """
+    Group contributions by canonical ingredient, skipping malformed names
+
+    Names that resolve to a canonical ingredient are never malformed, so
+    short names such as 'ui' are kept.
+
+    Returns:
+        Dict of key -> consolidation with the item name, canonical ingredient
+        id, contributing recipes and contributions
+    """
+    contributions = list(contributions)
+    keys = ingredient_keys({contribution.name for contribution in contributions})
+    consolidated = {}
+    malformed = {}
+
+    for contribution in contributions:
+        name = contribution.name
+        key, item_name, canonical_id = keys[name]
+        if canonical_id is None:
+            if name not in malformed:
+                malformed[name] = is_malformed_ingredient_name(name)
+            if malformed[name]:
+                continue
+
+        consolidation = consolidated.setdefault(key, {
+            'name': item_name, 'canonical_id': canonical_id, 'recipes': set(), 'contributions': []
+        })
+        consolidation['recipes'].add(contribution.recipe_id)
+        consolidation['contributions'].append(contribution)
+
+    return consolidated
+
+
+def format_total_amount(totals: List[Total], notes: Iterable[str]) -> str:
+    """
+    Consolidated amount description of at most MAX_TOTAL_AMOUNT characters
+
+    Args:
+        totals: Summed quantities of the item
+        notes: Notes of the contributions whose amount has no number
+    """
+    parts = [format_totals(totals)] if totals else []
+    parts.extend(note for note in notes if note)
+    if not parts:
+        return "As needed"
+    total_amount = '; '.join(parts)
+    if len(total_amount) > MAX_TOTAL_AMOUNT:
+        total_amount = total_amount[:MAX_TOTAL_AMOUNT - 3] + "..."
+    return total_amount
+
+
+def item_fields(contributions: Dict[Any, List[tuple]]) -> Dict[Any, Dict[str, str]]:
+    """
+    Total amount, unit and category of items from their ordered contributions
+
+    The quantities of all items are summed in a single pass (see
+    quantity_totals.sum_quantities).
+
+    Args:
+        contributions: Item key -> (note, scaled quantity, unit, category) per contribution
+
+    Returns:
+        Dict of item key -> dict with total_amount, an empty unit (the total
+        amount carries the units) and the first category other than 'other'
+    """
+    keys, quantities, units = [], [], []
+    for key, rows in contributions.items():
+        for _, quantity, unit, _ in rows:
+            if quantity is not None:
+                keys.append(key)
+                quantities.append(float(quantity))
+                units.append(unit)
+    totals = sum_quantities(keys, quantities, units)
+
+    fields = {}
+    for key, rows in contributions.items():
+        item_totals = totals.get(key, [])
+        notes, category = [], IngredientCategory.OTHER
+        for note, quantity, _, contribution_category in rows:
+            if quantity is None:
+                notes.append(note)
+            if category == IngredientCategory.OTHER:
+                category = contribution_category
+        fields[key] = {
+            'total_amount': format_total_amount(item_totals, notes),
+            # Totals and notes are shown with their own units ('2.1 kg + 3')
+            'unit': '',
+            'category': category or IngredientCategory.OTHER,
+        }
+    return fields
+
+
+def write_items(shopping_list: ShoppingList, consolidated: Dict[Any, Dict[str, Any]],
+                existing: Optional[Dict[Any, ShoppingListItem]] = None) -> List[ShoppingListItem]:
+    """
+    Save consolidated items with their source recipe links and contributions
+
+    Items found in existing (by consolidation key) are updated in place, which
+    keeps their purchased flag and notes; the others are inserted. Existing
+    must only hold generated items, and the list must have no links or
+    contributions for them left.
+
+    Returns:
+        Saved ShoppingListItem instances
+    """
+    existing = existing or {}
+    SourceRecipe = ShoppingListItem.source_recipes.through
+    new_items, updated_items, links, rows = [], [], [], []
+
+    fields = item_fields({
+        key: [contribution.stored_values() for contribution in consolidation['contributions']]
+        for key, consolidation in consolidated.items()
+    })
+    for key, consolidation in consolidated.items():
+        item = existing.get(key)
+        if item is None:
+            # Primary keys are UUIDs set on instantiation, so links need no second read
+            item = ShoppingListItem(
+                shopping_list=shopping_list,
+                ingredient_name=consolidation['name'].title(),
+                canonical_ingredient_id=consolidation['canonical_id'],
+                generated=True,
+                **fields[key]
+            )
+            new_items.append(item)
+        else:
+            for field, value in fields[key].items():
+                setattr(item, field, value)
+            item.canonical_ingredient_id = consolidation['canonical_id']
+            item.generated = True
+            updated_items.append(item)
+
+        links.extend(
+            SourceRecipe(shoppinglistitem_id=item.id, recipe_id=recipe_id)
+            for recipe_id in sorted(consolidation['recipes'], key=str)
+        )
+        rows.extend(contribution_rows(item, consolidation['contributions']))
+
+    ShoppingListItem.objects.bulk_create(new_items)
+    if updated_items:
+        ShoppingListItem.objects.bulk_update(
+            updated_items, ['total_amount', 'unit', 'category', 'canonical_ingredient', 'generated']
+        )
+    SourceRecipe.objects.bulk_create(links)
+    ShoppingListContribution.objects.bulk_create(rows)
+    return new_items + updated_items
+
+
+def contribution_rows(item: ShoppingListItem, contributions: Iterable[Contribution]) -> List[ShoppingListContribution]:
+    """Unsaved contribution rows of an item"""
+    rows = []
+    for contribution in contributions:
+        note, quantity, unit, category = contribution.stored_values()
+        rows.append(ShoppingListContribution(
+            item_id=item.id,
+            assignment_id=contribution.assignment_id,
+            recipe_id=contribution.recipe_id,
+            position=contribution.position,
+            note=note,
+            quantity=quantity,
+            unit=unit,
+            category=category
+        ))
+    return rows
+
+
+def build_shopping_list_items(shopping_list: ShoppingList, meal_plan_ids: Iterable) -> List[ShoppingListItem]:
+    """
+    Create the items of a shopping list from its meal plans and date range
+
+    Args:
+        shopping_list: Saved shopping list without items
+        meal_plan_ids: Meal plans to include
+
+    Returns:
+        Created ShoppingListItem instances
+    """
+    contributions = load_contributions(meal_plan_ids, shopping_list.start_date, shopping_list.end_date)
+    items = write_items(shopping_list, consolidate(contributions))
+    logger.info(
+        f"Generated {len(items)} items from {len(contributions)} ingredients for shopping list {shopping_list.id}"
+    )
+    return items
+
+
+def rebuild_shopping_list_items(shopping_list: ShoppingList) -> List[ShoppingListItem]:
+    """
+    Regenerate the items of an existing shopping list in place
+
+    Items that are still needed keep their id, purchased flag and notes.
+    Generated items that are no longer needed are deleted unless purchased;
+    items added by hand are neither updated nor deleted, a generated item
+    with the same name is added next to them.
+
+    Args:
+        shopping_list: Shopping list to regenerate from its meal plans and date range
+
+    Returns:
+        Saved ShoppingListItem instances
+    """
+    meal_plan_ids = list(shopping_list.meal_plans.values_list('id', flat=True))
+    contributions = load_contributions(meal_plan_ids, shopping_list.start_date, shopping_list.end_date)
+
+    # Before contributions were tracked every item was generated
+    items = [
+        item for item in shopping_list.items.all()
+        if item.generated or not shopping_list.contributions_tracked
+    ]
+    keys = item_keys(items)
+    existing = {}
+    for item in items:
+        existing.setdefault(keys[item.id], item)
+
+    # The links of items added by hand (e.g. the recipe they were added for) are kept
+    rebuilt = shopping_list.items.all()
+    if shopping_list.contributions_tracked:
+        rebuilt = rebuilt.filter(generated=True)
+    ShoppingListContribution.objects.filter(item__in=rebuilt).delete()
+    ShoppingListItem.source_recipes.through.objects.filter(shoppinglistitem__in=rebuilt).delete()
+
+    consolidated = consolidate(contributions)
+    saved = write_items(shopping_list, consolidated, existing)
+
+    kept = {item.id for item in saved}
+    stale = [item.id for item in items if item.id not in kept and not item.purchased]
+    ShoppingListItem.objects.filter(id__in=stale).delete()
+
+    if not shopping_list.contributions_tracked:
+        shopping_list.contributions_tracked = True
+        ShoppingList.objects.filter(id=shopping_list.id).update(contributions_tracked=True)
+
+    logger.info(f"Rebuilt shopping list {shopping_list.id}: {len(saved)} items, {len(stale)} removed")
+    return saved
@@ -0,0 +1,91 @@
+"""
+Reference implementation of shopping list generation
+
+This is the per-day, per-recipe loop that ShoppingListService.generate_shopping_list
+used before it delegated to meal_planning.shopping_list_engine: a query per
+day and per recipe, and an insert plus a source_recipes.set per item. It is
+kept unchanged so the benchmark_shopping_list command can measure the engine
+against it and the tests can check that both produce the same items from the
+same recipes. It joins amounts as text where the engine sums them. Do not use
+it in application code.
+"""
+from collections import defaultdict
+
+from recipes.models import IngredientCategory
+
+from .models import ShoppingListItem
+from .shopping_list_engine import is_malformed_ingredient_name
+
+
+def reference_build_items(shopping_list, meal_plans):
+    """Create the items of a shopping list as generate_shopping_list did before the engine"""
+    start_date, end_date = shopping_list.start_date, shopping_list.end_date
+    
+    # Collect ingredients from all meal assignments in the date range
+    ingredient_consolidation = defaultdict(lambda: {
+        'total_amount': '',
+        'unit': '',
+        'category': IngredientCategory.OTHER,
+        'recipes': set(),
+        'notes': []
+    })
+    
+    for meal_plan in meal_plans:
+        # Get daily meals within the date range
+        daily_meals = meal_plan.daily_meals.filter(
+            date__gte=start_date,
+            date__lte=end_date
+        )
+        
+        for daily in daily_meals:
+            for assignment in daily.meal_assignments.select_related('recipe').all():
+                recipe = assignment.recipe
+                servings_multiplier = assignment.effective_servings / (recipe.servings or 1)
+                
+                # Add ingredients from this recipe
+                for ingredient in recipe.ingredients.all():
+                    # Skip ingredients with obviously malformed names
+                    if is_malformed_ingredient_name(ingredient.name):
+                        continue
+                        
+                    key = ingredient.name.lower().strip()
+                    consolidation = ingredient_consolidation[key]
+                    
+                    # Track which recipes use this ingredient
+                    consolidation['recipes'].add(recipe)
+                    
+                    # Use the first category we encounter (could be improved)
+                    if consolidation['category'] == IngredientCategory.OTHER:
+                        consolidation['category'] = ingredient.category
+                    
+                    # For now, just collect amounts as text (proper consolidation would need unit parsing)
+                    if ingredient.amount:
+                        amount_text = f"{ingredient.amount} (from {recipe.title})"
+                        if servings_multiplier != 1:
+                            amount_text += f" x{servings_multiplier:.1f}"
+                        consolidation['notes'].append(amount_text)
+                    
+                    # Use the most common unit
+                    if ingredient.unit and not consolidation['unit']:
+                        consolidation['unit'] = ingredient.unit
+    
+    # Create shopping list items
+    for ingredient_name, consolidation in ingredient_consolidation.items():
+        # Create a consolidated amount description (max 100 chars)
+        if consolidation['notes']:
+            total_amount = '; '.join(consolidation['notes'])
+            if len(total_amount) > 100:
+                total_amount = total_amount[:97] + "..."
+        else:
+            total_amount = "As needed"
+        
+        item = ShoppingListItem.objects.create(
+            shopping_list=shopping_list,
+            ingredient_name=ingredient_name.title(),
+            total_amount=total_amount,
+            unit=consolidation['unit'] or '',
+            category=consolidation['category'] or 'other'
+        )
+        
+        # Link to source recipes
+        item.source_recipes.set(consolidation['recipes'])
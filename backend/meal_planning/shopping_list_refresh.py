@@ -0,0 +1,213 @@
+"""
+Coalesced background refresh of shopping lists
+
+Meal plan changes that are not applied as a delta mark the affected shopping
+lists for a refresh by setting refresh_requested_at, which keeps the time of
+the first change until the list is refreshed. A list is regenerated in place
+once SHOPPING_LIST_REFRESH_WINDOW seconds have passed since that first change,
+so a burst of changes costs a single regeneration per window.
+
+Refreshes are claimed with a conditional UPDATE, like import jobs, so the
+run_shopping_list_worker command and the in-process timer can run side by
+side. A request that reads a list past its window only starts the timer
+(schedule_if_due). Each list is regenerated in one transaction: readers see
+the previous items until it commits, with ShoppingList.is_refreshing telling them an
+update is on its way, and never wait for it.
+"""
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import DateTimeField, Q, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import ShoppingList
+from .shopping_list_engine import rebuild_shopping_list_items
+
+logger = logging.getLogger(__name__)
+
+_timer = None
+_timer_lock = threading.Lock()
+
+
+def request_refresh(shopping_lists) -> int:
+    """
+    Mark shopping lists for a refresh
+
+    Lists that are already marked keep their first request time, so the
+    window is counted from the first change.
+
+    Args:
+        shopping_lists: ShoppingList queryset
+
+    Returns:
+        Number of lists marked
+    """
+    marked = shopping_lists.update(
+        refresh_requested_at=Coalesce('refresh_requested_at', Value(timezone.now(), output_field=DateTimeField()))
+    )
+    if marked and settings.SHOPPING_LIST_REFRESH_IN_PROCESS:
+        transaction.on_commit(schedule_in_process)
+    return marked
+
+
+def request_refresh_for_meal_plan(meal_plan_id) -> List[ShoppingList]:
+    """Mark all shopping lists that include a meal plan for a refresh"""
+    shopping_lists = ShoppingList.objects.filter(
+        id__in=ShoppingList.objects.filter(meal_plans__id=meal_plan_id).values('id')
+    )
+    request_refresh(shopping_lists)
+    return list(shopping_lists)
+
+
+def _claimable(now: datetime) -> Q:
+    """Lists not being refreshed, or whose refresh was abandoned"""
+    stale = now - timedelta(seconds=settings.SHOPPING_LIST_REFRESH_TIMEOUT)
+    return Q(refresh_started_at__isnull=True) | Q(refresh_started_at__lt=stale)
+
+
+def claim_due_lists(now: Optional[datetime] = None, limit: int = 20,
+                    shopping_lists=None) -> List[ShoppingList]:
+    """
+    Atomically claim shopping lists whose refresh window has passed
+
+    Args:
+        now: Current time, for tests
+        limit: Most lists to claim
+        shopping_lists: ShoppingList queryset to claim from, all lists by default
+
+    Returns:
+        Claimed ShoppingList instances
+    """
+    now = now or timezone.now()
+    due = now - timedelta(seconds=settings.SHOPPING_LIST_REFRESH_WINDOW)
+    shopping_lists = ShoppingList.objects.all() if shopping_lists is None else shopping_lists
+    candidates = list(
+        shopping_lists
+        .filter(_claimable(now), refresh_requested_at__lte=due)
+        .order_by('refresh_requested_at')
+        .values_list('id', 'refresh_requested_at')[:limit]
+    )
+
+    claimed = []
+    for list_id, requested_at in candidates:
+        # Changes made while the list is refreshed set refresh_requested_at again
+        updated = ShoppingList.objects.filter(_claimable(now), id=list_id, refresh_requested_at=requested_at).update(
+            refresh_started_at=now,
+            refresh_requested_at=None
+        )
+        if updated:
+            claimed.append(list_id)
+    return list(ShoppingList.objects.filter(id__in=claimed))
+
+
+def refresh_shopping_list(shopping_list: ShoppingList) -> bool:
+    """
+    Regenerate a claimed shopping list
+
+    On failure the list is marked for a refresh again, so it is retried after
+    the next window.
+
+    Returns:
+        True if the list was refreshed
+    """
+    try:
+        with transaction.atomic():
+            rebuild_shopping_list_items(shopping_list)
+            ShoppingList.objects.filter(id=shopping_list.id).update(
+                refresh_started_at=None, refreshed_at=timezone.now()
+            )
+        return True
+    except Exception as e:
+        logger.error(f"Failed to refresh shopping list {shopping_list.id}: {str(e)}")
+        ShoppingList.objects.filter(id=shopping_list.id).update(refresh_started_at=None)
+        request_refresh(ShoppingList.objects.filter(id=shopping_list.id))
+        return False
+
+
+def refresh_due_lists(now: Optional[datetime] = None, limit: int = 20, shopping_lists=None) -> int:
+    """
+    Refresh shopping lists whose window has passed
+
+    Args:
+        now: Current time, for tests
+        limit: Most lists to refresh in this pass
+        shopping_lists: ShoppingList queryset to refresh from, all lists by default
+
+    Returns:
+        Number of lists refreshed
+    """
+    return sum(
+        refresh_shopping_list(shopping_list) for shopping_list in claim_due_lists(now, limit, shopping_lists)
+    )
+
+
+def schedule_if_due(shopping_list: ShoppingList, now: Optional[datetime] = None) -> bool:
+    """
+    Start the in-process timer for a list that is read after its window passed
+
+    Lists are refreshed by the worker or the in-process timer; this makes sure
+    an overdue list is refreshed when neither of them is waiting, without
+    making the reader wait for it. The reader gets the stored items, with
+    is_refreshing set.
+
+    Returns:
+        True if a refresh was scheduled
+    """
+    if shopping_list.refresh_requested_at is None:
+        return False
+    now = now or timezone.now()
+    if shopping_list.refresh_requested_at > now - timedelta(seconds=settings.SHOPPING_LIST_REFRESH_WINDOW):
+        return False
+    transaction.on_commit(lambda: schedule_in_process(0))
+    return True
+
+
+def seconds_until_next_refresh() -> Optional[float]:
+    """Seconds until the earliest marked list is due, None when nothing is marked"""
+    requested_at = (
+        ShoppingList.objects
+        .filter(refresh_requested_at__isnull=False)
+        .order_by('refresh_requested_at')
+        .values_list('refresh_requested_at', flat=True)
+        .first()
+    )
+    if requested_at is None:
+        return None
+    due = requested_at + timedelta(seconds=settings.SHOPPING_LIST_REFRESH_WINDOW)
+    return max((due - timezone.now()).total_seconds(), 0.0)
+
+
+def schedule_in_process(delay: Optional[float] = None):
+    """Start the refresh timer of this process unless it is already waiting"""
+    global _timer
+    with _timer_lock:
+        if _timer is not None:
+            return
+        delay = settings.SHOPPING_LIST_REFRESH_WINDOW if delay is None else delay
+        # A daemon thread never keeps the process from exiting
+        _timer = threading.Timer(delay, _run_timer)
+        _timer.daemon = True
+        _timer.start()
+
+
+def _run_timer():
+    global _timer
+    try:
+        refresh_due_lists()
+        next_refresh = seconds_until_next_refresh()
+    except Exception as e:
+        logger.error(f"Shopping list refresh failed: {str(e)}")
+        next_refresh = None
+    finally:
+        # The connections of this thread are not reused by requests
+        connections.close_all()
+        with _timer_lock:
+            _timer = None
+
+    if next_refresh is not None:
+        schedule_in_process(next_refresh + 0.1)
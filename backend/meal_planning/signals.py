@@ -0,0 +1,34 @@
+"""
+Keep shopping lists in step with deleted recipes and meal plans
+
+Deleting a recipe or meal plan cascades to its meal assignments and their
+shopping list contributions without going through shopping_list_delta, so
+the lists that included them are marked for a refresh first (see
+shopping_list_refresh). The refresh drops the generated items that are no
+longer needed and recomputes the others.
+"""
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+
+from recipes.models import Recipe
+
+from .models import MealPlan, ShoppingList
+from .shopping_list_refresh import request_refresh
+
+
+@receiver(pre_delete, sender=Recipe, dispatch_uid='shopping_lists_recipe_deleted')
+def recipe_deleted(sender, instance, **kwargs):
+    """Refresh the shopping lists the recipe contributes to"""
+    list_ids = list(
+        ShoppingList.objects.filter(items__contributions__recipe_id=instance.pk).values_list('id', flat=True)
+    )
+    if list_ids:
+        request_refresh(ShoppingList.objects.filter(id__in=list_ids))
+
+
+@receiver(pre_delete, sender=MealPlan, dispatch_uid='shopping_lists_meal_plan_deleted')
+def meal_plan_deleted(sender, instance, **kwargs):
+    """Refresh the shopping lists that include the meal plan"""
+    list_ids = list(ShoppingList.objects.filter(meal_plans__id=instance.pk).values_list('id', flat=True))
+    if list_ids:
+        request_refresh(ShoppingList.objects.filter(id__in=list_ids))
@@ -1,11 +1,20 @@
-from django.test import TestCase
+import io
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework.test import APITestCase
 from rest_framework import status
 from datetime import date, timedelta
-from recipes.models import Recipe, Ingredient, RecipeSource
+from recipes import ingredient_index
+from recipes.models import CanonicalIngredient, Recipe, Ingredient, RecipeSource
 from .models import MealPlan, DailyMeals, MealAssignment, ShoppingList, ShoppingListItem, MealType
+from . import quantity_totals, shopping_list_refresh
 from .services import MealPlanningService, ShoppingListService
+from .shopping_list_reference import reference_build_items
 
 
 class MealPlanModelTest(TestCase):
@@ -437,4 +446,317 @@ class ShoppingListAPITest(APITestCase):
         response = self.client.get(url)
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertIsInstance(response.data, dict)
\ No newline at end of file
+        self.assertIsInstance(response.data, dict)
+
+class ShoppingListEngineTest(TestCase):
+    """Test set-based shopping list generation"""
+    
+    def setUp(self):
+        # Group by name, like the per-row loop, with an empty dictionary compiled before counting queries
+        CanonicalIngredient.objects.all().delete()
+        ingredient_index.reset_index()
+        ingredient_index.get_index()
+        self.user = User.objects.create_user(username='planner', password='secret123')
+        self.service = ShoppingListService()
+        self.pasta = Recipe.objects.create(user=self.user, title="Pasta", servings=4)
+        self.salad = Recipe.objects.create(user=self.user, title="Salade", servings=2)
+        for recipe, ingredients in [
+            (self.pasta, [('Tomaten', '400 gram', 'g', 'produce'), ('Pasta', '300 gram', 'g', 'pantry'),
+                          ('ui', '1', '', 'produce'), ('1.', '', '', 'other')]),
+            (self.salad, [('tomaten', '2', '', 'other'), ('Rucola', '75 gram', 'g', 'produce')]),
+        ]:
+            for order, (name, amount, unit, category) in enumerate(ingredients):
+                Ingredient.objects.create(
+                    recipe=recipe, name=name, amount=amount, unit=unit, category=category, order=order
+                )
+        
+        self.meal_plan = MealPlanningService().create_meal_plan(
+            name="Maand", start_date=date(2024, 1, 1), end_date=date(2024, 1, 28), user=self.user
+        )
+        for daily in self.meal_plan.daily_meals.all():
+            MealAssignment.objects.create(daily_meals=daily, recipe=self.pasta, meal_type=MealType.DINNER)
+            if daily.date.day % 3 == 0:
+                MealAssignment.objects.create(
+                    daily_meals=daily, recipe=self.salad, meal_type=MealType.LUNCH, servings_planned=3
+                )
+    
+    def _generate(self, end_date):
+        return self.service.generate_shopping_list(
+            name="Boodschappen", start_date=date(2024, 1, 1), end_date=end_date,
+            meal_plan_ids=[str(self.meal_plan.id)], user=self.user
+        )
+    
+    def _snapshot(self, shopping_list, amounts=True):
+        return sorted(
+            (item.ingredient_name, item.total_amount if amounts else None, item.unit if amounts else None,
+             item.category, sorted(item.source_recipes.values_list('title', flat=True)))
+            for item in shopping_list.items.all()
+        )
+    
+    def test_same_items_as_per_row_loop(self):
+        """Test the engine consolidates the same items as the previous loop"""
+        shopping_list = self._generate(date(2024, 1, 7))
+        reference = ShoppingList.objects.create(
+            user=self.user, name="Reference", start_date=date(2024, 1, 1), end_date=date(2024, 1, 7)
+        )
+        reference_build_items(reference, [self.meal_plan])
+        
+        self.assertEqual(self._snapshot(shopping_list, amounts=False), self._snapshot(reference, amounts=False))
+        tomatoes = shopping_list.items.get(ingredient_name='Tomaten')
+        self.assertEqual(tomatoes.category, 'produce')
+        self.assertEqual(tomatoes.source_recipes.count(), 2)
+        self.assertFalse(shopping_list.items.filter(ingredient_name='1.').exists())
+    
+    def test_quantities_summed_in_canonical_units(self):
+        """Test amounts are scaled by the planned servings and summed per unit dimension"""
+        Ingredient.objects.create(recipe=self.pasta, name="Olijfolie", amount="2 el", quantity=2, unit="tbsp", order=4)
+        Ingredient.objects.create(recipe=self.pasta, name="olijfolie", amount="1 tl", quantity=1, unit="tsp", order=5)
+        Ingredient.objects.create(recipe=self.salad, name="Olijfolie", amount="naar smaak", order=2)
+        shopping_list = self._generate(date(2024, 1, 7))
+        
+        # 7 x 400 g for dinner, 2 lunches of 2 tomatoes x1.5
+        tomatoes = shopping_list.items.get(ingredient_name='Tomaten')
+        self.assertEqual((tomatoes.total_amount, tomatoes.unit), ('2.8 kg + 6', ''))
+        self.assertEqual(shopping_list.items.get(ingredient_name='Rucola').total_amount, '225 g')
+        self.assertEqual(shopping_list.items.get(ingredient_name='Pasta').total_amount, '2.1 kg')
+        self.assertEqual(
+            shopping_list.items.get(ingredient_name='Olijfolie').total_amount,
+            '16.3 el; naar smaak (from Salade) x1.5; naar smaak (from Salade) x1.5'
+        )
+    
+    def test_totals_same_with_and_without_numpy(self):
+        """Test the vectorised sum and the Python loop give identical totals"""
+        keys = ['ui', 'melk', 'ui', 'melk', 'zout', 'ui', 'melk', 'gehakt', 'gehakt']
+        quantities = [1, 750, 2, 0.5, 1, 200, 3, 1, 200]
+        units = ['', 'ml', '', 'l', 'pinch', 'g', 'tbsp', 'pond', 'g']
+        totals = quantity_totals.sum_quantities(keys, quantities, units, use_numpy=False)
+        
+        self.assertEqual(totals, {
+            'ui': [quantity_totals.Total(3, ''), quantity_totals.Total(200, 'g')],
+            'melk': [quantity_totals.Total(1.25, 'l'), quantity_totals.Total(3, 'tbsp')],
+            'zout': [quantity_totals.Total(1, 'pinch')],
+            'gehakt': [quantity_totals.Total(700, 'g')],
+        })
+        if quantity_totals.NUMPY_AVAILABLE:
+            self.assertEqual(quantity_totals.sum_quantities(keys, quantities, units, use_numpy=True), totals)
+    
+    def test_query_count_independent_of_range(self):
+        """Test a month costs as many queries as a week"""
+        with self.assertNumQueries(14):
+            self._generate(date(2024, 1, 7))
+        with self.assertNumQueries(14):
+            self._generate(date(2024, 1, 28))
+    
+    def test_meal_changes_applied_as_deltas(self):
+        """Test adding and removing a meal gives the same items as regenerating, keeping purchases and notes"""
+        shopping_list = self._generate(date(2024, 1, 7))
+        pasta = shopping_list.items.get(ingredient_name='Pasta')
+        ShoppingListItem.objects.filter(id=pasta.id).update(purchased=True, notes='Volkoren')
+        planner = MealPlanningService()
+        
+        with self.assertNumQueries(17):
+            assignment = planner.assign_meal(
+                str(self.meal_plan.id), date(2024, 1, 2), str(self.salad.id), MealType.DINNER, servings_planned=4
+            )
+        
+        self.assertEqual(self._snapshot(shopping_list), self._snapshot(self._generate(date(2024, 1, 7))))
+        self.assertEqual(shopping_list.items.get(ingredient_name='Rucola').total_amount, '375 g')
+        pasta.refresh_from_db()
+        self.assertEqual((pasta.purchased, pasta.notes), (True, 'Volkoren'))
+        
+        self.assertTrue(planner.remove_meal_assignment(str(assignment.id)))
+        
+        self.assertEqual(self._snapshot(shopping_list), self._snapshot(self._generate(date(2024, 1, 7))))
+        self.assertEqual(shopping_list.items.get(id=pasta.id).notes, 'Volkoren')
+    
+    def test_delta_cost_independent_of_plan(self):
+        """Test a meal change costs as many queries on a month list as on a week list"""
+        self._generate(date(2024, 1, 28))
+        planner = MealPlanningService()
+        with self.assertNumQueries(17):
+            planner.assign_meal(str(self.meal_plan.id), date(2024, 1, 2), str(self.salad.id), MealType.DINNER)
+    
+    def test_items_added_by_hand_are_left_alone(self):
+        """Test meal changes and rebuilds never take over or delete an item added by hand"""
+        shopping_list = self._generate(date(2024, 1, 1))
+        manual = ShoppingListItem.objects.create(
+            shopping_list=shopping_list, ingredient_name='Rucola', total_amount='1 zak', notes='Van de markt'
+        )
+        manual.source_recipes.add(self.salad)
+        planner = MealPlanningService()
+        
+        assignment = planner.assign_meal(
+            str(self.meal_plan.id), date(2024, 1, 1), str(self.salad.id), MealType.LUNCH
+        )
+        generated = shopping_list.items.get(ingredient_name='Rucola', generated=True)
+        self.assertEqual(generated.total_amount, '75 g')
+        self.assertNotEqual(generated.id, manual.id)
+        
+        planner.remove_meal_assignment(str(assignment.id))
+        ShoppingListService().update_shopping_lists_for_meal_plan(str(self.meal_plan.id))
+        
+        manual.refresh_from_db()
+        self.assertEqual((manual.total_amount, manual.notes, manual.generated), ('1 zak', 'Van de markt', False))
+        self.assertEqual(list(manual.source_recipes.all()), [self.salad])
+        self.assertEqual(shopping_list.items.filter(ingredient_name='Rucola').count(), 1)
+    
+    def test_deleted_recipe_leaves_list_on_refresh(self):
+        """Test deleting a planned recipe marks its lists for a refresh that drops its items"""
+        shopping_list = self._generate(date(2024, 1, 7))
+        
+        with override_settings(SHOPPING_LIST_REFRESH_IN_PROCESS=False):
+            self.salad.delete()
+        shopping_list.refresh_from_db()
+        self.assertTrue(shopping_list.is_refreshing)
+        self.assertTrue(shopping_list.items.filter(ingredient_name='Rucola').exists())
+        
+        shopping_list_refresh.refresh_shopping_list(shopping_list)
+        self.assertFalse(shopping_list.items.filter(ingredient_name='Rucola').exists())
+        self.assertEqual(shopping_list.items.get(ingredient_name='Tomaten').source_recipes.count(), 1)
+    
+    def test_regenerate_in_place(self):
+        """Test lists are regenerated in place, and lists without contributions are rebuilt once"""
+        legacy = ShoppingList.objects.create(
+            user=self.user, name="Oud", start_date=date(2024, 1, 1), end_date=date(2024, 1, 7)
+        )
+        legacy.meal_plans.add(self.meal_plan)
+        reference_build_items(legacy, [self.meal_plan])
+        legacy.items.filter(ingredient_name='Pasta').update(purchased=True)
+        ShoppingListItem.objects.create(shopping_list=legacy, ingredient_name='Verouderd', total_amount='1')
+        
+        ShoppingListService().update_shopping_lists_for_meal_plan(str(self.meal_plan.id))
+        
+        legacy.refresh_from_db()
+        self.assertEqual(ShoppingList.objects.count(), 1)
+        self.assertTrue(legacy.contributions_tracked)
+        self.assertTrue(legacy.items.get(ingredient_name='Pasta').purchased)
+        self.assertFalse(legacy.items.filter(ingredient_name='Verouderd').exists())
+        self.assertEqual(self._snapshot(legacy), self._snapshot(self._generate(date(2024, 1, 7))))
+
+    
+    def test_variants_grouped_by_canonical_ingredient(self):
+        """Test spelling variants of an ingredient become one item, also after a meal change"""
+        ingredient_index.load_dictionary()
+        self.addCleanup(ingredient_index.reset_index)
+        Ingredient.objects.create(recipe=self.pasta, name="Grote ui", amount="1", order=4)
+        Ingredient.objects.create(recipe=self.salad, name="Uien (gesnipperd)", amount="2", order=2)
+        shopping_list = self._generate(date(2024, 1, 7))
+        
+        onions = shopping_list.items.get(ingredient_name='Ui')
+        self.assertEqual(onions.canonical_ingredient.name, 'ui')
+        self.assertEqual(onions.total_amount, '20')
+        self.assertEqual(onions.source_recipes.count(), 2)
+        self.assertFalse(shopping_list.items.filter(ingredient_name__icontains='grote').exists())
+        
+        MealPlanningService().assign_meal(
+            str(self.meal_plan.id), date(2024, 1, 2), str(self.salad.id), MealType.DINNER, servings_planned=2
+        )
+        self.assertEqual(shopping_list.items.get(ingredient_name='Ui').total_amount, '22')
+        self.assertEqual(self._snapshot(shopping_list), self._snapshot(self._generate(date(2024, 1, 7))))
+    
+    def test_remove_duplicates_by_canonical_ingredient(self):
+        """Test items that are spelling variants of one ingredient are merged"""
+        ingredient_index.load_dictionary()
+        self.addCleanup(ingredient_index.reset_index)
+        shopping_list = ShoppingList.objects.create(
+            user=self.user, name="Handmatig", start_date=date(2024, 1, 1), end_date=date(2024, 1, 7)
+        )
+        for name in ['Uien', 'Grote ui', 'Knoflok', 'Knoflook', 'Saffraandraadjes']:
+            ShoppingListItem.objects.create(shopping_list=shopping_list, ingredient_name=name, total_amount='1')
+        
+        self.assertEqual(ShoppingListService().remove_duplicates(str(shopping_list.id)), 2)
+        self.assertEqual(shopping_list.items.count(), 3)
+
+
+@override_settings(SHOPPING_LIST_REFRESH_IN_PROCESS=False, SHOPPING_LIST_REFRESH_WINDOW=30)
+class ShoppingListRefreshTest(APITestCase):
+    """Test coalesced background refresh of shopping lists"""
+    
+    def setUp(self):
+        ingredient_index.reset_index()
+        self.user = User.objects.create_user(username='refresher', password='secret123')
+        self.client.force_authenticate(user=self.user)
+        self.recipe = Recipe.objects.create(user=self.user, title="Soep", servings=2)
+        Ingredient.objects.create(recipe=self.recipe, name="Pompoen", amount="1", category="produce")
+        self.planner = MealPlanningService()
+        self.meal_plan = self.planner.create_meal_plan(
+            name="Week", start_date=date(2024, 1, 1), end_date=date(2024, 1, 7), user=self.user
+        )
+        self.shopping_list = ShoppingListService().generate_shopping_list(
+            name="Boodschappen", start_date=date(2024, 1, 1), end_date=date(2024, 1, 7),
+            meal_plan_ids=[str(self.meal_plan.id)], user=self.user
+        )
+    
+    @override_settings(SHOPPING_LIST_DELTA_UPDATES=False)
+    def test_changes_coalesced_into_one_refresh(self):
+        """Test a burst of meal changes regenerates the list once, after the window"""
+        for day in range(1, 6):
+            self.planner.assign_meal(str(self.meal_plan.id), date(2024, 1, day), str(self.recipe.id), MealType.DINNER)
+        
+        self.shopping_list.refresh_from_db()
+        requested_at = self.shopping_list.refresh_requested_at
+        self.assertIsNotNone(requested_at)
+        self.assertEqual(self.shopping_list.items.count(), 0)
+        url = reverse('shoppinglist-detail', kwargs={'pk': self.shopping_list.id})
+        self.assertTrue(self.client.get(url).data['refreshing'])
+        
+        with mock.patch.object(
+            shopping_list_refresh, 'rebuild_shopping_list_items', wraps=shopping_list_refresh.rebuild_shopping_list_items
+        ) as rebuild:
+            self.assertEqual(shopping_list_refresh.refresh_due_lists(now=requested_at + timedelta(seconds=10)), 0)
+            self.assertEqual(shopping_list_refresh.refresh_due_lists(now=requested_at + timedelta(seconds=31)), 1)
+            self.assertEqual(shopping_list_refresh.refresh_due_lists(now=requested_at + timedelta(seconds=62)), 0)
+        
+        self.assertEqual(rebuild.call_count, 1)
+        response = self.client.get(url)
+        self.assertFalse(response.data['refreshing'])
+        self.assertIsNotNone(response.data['refreshed_at'])
+        self.assertEqual(self.shopping_list.items.get().total_amount, '5')
+    
+    @override_settings(SHOPPING_LIST_DELTA_UPDATES=False)
+    @override_settings(SHOPPING_LIST_DELTA_UPDATES=False)
+    def test_overdue_list_read_schedules_refresh(self):
+        """Test reading a list after its window returns the stored items and refreshes it in the background"""
+        self.planner.assign_meal(str(self.meal_plan.id), date(2024, 1, 1), str(self.recipe.id), MealType.DINNER)
+        url = reverse('shoppinglist-detail', kwargs={'pk': self.shopping_list.id})
+        
+        with mock.patch.object(shopping_list_refresh, 'schedule_in_process') as schedule:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.get(url)
+            schedule.assert_not_called()
+            
+            with override_settings(SHOPPING_LIST_REFRESH_WINDOW=0), self.captureOnCommitCallbacks(execute=True):
+                response = self.client.get(url)
+            schedule.assert_called_once_with(0)
+        
+        self.assertTrue(response.data['refreshing'])
+        self.assertEqual(response.data['items'], [])
+        self.shopping_list.refresh_from_db()
+        self.assertIsNotNone(self.shopping_list.refresh_requested_at)
+    
+    def test_claim_is_exclusive(self):
+        """Test a list is claimed once, and a change during its refresh marks it again"""
+        self.planner.trigger_shopping_list_updates(str(self.meal_plan.id))
+        later = timezone.now() + timedelta(seconds=60)
+        
+        claimed = shopping_list_refresh.claim_due_lists(now=later)
+        self.assertEqual([shopping_list.id for shopping_list in claimed], [self.shopping_list.id])
+        self.assertEqual(shopping_list_refresh.claim_due_lists(now=later), [])
+        
+        self.planner.trigger_shopping_list_updates(str(self.meal_plan.id))
+        self.assertTrue(shopping_list_refresh.refresh_shopping_list(claimed[0]))
+        self.shopping_list.refresh_from_db()
+        self.assertIsNotNone(self.shopping_list.refresh_requested_at)
+        self.assertIsNone(self.shopping_list.refresh_started_at)
+    
+    @override_settings(SHOPPING_LIST_REFRESH_WINDOW=0)
+    def test_worker_command(self):
+        """Test the worker refreshes due lists and exits with --once"""
+        self.planner.trigger_shopping_list_updates(str(self.meal_plan.id))
+        output = io.StringIO()
+        
+        call_command('run_shopping_list_worker', '--once', stdout=output)
+        
+        self.assertIn('Refreshed 1 shopping lists', output.getvalue())
+        self.shopping_list.refresh_from_db()
+        self.assertFalse(self.shopping_list.is_refreshing)
@@ -14,6 +14,7 @@ from .serializers import (
     ShoppingListSerializer, ShoppingListCreateSerializer, ShoppingListItemSerializer
 )
 from .services import MealPlanningService, ShoppingListService
+from .shopping_list_refresh import schedule_if_due
 
 logger = logging.getLogger(__name__)
 
@@ -211,6 +212,11 @@ class MealAssignmentViewSet(viewsets.ModelViewSet):
         """Filter queryset to only show current user's meal assignments"""
         return MealAssignment.objects.filter(daily_meals__meal_plan__user=self.request.user).select_related('recipe', 'daily_meals__meal_plan')
     
+    def perform_update(self, serializer):
+        """Save the assignment and mark the shopping lists of its meal plan for a refresh"""
+        assignment = serializer.save()
+        MealPlanningService().trigger_shopping_list_updates(str(assignment.daily_meals.meal_plan_id))
+    
     def destroy(self, request, *args, **kwargs):
         """Delete a meal assignment"""
         assignment = self.get_object()
@@ -272,6 +278,13 @@ class ShoppingListViewSet(viewsets.ModelViewSet):
             # Personal scope - only user's own shopping lists
             return ShoppingList.objects.filter(user=self.request.user).prefetch_related('items', 'meal_plans')
     
+    def get_object(self):
+        """Return the shopping list, scheduling its refresh when it is read after its refresh window"""
+        shopping_list = super().get_object()
+        if self.request.method == 'GET':
+            schedule_if_due(shopping_list)
+        return shopping_list
+    
     def perform_create(self, serializer):
         """Set the user when creating a shopping list"""
         serializer.save(user=self.request.user)
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 import os
 import sys
+import tempfile
 from pathlib import Path
 from .config import get_env_bool, get_env_list, get_env_str, get_env_int, is_production
 
@@ -270,9 +271,92 @@ SPECTACULAR_SETTINGS = {
 }
 
 # File upload settings
-FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
+# Larger uploads are streamed to a temporary file instead of being held in memory
+FILE_UPLOAD_MAX_MEMORY_SIZE = get_env_int('FILE_UPLOAD_MAX_MEMORY_SIZE', default=2_621_440)  # 2.5MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
 
+# Recipe import worker
+# When enabled, POST /api/recipes/import/ queues an ImportJob and returns 202;
+# `python manage.py run_import_worker` processes the queue (started by
+# start_workers.sh in the Docker image, the worker process in the Procfile)
+RECIPE_IMPORT_ASYNC = get_env_bool('RECIPE_IMPORT_ASYNC', default=True)
+IMPORT_WORKER_PROCESSES = get_env_int('IMPORT_WORKER_PROCESSES', default=2)
+IMPORT_WORKER_POLL_INTERVAL = get_env_int('IMPORT_WORKER_POLL_INTERVAL', default=2)  # seconds
+IMPORT_JOB_TIMEOUT = get_env_int('IMPORT_JOB_TIMEOUT', default=600)  # seconds without a worker heartbeat before a running job is requeued
+IMPORT_WORKER_REQUEUE_INTERVAL = get_env_int('IMPORT_WORKER_REQUEUE_INTERVAL', default=60)  # seconds between heartbeats and stale job checks
+# Previews (preview=true) are kept this long for POST /api/recipes/import/commit/
+IMPORT_PREVIEW_TIMEOUT = get_env_int('IMPORT_PREVIEW_TIMEOUT', default=30 * 60)  # seconds
+# Stages of every single-file import, in order: names from recipes/import_pipeline.py STAGES
+# or dotted paths of ImportStage subclasses. Durations per stage are stored on SourceMetadata
+IMPORT_PIPELINE_STAGES = get_env_list(
+    'IMPORT_PIPELINE_STAGES', default='validation,extraction,parsing,classification,persist'
+)
+
+# Resumable chunked uploads (POST /api/uploads/), spooled to files in CHUNKED_UPLOAD_DIR
+CHUNKED_UPLOAD_DIR = get_env_str('CHUNKED_UPLOAD_DIR', default=os.path.join(tempfile.gettempdir(), 'recipe_uploads'))
+CHUNKED_UPLOAD_CHUNK_SIZE = get_env_int('CHUNKED_UPLOAD_CHUNK_SIZE', default=1024 * 1024)  # bytes per request
+CHUNKED_UPLOAD_EXPIRY = get_env_int('CHUNKED_UPLOAD_EXPIRY', default=24 * 60 * 60)  # seconds before unfinished uploads are removed
+
+# Import cache: extraction results keyed by SHA-256 of the upload, parse results by text hash
+IMPORT_CACHE_ENABLED = get_env_bool('IMPORT_CACHE_ENABLED', default=True)
+IMPORT_CACHE_TIMEOUT = get_env_int('IMPORT_CACHE_TIMEOUT', default=7 * 24 * 60 * 60)  # seconds
+
+# Parse budget per text: longer texts are cut off, and a parse that runs out of
+# time returns the fields found so far with a warning (0 disables a limit)
+PARSER_MAX_CHARS = get_env_int('PARSER_MAX_CHARS', default=500_000)
+PARSER_TIME_BUDGET_MS = get_env_int('PARSER_TIME_BUDGET_MS', default=2000)
+
+# Stop reading PDF pages once title, ingredients and instructions are complete
+PDF_EARLY_EXIT_ENABLED = get_env_bool('PDF_EARLY_EXIT_ENABLED', default=True)
+
+# Page-parallel extraction of whole PDFs (cookbooks), set PDF_PARALLEL_PROCESSES to 0 to disable
+PDF_PARALLEL_PROCESSES = get_env_int('PDF_PARALLEL_PROCESSES', default=2)
+PDF_PARALLEL_MIN_PAGES = get_env_int('PDF_PARALLEL_MIN_PAGES', default=8)  # smaller PDFs are extracted serially
+PDF_PAGE_TIMEOUT = get_env_int('PDF_PAGE_TIMEOUT', default=30)  # seconds per page before it is skipped
+
+# OCR for image imports, run by worker processes that load the engine once (see recipes/ocr.py)
+# OCR_BACKEND is 'easyocr', 'tesseract', 'stub' (deterministic, for tests) or the dotted path
+# of an OCRBackend subclass; leave it empty to disable OCR
+OCR_BACKEND = get_env_str('OCR_BACKEND', '')
+OCR_WORKERS = get_env_int('OCR_WORKERS', default=1)  # 0 runs OCR in the requesting process
+OCR_TIMEOUT = get_env_int('OCR_TIMEOUT', default=60)  # seconds per image
+OCR_LANGUAGES = get_env_list('OCR_LANGUAGES', default='en,nl')
+OCR_MAX_PIXELS = get_env_int('OCR_MAX_PIXELS', default=4_000_000)  # photos are scaled down to this before OCR
+# Reuse the OCR text of near-duplicate photos (same recipe card) whose 64-bit dHash
+# differs in at most OCR_HASH_CACHE_DISTANCE bits (see recipes/image_hash_index.py)
+OCR_HASH_CACHE_ENABLED = get_env_bool('OCR_HASH_CACHE_ENABLED', default=True)
+OCR_HASH_CACHE_DISTANCE = get_env_int('OCR_HASH_CACHE_DISTANCE', default=8)
+
+# Bulk ZIP import (POST /api/recipes/import-zip/)
+# Set BULK_IMPORT_PROCESSES to 0 to extract files in the request process
+BULK_IMPORT_PROCESSES = get_env_int('BULK_IMPORT_PROCESSES', default=2)
+BULK_IMPORT_BATCH_SIZE = get_env_int('BULK_IMPORT_BATCH_SIZE', default=100)  # recipes per bulk insert
+BULK_IMPORT_MAX_FILES = get_env_int('BULK_IMPORT_MAX_FILES', default=500)
+BULK_IMPORT_MAX_SIZE = get_env_int('BULK_IMPORT_MAX_SIZE', default=200 * 1024 * 1024)  # bytes
+
+# Cookbook import (mode=cookbook): one large PDF split into many recipes
+COOKBOOK_IMPORT_MAX_SIZE = get_env_int('COOKBOOK_IMPORT_MAX_SIZE', default=100 * 1024 * 1024)  # bytes
+COOKBOOK_MAX_SEGMENT_PAGES = get_env_int('COOKBOOK_MAX_SEGMENT_PAGES', default=5)  # pages a single recipe may span
+
+# Ingredient categories from the lexicon in recipes/keywords/, memoised per canonical
+# name in this many entries per process and in the IngredientClassification table
+INGREDIENT_CATEGORY_CACHE_SIZE = get_env_int('INGREDIENT_CATEGORY_CACHE_SIZE', default=10_000)
+
+# Ingredient names resolved to the canonical ingredient dictionary, memoised in this many
+# entries per process
+CANONICAL_INGREDIENT_CACHE_SIZE = get_env_int('CANONICAL_INGREDIENT_CACHE_SIZE', default=10_000)
+
+# Shopping lists: assigning or removing a meal is applied to the lists as a delta. Other meal
+# plan changes mark the lists for a refresh that regenerates each list at most once per
+# SHOPPING_LIST_REFRESH_WINDOW, run by `python manage.py run_shopping_list_worker` (started by
+# start_workers.sh, the shopping-lists process in the Procfile) or, with
+# SHOPPING_LIST_REFRESH_IN_PROCESS, by a timer thread in the process that made the change.
+# A list read after its window is returned as it is, with a refresh started in the background
+SHOPPING_LIST_DELTA_UPDATES = get_env_bool('SHOPPING_LIST_DELTA_UPDATES', default=True)  # off: refresh instead
+SHOPPING_LIST_REFRESH_WINDOW = get_env_int('SHOPPING_LIST_REFRESH_WINDOW', default=30)  # seconds
+SHOPPING_LIST_REFRESH_IN_PROCESS = get_env_bool('SHOPPING_LIST_REFRESH_IN_PROCESS', default=True)
+SHOPPING_LIST_REFRESH_TIMEOUT = get_env_int('SHOPPING_LIST_REFRESH_TIMEOUT', default=300)  # seconds before a refresh is retried
+
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
@@ -1,21 +1,26 @@
 from django.contrib import admin
-from .models import Recipe, Ingredient, SourceMetadata
+from .models import (
+    Recipe, Ingredient, SourceMetadata, ImportJob, ImageHash, IngredientClassification, CanonicalIngredient
+)
+from .ingredient_classifier import reset_cache
+from .ingredient_index import reset_index
 
 
 class IngredientInline(admin.TabularInline):
     model = Ingredient
     extra = 1
-    fields = ['name', 'amount', 'unit', 'notes', 'category', 'order']
+    fields = ['name', 'amount', 'unit', 'quantity', 'notes', 'category', 'order']
     ordering = ['order', 'name']
 
 
 class SourceMetadataInline(admin.StackedInline):
     model = SourceMetadata
     extra = 0
-    readonly_fields = ['import_date', 'file_size', 'page_count']
+    readonly_fields = ['import_date', 'file_size', 'page_count', 'extraction_method', 'text_size', 'stage_timings']
     fields = [
         'original_filename', 'file_size', 'page_count',
-        'import_date', 'import_success', 'import_warnings', 'import_errors'
+        'import_date', 'import_success', 'import_warnings', 'import_errors',
+        'extraction_method', 'text_size', 'stage_timings'
     ]
 
 
@@ -57,8 +62,60 @@ class IngredientAdmin(admin.ModelAdmin):
 
 @admin.register(SourceMetadata)
 class SourceMetadataAdmin(admin.ModelAdmin):
-    list_display = ['recipe', 'original_filename', 'file_size', 'import_date', 'import_success']
-    list_filter = ['import_success', 'import_date']
+    list_display = ['recipe', 'original_filename', 'file_size', 'extraction_method', 'import_date', 'import_success']
+    list_filter = ['import_success', 'extraction_method', 'import_date']
     search_fields = ['recipe__title', 'original_filename']
     readonly_fields = ['import_date']
-    list_select_related = ['recipe']
\ No newline at end of file
+    list_select_related = ['recipe']
+
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ['original_filename', 'user', 'status', 'attempts', 'created_at', 'finished_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['original_filename', 'user__username']
+    readonly_fields = ['id', 'created_at', 'started_at', 'finished_at', 'timings', 'result']
+    list_select_related = ['user', 'recipe']
+
+
+@admin.register(ImageHash)
+class ImageHashAdmin(admin.ModelAdmin):
+    list_display = ['__str__', 'user', 'method', 'confidence', 'created_at']
+    list_filter = ['backend', 'created_at']
+    search_fields = ['text']
+    readonly_fields = ['user', 'hash', 'backend', 'created_at']
+
+
+@admin.register(IngredientClassification)
+class IngredientClassificationAdmin(admin.ModelAdmin):
+    list_display = ['name', 'category', 'is_manual', 'lexicon_version', 'updated_at']
+    list_editable = ['category']
+    list_filter = ['category', 'is_manual']
+    search_fields = ['name']
+    readonly_fields = ['lexicon_version', 'updated_at']
+    
+    def save_model(self, request, obj, form, change):
+        # A category set by hand is kept when the lexicon changes
+        obj.is_manual = True
+        super().save_model(request, obj, form, change)
+        reset_cache()
+
+
+@admin.register(CanonicalIngredient)
+class CanonicalIngredientAdmin(admin.ModelAdmin):
+    list_display = ['name', 'aliases', 'updated_at']
+    search_fields = ['name']
+    readonly_fields = ['created_at', 'updated_at']
+    
+    # Every process compiles the index again after a change
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        reset_index()
+    
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        reset_index()
+    
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        reset_index()
@@ -0,0 +1,230 @@
+"""
+Bulk recipe import from ZIP archives
+
+Archive entries are read one at a time and handed to a process pool that runs
+text extraction and parsing. Finished recipes are written in batches with
+bulk_create, so a cookbook of hundreds of scans costs a handful of queries.
+
+Archives uploaded through the API are imported by the import worker (an
+ImportJob in 'archive' mode); the job records the files of every saved
+batch, so a retried job does not import them again.
+"""
+import os
+import logging
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
+
+from .models import Recipe, Ingredient, SourceMetadata, ImportJob
+from .ocr import init_ocr_worker
+from .text_extraction_service import EnhancedRecipeImportService, IMAGE_EXTENSIONS
+from .workers import get_shared_pool
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = ['pdf'] + IMAGE_EXTENSIONS
+MAX_ENTRY_SIZE = 10 * 1024 * 1024  # Same limit as single file imports
+
+
+def extract_and_parse(filename: str, content: bytes) -> Dict[str, Any]:
+    """
+    Extract and parse one archive entry (runs inside a pool process)
+
+    Args:
+        filename: Name of the entry inside the archive
+        content: Raw file content
+
+    Returns:
+        Result of EnhancedRecipeImportService.import_recipe_from_file
+    """
+    upload = SimpleUploadedFile(os.path.basename(filename), content)
+    result = EnhancedRecipeImportService().import_recipe_from_file(upload)
+    # Only the error message is needed by the parent, keep the pickled result small
+    result.pop('extraction_result', None)
+    return result
+
+
+class BulkRecipeImporter:
+    """Import every PDF and image in a ZIP archive for one user"""
+
+    def __init__(self, user, processes: int = None, batch_size: int = None, job: Optional[ImportJob] = None):
+        self.user = user
+        self.processes = settings.BULK_IMPORT_PROCESSES if processes is None else processes
+        self.batch_size = batch_size or settings.BULK_IMPORT_BATCH_SIZE
+        self.job = job
+        self.service = EnhancedRecipeImportService()
+        self.saved = []
+
+    def import_archive(self, archive_file) -> Dict[str, Any]:
+        """
+        Import all supported files from a ZIP archive
+
+        Args:
+            archive_file: Uploaded ZIP file (any seekable file object)
+
+        Returns:
+            Report with totals and a per-file status list in archive order
+        """
+        try:
+            archive = zipfile.ZipFile(archive_file)
+        except zipfile.BadZipFile as e:
+            raise ValueError(f"Invalid ZIP archive: {str(e)}")
+
+        with archive:
+            entries = []
+            for info in archive.infolist():
+                report = self._check_entry(info)
+                entries.append((info, report))
+
+            if sum(1 for _, report in entries if report is None) > settings.BULK_IMPORT_MAX_FILES:
+                raise ValueError(f"Archive contains more than {settings.BULK_IMPORT_MAX_FILES} importable files")
+
+            # Files saved by an earlier attempt of the job are reported, not imported again
+            self.saved = list(self.job.progress.get('files', [])) if self.job else []
+            saved_names = {report['filename'] for report in self.saved}
+            if saved_names:
+                logger.info(f"Resuming archive import after {len(saved_names)} saved files")
+
+            reports = [report for _, report in entries if report is not None and report['status'] != 'ignored']
+            reports.extend(self.saved)
+            files = [info for info, report in entries if report is None and info.filename not in saved_names]
+
+            if self.processes > 0:
+                reports.extend(self._import_parallel(archive, files))
+            else:
+                reports.extend(self._import_serial(archive, files))
+
+        order = {info.filename: position for position, (info, _) in enumerate(entries)}
+        reports.sort(key=lambda report: order.get(report['filename'], 0))
+
+        return {
+            'total_files': len(reports),
+            'imported': sum(1 for report in reports if report['status'] == 'imported'),
+            'failed': sum(1 for report in reports if report['status'] == 'failed'),
+            'skipped': sum(1 for report in reports if report['status'] == 'skipped'),
+            'files': reports,
+        }
+
+    def _check_entry(self, info: zipfile.ZipInfo):
+        """Return a report for entries that will not be imported, None otherwise"""
+        basename = os.path.basename(info.filename)
+
+        # Folders and OS metadata (e.g. __MACOSX/, ._file.pdf, .DS_Store) are ignored silently
+        if info.is_dir() or not basename or basename.startswith('.') or info.filename.startswith('__MACOSX/'):
+            return {'filename': info.filename, 'status': 'ignored'}
+
+        extension = basename.lower().split('.')[-1] if '.' in basename else ''
+        if extension not in SUPPORTED_EXTENSIONS:
+            return {'filename': info.filename, 'status': 'skipped', 'error': f'Unsupported file type: {extension}'}
+
+        if info.file_size == 0:
+            return {'filename': info.filename, 'status': 'skipped', 'error': 'File is empty'}
+
+        if info.file_size > MAX_ENTRY_SIZE:
+            return {'filename': info.filename, 'status': 'skipped', 'error': 'File size cannot exceed 10MB'}
+
+        return None
+
+    def _import_serial(self, archive: zipfile.ZipFile, files: List[zipfile.ZipInfo]) -> List[Dict[str, Any]]:
+        """Process entries in this process (used when the pool is disabled)"""
+        reports = []
+        batch = []
+        for info in files:
+            result = extract_and_parse(info.filename, archive.read(info))
+            self._collect(info, result, reports, batch)
+        reports.extend(self._flush(batch))
+        return reports
+
+    def _import_parallel(self, archive: zipfile.ZipFile, files: List[zipfile.ZipInfo]) -> List[Dict[str, Any]]:
+        """Stream entries into the process pool, keeping a bounded number in flight"""
+        # Scans are OCRed in the pool process itself, not sent on to the 'ocr' pool
+        pool = get_shared_pool('bulk_import', self.processes, initializer=init_ocr_worker)
+        max_in_flight = self.processes * 2
+
+        reports = []
+        batch = []
+        in_flight = {}
+        pending = iter(files)
+        exhausted = False
+
+        while in_flight or not exhausted:
+            # Only read the next entries when the pool has room, so memory stays bounded
+            while not exhausted and len(in_flight) < max_in_flight:
+                info = next(pending, None)
+                if info is None:
+                    exhausted = True
+                    break
+                future = pool.submit(extract_and_parse, info.filename, archive.read(info))
+                in_flight[future] = info
+
+            if not in_flight:
+                break
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                info = in_flight.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error(f"Bulk import worker failed on {info.filename}: {str(e)}")
+                    result = {'success': False, 'error': str(e), 'stage': 'worker'}
+                self._collect(info, result, reports, batch)
+
+                if len(batch) >= self.batch_size:
+                    reports.extend(self._flush(batch))
+                    batch = []
+
+        reports.extend(self._flush(batch))
+        return reports
+
+    def _collect(self, info: zipfile.ZipInfo, result: Dict[str, Any], reports: list, batch: list):
+        """Queue a successful result for insertion or record a failure"""
+        if result['success']:
+            batch.append((info, result))
+        else:
+            reports.append({
+                'filename': info.filename,
+                'status': 'failed',
+                'error': result.get('error', 'Unknown error'),
+                'stage': result.get('stage', 'unknown'),
+            })
+
+    def _flush(self, batch: list) -> List[Dict[str, Any]]:
+        """Insert a batch of parsed recipes with one bulk_create per table"""
+        if not batch:
+            return []
+
+        recipes, ingredients, metadata, reports = [], [], [], []
+        for info, result in batch:
+            recipe, recipe_ingredients, source_metadata = self.service.build_recipe_objects(
+                result, self.user, os.path.basename(info.filename), info.file_size
+            )
+            recipes.append(recipe)
+            ingredients.extend(recipe_ingredients)
+            metadata.append(source_metadata)
+            reports.append({
+                'filename': info.filename,
+                'status': 'imported',
+                'recipe_id': str(recipe.id),
+                'title': recipe.title,
+                'ingredients_found': len(recipe_ingredients),
+                'instructions_found': len(recipe.instructions),
+            })
+
+        with transaction.atomic():
+            Recipe.objects.bulk_create(recipes)
+            Ingredient.objects.bulk_create(ingredients)
+            SourceMetadata.objects.bulk_create(metadata)
+
+            # Saved with the batch, so a retry skips exactly these files
+            if self.job is not None:
+                self.saved.extend(reports)
+                self.job.progress = {'files': self.saved}
+                ImportJob.objects.filter(id=self.job.id).update(progress=self.job.progress)
+
+        logger.info(f"Bulk imported {len(recipes)} recipes for user {self.user.id}")
+        return reports
@@ -0,0 +1,188 @@
+"""
+Resumable chunked uploads spooled to disk
+
+Imports and recipe images used to arrive as one multipart request that Django
+kept in memory before PyPDF2 and PIL read it again. A ChunkedUpload receives
+the file in chunks of CHUNKED_UPLOAD_CHUNK_SIZE bytes that are written
+straight to a file in CHUNKED_UPLOAD_DIR, so a request never holds more than
+one small buffer. An interrupted upload resumes from the offset stored on the
+ChunkedUpload.
+
+Once complete, the spooled file is handed over as a regular Django File
+(streamed into storage in chunks) to the import queue or the recipe image.
+"""
+import os
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+
+from .image_utils import validate_image_file
+from .models import ChunkedUpload, ChunkedUploadPurpose, ChunkedUploadStatus, ImportMode
+
+logger = logging.getLogger(__name__)
+
+# Read the request body in pieces this size while writing a chunk
+COPY_BUFFER_SIZE = 64 * 1024
+
+
+class UploadOffsetError(ValueError):
+    """A chunk does not start where the previous one ended"""
+
+    def __init__(self, expected: int):
+        super().__init__(f"Chunk must start at offset {expected}")
+        self.expected = expected
+
+
+def get_upload_path(upload: ChunkedUpload) -> str:
+    """Path of the spooled file of an upload"""
+    return os.path.join(settings.CHUNKED_UPLOAD_DIR, f'{upload.id}.part')
+
+
+def start_upload(upload: ChunkedUpload) -> ChunkedUpload:
+    """Save a new upload and create its empty spool file"""
+    os.makedirs(settings.CHUNKED_UPLOAD_DIR, exist_ok=True)
+    upload.save()
+    open(get_upload_path(upload), 'wb').close()
+    return upload
+
+
+def append_chunk(upload_id, offset: int, stream, length: int) -> ChunkedUpload:
+    """
+    Write the next chunk of an upload to its spool file
+
+    Args:
+        upload_id: ID of the ChunkedUpload
+        offset: Position of the chunk in the file, must equal the bytes received so far
+        stream: File-like request body
+        length: Number of bytes in the chunk
+
+    Returns:
+        The updated ChunkedUpload
+
+    Raises:
+        UploadOffsetError: If the chunk does not continue the upload
+        ValueError: If the chunk is too large or the body is shorter than announced
+    """
+    with transaction.atomic():
+        # Locking the row keeps concurrent chunks for the same upload in order
+        upload = ChunkedUpload.objects.select_for_update().get(id=upload_id)
+        if upload.status != ChunkedUploadStatus.UPLOADING:
+            raise ValueError("Upload is already complete")
+        if offset != upload.offset:
+            raise UploadOffsetError(upload.offset)
+        if length > settings.CHUNKED_UPLOAD_CHUNK_SIZE:
+            raise ValueError(f"Chunks cannot exceed {settings.CHUNKED_UPLOAD_CHUNK_SIZE} bytes")
+        if offset + length > upload.size:
+            raise ValueError("Chunk extends past the announced file size")
+
+        written = 0
+        with open(get_upload_path(upload), 'r+b') as spool:
+            spool.seek(offset)
+            while written < length:
+                data = stream.read(min(COPY_BUFFER_SIZE, length - written))
+                if not data:
+                    break
+                spool.write(data)
+                written += len(data)
+            # Drop anything a failed earlier attempt left beyond this chunk
+            spool.truncate()
+
+        if written != length:
+            raise ValueError(f"Expected {length} bytes but received {written}")
+
+        upload.offset = offset + written
+        upload.save(update_fields=['offset', 'updated_at'])
+    return upload
+
+
+def complete_upload(upload: ChunkedUpload):
+    """
+    Hand a fully received upload over to the import queue or its recipe
+
+    Args:
+        upload: ChunkedUpload whose offset reached its size
+
+    Returns:
+        The queued ImportJob for imports and cookbooks, the updated Recipe for
+        recipe images
+
+    Raises:
+        ValueError: If bytes are missing or the file is not acceptable
+    """
+    from .import_jobs import enqueue_import, process_import_job
+
+    with transaction.atomic():
+        # Locking the row makes concurrent completions of one upload queue it once
+        upload = ChunkedUpload.objects.select_for_update().select_related('user', 'recipe').get(id=upload.id)
+        if upload.offset != upload.size:
+            raise ValueError(f"Upload is incomplete: {upload.offset} of {upload.size} bytes received")
+        # Conditional, so only one request gets past it without row locks (SQLite) as well;
+        # a failed hand-over below rolls it back
+        completed = ChunkedUpload.objects.filter(id=upload.id, status=ChunkedUploadStatus.UPLOADING).update(
+            status=ChunkedUploadStatus.COMPLETE, updated_at=timezone.now()
+        )
+        if not completed:
+            raise ValueError("Upload is already complete")
+        upload.status = ChunkedUploadStatus.COMPLETE
+
+        path = get_upload_path(upload)
+        with open(path, 'rb') as spool:
+            file = File(spool, name=upload.filename)
+
+            if upload.purpose == ChunkedUploadPurpose.IMPORT:
+                result = enqueue_import(file, upload.user)
+            elif upload.purpose == ChunkedUploadPurpose.COOKBOOK:
+                result = enqueue_import(file, upload.user, mode=ImportMode.COOKBOOK)
+            else:
+                validate_image_file(file)
+                # Image.verify only reads the headers, the pixels stay on disk
+                with Image.open(path) as image:
+                    image.verify()
+                recipe = upload.recipe
+                recipe.image.save(os.path.basename(upload.filename), file, save=True)
+                result = recipe
+
+    discard_spool(upload)
+
+    if upload.purpose != ChunkedUploadPurpose.RECIPE_IMAGE and not settings.RECIPE_IMPORT_ASYNC:
+        result = process_import_job(result)
+
+    logger.info(f"Completed chunked upload {upload.id} ({upload.size} bytes, {upload.purpose})")
+    return result
+
+
+def discard_spool(upload: ChunkedUpload):
+    """Remove the spooled file of an upload"""
+    try:
+        os.remove(get_upload_path(upload))
+    except FileNotFoundError:
+        pass
+
+
+def remove_stale_uploads(max_age_seconds: int = None) -> int:
+    """
+    Delete unfinished uploads that have not received a chunk for a while
+
+    Args:
+        max_age_seconds: Age after which an upload is abandoned, defaults to
+            CHUNKED_UPLOAD_EXPIRY
+
+    Returns:
+        Number of uploads removed
+    """
+    if max_age_seconds is None:
+        max_age_seconds = settings.CHUNKED_UPLOAD_EXPIRY
+
+    cutoff = timezone.now() - timedelta(seconds=max_age_seconds)
+    stale = ChunkedUpload.objects.filter(updated_at__lt=cutoff)
+    count = 0
+    for upload in stale:
+        discard_spool(upload)
+        upload.delete()
+        count += 1
+    return count
@@ -0,0 +1,298 @@
+"""
+Cookbook import: many recipes from one large PDF
+
+A regular import treats a PDF as one recipe and reads its first pages only.
+A cookbook import (ImportJob.mode == 'cookbook') walks every page once and
+CookbookSplitter cuts the text into one segment per recipe: a recipe starts
+at the title block (title, servings and time lines) just before an
+ingredients header, once the recipe before it has instructions (an
+instructions header or a step). An ingredients header before that, such as
+"Ingrediënten voor de saus", is a sub-header of the current recipe. Text
+before the first ingredients header, such as a preface or table of contents,
+is dropped.
+
+Segments are parsed like single imports and inserted in batches with
+bulk_create. Page texts are not kept on the PDFDocument, so memory holds the
+pages of the current recipe plus one batch of parsed recipes, however long
+the cookbook is. Every batch records the segments it covers on the ImportJob
+in the same transaction, so a retried job skips the batches that were saved.
+"""
+import logging
+import re
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Iterator, List, NamedTuple, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+
+from .import_pipeline import classify_recipe
+from .keyword_matcher import get_matcher, load_keyword_sets
+from .models import ImportJob, Recipe, Ingredient, SourceMetadata
+from .parallel_extraction import iter_page_texts
+from .parser_engine import TEXT_STEP_NUMBER
+from .pdf_document import PDFDocument
+from .quantity_parser import VULGAR_FRACTIONS, parse_ingredient_line
+from .text_extraction_service import EnhancedRecipeImportService
+
+logger = logging.getLogger(__name__)
+
+# Lines before an ingredients header that can belong to the next recipe
+TITLE_BLOCK_LINES = 3
+# Numbered instruction step, '1. Kook de pasta' but not '1.5 kg bloem'
+STEP_LINE = re.compile(r'^\d+[.)]\s+\D')
+
+
+class RecipeSegment(NamedTuple):
+    """Text of one recipe and the pages it was found on"""
+    text: str
+    first_page: int
+    last_page: int
+
+
+@lru_cache(maxsize=None)
+def instruction_headers() -> FrozenSet[str]:
+    """Lowercase instructions headers, from the instruction_headers keyword sets"""
+    return frozenset(header.lower() for header in load_keyword_sets().get('instruction_headers', []))
+
+
+def is_ingredient_line(line: str) -> bool:
+    """Check whether a line reads like an ingredient ('1 ui', '½ bosje peterselie', 'snufje zout')"""
+    if line[0].isdigit() or line[0] in VULGAR_FRACTIONS:
+        return True
+    parsed = parse_ingredient_line(line)
+    return parsed is not None and bool(parsed.unit)
+
+
+def is_title_line(line: str) -> bool:
+    """Check whether a line can be part of a title block (title, servings, times)"""
+    return (
+        len(line) <= 100
+        and not line.endswith(('.', ':', ';', ','))
+        and not line.startswith(('-', '•', '*'))
+        and not TEXT_STEP_NUMBER.match(line)
+        and not is_ingredient_line(line)
+    )
+
+
+def is_instruction_line(line: str) -> bool:
+    """Check whether a line is an instructions header or an instruction step"""
+    return (
+        line.lower().rstrip(' :') in instruction_headers()
+        or bool(STEP_LINE.match(line))
+        or (line.endswith('.') and len(line.split()) >= 4 and not is_ingredient_line(line))
+    )
+
+
+class CookbookSplitter:
+    """Cuts the page texts of a cookbook into recipe segments"""
+
+    def __init__(self, max_segment_pages: Optional[int] = None):
+        """
+        Args:
+            max_segment_pages: Pages a recipe may span before it is emitted
+                without waiting for the next recipe, defaults to
+                COOKBOOK_MAX_SEGMENT_PAGES
+        """
+        self.max_segment_pages = max_segment_pages or settings.COOKBOOK_MAX_SEGMENT_PAGES
+        self.headers = get_matcher('ingredient_headers')
+        # (page number, line) of the current segment
+        self.lines: List[Tuple[int, str]] = []
+        # Position of the ingredients header in self.lines, None before it was seen
+        self.header_index: Optional[int] = None
+        # Whether the instructions of the current recipe have started
+        self.in_instructions = False
+
+    def feed(self, page_number: int, page_text: str) -> Iterator[RecipeSegment]:
+        """
+        Add the text of the next page
+
+        Args:
+            page_number: Page number starting at 1
+            page_text: Extracted text of the page
+
+        Yields:
+            Segments of the recipes that ended on this page
+        """
+        for line in page_text.split('\n'):
+            line = line.strip()
+            if not line:
+                continue
+            if self.headers.startswith(line.lower()):
+                yield from self._start_recipe()
+            elif self.header_index is not None and not self.in_instructions:
+                self.in_instructions = is_instruction_line(line)
+            self.lines.append((page_number, line))
+
+        if self.header_index is None:
+            # Front matter: only a possible title block of the first recipe is kept
+            self.lines = self._title_block()
+        elif page_number - self.lines[0][0] + 1 >= self.max_segment_pages:
+            segment = self._segment(self.lines)
+            self.lines, self.header_index, self.in_instructions = [], None, False
+            yield segment
+
+    def finish(self) -> Iterator[RecipeSegment]:
+        """Yield the last recipe once all pages have been fed"""
+        if self.header_index is not None:
+            yield self._segment(self.lines)
+        self.lines, self.header_index, self.in_instructions = [], None, False
+
+    def _start_recipe(self) -> Iterator[RecipeSegment]:
+        """Handle an ingredients header line, closing the previous recipe if it is complete"""
+        if self.header_index is not None and not self.in_instructions:
+            # A second header before the instructions (e.g. "Ingredients for the sauce")
+            return
+
+        title_block = self._title_block()
+        if self.header_index is not None:
+            yield self._segment(self.lines[:len(self.lines) - len(title_block)])
+        self.lines = title_block
+        self.header_index = len(self.lines)
+        self.in_instructions = False
+
+    def _title_block(self) -> List[Tuple[int, str]]:
+        """Trailing lines that look like the title block of the next recipe"""
+        count = 0
+        for _, line in reversed(self.lines[-TITLE_BLOCK_LINES:]):
+            if not is_title_line(line):
+                break
+            count += 1
+        return self.lines[len(self.lines) - count:] if count else []
+
+    @staticmethod
+    def _segment(lines: List[Tuple[int, str]]) -> RecipeSegment:
+        return RecipeSegment(
+            text='\n'.join(line for _, line in lines),
+            first_page=lines[0][0],
+            last_page=lines[-1][0],
+        )
+
+
+class CookbookImporter:
+    """Import every recipe in a cookbook PDF for one user"""
+
+    def __init__(self, user, batch_size: int = None, job: Optional[ImportJob] = None):
+        """
+        Args:
+            user: Owner of the imported recipes
+            batch_size: Recipes per bulk insert, defaults to BULK_IMPORT_BATCH_SIZE
+            job: ImportJob that records the saved batches, so a retry resumes
+                after them
+        """
+        self.user = user
+        self.batch_size = batch_size or settings.BULK_IMPORT_BATCH_SIZE
+        self.service = EnhancedRecipeImportService()
+        self.job = job
+
+    def import_document(self, file, filename: str = None, file_size: int = None) -> Dict[str, Any]:
+        """
+        Split a cookbook into recipes and save them
+
+        Args:
+            file: Uploaded or stored PDF file, or its PDFDocument
+            filename: Original filename, defaults to the name of the file
+            file_size: Size of the file in bytes
+
+        Returns:
+            Report with the imported recipes and the number of skipped segments
+        """
+        document = PDFDocument.of(file)
+        filename = filename or document.name
+        splitter = CookbookSplitter()
+        # Segments saved by an earlier attempt of the job are not parsed again
+        progress = self.job.progress if self.job else {}
+        saved_segments = progress.get('segments', 0)
+        recipes = list(progress.get('recipes', []))
+        skipped = progress.get('skipped', 0)
+        if saved_segments:
+            logger.info(f"Cookbook {filename}: resuming after {saved_segments} saved segments")
+
+        batch = []
+        segment_count = 0
+
+        def collect(segments):
+            nonlocal skipped, batch, segment_count
+            for segment in segments:
+                segment_count += 1
+                if segment_count <= saved_segments:
+                    continue
+                result = self._parse(segment)
+                if result is None:
+                    skipped += 1
+                    continue
+                batch.append((segment, result))
+                if len(batch) >= self.batch_size:
+                    recipes.extend(self._flush(batch, filename, file_size, recipes, segment_count, skipped))
+                    batch = []
+
+        for page_number, page_text in iter_page_texts(document, skip_errors=True, cache=False):
+            collect(splitter.feed(page_number, page_text))
+        collect(splitter.finish())
+        recipes.extend(self._flush(batch, filename, file_size, recipes, segment_count, skipped))
+
+        logger.info(f"Cookbook {filename}: imported {len(recipes)} recipes, skipped {skipped} segments")
+        return {
+            'recipes_imported': len(recipes),
+            'segments_skipped': skipped,
+            'total_pages': document.page_count,
+            'recipes': recipes,
+        }
+
+    def _parse(self, segment: RecipeSegment) -> Optional[Dict[str, Any]]:
+        """Parse a segment like a single import, None if it holds no recipe"""
+        parsing_result = self.service.recipe_parser.parse_recipe_text(segment.text)
+        if not parsing_result['success'] or not parsing_result['recipe_data'].get('ingredients'):
+            return None
+        classify_recipe(parsing_result['recipe_data'], segment.text)
+        return {
+            'recipe_data': parsing_result['recipe_data'],
+            'raw_text_preview': parsing_result.get('raw_text', ''),
+            'raw_text': segment.text,
+            'warnings': parsing_result.get('warnings', []),
+        }
+
+    def _flush(self, batch: list, filename: str, file_size: Optional[int], saved: List[Dict[str, Any]],
+               segment_count: int, skipped: int) -> List[Dict[str, Any]]:
+        """
+        Insert a batch of parsed recipes with one bulk_create per table
+
+        Args:
+            batch: (segment, parse result) pairs
+            filename: Original filename of the cookbook
+            file_size: Size of the cookbook in bytes
+            saved: Reports of the recipes saved before this batch
+            segment_count: Segments split off so far, including this batch
+            skipped: Segments without a recipe so far
+
+        Returns:
+            Reports of the recipes in the batch
+        """
+        if not batch:
+            return []
+
+        recipes, ingredients, metadata, reports = [], [], [], []
+        for segment, result in batch:
+            recipe, recipe_ingredients, source_metadata = self.service.build_recipe_objects(
+                result, self.user, filename, file_size
+            )
+            source_metadata.page_count = segment.last_page - segment.first_page + 1
+            recipes.append(recipe)
+            ingredients.extend(recipe_ingredients)
+            metadata.append(source_metadata)
+            reports.append({
+                'recipe_id': str(recipe.id),
+                'title': recipe.title,
+                'pages': [segment.first_page, segment.last_page],
+                'ingredients_found': len(recipe_ingredients),
+                'instructions_found': len(recipe.instructions),
+            })
+
+        with transaction.atomic():
+            Recipe.objects.bulk_create(recipes)
+            Ingredient.objects.bulk_create(ingredients)
+            SourceMetadata.objects.bulk_create(metadata)
+            if self.job is not None:
+                self.job.progress = {'segments': segment_count, 'skipped': skipped, 'recipes': saved + reports}
+                ImportJob.objects.filter(id=self.job.id).update(progress=self.job.progress)
+
+        return reports
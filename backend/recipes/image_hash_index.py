@@ -0,0 +1,248 @@
+"""
+Perceptual-hash cache for OCR results of near-duplicate photos
+
+The same recipe card is often photographed several times. The photos differ
+byte for byte (so the SHA-256 import cache misses), but their difference hash
+(dHash) barely does: every image is reduced to a 9x8 grayscale thumbnail and
+each bit of the 64-bit hash tells whether a pixel is brighter than its right
+neighbour. Re-encoding, rescaling and small lighting changes flip only a few
+bits, so a stored OCR result is reused when a new photo's hash is within
+OCR_HASH_CACHE_DISTANCE bits (Hamming distance) of a stored one.
+
+Hashes and OCR texts are stored in the ImageHash table with the user who
+imported the image, and a photo only matches images of the same user: the
+text of another user's recipe card is never returned. Each process keeps a
+multi-index hash (see MultiIndexHash) of (hash, row id) per OCR backend and
+user, loaded from the table on first use and extended with newer rows (by
+id) before every lookup, so a lookup only compares a few candidates instead
+of every stored hash. Only ids are kept in memory; the text of a match is
+read from the table.
+"""
+import logging
+import threading
+from functools import lru_cache
+from itertools import combinations
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from PIL import Image, ImageOps
+
+from .models import ImageHash
+
+logger = logging.getLogger(__name__)
+
+HASH_SIZE = 8
+HASH_MASK = (1 << HASH_SIZE * HASH_SIZE) - 1
+SIGNED_LIMIT = 1 << (HASH_SIZE * HASH_SIZE - 1)
+
+# Hash indexes of this process per (OCR backend, user id), see _index
+_indexes: Dict[Tuple[str, int], 'HashIndex'] = {}
+_indexes_lock = threading.Lock()
+
+
+def dhash(image: Image.Image) -> int:
+    """
+    Compute the 64-bit difference hash of an image
+
+    Args:
+        image: Opened image; JPEGs that are not loaded yet are decoded at 1/8 scale
+
+    Returns:
+        Hash as an unsigned integer
+    """
+    image.draft('L', (HASH_SIZE * 16, HASH_SIZE * 16))
+    # Upright first, so photos taken in portrait and landscape mode hash alike
+    gray = ImageOps.exif_transpose(image.convert('L'))
+    pixels = list(gray.resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.BOX).getdata())
+
+    value = 0
+    for row in range(HASH_SIZE):
+        offset = row * (HASH_SIZE + 1)
+        for column in range(HASH_SIZE):
+            value = (value << 1) | (pixels[offset + column] > pixels[offset + column + 1])
+    return value
+
+
+def is_featureless(image_hash: int) -> bool:
+    """Blank or uniform images hash to all zeros (or ones) and would match each other"""
+    return image_hash in (0, HASH_MASK)
+
+
+def hamming_distance(first: int, second: int) -> int:
+    """Number of bits in which two hashes differ"""
+    return (first ^ second).bit_count()
+
+
+def to_signed(value: int) -> int:
+    """Store an unsigned 64-bit hash in a (signed) BigIntegerField"""
+    return value - (1 << HASH_SIZE * HASH_SIZE) if value >= SIGNED_LIMIT else value
+
+
+def to_unsigned(value: int) -> int:
+    """Inverse of to_signed"""
+    return value & HASH_MASK
+
+
+class MultiIndexHash:
+    """
+    Exact Hamming-distance search over 64-bit hashes by multi-index hashing
+
+    Every hash is filed under each of its CHUNKS 16-bit chunks. When two
+    hashes differ in at most max_distance bits, one of their chunks differs
+    in at most max_distance // CHUNKS bits (pigeonhole), so the candidates
+    are the entries filed under the query's chunks with up to that many bits
+    flipped: for a distance of 8, 4 x 137 dictionary lookups instead of a
+    comparison with every stored hash. Candidates are then checked on the
+    full hash.
+    """
+
+    CHUNKS = 4
+    CHUNK_BITS = HASH_SIZE * HASH_SIZE // CHUNKS
+    CHUNK_MASK = (1 << CHUNK_BITS) - 1
+
+    def __init__(self):
+        # Per chunk position: {chunk value: [(hash, value), ...]}
+        self.tables: List[Dict[int, List[Tuple[int, Any]]]] = [{} for _ in range(self.CHUNKS)]
+        self.size = 0
+
+    def _chunks(self, value_hash: int) -> List[int]:
+        return [(value_hash >> (index * self.CHUNK_BITS)) & self.CHUNK_MASK for index in range(self.CHUNKS)]
+
+    def add(self, value_hash: int, value: Any):
+        """File a value under its hash"""
+        self.size += 1
+        for table, chunk in zip(self.tables, self._chunks(value_hash)):
+            table.setdefault(chunk, []).append((value_hash, value))
+
+    def find(self, query_hash: int, max_distance: int) -> List[Tuple[int, Any]]:
+        """
+        Find the values whose hash is within max_distance bits of a hash
+
+        Returns:
+            List of (distance, value), closest first
+        """
+        found = {}
+        for table, chunk in zip(self.tables, self._chunks(query_hash)):
+            for flips in flip_masks(self.CHUNK_BITS, max_distance // self.CHUNKS):
+                for value_hash, value in table.get(chunk ^ flips, ()):
+                    distance = hamming_distance(query_hash, value_hash)
+                    if distance <= max_distance:
+                        found[value] = distance
+        return sorted(((distance, value) for value, distance in found.items()), key=lambda match: match[0])
+
+    def __len__(self):
+        return self.size
+
+
+@lru_cache(maxsize=None)
+def flip_masks(bits: int, max_flips: int) -> Tuple[int, ...]:
+    """Every mask of up to max_flips set bits within the given width, 0 first"""
+    return tuple(
+        sum(1 << bit for bit in positions)
+        for flips in range(max_flips + 1)
+        for positions in combinations(range(bits), flips)
+    )
+
+
+class HashIndex:
+    """Multi-index hash of the ImageHash rows of one OCR backend and user, synced with the table by id"""
+
+    def __init__(self, backend: str, user_id: int):
+        self.backend = backend
+        self.user_id = user_id
+        self.hashes = MultiIndexHash()
+        self.last_id = 0
+        self.lock = threading.Lock()
+
+    def sync(self):
+        """Add the rows stored since the last sync (by this or any other process)"""
+        with self.lock:
+            rows = ImageHash.objects.filter(
+                backend=self.backend, user_id=self.user_id, id__gt=self.last_id
+            ).order_by('id')
+            for row_id, row_hash in rows.values_list('id', 'hash').iterator():
+                self.hashes.add(to_unsigned(row_hash), row_id)
+                self.last_id = row_id
+
+    def find(self, image_hash: int, max_distance: int) -> List[Tuple[int, int]]:
+        """(distance, row id) of the stored hashes near a hash, closest first"""
+        self.sync()
+        with self.lock:
+            return self.hashes.find(image_hash, max_distance)
+
+
+def _index(backend: str, user_id: int) -> HashIndex:
+    """Return the hash index of an OCR backend and user in this process"""
+    with _indexes_lock:
+        if (backend, user_id) not in _indexes:
+            _indexes[backend, user_id] = HashIndex(backend, user_id)
+        return _indexes[backend, user_id]
+
+
+def reset_indexes():
+    """Forget the in-memory indexes, they are reloaded from the table on next use"""
+    with _indexes_lock:
+        _indexes.clear()
+
+
+def cache_enabled() -> bool:
+    """Check whether OCR results are cached by perceptual hash"""
+    return settings.OCR_HASH_CACHE_ENABLED and bool(settings.OCR_BACKEND)
+
+
+def lookup(image_hash: int, user) -> Optional[Dict[str, Any]]:
+    """
+    Return the stored OCR result of the closest near-duplicate image of a user
+
+    Args:
+        image_hash: dHash of the new image
+        user: User importing the image, None to skip the lookup
+
+    Returns:
+        Dictionary with text, method, confidence and the Hamming distance, or None
+    """
+    if not cache_enabled() or is_featureless(image_hash) or user is None:
+        return None
+
+    key = (settings.OCR_BACKEND, user.pk)
+    matches = _index(*key).find(image_hash, settings.OCR_HASH_CACHE_DISTANCE)
+    if not matches:
+        return None
+
+    distance, row_id = matches[0]
+    row = ImageHash.objects.filter(id=row_id, user_id=user.pk).first()
+    if row is None or hamming_distance(to_unsigned(row.hash), image_hash) != distance:
+        # Rows were deleted (or their ids reused), rebuild the index from the table next time
+        with _indexes_lock:
+            _indexes.pop(key, None)
+        return None
+
+    return {
+        'text': row.text,
+        'method': row.method,
+        'confidence': row.confidence,
+        'hash_distance': distance,
+    }
+
+
+def store(image_hash: int, result: Dict[str, Any], user):
+    """
+    Store the OCR result of an image under its hash
+
+    Args:
+        image_hash: dHash of the image
+        result: OCR result with text, method and confidence
+        user: User who imported the image, None to not store it
+    """
+    if not cache_enabled() or is_featureless(image_hash) or user is None or not result.get('text', '').strip():
+        return
+
+    ImageHash.objects.create(
+        user=user,
+        hash=to_signed(image_hash),
+        backend=settings.OCR_BACKEND,
+        text=result['text'],
+        method=result['method'],
+        confidence=result.get('confidence', ''),
+    )
+    logger.info(f"Stored OCR result for image hash {image_hash:016x}")
@@ -0,0 +1,166 @@
+"""
+Image preprocessing before OCR
+
+Phone photos of recipes are 12MP or more, often rotated through EXIF, unevenly
+lit and slightly skewed. preprocess_image turns them into a small, upright
+black-and-white image in five vectorised steps:
+
+1. The image is scaled down to OCR_MAX_PIXELS. JPEGs are decoded directly at
+   a reduced scale (Image.draft), so the full-size bitmap is never built;
+   they may end up with between half and all of the pixel budget.
+2. Grayscale conversion.
+3. EXIF orientation is applied.
+4. Adaptive (Bradley) thresholding: a pixel is black when it is darker than
+   the mean of its neighbourhood (a box blur). The comparison runs on bands
+   of BAND_ROWS rows so its temporary arrays stay small.
+5. Deskew: the angle whose row projection of the black pixels has the
+   sharpest peaks (text lines) is estimated on a subsample and undone.
+
+Steps 4 and 5 need NumPy. Without it steps 1-3 are followed by autocontrast.
+"""
+import math
+from typing import Optional
+
+from django.conf import settings
+from PIL import Image, ImageFilter, ImageOps
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:  # pragma: no cover - numpy is in requirements.txt
+    np = None
+    NUMPY_AVAILABLE = False
+
+# Rows thresholded at a time
+BAND_ROWS = 256
+# A pixel is black when it is this much darker than its neighbourhood mean
+THRESHOLD_SENSITIVITY = 0.15
+# Skew angles searched, in degrees
+MAX_SKEW = 5.0
+COARSE_SKEW_STEP = 0.5
+FINE_SKEW_STEP = 0.1
+# Black pixels sampled for the skew estimate
+SKEW_SAMPLE_WIDTH = 1000
+SKEW_SAMPLE_POINTS = 100_000
+
+
+def preprocess_image(image: Image.Image, max_pixels: Optional[int] = None,
+                     binarize: bool = True) -> Image.Image:
+    """
+    Prepare a photo or scan for OCR
+
+    Args:
+        image: Opened image, preferably not loaded yet so JPEGs can be
+            decoded at a reduced scale
+        max_pixels: Pixel budget, defaults to OCR_MAX_PIXELS
+        binarize: Threshold and deskew (steps 4 and 5), for engines that
+            work best on black-and-white input
+
+    Returns:
+        Grayscale ('L') image, black text on white when binarized. The info
+        of the original (e.g. PNG text chunks) is kept, except the EXIF.
+    """
+    info = dict(image.info)
+    max_pixels = max_pixels or settings.OCR_MAX_PIXELS
+
+    width, height = image.size
+    if width * height > max_pixels:
+        # JPEG only: decode at the largest 1/2, 1/4 or 1/8 reduction that keeps at least
+        # half the pixel budget, e.g. a 12MP photo at 1/2 scale (3MP) for a 4MP budget
+        scale = math.sqrt(max_pixels / 2 / (width * height))
+        image.draft('L', (int(width * scale), int(height * scale)))
+
+    gray = image if image.mode == 'L' else image.convert('L')
+    width, height = gray.size
+    if width * height > max_pixels:
+        scale = math.sqrt(max_pixels / (width * height))
+        gray = gray.resize((max(1, int(width * scale)), max(1, int(height * scale))), Image.Resampling.BILINEAR)
+
+    # Turning the small image is cheaper than turning the photo (convert and resize keep the EXIF)
+    gray = ImageOps.exif_transpose(gray)
+
+    if not binarize:
+        result = gray
+    elif NUMPY_AVAILABLE:
+        binary = adaptive_threshold(gray)
+        result = deskew(Image.fromarray(binary), estimate_skew(binary))
+    else:
+        result = ImageOps.autocontrast(gray)
+
+    # The orientation has been applied, only keep the other metadata
+    result.info.pop('exif', None)
+    result.info.update({key: value for key, value in info.items() if key != 'exif'})
+    return result
+
+
+def adaptive_threshold(gray: Image.Image, window: Optional[int] = None,
+                       sensitivity: float = THRESHOLD_SENSITIVITY, band_rows: int = BAND_ROWS):
+    """
+    Bradley adaptive thresholding against the mean of each pixel's neighbourhood
+
+    Args:
+        gray: Grayscale ('L') image
+        window: Side of the neighbourhood in pixels, defaults to 1/40 of the width
+        sensitivity: Fraction below the neighbourhood mean at which a pixel turns black
+        band_rows: Rows compared at a time, bounds the size of the temporary arrays
+
+    Returns:
+        2D uint8 array with 0 for black and 255 for white
+    """
+    if window is None:
+        window = max(15, gray.width // 40)
+
+    # BoxBlur runs in C and averages a window x window square around every pixel
+    mean = np.asarray(gray.filter(ImageFilter.BoxBlur(window // 2)))
+    pixels = np.asarray(gray)
+    limit = int(round((1 - sensitivity) * 100))
+
+    result = np.empty_like(pixels)
+    for start in range(0, pixels.shape[0], band_rows):
+        stop = start + band_rows
+        # Percentages of uint8 values stay below 2**16
+        darker = pixels[start:stop].astype(np.uint16) * 100 <= mean[start:stop].astype(np.uint16) * limit
+        result[start:stop] = np.where(darker, 0, 255)
+
+    return result
+
+
+def estimate_skew(binary) -> float:
+    """
+    Estimate the rotation of the text lines in a binarized image
+
+    Black pixels are projected onto rows for each candidate angle; text
+    lines give the sharpest projection when the angle matches.
+
+    Args:
+        binary: 2D array with 0 for black
+
+    Returns:
+        Angle in degrees, counter-clockwise rotation that straightens the text
+    """
+    step = max(1, math.ceil(binary.shape[1] / SKEW_SAMPLE_WIDTH))
+    ys, xs = np.nonzero(binary[::step, ::step] == 0)
+    if len(ys) < 100:
+        return 0.0
+    if len(ys) > SKEW_SAMPLE_POINTS:
+        stride = math.ceil(len(ys) / SKEW_SAMPLE_POINTS)
+        ys, xs = ys[::stride], xs[::stride]
+
+    def best(angles):
+        radians = np.radians(angles)[:, None]
+        projected = np.rint(ys * np.cos(radians) + xs * np.sin(radians)).astype(np.int64)
+        projected -= projected.min(axis=1, keepdims=True)
+        scores = [np.square(np.diff(np.bincount(row))).sum() for row in projected]
+        return float(angles[int(np.argmax(scores))])
+
+    coarse = best(np.arange(-MAX_SKEW, MAX_SKEW + COARSE_SKEW_STEP / 2, COARSE_SKEW_STEP))
+    fine = best(np.arange(coarse - COARSE_SKEW_STEP, coarse + COARSE_SKEW_STEP + FINE_SKEW_STEP / 2, FINE_SKEW_STEP))
+    # The projection angle is the rotation of the text, undoing it takes the opposite
+    return round(-fine, 2) or 0.0
+
+
+def deskew(image: Image.Image, angle: float) -> Image.Image:
+    """Rotate a binarized image by angle degrees, filling the corners with white"""
+    if abs(angle) < FINE_SKEW_STEP / 2:
+        return image
+    return image.rotate(angle, resample=Image.Resampling.NEAREST, expand=True, fillcolor=255)
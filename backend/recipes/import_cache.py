@@ -0,0 +1,101 @@
+"""
+Content-addressed cache for recipe imports
+
+Uploads are keyed by the SHA-256 of their bytes, so re-uploading the same file
+(preview followed by import, or the same PDF shared within a family) reuses the
+extracted text instead of running PyPDF2 or OCR again. Parse results are keyed
+by the hash of the normalized text, so identical text from different files is
+only parsed once.
+
+Entries live in the default Django cache. Redis evicts them with its LRU
+policy and LocMemCache culls the least recently used entries once MAX_ENTRIES
+is reached; IMPORT_CACHE_TIMEOUT bounds how long any entry is kept.
+"""
+import hashlib
+import logging
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Bump when extraction or parsing output changes so stale entries are ignored
+CACHE_VERSION = 2
+
+EXTRACTION_KEY = 'recipe_import:extract:v{version}:{digest}'
+PARSE_KEY = 'recipe_import:parse:v{version}:{parser}:{digest}'
+
+
+def file_digest(file) -> str:
+    """
+    Compute the SHA-256 of an uploaded file without loading it into memory
+
+    Args:
+        file: Uploaded file (or any Django File)
+
+    Returns:
+        Hex digest of the file content
+    """
+    sha256 = hashlib.sha256()
+    file.seek(0)
+    for chunk in file.chunks():
+        sha256.update(chunk)
+    file.seek(0)
+    return sha256.hexdigest()
+
+
+def normalize_text(text: str) -> str:
+    """Normalize line endings and trailing whitespace, which never affect parsing"""
+    lines = text.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    return '\n'.join(line.rstrip() for line in lines).strip()
+
+
+def text_digest(text: str) -> str:
+    """SHA-256 of the normalized text"""
+    return hashlib.sha256(normalize_text(text).encode('utf-8')).hexdigest()
+
+
+def get_extraction(digest: str) -> Optional[Dict[str, Any]]:
+    """Return a cached extraction result for a file digest, if any"""
+    if not settings.IMPORT_CACHE_ENABLED:
+        return None
+    return cache.get(EXTRACTION_KEY.format(version=CACHE_VERSION, digest=digest))
+
+
+def set_extraction(digest: str, result: Dict[str, Any]):
+    """Cache a successful extraction result for a file digest"""
+    if not settings.IMPORT_CACHE_ENABLED or not result.get('success'):
+        return
+    cache.set(
+        EXTRACTION_KEY.format(version=CACHE_VERSION, digest=digest),
+        result,
+        settings.IMPORT_CACHE_TIMEOUT
+    )
+
+
+def get_parse(parser: str, text: str) -> Optional[Dict[str, Any]]:
+    """
+    Return a memoised parse result for the given text
+
+    Args:
+        parser: Name of the parser, results of different parsers are kept apart
+        text: Text that is about to be parsed
+
+    Returns:
+        Cached parse result or None
+    """
+    if not settings.IMPORT_CACHE_ENABLED:
+        return None
+    return cache.get(PARSE_KEY.format(version=CACHE_VERSION, parser=parser, digest=text_digest(text)))
+
+
+def set_parse(parser: str, text: str, result: Dict[str, Any]):
+    """Memoise a parse result for the given text"""
+    if not settings.IMPORT_CACHE_ENABLED:
+        return
+    cache.set(
+        PARSE_KEY.format(version=CACHE_VERSION, parser=parser, digest=text_digest(text)),
+        result,
+        settings.IMPORT_CACHE_TIMEOUT
+    )
@@ -0,0 +1,305 @@
+"""
+Asynchronous recipe import jobs
+
+The import endpoint stores the upload in an ImportJob and returns straight away.
+The run_import_worker management command claims pending jobs and processes them
+in a pool of worker processes, recording status, timings and errors per job.
+"""
+import os
+import socket
+import time
+import logging
+from datetime import timedelta
+from typing import Iterable, Optional
+
+from django.core.files.uploadedfile import UploadedFile
+from django.db import close_old_connections
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import ImportJob, ImportJobStatus, ImportMode
+
+logger = logging.getLogger(__name__)
+
+# A job that keeps crashing its worker is failed after this many attempts
+MAX_ATTEMPTS = 3
+
+
+def get_worker_name() -> str:
+    """Identify the current worker process as host:pid"""
+    return f"{socket.gethostname()}:{os.getpid()}"[:100]
+
+
+def enqueue_import(uploaded_file, user, mode: str = ImportMode.SINGLE) -> ImportJob:
+    """
+    Store an uploaded file and queue it for import
+
+    Args:
+        uploaded_file: Uploaded PDF, image or ZIP archive
+        user: User who requested the import
+        mode: ImportMode, 'cookbook' splits a PDF into many recipes and
+            'archive' imports every file of a ZIP archive
+
+    Returns:
+        Created ImportJob instance in pending state
+    """
+    job = ImportJob(
+        user=user,
+        original_filename=uploaded_file.name[:255],
+        file_size=uploaded_file.size,
+        mode=mode,
+    )
+    uploaded_file.seek(0)
+    job.file.save(os.path.basename(uploaded_file.name), uploaded_file, save=False)
+    job.save()
+
+    logger.info(f"Queued import job {job.id} for {uploaded_file.name}")
+    return job
+
+
+def claim_next_job(worker_name: str) -> Optional[ImportJob]:
+    """
+    Atomically claim the oldest pending job
+
+    The conditional UPDATE makes sure two workers can never claim the same job,
+    without relying on row locks (not available on SQLite).
+
+    Args:
+        worker_name: Identifier recorded on the claimed job
+
+    Returns:
+        Claimed ImportJob, or None if nothing is pending
+    """
+    candidate_ids = list(
+        ImportJob.objects.filter(status=ImportJobStatus.PENDING)
+        .order_by('created_at')
+        .values_list('id', flat=True)[:10]
+    )
+
+    for job_id in candidate_ids:
+        now = timezone.now()
+        claimed = ImportJob.objects.filter(id=job_id, status=ImportJobStatus.PENDING).update(
+            status=ImportJobStatus.RUNNING,
+            started_at=now,
+            heartbeat_at=now,
+            worker=worker_name,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return ImportJob.objects.get(id=job_id)
+
+    return None
+
+
+def record_heartbeat(job_ids: Iterable) -> int:
+    """
+    Mark running jobs as still being processed by their worker
+
+    Args:
+        job_ids: Ids of the jobs the calling worker is processing
+
+    Returns:
+        Number of jobs that were updated
+    """
+    return ImportJob.objects.filter(id__in=list(job_ids), status=ImportJobStatus.RUNNING).update(
+        heartbeat_at=timezone.now()
+    )
+
+
+def requeue_stale_jobs(timeout_seconds: int, exclude_ids: Iterable = ()) -> int:
+    """
+    Put jobs back in the queue when their worker died while processing them
+
+    A job is abandoned when its worker stopped recording heartbeats, so jobs
+    that simply take long are left alone.
+
+    Args:
+        timeout_seconds: Time without a heartbeat after which a job is considered abandoned
+        exclude_ids: Ids of the jobs the calling worker is processing itself
+
+    Returns:
+        Number of jobs that were requeued
+    """
+    cutoff = timezone.now() - timedelta(seconds=timeout_seconds)
+    return requeue_jobs(
+        ImportJob.objects
+        .filter(Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff))
+        .exclude(id__in=list(exclude_ids))
+    )
+
+
+def requeue_jobs(jobs) -> int:
+    """
+    Put running jobs back in the queue, failing those that used up their attempts
+
+    Args:
+        jobs: ImportJob queryset, only its running jobs are changed
+
+    Returns:
+        Number of jobs that were requeued
+    """
+    now = timezone.now()
+    stale = jobs.filter(status=ImportJobStatus.RUNNING)
+
+    stale.filter(attempts__gte=MAX_ATTEMPTS).update(
+        status=ImportJobStatus.FAILED,
+        error='Import worker did not finish the job',
+        error_stage='worker',
+        finished_at=now,
+    )
+    return stale.filter(attempts__lt=MAX_ATTEMPTS).update(
+        status=ImportJobStatus.PENDING,
+        worker='',
+    )
+
+
+def run_import_job(job_id: str) -> str:
+    """
+    Process a single job by ID (entry point for pool workers)
+
+    Args:
+        job_id: ID of a claimed ImportJob
+
+    Returns:
+        Final status of the job
+    """
+    close_old_connections()
+    try:
+        job = ImportJob.objects.select_related('user').get(id=job_id)
+    except ImportJob.DoesNotExist:
+        logger.warning(f"Import job {job_id} disappeared before processing")
+        return 'missing'
+
+    process_import_job(job)
+    return job.status
+
+
+def process_import_job(job: ImportJob) -> ImportJob:
+    """
+    Extract, parse and save the recipe for an import job
+
+    Args:
+        job: ImportJob to process
+
+    Returns:
+        The updated ImportJob
+    """
+    from .import_pipeline import ImportContext, ImportPipeline
+    from .text_extraction_service import build_import_metadata
+
+    started = time.perf_counter()
+    timings = {}
+    if job.started_at:
+        timings['queued'] = (job.started_at - job.created_at).total_seconds()
+
+    try:
+        if not job.file:
+            raise ValueError("Uploaded file is no longer available")
+
+        if job.mode == ImportMode.COOKBOOK:
+            return _process_cookbook_job(job, timings, started)
+        if job.mode == ImportMode.ARCHIVE:
+            return _process_archive_job(job, timings, started)
+
+        with job.file.open('rb') as stored_file:
+            upload = UploadedFile(
+                file=stored_file,
+                name=job.original_filename,
+                size=job.file_size,
+            )
+            context = ImportPipeline.from_settings().run(ImportContext(upload, user=job.user))
+        import_result = context.result
+        timings.update(import_result['timings'])
+
+        if not context.succeeded:
+            return _finish_failed(job, import_result['error'], import_result.get('stage', 'unknown'), timings, started)
+        recipe = context.recipe
+
+    except Exception as e:
+        logger.error(f"Import job {job.id} failed: {str(e)}", exc_info=True)
+        return _finish_failed(job, str(e), 'worker', timings, started)
+
+    timings['total'] = time.perf_counter() - started
+    job.recipe = recipe
+    job.result = build_import_metadata(import_result, recipe.source)
+    job.status = ImportJobStatus.SUCCEEDED
+    job.error = ''
+    job.error_stage = ''
+    job.timings = timings
+    job.finished_at = timezone.now()
+
+    # The recipe now holds everything we need, drop the stored upload
+    job.file.delete(save=False)
+    job.save()
+
+    logger.info(f"Import job {job.id} created recipe {recipe.id} in {timings['total']:.2f}s")
+    return job
+
+
+def _process_cookbook_job(job: ImportJob, timings: dict, started: float) -> ImportJob:
+    """Split a cookbook PDF into recipes, see cookbook_import"""
+    from .cookbook_import import CookbookImporter
+
+    with job.file.open('rb'):
+        # The stored file has a path, so page workers read it without a copy
+        report = CookbookImporter(job.user, job=job).import_document(
+            job.file, job.original_filename, job.file_size
+        )
+
+    if not report['recipes_imported']:
+        return _finish_failed(job, "No recipes found in the cookbook", 'cookbook_splitting', timings, started)
+
+    timings['total'] = time.perf_counter() - started
+    job.result = report
+    job.status = ImportJobStatus.SUCCEEDED
+    job.error = ''
+    job.error_stage = ''
+    job.timings = timings
+    job.finished_at = timezone.now()
+    job.file.delete(save=False)
+    job.save()
+
+    logger.info(f"Import job {job.id} created {report['recipes_imported']} recipes in {timings['total']:.2f}s")
+    return job
+
+
+def _process_archive_job(job: ImportJob, timings: dict, started: float) -> ImportJob:
+    """Import every PDF and image of a ZIP archive, see bulk_import"""
+    from .bulk_import import BulkRecipeImporter
+
+    try:
+        with job.file.open('rb') as stored_file:
+            report = BulkRecipeImporter(job.user, job=job).import_archive(stored_file)
+    except ValueError as e:
+        return _finish_failed(job, str(e), 'archive', timings, started)
+
+    # The report lists the outcome per file, also when nothing was imported
+    job.result = report
+    if not report['imported']:
+        return _finish_failed(job, "No recipe could be imported from the archive", 'archive', timings, started)
+
+    timings['total'] = time.perf_counter() - started
+    job.status = ImportJobStatus.SUCCEEDED
+    job.error = ''
+    job.error_stage = ''
+    job.timings = timings
+    job.finished_at = timezone.now()
+    job.file.delete(save=False)
+    job.save()
+
+    logger.info(f"Import job {job.id} created {report['imported']} recipes in {timings['total']:.2f}s")
+    return job
+
+
+def _finish_failed(job: ImportJob, error: str, stage: str, timings: dict, started: float) -> ImportJob:
+    """Record a failed job"""
+    timings['total'] = time.perf_counter() - started
+    job.status = ImportJobStatus.FAILED
+    job.error = error
+    job.error_stage = stage
+    job.timings = timings
+    job.finished_at = timezone.now()
+    job.save()
+
+    logger.warning(f"Import job {job.id} failed during {stage}: {error}")
+    return job
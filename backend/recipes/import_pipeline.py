@@ -0,0 +1,361 @@
+"""
+Staged recipe import pipeline
+
+Every single-file import (the import endpoint, its preview and commit, import
+jobs and ZIP archive entries) runs the same stages in order:
+
+    validation -> extraction -> parsing -> classification -> persist
+
+Each stage reads and extends an ImportContext. A stage stops the import by
+raising ImportStageError, which turns into the usual failed import result
+with the stage's error_stage. The pipeline times every stage; the timings end
+up in the import result and, with the byte counts and extraction method, on
+the SourceMetadata of the recipe.
+
+Stages are chosen with IMPORT_PIPELINE_STAGES: names from STAGES or dotted
+paths of ImportStage subclasses, so a stage can be replaced or added without
+touching the callers. stage_statistics aggregates the stored timings into
+percentiles for the import-stats endpoint.
+"""
+import time
+import logging
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Union
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import import_cache
+from .models import SourceMetadata
+from .parser_engine import RecipeDocument, RecipeParserEngine
+from .pdf_document import PDFDocument
+from .text_extraction_service import (
+    EnhancedRecipeImportService, IMAGE_EXTENSIONS, get_recipe_source
+)
+
+logger = logging.getLogger(__name__)
+
+MAX_FILE_SIZE = 10 * 1024 * 1024  # Same limit as the upload serializer
+
+STAGES = {
+    'validation': 'recipes.import_pipeline.ValidationStage',
+    'extraction': 'recipes.import_pipeline.ExtractionStage',
+    'parsing': 'recipes.import_pipeline.ParsingStage',
+    'classification': 'recipes.import_pipeline.ClassificationStage',
+    'persist': 'recipes.import_pipeline.PersistStage',
+}
+
+
+class ImportStageError(Exception):
+    """Raised by a stage to stop the import"""
+
+
+class ImportContext:
+    """State of one import, passed from stage to stage"""
+
+    def __init__(self, file: Union[UploadedFile, PDFDocument, None] = None, user=None,
+                 filename: Optional[str] = None, file_size: Optional[int] = None,
+                 result: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            file: Uploaded file, None when resuming from a stored result
+            user: Owner of the recipe, needed by the persist stage
+            filename: Original filename, defaults to the file's name
+            file_size: Size of the upload in bytes, defaults to the file's size
+            result: Import result of earlier stages (e.g. a stored preview)
+        """
+        if file is not None and file.name.lower().endswith('.pdf'):
+            # Validation, hashing and extraction share one parsed document
+            file = PDFDocument.of(file)
+        self.file = file
+        self.user = user
+        self.filename = filename or file.name
+        self.file_size = file_size if file_size is not None else getattr(file, 'size', None)
+        self.result = {'success': True, **(result or {})}
+        self.result.setdefault('timings', {})
+        self.result.setdefault('warnings', [])
+        self.recipe = None
+
+    @property
+    def timings(self) -> Dict[str, float]:
+        return self.result['timings']
+
+    @property
+    def succeeded(self) -> bool:
+        return self.result['success']
+
+
+class ImportStage:
+    """Base class for pipeline stages"""
+
+    name = ''
+    # Reported as 'stage' of a failed import, kept stable for API clients
+    error_stage = ''
+    # Stages that write to the database, skipped by previews
+    persists = False
+
+    def run(self, context: ImportContext):
+        """
+        Process the import, raise ImportStageError to stop it
+
+        Args:
+            context: Import state, extended in place
+        """
+        raise NotImplementedError
+
+
+class ValidationStage(ImportStage):
+    """Reject unsupported, empty, oversized and malformed files before any extraction"""
+
+    name = 'validation'
+    error_stage = 'validation'
+
+    def run(self, context: ImportContext):
+        from .services import PDFValidationService
+
+        extension = context.filename.lower().split('.')[-1] if '.' in context.filename else ''
+        if extension != 'pdf' and extension not in IMAGE_EXTENSIONS:
+            raise ImportStageError(f'Unsupported file type: {extension}')
+        if not context.file_size:
+            raise ImportStageError('File is empty')
+        if context.file_size > MAX_FILE_SIZE:
+            raise ImportStageError('File size cannot exceed 10MB')
+
+        if extension == 'pdf':
+            # Header, trailer and page tree only, extraction reads the pages
+            validation = PDFValidationService().validate_file(context.file, full=False)
+            if not validation['is_valid']:
+                raise ImportStageError('; '.join(validation['errors']))
+            context.result['warnings'].extend(validation['warnings'])
+            context.result['page_count'] = validation['page_count']
+
+
+class ExtractionStage(ImportStage):
+    """Extract the text, reusing the result of an earlier import of the same file"""
+
+    name = 'extraction'
+    error_stage = 'text_extraction'
+
+    def __init__(self):
+        self.service = EnhancedRecipeImportService()
+
+    def run(self, context: ImportContext):
+        file = context.file
+        digest = file.digest if isinstance(file, PDFDocument) else import_cache.file_digest(file)
+        context.result['content_hash'] = digest
+
+        extraction_result = import_cache.get_extraction(digest)
+        cache_hit = extraction_result is not None
+        if not cache_hit:
+            extraction_result = self.service.text_extractor.extract_text_from_file(file, context.user)
+            import_cache.set_extraction(digest, extraction_result)
+        context.result.setdefault('cache_hits', {})['extraction'] = cache_hit
+
+        if not extraction_result['success']:
+            raise ImportStageError(extraction_result['error'])
+
+        text = extraction_result['text']
+        context.result.update({
+            'raw_text': text,
+            'text_size': len(text.encode('utf-8')),
+            'extraction_method': extraction_result.get('method', 'unknown'),
+            'extraction_metadata': {
+                k: v for k, v in extraction_result.items()
+                if k not in ['success', 'text', 'error']
+            },
+        })
+
+
+class ParsingStage(ImportStage):
+    """Parse the text into recipe data, reusing the parse of an identical text"""
+
+    name = 'parsing'
+    error_stage = 'recipe_parsing'
+
+    def __init__(self):
+        self.service = EnhancedRecipeImportService()
+
+    def run(self, context: ImportContext):
+        text = context.result['raw_text']
+        parsing_result = import_cache.get_parse('recipe_text_parser', text)
+        cache_hit = parsing_result is not None
+        if not cache_hit:
+            parsing_result = self.service.recipe_parser.parse_recipe_text(text)
+            # Results cut short by the parse budget depend on timing, they are not cached
+            if parsing_result['success'] and not parsing_result.get('warnings'):
+                import_cache.set_parse('recipe_text_parser', text, parsing_result)
+        context.result.setdefault('cache_hits', {})['parsing'] = cache_hit
+
+        if not parsing_result['success']:
+            raise ImportStageError(parsing_result['error'])
+
+        context.result['recipe_data'] = dict(parsing_result['recipe_data'])
+        context.result['raw_text_preview'] = parsing_result.get('raw_text', '')
+        context.result['warnings'].extend(parsing_result.get('warnings', []))
+
+
+class ClassificationStage(ImportStage):
+    """Determine the source type and the recipe's categories and tags"""
+
+    name = 'classification'
+    error_stage = 'classification'
+
+    def run(self, context: ImportContext):
+        context.result['source'] = get_recipe_source(context.filename)
+
+        classify_recipe(context.result['recipe_data'], context.result['raw_text'])
+
+
+def classify_recipe(recipe_data: Dict[str, Any], text: str):
+    """
+    Add categories and tags to parsed recipe data
+
+    The text parser leaves them out; values that are already set (by an
+    edited preview) are kept.
+
+    Args:
+        recipe_data: Parsed recipe data, updated in place
+        text: Text the recipe was parsed from
+    """
+    if 'categories' in recipe_data and 'tags' in recipe_data:
+        return
+    engine = RecipeParserEngine()
+    document = RecipeDocument(text)
+    if 'categories' not in recipe_data:
+        recipe_data['categories'] = engine.extract_categories(document)
+    if 'tags' not in recipe_data:
+        recipe_data['tags'] = engine.extract_tags(document)
+
+
+class PersistStage(ImportStage):
+    """Save the recipe with its ingredients and source metadata"""
+
+    name = 'persist'
+    error_stage = 'persist'
+    persists = True
+
+    def __init__(self):
+        self.service = EnhancedRecipeImportService()
+
+    def run(self, context: ImportContext):
+        if context.user is None:
+            raise ImportStageError('No user to save the recipe for')
+        context.recipe = self.service.save_recipe(
+            context.result, context.user, context.filename, context.file_size
+        )
+
+
+class ImportPipeline:
+    """Run import stages in order, timing each one"""
+
+    def __init__(self, stages: List[ImportStage]):
+        self.stages = stages
+
+    @classmethod
+    def from_settings(cls, process: bool = True, persist: bool = True) -> 'ImportPipeline':
+        """
+        Build the pipeline configured by IMPORT_PIPELINE_STAGES
+
+        Args:
+            process: Include the stages that produce the recipe data
+            persist: Include the stages that write to the database
+        """
+        stages = [import_string(STAGES.get(name, name))() for name in settings.IMPORT_PIPELINE_STAGES]
+        return cls([stage for stage in stages if (persist if stage.persists else process)])
+
+    def run(self, context: ImportContext) -> ImportContext:
+        """
+        Run every stage until one fails
+
+        Returns:
+            The context; context.result is the import result and
+            context.recipe the saved recipe when a persist stage ran
+        """
+        for stage in self.stages:
+            started = time.perf_counter()
+            try:
+                stage.run(context)
+            except ImportStageError as e:
+                context.timings[stage.name] = time.perf_counter() - started
+                context.result.update({'success': False, 'error': str(e), 'stage': stage.error_stage})
+                logger.warning(f"Import of {context.filename} failed during {stage.name}: {e}")
+                return context
+            context.timings[stage.name] = time.perf_counter() - started
+
+        if context.recipe is not None:
+            # The metadata was saved while the persist stage was still running
+            SourceMetadata.objects.filter(recipe=context.recipe).update(stage_timings=context.timings)
+        return context
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Percentile of sorted values, interpolated between the closest ranks"""
+    position = (len(values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def stage_statistics(queryset=None, days: int = 30, limit: int = 5000) -> Dict[str, Any]:
+    """
+    Aggregate the stage timings of recent imports
+
+    Args:
+        queryset: SourceMetadata to aggregate, all imports by default
+        days: Only imports from the last this many days
+        limit: Only the most recent this many imports
+
+    Returns:
+        Dictionary with the number of imports, p50/p95/max seconds per stage
+        and for the whole import, p50/p95 file and text sizes in bytes and
+        the number of imports per extraction method
+    """
+    queryset = SourceMetadata.objects.all() if queryset is None else queryset
+    rows = list(
+        queryset
+        .filter(import_date__gte=timezone.now() - timedelta(days=days))
+        .exclude(stage_timings={})
+        .order_by('-import_date')
+        .values_list('stage_timings', 'file_size', 'text_size', 'extraction_method')[:limit]
+    )
+
+    durations: Dict[str, List[float]] = {}
+    methods: Dict[str, int] = {}
+    for timings, _, _, method in rows:
+        for stage, seconds in timings.items():
+            durations.setdefault(stage, []).append(seconds)
+        durations.setdefault('total', []).append(sum(timings.values()))
+        methods[method or 'unknown'] = methods.get(method or 'unknown', 0) + 1
+
+    # Configured stages in pipeline order, then any others that were recorded
+    order = [name for name in settings.IMPORT_PIPELINE_STAGES if name in durations]
+    order += sorted(stage for stage in durations if stage not in order and stage != 'total')
+    if rows:
+        order.append('total')
+
+    def summary(values: List[float]) -> Dict[str, Any]:
+        values = sorted(values)
+        return {
+            'count': len(values),
+            'p50': round(percentile(values, 0.5), 4),
+            'p95': round(percentile(values, 0.95), 4),
+            'max': round(values[-1], 4),
+        }
+
+    sizes = {}
+    for field, column in (('file_size', 1), ('text_size', 2)):
+        values = sorted(row[column] for row in rows if row[column] is not None)
+        sizes[field] = {
+            'p50': round(percentile(values, 0.5)) if values else None,
+            'p95': round(percentile(values, 0.95)) if values else None,
+        }
+
+    return {
+        'imports': len(rows),
+        'days': days,
+        'stages': [{'stage': stage, **summary(durations[stage])} for stage in order],
+        'sizes': sizes,
+        'extraction_methods': methods,
+    }
@@ -0,0 +1,86 @@
+"""
+Short-lived preview tokens for recipe imports
+
+A preview (POST /api/recipes/import/ with preview=true) stores its import
+result in the ImportPreview table under a random token. The follow-up
+commit call (POST /api/recipes/import/commit/) creates the recipe from that
+row plus the fields the user edited, so the file is neither uploaded nor
+extracted and parsed a second time. The table is shared by every worker
+process, unlike the default (local memory) cache.
+
+A token belongs to the user who created the preview and can be committed
+once; rows expire after IMPORT_PREVIEW_TIMEOUT seconds.
+"""
+import secrets
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Any, Dict, Iterator, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ImportPreview
+
+# Parts of an import result needed to save the recipe later
+PREVIEW_RESULT_KEYS = (
+    'recipe_data', 'raw_text_preview', 'raw_text', 'extraction_method', 'extraction_metadata',
+    'warnings', 'text_size', 'page_count', 'timings',
+)
+
+
+def store_preview(user, import_result: Dict[str, Any], filename: str,
+                  file_size: Optional[int] = None) -> str:
+    """
+    Keep a previewed import result until the user commits it
+
+    Args:
+        user: User who requested the preview
+        import_result: Successful result of import_recipe_from_file
+        filename: Original filename of the upload
+        file_size: Size of the upload in bytes
+
+    Returns:
+        Preview token
+    """
+    now = timezone.now()
+    # Previews that were never committed
+    ImportPreview.objects.filter(expires_at__lte=now).delete()
+
+    token = secrets.token_urlsafe(24)
+    ImportPreview.objects.create(
+        token=token,
+        user=user,
+        filename=filename,
+        file_size=file_size,
+        import_result={key: import_result[key] for key in PREVIEW_RESULT_KEYS if key in import_result},
+        expires_at=now + timedelta(seconds=settings.IMPORT_PREVIEW_TIMEOUT),
+    )
+    return token
+
+
+@contextmanager
+def claim_preview(token: str, user) -> Iterator[ImportPreview]:
+    """
+    Lock a preview while the recipe is saved from it, and delete it with the save
+
+    The preview is only deleted when the block completes; if saving raises,
+    the transaction is rolled back and the token can be committed again.
+
+    Raises:
+        ImportPreview.DoesNotExist: The preview expired, was already committed
+            or belongs to another user
+    """
+    with transaction.atomic():
+        preview = ImportPreview.objects.select_for_update().filter(
+            token=token, user=user, expires_at__gt=timezone.now()
+        ).first()
+        if preview is None:
+            raise ImportPreview.DoesNotExist(token)
+
+        yield preview
+
+        # Only the request that actually deletes the row may commit it
+        deleted, _ = ImportPreview.objects.filter(pk=preview.pk).delete()
+        if not deleted:
+            raise ImportPreview.DoesNotExist(token)
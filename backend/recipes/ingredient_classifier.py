@@ -0,0 +1,356 @@
+"""
+Ingredient category classification for shopping lists
+
+Ingredients are sorted into an IngredientCategory by a curated Dutch and
+English lexicon, the ingredient_categories keyword sets in recipes/keywords/.
+The lexicon is compiled once per process into a dict of normalised token
+form -> category, plus a dict of multi-word phrases. Every word is indexed
+under its light stems (plural and diminutive endings stripped, doubled letters
+collapsed), and names are looked up under the same stems, so 'tomaten',
+'tomaatjes' and 'tomaat' all land on produce without a full stemmer.
+
+A name is classified by, in order: frozen markers ('diepvries', 'frozen'),
+phrases ('olijfolie' is one word, 'olive oil' a phrase), single words from
+the last word to the first (the head of 'kipfilet in blokjes' is kipfilet),
+and finally the parts of Dutch compounds, head first ('tomatenpuree' is
+puree, so pantry, not produce).
+
+Results are memoised per canonical name (lowercase, no accents, notes or
+parentheses): in an in-process LRU of INGREDIENT_CATEGORY_CACHE_SIZE
+entries and in the IngredientClassification table, which is read with one
+query per batch of names. Rows derived from an older lexicon are classified
+again; rows set by hand (is_manual) always win.
+"""
+import re
+import json
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import Counter, OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+from django.conf import settings
+from django.db.models import Q
+
+from .keyword_matcher import load_keyword_sets
+from .models import Ingredient, IngredientCategory, IngredientClassification
+
+logger = logging.getLogger(__name__)
+
+# Bump when the matching rules change, so stored rows are classified again
+CLASSIFIER_VERSION = 1
+
+# Plural and diminutive endings, the first one that matches is stripped
+SUFFIXES = ('etjes', 'tjes', 'jes', 'tje', 'je', 'eren', 'en', 'es', 's', 'e')
+MIN_STEM = 2
+# Shortest part of a compound word that is looked up on its own
+MIN_COMPOUND_PART = 3
+MAX_PHRASE_WORDS = 3
+
+DOUBLED_LETTERS = re.compile(r'(.)\1+')
+TOKEN = re.compile(r'[a-z]+')
+PARENTHESES = re.compile(r'\([^)]*\)')
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+class Lexicon(NamedTuple):
+    """Compiled lexicon, see compile_lexicon"""
+    words: Dict[str, str]
+    phrases: Dict[str, str]
+    version: str
+
+
+class LRUCache:
+    """Thread-safe least-recently-used mapping of a fixed size"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: str):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def _get_cache() -> LRUCache:
+    """Return the LRU of this process, created on first use"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LRUCache(settings.INGREDIENT_CATEGORY_CACHE_SIZE)
+        return _cache
+
+
+def reset_cache():
+    """Forget the memoised categories of this process"""
+    global _cache
+    with _cache_lock:
+        _cache = None
+
+
+def normalise(text: str) -> List[str]:
+    """Lowercase words of a text without accents or apostrophes ('pinda's' -> ['pindas'])"""
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return TOKEN.findall(text.replace("'", '').replace('’', ''))
+
+
+def canonical_name(name: str) -> str:
+    """
+    Canonical form of an ingredient name, the key of the memo table
+
+    Notes after a comma and text in parentheses are dropped:
+    'Tomaten (in blik), gehakt' -> 'tomaten'
+    """
+    name = PARENTHESES.sub(' ', name.split(',')[0])
+    return ' '.join(normalise(name))[:255]
+
+
+def forms(token: str) -> List[str]:
+    """The token and its stem, with doubled letters collapsed ('tomaten' -> ['tomaten', 'tomat'])"""
+    found = [DOUBLED_LETTERS.sub(r'\1', token)]
+    if token.endswith('ies') and len(token) - 3 >= MIN_STEM:
+        stem = token[:-3] + 'y'
+    else:
+        stem = next(
+            (token[:-len(suffix)] for suffix in SUFFIXES
+             if token.endswith(suffix) and len(token) - len(suffix) >= MIN_STEM),
+            None
+        )
+    if stem is not None:
+        stem = DOUBLED_LETTERS.sub(r'\1', stem)
+        if stem != found[0]:
+            found.append(stem)
+    return found
+
+
+def stem(token: str) -> str:
+    """The most reduced form of a token"""
+    return forms(token)[-1]
+
+
+@lru_cache(maxsize=None)
+def compile_lexicon() -> Lexicon:
+    """
+    Compile the ingredient_categories keyword sets
+
+    Returns:
+        Lexicon with the category per word form and per phrase of stems, and
+        a version hash that changes with the lexicon or CLASSIFIER_VERSION
+    """
+    keyword_set = load_keyword_sets()['ingredient_categories']
+    words, phrases = {}, {}
+    for category, entries in keyword_set.items():
+        for entry in entries:
+            tokens = normalise(entry)
+            if len(tokens) == 1:
+                for form in forms(tokens[0]):
+                    words.setdefault(form, category)
+            elif tokens:
+                phrases.setdefault(' '.join(stem(token) for token in tokens), category)
+
+    digest = hashlib.sha1(
+        json.dumps([CLASSIFIER_VERSION, keyword_set], sort_keys=True).encode('utf-8')
+    ).hexdigest()[:16]
+    return Lexicon(words, phrases, digest)
+
+
+def _lookup(token_forms: List[str], words: Dict[str, str]) -> Optional[str]:
+    for form in token_forms:
+        category = words.get(form)
+        if category is not None:
+            return category
+    return None
+
+
+def _compound_lookup(token: str, words: Dict[str, str]) -> Optional[str]:
+    """Category of the longest known head, else the longest known modifier of a compound"""
+    for start in range(1, len(token) - MIN_COMPOUND_PART + 1):
+        category = _lookup(forms(token[start:]), words)
+        if category is not None:
+            return category
+    for end in range(len(token) - 1, MIN_COMPOUND_PART - 1, -1):
+        category = _lookup(forms(token[:end]), words)
+        if category is not None:
+            return category
+    return None
+
+
+def classify_canonical(name: str) -> str:
+    """
+    Classify a canonical ingredient name with the lexicon
+
+    Returns:
+        IngredientCategory value, OTHER when nothing matches
+    """
+    tokens = name.split()
+    if not tokens:
+        return IngredientCategory.OTHER
+
+    lexicon = compile_lexicon()
+    token_forms = [forms(token) for token in tokens]
+
+    # 'diepvries spinazie' is bought in the freezer aisle
+    for token, found in zip(tokens, token_forms):
+        if _lookup(found, lexicon.words) == IngredientCategory.FROZEN:
+            return IngredientCategory.FROZEN
+        if token.startswith('diepvries'):
+            return IngredientCategory.FROZEN
+
+    stems = [found[-1] for found in token_forms]
+    for size in range(min(MAX_PHRASE_WORDS, len(tokens)), 1, -1):
+        for start in range(len(tokens) - size, -1, -1):
+            category = lexicon.phrases.get(' '.join(stems[start:start + size]))
+            if category is not None:
+                return category
+
+    for found in reversed(token_forms):
+        category = _lookup(found, lexicon.words)
+        if category is not None:
+            return category
+
+    for token in reversed(tokens):
+        if len(token) > MIN_COMPOUND_PART:
+            category = _compound_lookup(token, lexicon.words)
+            if category is not None:
+                return category
+
+    return IngredientCategory.OTHER
+
+
+def classify_many(names: Iterable[str]) -> Dict[str, str]:
+    """
+    Classify ingredient names, memoised per canonical name
+
+    Names missing from the LRU are read from IngredientClassification with a
+    single query; names missing there are classified with the lexicon and
+    stored.
+
+    Args:
+        names: Ingredient names as written
+
+    Returns:
+        Dict of name -> IngredientCategory value
+    """
+    cache = _get_cache()
+    canonical = {name: canonical_name(name) for name in names}
+    categories = {'': IngredientCategory.OTHER}
+    missing = []
+    for key in set(canonical.values()) - {''}:
+        category = cache.get(key)
+        if category is None:
+            missing.append(key)
+        else:
+            categories[key] = category
+
+    if missing:
+        version = compile_lexicon().version
+        stored = dict(
+            IngredientClassification.objects
+            .filter(name__in=missing)
+            .filter(Q(is_manual=True) | Q(lexicon_version=version))
+            .values_list('name', 'category')
+        )
+        new_rows = [
+            IngredientClassification(name=key, category=classify_canonical(key), lexicon_version=version)
+            for key in missing if key not in stored
+        ]
+        if new_rows:
+            # Rows of an older lexicon are replaced, manual rows were read above
+            IngredientClassification.objects.bulk_create(
+                new_rows, update_conflicts=True, unique_fields=['name'],
+                update_fields=['category', 'lexicon_version', 'updated_at']
+            )
+            stored.update((row.name, row.category) for row in new_rows)
+        for key, category in stored.items():
+            cache.put(key, category)
+        categories.update(stored)
+
+    return {name: categories[key] for name, key in canonical.items()}
+
+
+def classify(name: str) -> str:
+    """Classify a single ingredient name, see classify_many"""
+    return classify_many([name])[name]
+
+
+def classify_ingredients(ingredients: List[Ingredient]) -> List[Ingredient]:
+    """
+    Set the category of ingredients that are still OTHER
+
+    Args:
+        ingredients: Ingredient instances, changed in place
+
+    Returns:
+        The ingredients whose category changed
+    """
+    unsorted = [ingredient for ingredient in ingredients if ingredient.category == IngredientCategory.OTHER]
+    if not unsorted:
+        return []
+
+    categories = classify_many(ingredient.name for ingredient in unsorted)
+    changed = []
+    for ingredient in unsorted:
+        category = categories[ingredient.name]
+        if category != IngredientCategory.OTHER:
+            ingredient.category = category
+            changed.append(ingredient)
+    return changed
+
+
+def backfill_categories(queryset=None, batch_size: int = None, dry_run: bool = False) -> Dict[str, Any]:
+    """
+    Classify stored ingredients, one bulk_update per batch
+
+    Args:
+        queryset: Ingredients to process, those still in OTHER by default
+        batch_size: Rows read and written per batch, defaults to BULK_IMPORT_BATCH_SIZE
+        dry_run: Only count the changes
+
+    Returns:
+        Statistics: ingredients scanned and classified, and the number per category
+    """
+    batch_size = batch_size or settings.BULK_IMPORT_BATCH_SIZE
+    if queryset is None:
+        queryset = Ingredient.objects.filter(category=IngredientCategory.OTHER)
+
+    stats = {'scanned': 0, 'classified': 0, 'categories': Counter()}
+    rows = queryset.only('id', 'name', 'category').order_by('pk').iterator(chunk_size=batch_size)
+
+    def flush(batch):
+        changed = classify_ingredients(batch)
+        stats['classified'] += len(changed)
+        stats['categories'].update(ingredient.category for ingredient in changed)
+        if changed and not dry_run:
+            Ingredient.objects.bulk_update(changed, ['category'])
+
+    batch = []
+    for ingredient in rows:
+        stats['scanned'] += 1
+        batch.append(ingredient)
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    flush(batch)
+
+    stats['categories'] = dict(stats['categories'])
+    logger.info(f"Classified {stats['classified']} of {stats['scanned']} ingredients")
+    return stats
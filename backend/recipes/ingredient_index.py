@@ -0,0 +1,292 @@
+"""
+Canonical ingredient dictionary and fuzzy-match index
+
+Shopping lists group ingredients by their CanonicalIngredient, so 'ui',
+'uien', 'grote ui' and 'Ui (gesnipperd)' become one item. The dictionary is
+seeded from the canonical_ingredients keyword sets in recipes/keywords/
+(load_dictionary, the load_canonical_ingredients command) and edited in the
+admin.
+
+Names are matched on keys: the canonical name of ingredient_classifier
+(lowercase, no accents, notes or parentheses), once with its words as
+written and once with their light stems, so plurals and diminutives need no
+alias. Both are needed as stemming is not idempotent ('pompoenen' stems to
+'pompoen', which stems to 'pompo'). The dictionary is compiled once per
+process into a dict of key -> id for all names and aliases, plus a
+trigram -> keys postings list. A name resolves to, in order:
+
+1. the entry of its keys
+2. the entry of its keys without preparation and size modifiers ('grote',
+   'gesnipperde', ..., the ingredient_modifiers keyword sets) and units
+   ('teentjes'); words that make another product ('rode peper', 'zure
+   room') are not modifiers
+3. for single words of at least FUZZY_MIN_LENGTH characters, the closest
+   key within a Levenshtein distance that grows with the length of the word
+   ('champigons'), among keys that share most of their trigrams with it
+
+A name is never matched on part of its words: 'coconut milk', 'sweet
+potato' and 'zout en peper' are not milk, potato or peper, as their
+quantities would be added up on one shopping list item. Names without an
+entry are grouped by their own name.
+
+Results are memoised per name as written in an in-process LRU of
+CANONICAL_INGREDIENT_CACHE_SIZE entries, as computing the canonical name
+costs about as much as matching it. Every lookup reads the version of the
+dictionary (the number of entries and their latest updated_at) from the
+database, so an entry saved in the admin or by load_dictionary in any
+process is picked up by all of them on their next lookup.
+"""
+import logging
+import threading
+from collections import Counter, defaultdict
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+from .ingredient_classifier import LRUCache, canonical_name, forms, normalise
+from .keyword_matcher import load_keyword_sets
+from .models import CanonicalIngredient
+from .quantity_parser import unit_aliases
+
+logger = logging.getLogger(__name__)
+
+# Memoised for names without an entry, ids start at 1
+NO_MATCH = 0
+# Keys compared with Levenshtein per name, those sharing the most trigrams
+MAX_FUZZY_CANDIDATES = 20
+# Shorter names are only matched exactly ('beter' is not 'boter')
+FUZZY_MIN_LENGTH = 6
+# Share of the trigrams of the longer of a name and a key that both must have
+FUZZY_MIN_TRIGRAM_OVERLAP = 0.5
+
+_index = None
+_memo = None
+_lock = threading.Lock()
+
+
+class IngredientIndex(NamedTuple):
+    """Compiled dictionary, see compile_index"""
+    keys: Dict[str, int]
+    trigrams: Dict[str, List[str]]
+    names: Dict[int, str]
+    version: str
+
+
+class CanonicalMatch(NamedTuple):
+    """Dictionary entry a name resolved to"""
+    id: int
+    name: str
+
+
+@lru_cache(maxsize=None)
+def modifiers() -> FrozenSet[str]:
+    """Words that do not change which ingredient is bought: the ingredient_modifiers keyword sets and units"""
+    words = list(load_keyword_sets().get('ingredient_modifiers', [])) + list(unit_aliases())
+    return frozenset(token for word in words for token in normalise(word))
+
+
+def _variants(words: List[str]) -> List[List[str]]:
+    """Words as written (doubled letters collapsed) and stemmed"""
+    found = [forms(word) for word in words]
+    return [[word_forms[0] for word_forms in found], [word_forms[-1] for word_forms in found]]
+
+
+def index_keys(name: str) -> List[str]:
+    """Keys of a name in the index ('Tomaten (in blik)' -> ['tomaten', 'tomat'])"""
+    words = canonical_name(name).split()
+    if not words:
+        return []
+    return list(dict.fromkeys(' '.join(variant) for variant in _variants(words)))
+
+
+def trigrams(key: str) -> Set[str]:
+    """Trigrams of a key, padded so short keys and word boundaries count"""
+    padded = f' {key} '
+    return {padded[start:start + 3] for start in range(len(padded) - 2)}
+
+
+def max_distance(key: str) -> int:
+    """Typos tolerated in a key: none below FUZZY_MIN_LENGTH characters, one up to 8, then two"""
+    return 0 if len(key) < FUZZY_MIN_LENGTH else 1 if len(key) <= 8 else 2
+
+
+def levenshtein(first: str, second: str, limit: int) -> int:
+    """
+    Edit distance between two strings, given up once it exceeds limit
+
+    Returns:
+        The distance, or limit + 1 when it is larger than limit
+    """
+    if abs(len(first) - len(second)) > limit:
+        return limit + 1
+    previous = list(range(len(second) + 1))
+    for row, first_char in enumerate(first, 1):
+        current = [row]
+        for column, second_char in enumerate(second, 1):
+            current.append(min(
+                previous[column] + 1,
+                current[column - 1] + 1,
+                previous[column - 1] + (first_char != second_char)
+            ))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def compile_index(version: str = '') -> IngredientIndex:
+    """
+    Compile the CanonicalIngredient table, in one query
+
+    Names win over aliases when two entries share a key.
+    """
+    keys, names, aliases = {}, {}, []
+    for canonical_id, name, entry_aliases in CanonicalIngredient.objects.values_list('id', 'name', 'aliases'):
+        names[canonical_id] = name
+        for key in index_keys(name):
+            keys.setdefault(key, canonical_id)
+        aliases.extend((alias, canonical_id) for alias in entry_aliases or [])
+    for alias, canonical_id in aliases:
+        for key in index_keys(alias):
+            keys.setdefault(key, canonical_id)
+
+    postings = defaultdict(list)
+    for key in keys:
+        for trigram in trigrams(key):
+            postings[trigram].append(key)
+
+    logger.info(f"Compiled canonical ingredient index: {len(names)} ingredients, {len(keys)} keys")
+    return IngredientIndex(keys, dict(postings), names, version)
+
+
+def dictionary_version() -> str:
+    """Version of the CanonicalIngredient table, changed by every save, insert and delete"""
+    version = CanonicalIngredient.objects.aggregate(entries=Count('id'), updated=Max('updated_at'))
+    return f"{version['entries']}:{version['updated'].isoformat() if version['updated'] else ''}"
+
+
+def _state() -> Tuple[IngredientIndex, LRUCache]:
+    """Index and memo of this process, compiled again when the dictionary changed"""
+    global _index, _memo
+    version = dictionary_version()
+    with _lock:
+        if _index is None or _index.version != version:
+            _index = compile_index(version)
+            _memo = LRUCache(settings.CANONICAL_INGREDIENT_CACHE_SIZE)
+        return _index, _memo
+
+
+def get_index() -> IngredientIndex:
+    """Return the compiled index of this process"""
+    return _state()[0]
+
+
+def reset_index():
+    """Compile the index of this process again on its next lookup, other processes notice the new version"""
+    global _index
+    with _lock:
+        _index = None
+
+
+def _closest(key: str, index: IngredientIndex) -> Optional[int]:
+    """Entry of the closest key within max_distance, fewest edits then most shared trigrams"""
+    limit = max_distance(key)
+    if not limit:
+        return None
+    query = trigrams(key)
+    shared = Counter(candidate for trigram in query for candidate in index.trigrams.get(trigram, ()))
+    # Every edit changes at most three trigrams
+    needed = max(1, len(query) - 3 * limit)
+
+    best = None
+    for candidate, count in shared.most_common(MAX_FUZZY_CANDIDATES):
+        if count < needed:
+            break
+        # A padded key of n characters has at most n trigrams
+        if count < FUZZY_MIN_TRIGRAM_OVERLAP * max(len(query), len(candidate)):
+            continue
+        distance = levenshtein(key, candidate, limit)
+        if distance <= limit and (best is None or distance < best[0]):
+            best = (distance, candidate)
+    return index.keys[best[1]] if best else None
+
+
+def match(name: str, index: IngredientIndex) -> Optional[int]:
+    """
+    Resolve a canonical name with the index
+
+    Returns:
+        Id of the CanonicalIngredient, None when nothing matches
+    """
+    words = name.split()
+    if not words:
+        return None
+    kept = [word for word in words if word not in modifiers()] or words
+
+    for candidate in [words, kept] if len(kept) < len(words) else [words]:
+        for variant in _variants(candidate):
+            found = index.keys.get(' '.join(variant))
+            if found:
+                return found
+
+    # Two ingredients in one name are neither of them, and a typo in one of
+    # several words more often makes another product than a misspelling
+    if len(kept) > 1:
+        return None
+    for variant in _variants(kept):
+        found = _closest(' '.join(variant), index)
+        if found:
+            return found
+    return None
+
+
+def resolve_many(names: Iterable[str]) -> Dict[str, Optional[CanonicalMatch]]:
+    """
+    Resolve free-text ingredient names to canonical ingredients, memoised per name
+
+    Args:
+        names: Ingredient names as written
+
+    Returns:
+        Dict of name -> CanonicalMatch, None for names without an entry
+    """
+    index, memo = _state()
+    resolved = {}
+    for name in set(names):
+        canonical_id = memo.get(name)
+        if canonical_id is None:
+            canonical_id = match(canonical_name(name), index) or NO_MATCH
+            memo.put(name, canonical_id)
+        resolved[name] = CanonicalMatch(canonical_id, index.names[canonical_id]) if canonical_id else None
+    return resolved
+
+
+def resolve(name: str) -> Optional[CanonicalMatch]:
+    """Resolve a single ingredient name, see resolve_many"""
+    return resolve_many([name])[name]
+
+
+def load_dictionary() -> List[CanonicalIngredient]:
+    """
+    Add the entries of the canonical_ingredients keyword sets that are not in the table yet
+
+    Entries already in the table are left alone, so changes made in the
+    admin are kept.
+
+    Returns:
+        The created CanonicalIngredient instances
+    """
+    entries = load_keyword_sets().get('canonical_ingredients', {})
+    existing = set(CanonicalIngredient.objects.values_list('name', flat=True))
+    created = CanonicalIngredient.objects.bulk_create(
+        [
+            CanonicalIngredient(name=name, aliases=sorted(set(aliases)))
+            for name, aliases in entries.items() if name not in existing
+        ],
+        ignore_conflicts=True
+    )
+    if created:
+        reset_index()
+    return created
@@ -0,0 +1,164 @@
+"""
+Multi-keyword matching with an Aho–Corasick automaton
+
+Keyword checks such as "does this ingredient name contain an instruction
+word" used to test every keyword with `keyword in text`. A KeywordMatcher
+compiles all keywords of a set into one automaton, so a check is a single
+scan over the text no matter how many keywords (or languages) there are.
+
+Keyword sets are loaded from the JSON files in recipes/keywords/, one file
+per language. Every file maps set names to either a list of keywords or a
+dict of label -> keywords; sets with the same name are merged across files.
+Matchers are built lazily on first use and kept in a module-level registry.
+"""
+import json
+import threading
+from collections import deque
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Set, Union
+
+KEYWORDS_DIR = Path(__file__).resolve().parent / 'keywords'
+
+_matchers = {}
+_matchers_lock = threading.Lock()
+
+
+class KeywordMatcher:
+    """
+    Aho–Corasick automaton over a fixed set of lowercase keywords
+
+    Methods expect lowercase text, like the `keyword in text.lower()` checks
+    they replace.
+    """
+
+    def __init__(self, keywords: Union[Dict[str, List[str]], Iterable[str]]):
+        """
+        Args:
+            keywords: Keywords, or a dict of label -> keywords to report which
+                labels occur in a text
+        """
+        if isinstance(keywords, dict):
+            labelled = [(keyword, label) for label, words in keywords.items() for keyword in words]
+            self.labels_order = list(keywords)
+        else:
+            labelled = [(keyword, keyword) for keyword in keywords]
+            self.labels_order = [keyword for keyword, _ in labelled]
+
+        # Trie of all keywords
+        self._goto = [{}]
+        self._ends = [set()]
+        for keyword, label in labelled:
+            state = 0
+            for char in keyword.lower():
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._ends.append(set())
+                state = next_state
+            self._ends[state].add(label)
+
+        # Breadth-first pass adding failure links, folded into a full transition
+        # table so matching needs exactly one dict lookup per character
+        self._delta = [dict(self._goto[0])] + [None] * (len(self._goto) - 1)
+        self._outputs = [frozenset(self._ends[0])] + [None] * (len(self._goto) - 1)
+        fail = [0] * len(self._goto)
+        queue = deque()
+        for state in self._goto[0].values():
+            queue.append(state)
+
+        while queue:
+            state = queue.popleft()
+            self._delta[state] = {**self._delta[fail[state]], **self._goto[state]}
+            self._outputs[state] = frozenset(self._ends[state] | self._outputs[fail[state]])
+            for char, next_state in self._goto[state].items():
+                fail[next_state] = self._delta[fail[state]].get(char, 0)
+                queue.append(next_state)
+
+    def search(self, text: str) -> bool:
+        """Return True if any keyword occurs in the text"""
+        delta, outputs = self._delta, self._outputs
+        state = 0
+        for char in text:
+            state = delta[state].get(char, 0)
+            if outputs[state]:
+                return True
+        return False
+
+    def labels(self, text: str) -> Set[str]:
+        """Return the labels (or keywords) of all keywords occurring in the text"""
+        delta, outputs = self._delta, self._outputs
+        found = set()
+        state = 0
+        for char in text:
+            state = delta[state].get(char, 0)
+            if outputs[state]:
+                found |= outputs[state]
+        return found
+
+    def ordered_labels(self, text: str) -> List[str]:
+        """Labels occurring in the text, in the order the keyword set defines them"""
+        found = self.labels(text)
+        return [label for label in self.labels_order if label in found]
+
+    def startswith(self, text: str) -> bool:
+        """Return True if the text starts with any keyword"""
+        goto, ends = self._goto, self._ends
+        state = 0
+        if ends[state]:
+            return True
+        for char in text:
+            state = goto[state].get(char)
+            if state is None:
+                return False
+            if ends[state]:
+                return True
+        return False
+
+
+@lru_cache(maxsize=None)
+def load_keyword_sets() -> Dict[str, Union[List[str], Dict[str, List[str]]]]:
+    """
+    Read and merge the keyword sets of all language files
+
+    Returns:
+        Dict of set name -> keywords (or label -> keywords)
+    """
+    keyword_sets = {}
+    for path in sorted(KEYWORDS_DIR.glob('*.json')):
+        with open(path, encoding='utf-8') as keyword_file:
+            data = json.load(keyword_file)
+
+        for name, keywords in data.items():
+            if isinstance(keywords, dict):
+                merged = keyword_sets.setdefault(name, {})
+                for label, words in keywords.items():
+                    merged.setdefault(label, []).extend(words)
+            else:
+                keyword_sets.setdefault(name, []).extend(keywords)
+
+    return keyword_sets
+
+
+def get_matcher(name: str) -> KeywordMatcher:
+    """
+    Return the shared matcher for a keyword set, building it on first use
+
+    Args:
+        name: Name of the keyword set, e.g. 'ingredient_instructions'
+
+    Returns:
+        KeywordMatcher for the merged keywords of all languages
+    """
+    matcher = _matchers.get(name)
+    if matcher is None:
+        with _matchers_lock:
+            matcher = _matchers.get(name)
+            if matcher is None:
+                keyword_sets = load_keyword_sets()
+                if name not in keyword_sets:
+                    raise KeyError(f"Unknown keyword set: {name}")
+                matcher = _matchers[name] = KeywordMatcher(keyword_sets[name])
+    return matcher
@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.models import Ingredient
+from recipes.quantity_parser import backfill_quantities
+
+
+class Command(BaseCommand):
+    help = 'Parse numeric quantities and canonical units of stored ingredients'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would change without writing anything',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.BULK_IMPORT_BATCH_SIZE,
+            help='Ingredients read and written per batch',
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Also parse ingredients that already have a quantity',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        queryset = Ingredient.objects.all() if options['all'] else Ingredient.objects.filter(quantity__isnull=True)
+
+        dry_run = options['dry_run']
+        self.stdout.write(f"🔢 Parsing ingredient quantities{' (dry run)' if dry_run else ''}...")
+
+        stats = backfill_quantities(queryset, batch_size=options['batch_size'], dry_run=dry_run)
+
+        self.stdout.write(f"📊 Scanned {stats['scanned']} ingredients")
+        self.stdout.write(f"   {'with quantity:':<22}{stats['with_quantity']}")
+        self.stdout.write(f"   {'would change:' if dry_run else 'changed:':<22}{stats['updated']}")
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING('⚠️  Dry run, nothing was written'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"✅ Updated {stats['updated']} ingredients"))
@@ -0,0 +1,102 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes import ingredient_index
+from recipes.models import CanonicalIngredient
+
+VARIANTS = [
+    '{name}', '{name}en', '{name}s', 'rode {name}', 'verse {name}', 'grote {name}',
+    '{Name} (gesnipperd)', '{name}, fijngehakt', '{name} in blokjes', '{Name}',
+]
+UNKNOWN_WORDS = ['kwartel', 'yuzu', 'tempeh', 'shiso', 'miso', 'dashi', 'amchur', 'sumak']
+
+
+def typo(name: str, rng: random.Random) -> str:
+    """The name with one letter dropped or two neighbours swapped"""
+    if len(name) < 6:
+        return name
+    position = rng.randrange(1, len(name) - 2)
+    if rng.random() < 0.5:
+        return name[:position] + name[position + 1:]
+    return name[:position] + name[position + 1] + name[position] + name[position + 2:]
+
+
+def sample_names(count: int, seed: int = 42) -> list:
+    """
+    Distinct free-text ingredient names around the dictionary
+
+    Names are dictionary entries with plural endings, modifiers, notes and
+    typos, plus one in ten names that are not in the dictionary.
+    """
+    rng = random.Random(seed)
+    entries = list(CanonicalIngredient.objects.values_list('name', flat=True))
+    names = set()
+    while len(names) < count:
+        if rng.random() < 0.1:
+            name = f'{rng.choice(UNKNOWN_WORDS)} {rng.choice(UNKNOWN_WORDS)} {len(names)}'
+        else:
+            entry = rng.choice(entries)
+            if rng.random() < 0.2:
+                entry = typo(entry, rng)
+            name = rng.choice(VARIANTS).format(name=entry, Name=entry.capitalize())
+            # Numbered variants keep the names distinct, so every name is resolved once
+            name = f'{name} {len(names)}' if name in names else name
+        names.add(name)
+    return sorted(names)
+
+
+class Command(BaseCommand):
+    help = 'Measure how fast free-text ingredient names resolve to the canonical ingredient dictionary'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--names',
+            type=int,
+            default=10_000,
+            help='Number of distinct names to resolve',
+        )
+
+    def handle(self, *args, **options):
+        if options['names'] < 1:
+            raise CommandError('--names must be at least 1')
+
+        # A dictionary loaded for the benchmark is rolled back
+        with transaction.atomic():
+            if not CanonicalIngredient.objects.exists():
+                ingredient_index.load_dictionary()
+            names = sample_names(options['names'])
+            self._benchmark(names)
+            transaction.set_rollback(True)
+        ingredient_index.reset_index()
+
+    def _benchmark(self, names):
+        self.stdout.write(
+            f'📊 Resolving {len(names)} names against {CanonicalIngredient.objects.count()} canonical ingredients'
+        )
+
+        ingredient_index.reset_index()
+        started = time.perf_counter()
+        index = ingredient_index.get_index()
+        compiled = time.perf_counter() - started
+        self.stdout.write(f'   {"compile index:":<18}{compiled * 1000:10.1f} ms ({len(index.keys)} keys)')
+
+        timings = {}
+        for label in ['cold memo', 'warm memo']:
+            started = time.perf_counter()
+            resolved = ingredient_index.resolve_many(names)
+            timings[label] = elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'   {label + ":":<18}{elapsed * 1000:10.1f} ms '
+                f'({elapsed * 1_000_000 / len(names):.1f} µs per name)'
+            )
+
+        matched = sum(match is not None for match in resolved.values())
+        groups = len({match.id for match in resolved.values() if match is not None})
+        self.stdout.write(f'   🔗 {matched} names matched {groups} ingredients, {len(names) - matched} without a match')
+        if compiled + timings['cold memo'] < 1:
+            self.stdout.write(self.style.SUCCESS('   ✅ Under a second with a cold index'))
+        else:
+            self.stdout.write(self.style.WARNING('   ⚠️  Slower than a second'))
@@ -0,0 +1,142 @@
+import io
+import time
+from typing import Optional, Tuple
+
+from django.core.management.base import BaseCommand
+from PIL import Image, ImageDraw, ImageEnhance
+
+from recipes.image_preprocessing import NUMPY_AVAILABLE, preprocess_image
+
+EXIF_ORIENTATION = 0x0112
+
+
+def make_phone_photo(width: int, height: int) -> bytes:
+    """
+    Build a JPEG that looks like a phone photo of a recipe page
+
+    Text lines on uneven lighting, rotated by 2 degrees and stored sideways
+    with an EXIF orientation tag, like a photo taken in portrait mode.
+    """
+    # Light falls off from one corner to the other
+    lighting = Image.linear_gradient('L').resize((width, height)).point(lambda value: 255 - value // 3)
+    page = Image.merge('RGB', (lighting, lighting, lighting))
+    draw = ImageDraw.Draw(page)
+    line_height = height // 40
+    for row in range(4, 38):
+        for word in range(8):
+            left = width // 10 + word * width // 10
+            draw.rectangle(
+                [left, row * line_height, left + width // 14, row * line_height + line_height // 2],
+                fill=(40, 40, 40)
+            )
+    page = page.rotate(2, fillcolor=(255, 255, 255)).transpose(Image.Transpose.ROTATE_90)
+
+    exif = Image.Exif()
+    exif[EXIF_ORIENTATION] = 6
+    buffer = io.BytesIO()
+    page.save(buffer, 'JPEG', quality=90, exif=exif)
+    return buffer.getvalue()
+
+
+def legacy_preprocess(image: Image.Image) -> Image.Image:
+    """Preprocessing before the pipeline: full-size decode, grayscale and contrast"""
+    image = image.convert('RGB').convert('L')
+    return ImageEnhance.Contrast(image).enhance(2.0)
+
+
+PIPELINES = {
+    'full size + contrast': legacy_preprocess,
+    'preprocess_image': preprocess_image,
+}
+
+
+def process_memory_mb(field: str) -> float:
+    """Memory figure of this process from /proc/self/status (Linux), in MB"""
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith(field + ':'):
+                return int(line.split()[1]) / 1024
+    raise KeyError(field)
+
+
+def reset_peak_memory() -> bool:
+    """Reset the peak resident memory (VmHWM) of this process, False where unsupported"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def run_pipeline(name: str, photo: bytes, images: int) -> Tuple[float, Optional[float], Tuple[int, int]]:
+    """
+    Preprocess the photo repeatedly
+
+    Returns:
+        Tuple of (seconds per image, largest memory growth of one image in MB
+        or None where it cannot be measured, output size)
+    """
+    pipeline = PIPELINES[name]
+    elapsed = 0.0
+    peak = None
+    for _ in range(images):
+        measured = reset_peak_memory()
+        before = process_memory_mb('VmRSS') if measured else 0.0
+
+        started = time.perf_counter()
+        with Image.open(io.BytesIO(photo)) as image:
+            result = pipeline(image)
+        elapsed += time.perf_counter() - started
+
+        if measured:
+            peak = max(peak or 0.0, process_memory_mb('VmHWM') - before)
+        size = result.size
+        del result
+    return elapsed / images, peak, size
+
+
+class Command(BaseCommand):
+    help = 'Measure time and memory per image of OCR preprocessing on 12MP phone photos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--images',
+            type=int,
+            default=5,
+            help='Number of photos processed per pipeline',
+        )
+        parser.add_argument(
+            '--width',
+            type=int,
+            default=4000,
+            help='Photo width in pixels',
+        )
+        parser.add_argument(
+            '--height',
+            type=int,
+            default=3000,
+            help='Photo height in pixels',
+        )
+
+    def handle(self, *args, **options):
+        images = options['images']
+        width, height = options['width'], options['height']
+        photo = make_phone_photo(width, height)
+
+        self.stdout.write(
+            f'📊 Preprocessing {images} photos of {width}x{height} '
+            f'({width * height / 1_000_000:.0f}MP, {len(photo) // 1024}KB JPEG)'
+        )
+        if not NUMPY_AVAILABLE:
+            self.stdout.write(self.style.WARNING('⚠️  NumPy is not installed, thresholding and deskew are skipped'))
+
+        for name in PIPELINES:
+            per_image, memory, size = run_pipeline(name, photo, images)
+            self.stdout.write(f'\n🔍 {name}')
+            self.stdout.write(f'   time per image:  {per_image * 1000:8.1f} ms')
+            if memory is None:
+                self.stdout.write('   peak memory:          n/a (needs Linux /proc)')
+            else:
+                self.stdout.write(f'   peak memory:     {memory:8.1f} MB per image')
+            self.stdout.write(f'   output size:     {size[0]}x{size[1]}')
@@ -0,0 +1,201 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.parser_engine import RecipeParserEngine, RecipeTextParserEngine
+from recipes.parser_reference import ReferenceRecipeParser, ReferenceRecipeTextParser
+from recipes.services import RecipeParser
+from recipes.text_extraction_service import RecipeTextParser
+
+SAMPLE_TEXTS = [
+    """Bloemkoolcouscous salade met avocado
+Voor 2 personen
+Bereidingstijd: 25 minuten
+
+Ingrediënten:
+- 200 gram broccoli
+- 1 avocado
+- 2 el olijfolie
+- 1 bloemkool
+- 50 gram feta
+
+Bereidingswijze:
+1. Snijd de bloemkool in roosjes en maal ze fijn in de keukenmachine
+2. Rooster de broccoli met de olijfolie in de oven
+3. Meng alles met de avocado en verkruimelde feta
+4. Serveer direct""",
+    """Chicken Curry
+Serves 4
+Prep time: 15 minutes
+Cook time: 30 minutes
+
+Ingredients:
+- 500g chicken breast
+- 2 tbsp curry powder
+- 1 can coconut milk
+- 1 onion
+- 2 cloves garlic
+
+Instructions:
+1. Cut chicken into pieces
+2. Fry the onion and garlic until soft
+3. Cook the chicken with curry powder
+4. Add coconut milk and simmer for 20 minutes
+
+Notes:
+Tastes even better the next day.""",
+    """Pasta met pesto Ingrediënten: ● 300 gram pasta ● 1 pot pesto ● 50 gram pijnboompitten ● 1 handje basilicum """
+    """Bereidingswijze: Kook de pasta volgens de verpakking.Rooster de pijnboompitten.Meng alles door elkaar.""",
+]
+
+# Inputs of about n characters that made the regex parsers backtrack: long runs
+# of digits or whitespace where a pattern expects a quantity or a keyword, and
+# many section headers, bullets and keywords
+ADVERSARIAL_INPUTS = {
+    'digits after ingredients header': lambda n: 'Title here\nIngredients:\n1 g x ' + '1' * n,
+    'digits after instructions header': lambda n: 'Title here\nInstructions:\n' + '1' * n,
+    'unterminated ingredient': lambda n: 'Title here\nIngredients:\n1 g' + ' ' * (n // 2) + 'a' * (n // 2) + '.',
+    'digits and spaces': lambda n: 'Ingredients:\n' + '1 ' * (n // 2),
+    'quantities without dots': lambda n: 'Ingredients:\n' + '1 g x ' * (n // 6),
+    'fractions': lambda n: 'Ingredients:\n' + '1/' * (n // 2),
+    'spaces in title line': lambda n: 'Recept' + ' ' * n + 'x',
+    'spaces after keyword': lambda n: 'voor' + ' ' * n + '1',
+    'repeated headers': lambda n: 'Ingredients:\n' * (n // 13),
+    'repeated inline headers': lambda n: 'Ingrediënten: bereidingswijze ' * (n // 30),
+    'bullet lines': lambda n: 'ingrediënten\n' + '● \n' * (n // 3),
+    'keywords': lambda n: 'prep cook serves voor ' * (n // 22),
+    'blank lines': lambda n: '\n' * n,
+    'numbered steps': lambda n: 'Instructions:\n' + '1. a' * (n // 4),
+}
+
+ENGINES = {
+    'RecipeParser': RecipeParserEngine,
+    'RecipeTextParser': RecipeTextParserEngine,
+}
+
+
+def best_time(parse, text: str, repeat: int = 3) -> float:
+    """Fastest of a few parses of a text, in seconds"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        parse(text)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+class Command(BaseCommand):
+    help = 'Compare throughput of the parser engine with the previous regex parsers'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=200,
+            help='Number of times each text is parsed',
+        )
+        parser.add_argument(
+            '--pages',
+            type=int,
+            default=1,
+            help='Repeat each text this many times to simulate longer documents',
+        )
+        parser.add_argument(
+            '--file',
+            action='append',
+            default=[],
+            help='Text file to include in the corpus (can be given multiple times)',
+        )
+        parser.add_argument(
+            '--adversarial',
+            action='store_true',
+            help='Time the parser engines on adversarial inputs of growing size instead',
+        )
+        parser.add_argument(
+            '--size',
+            type=int,
+            default=10_000,
+            help='Characters of the smallest adversarial input, doubled four times',
+        )
+
+    def handle(self, *args, **options):
+        if options['adversarial']:
+            return self._benchmark_adversarial(options['size'])
+
+        iterations = options['iterations']
+        texts = list(SAMPLE_TEXTS)
+        for path in options['file']:
+            with open(path, encoding='utf-8') as text_file:
+                texts.append(text_file.read())
+        texts = ['\n\n'.join([text] * options['pages']) for text in texts]
+
+        characters = sum(len(text) for text in texts)
+        self.stdout.write(
+            f'📊 Benchmarking {len(texts)} texts ({characters} characters) x {iterations} iterations'
+        )
+
+        comparisons = [
+            ('RecipeParser', ReferenceRecipeParser().parse_recipe, RecipeParser().parse_recipe),
+            ('RecipeTextParser', ReferenceRecipeTextParser().parse_recipe_text, RecipeTextParser().parse_recipe_text),
+        ]
+
+        for name, reference, engine in comparisons:
+            mismatches = sum(1 for text in texts if reference(text) != engine(text))
+            reference_time = self._measure(reference, texts, iterations)
+            engine_time = self._measure(engine, texts, iterations)
+
+            parsed = len(texts) * iterations
+            self.stdout.write(f'\n🔍 {name}')
+            self.stdout.write(
+                f'   regex parser:  {parsed / reference_time:10.0f} texts/s '
+                f'({reference_time / parsed * 1000:.3f} ms per text)'
+            )
+            self.stdout.write(
+                f'   parser engine: {parsed / engine_time:10.0f} texts/s '
+                f'({engine_time / parsed * 1000:.3f} ms per text)'
+            )
+            self.stdout.write(self.style.SUCCESS(f'   ⚡ Speedup: {reference_time / engine_time:.1f}x'))
+
+            if mismatches:
+                self.stdout.write(self.style.ERROR(f'   ❌ Output differs for {mismatches} texts'))
+            else:
+                self.stdout.write(self.style.SUCCESS('   ✅ Identical output'))
+
+    def _measure(self, parse, texts, iterations):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            for text in texts:
+                parse(text)
+        return time.perf_counter() - started
+
+    def _benchmark_adversarial(self, size: int):
+        """Time each engine per adversarial input and report how the time grows"""
+        sizes = [size * 2 ** step for step in range(5)]
+        self.stdout.write(
+            f'📊 Parsing {len(ADVERSARIAL_INPUTS)} adversarial inputs of {sizes[0]} to {sizes[-1]} characters'
+        )
+        # Growth per doubling of the input: 2 is linear, 4 quadratic
+        worst = 0.0
+        # Most of these inputs have no title, which the engines log as a warning
+        logging.disable(logging.WARNING)
+        try:
+            for name, engine_class in ENGINES.items():
+                parse = engine_class().parse
+                self.stdout.write(f'\n🔍 {name}')
+                for label, make_text in ADVERSARIAL_INPUTS.items():
+                    times = [best_time(parse, make_text(length)) for length in sizes]
+                    growth = (times[-1] / times[0]) ** (1 / (len(sizes) - 1)) if times[0] else 0.0
+                    worst = max(worst, growth)
+                    self.stdout.write(
+                        f'   {label:<34}{times[0] * 1000:8.2f} ms -> {times[-1] * 1000:8.2f} ms  '
+                        f'(x{growth:.1f} per doubling)'
+                    )
+        finally:
+            logging.disable(logging.NOTSET)
+
+        if worst < 3:
+            self.stdout.write(self.style.SUCCESS(f'\n✅ Linear: at most x{worst:.1f} per doubling'))
+        else:
+            self.stdout.write(self.style.ERROR(f'\n❌ Super-linear: up to x{worst:.1f} per doubling'))
@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.ingredient_classifier import backfill_categories
+from recipes.models import Ingredient, IngredientCategory
+
+
+class Command(BaseCommand):
+    help = 'Sort stored ingredients into shopping list categories from their name'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would change without writing anything',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.BULK_IMPORT_BATCH_SIZE,
+            help='Ingredients read and written per batch',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        queryset = Ingredient.objects.filter(category=IngredientCategory.OTHER)
+
+        dry_run = options['dry_run']
+        self.stdout.write(f"🏷️  Classifying ingredients{' (dry run)' if dry_run else ''}...")
+
+        stats = backfill_categories(queryset, batch_size=options['batch_size'], dry_run=dry_run)
+
+        self.stdout.write(f"📊 Scanned {stats['scanned']} ingredients in 'other'")
+        for category, count in sorted(stats['categories'].items(), key=lambda item: -item[1]):
+            self.stdout.write(f"   {IngredientCategory(category).label + ':':<22}{count}")
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING(f"⚠️  Dry run, {stats['classified']} ingredients would change"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"✅ Classified {stats['classified']} ingredients"))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from recipes.ingredient_index import get_index, load_dictionary
+from recipes.models import CanonicalIngredient
+
+
+class Command(BaseCommand):
+    help = 'Add the canonical ingredients of the keyword files that are not in the dictionary yet'
+
+    def handle(self, *args, **options):
+        self.stdout.write('📖 Loading canonical ingredients...')
+
+        created = load_dictionary()
+        index = get_index()
+
+        self.stdout.write(
+            f'📊 {CanonicalIngredient.objects.count()} ingredients in the dictionary, '
+            f'{len(index.keys)} names and aliases indexed'
+        )
+        self.stdout.write(self.style.SUCCESS(f'✅ Added {len(created)} ingredients'))
@@ -0,0 +1,79 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.models import SourceMetadata
+from recipes.reparse import RecipeReparser
+
+
+class Command(BaseCommand):
+    help = 'Run the current recipe parser again over the stored text of imported recipes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would change without writing anything',
+        )
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=settings.BULK_IMPORT_PROCESSES,
+            help='Number of parser processes (0 parses in this process)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.BULK_IMPORT_BATCH_SIZE,
+            help='Recipes read and written per batch',
+        )
+        parser.add_argument(
+            '--user',
+            help='Only reparse the recipes of this username',
+        )
+        parser.add_argument(
+            '--include-edited',
+            action='store_true',
+            help='Also reparse recipes that were changed after their import',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        queryset = SourceMetadata.objects.all()
+        if options['user']:
+            queryset = queryset.filter(recipe__user__username=options['user'])
+
+        dry_run = options['dry_run']
+        self.stdout.write(f"🔄 Reparsing imported recipes{' (dry run)' if dry_run else ''}...")
+
+        stats = RecipeReparser(
+            processes=options['processes'],
+            batch_size=options['batch_size'],
+            dry_run=dry_run,
+            include_edited=options['include_edited'],
+        ).reparse(queryset)
+
+        self.stdout.write(f"📊 Scanned {stats['scanned']} imports")
+        rows = [
+            ('unchanged', stats['unchanged']),
+            ('would change' if dry_run else 'changed', stats['changed']),
+            ('parse failed', stats['failed']),
+            ('skipped (no text)', stats['skipped_no_text']),
+            ('skipped (edited)', stats['skipped_edited']),
+        ]
+        for label, count in rows:
+            self.stdout.write(f"   {label + ':':<22}{count}")
+
+        if stats['fields']:
+            self.stdout.write('📝 Changed fields:')
+            for field, count in sorted(stats['fields'].items(), key=lambda item: -item[1]):
+                self.stdout.write(f'   {field}: {count}')
+            self.stdout.write(
+                f"🥕 Ingredients: +{stats['ingredients_added']} / -{stats['ingredients_removed']}"
+            )
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING('⚠️  Dry run, nothing was written'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"✅ Updated {stats['changed']} recipes"))
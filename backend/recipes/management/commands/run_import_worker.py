@@ -0,0 +1,129 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from recipes.chunked_uploads import remove_stale_uploads
+from recipes.import_jobs import (
+    claim_next_job, get_worker_name, record_heartbeat, requeue_jobs, requeue_stale_jobs, run_import_job,
+)
+from recipes.models import ImportJob
+from recipes.ocr import init_ocr_worker, ocr_enabled, warm_up
+from recipes.workers import create_process_pool
+
+
+class Command(BaseCommand):
+    help = 'Process queued recipe import jobs with a pool of worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=settings.IMPORT_WORKER_PROCESSES,
+            help='Number of worker processes',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=settings.IMPORT_WORKER_POLL_INTERVAL,
+            help='Seconds to wait between queue checks when idle',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process all pending jobs and exit instead of running forever',
+        )
+
+    def handle(self, *args, **options):
+        processes = options['processes']
+        poll_interval = options['poll_interval']
+        run_once = options['once']
+        worker_name = get_worker_name()
+
+        removed = remove_stale_uploads()
+        if removed:
+            self.stdout.write(self.style.WARNING(f'🧹 Removed {removed} abandoned chunked uploads'))
+
+        self.stdout.write(f'🚀 Import worker {worker_name} started with {processes} processes')
+
+        processed = 0
+        in_flight = {}
+        next_requeue = 0.0
+        pool = self.start_pool(processes)
+        try:
+            while True:
+                # Jobs of workers that died (here or on another host) go back in the queue,
+                # the jobs this worker is still running are marked as alive first
+                if time.monotonic() >= next_requeue:
+                    self.requeue_stale(in_flight)
+                    next_requeue = time.monotonic() + settings.IMPORT_WORKER_REQUEUE_INTERVAL
+
+                try:
+                    # Keep every process busy while there is work in the queue
+                    while len(in_flight) < processes:
+                        job = claim_next_job(worker_name)
+                        if job is None:
+                            break
+                        in_flight[pool.submit(run_import_job, str(job.id))] = job
+                except BrokenProcessPool:
+                    pool = self.restart_pool(pool, processes, in_flight, job)
+                    continue
+
+                if not in_flight:
+                    if run_once:
+                        break
+                    time.sleep(poll_interval)
+                    continue
+
+                done, _ = wait(in_flight, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                broken = False
+                for future in done:
+                    job = in_flight.pop(future)
+                    try:
+                        job_status = future.result()
+                    except BrokenProcessPool:
+                        broken = True
+                        in_flight[future] = job
+                        continue
+                    except Exception as e:
+                        processed += 1
+                        self.stdout.write(self.style.ERROR(f'❌ Job {job.id} crashed: {e}'))
+                        continue
+                    processed += 1
+                    self.stdout.write(f'📄 Job {job.id} ({job.original_filename}): {job_status}')
+
+                if broken:
+                    pool = self.restart_pool(pool, processes, in_flight)
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Processed {processed} import jobs'))
+
+    def start_pool(self, processes):
+        """Start the worker processes, with the OCR backend loaded in each of them"""
+        pool = create_process_pool(processes, initializer=init_ocr_worker)
+        if ocr_enabled():
+            warm_up(pool, processes)
+            self.stdout.write(f'🔥 OCR backend {settings.OCR_BACKEND} loaded in {processes} processes')
+        return pool
+
+    def restart_pool(self, pool, processes, in_flight, claimed=None):
+        """Replace a pool whose process died, putting its jobs back in the queue"""
+        jobs = [job.id for job in in_flight.values()] + ([claimed.id] if claimed is not None else [])
+        in_flight.clear()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+        requeued = requeue_jobs(ImportJob.objects.filter(id__in=jobs))
+        self.stdout.write(self.style.ERROR(
+            f'💥 A worker process died, requeued {requeued} of {len(jobs)} jobs and restarted the pool'
+        ))
+        return self.start_pool(processes)
+
+    def requeue_stale(self, in_flight):
+        job_ids = [job.id for job in in_flight.values()]
+        record_heartbeat(job_ids)
+        requeued = requeue_stale_jobs(settings.IMPORT_JOB_TIMEOUT, exclude_ids=job_ids)
+        if requeued:
+            self.stdout.write(self.style.WARNING(f'♻️  Requeued {requeued} abandoned import jobs'))
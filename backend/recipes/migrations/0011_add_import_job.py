@@ -0,0 +1,42 @@
+# Generated by Django 5.2.7 on 2026-10-18 04:45
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_alter_ingredient_amount_alter_ingredient_name_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('file', models.FileField(blank=True, help_text='Uploaded PDF or image waiting to be imported', null=True, upload_to='imports/%Y/%m/')),
+                ('original_filename', models.CharField(blank=True, help_text='Original filename of the uploaded file', max_length=255)),
+                ('file_size', models.PositiveIntegerField(blank=True, help_text='File size in bytes', null=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='pending', help_text='Current state of the job', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0, help_text='Number of times a worker picked up this job')),
+                ('worker', models.CharField(blank=True, help_text='Worker that processed the job (host:pid)', max_length=100)),
+                ('result', models.JSONField(blank=True, default=dict, help_text='Import metadata returned to the client')),
+                ('error', models.TextField(blank=True, help_text='Error message if the job failed')),
+                ('error_stage', models.CharField(blank=True, help_text='Stage in which the job failed', max_length=50)),
+                ('timings', models.JSONField(blank=True, default=dict, help_text='Durations per stage in seconds')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('recipe', models.ForeignKey(blank=True, help_text='Recipe created by this job', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='import_jobs', to='recipes.recipe')),
+                ('user', models.ForeignKey(help_text='User who requested the import', on_delete=django.db.models.deletion.CASCADE, related_name='import_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='recipes_imp_status_3f64bd_idx'), models.Index(fields=['user', 'created_at'], name='recipes_imp_user_id_d626e6_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:15
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_add_import_job'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChunkedUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(help_text='Original filename', max_length=255)),
+                ('size', models.PositiveIntegerField(help_text='Total file size in bytes')),
+                ('offset', models.PositiveIntegerField(default=0, help_text='Number of bytes received so far')),
+                ('purpose', models.CharField(choices=[('import', 'Recipe Import'), ('recipe_image', 'Recipe Image')], help_text='What the file is used for once complete', max_length=20)),
+                ('status', models.CharField(choices=[('uploading', 'Uploading'), ('complete', 'Complete')], default='uploading', help_text='Current state of the upload', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('recipe', models.ForeignKey(blank=True, help_text='Recipe that receives the image (recipe_image uploads)', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='chunked_uploads', to='recipes.recipe')),
+                ('user', models.ForeignKey(help_text='User uploading the file', on_delete=django.db.models.deletion.CASCADE, related_name='chunked_uploads', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'updated_at'], name='recipes_chu_status_9a921c_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_add_chunked_upload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='mode',
+            field=models.CharField(choices=[('single', 'Single Recipe'), ('cookbook', 'Cookbook')], default='single', help_text='Import one recipe, or split a cookbook PDF into many', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='chunkedupload',
+            name='purpose',
+            field=models.CharField(choices=[('import', 'Recipe Import'), ('recipe_image', 'Recipe Image'), ('cookbook', 'Cookbook Import')], help_text='What the file is used for once complete', max_length=20),
+        ),
+    ]
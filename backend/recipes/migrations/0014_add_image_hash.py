@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_add_import_job_mode'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageHash',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hash', models.BigIntegerField(help_text='64-bit difference hash (dHash) of the image, stored signed')),
+                ('backend', models.CharField(help_text='OCR_BACKEND that produced the text', max_length=100)),
+                ('text', models.TextField(help_text='Text recognised in the image')),
+                ('method', models.CharField(help_text='Name of the OCR engine', max_length=50)),
+                ('confidence', models.CharField(blank=True, help_text='Confidence reported with the text', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['backend', 'id'], name='recipes_ima_backend_f0830b_idx')],
+            },
+        ),
+    ]
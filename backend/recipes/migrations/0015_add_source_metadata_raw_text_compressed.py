@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0014_add_image_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sourcemetadata',
+            name='raw_text_compressed',
+            field=models.BinaryField(blank=True, help_text='Full extracted text, zlib-compressed (see full_text)', null=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0015_add_source_metadata_raw_text_compressed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sourcemetadata',
+            name='extraction_method',
+            field=models.CharField(blank=True, help_text='How the text was extracted (pdf_extraction, ocr, ...)', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='sourcemetadata',
+            name='stage_timings',
+            field=models.JSONField(default=dict, help_text='Seconds spent per import pipeline stage'),
+        ),
+        migrations.AddField(
+            model_name='sourcemetadata',
+            name='text_size',
+            field=models.PositiveIntegerField(blank=True, help_text='Size of the extracted text in bytes (UTF-8)', null=True),
+        ),
+    ]
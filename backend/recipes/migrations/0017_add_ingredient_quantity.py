@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0016_add_source_metadata_import_stages'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='quantity',
+            field=models.DecimalField(blank=True, decimal_places=3, help_text='Numeric quantity parsed from the amount, in unit', max_digits=10, null=True),
+        ),
+        migrations.AlterField(
+            model_name='ingredient',
+            name='unit',
+            field=models.CharField(blank=True, help_text="Canonical unit of measurement (e.g. 'g', 'tbsp'), see quantity_parser", max_length=100),
+        ),
+    ]
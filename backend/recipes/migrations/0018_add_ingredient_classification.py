@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-18 06:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0017_add_ingredient_quantity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngredientClassification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Canonical ingredient name (lowercase, without accents or notes)', max_length=255, unique=True)),
+                ('category', models.CharField(choices=[('produce', 'Groenten & Fruit'), ('meat', 'Vlees & Vis'), ('dairy', 'Zuivel & Eieren'), ('pantry', 'Voorraadkast'), ('frozen', 'Diepvries'), ('bakery', 'Bakkerij'), ('beverages', 'Dranken'), ('condiments', 'Kruiden & Sauzen'), ('spices', 'Specerijen & Kruiden'), ('other', 'Overig')], default='other', max_length=20)),
+                ('lexicon_version', models.CharField(blank=True, help_text='Lexicon the category was derived from, rows of older lexicons are classified again', max_length=16)),
+                ('is_manual', models.BooleanField(default=False, help_text='Set by hand, kept when the lexicon changes')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-18 06:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0018_add_ingredient_classification'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CanonicalIngredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text="Name shown on shopping lists, singular and lowercase (e.g. 'ui')", max_length=200, unique=True)),
+                ('aliases', models.JSONField(blank=True, default=list, help_text="Other names of the ingredient; plurals, notes and modifiers such as 'rode' need no alias")),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 06:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0019_canonical_ingredient'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='progress',
+            field=models.JSONField(blank=True, default=dict, help_text='Saved batches of a cookbook import, skipped when the job is retried'),
+        ),
+    ]
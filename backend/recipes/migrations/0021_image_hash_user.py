@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-18 06:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def delete_unscoped_hashes(apps, schema_editor):
+    # Stored before hashes were scoped per user, they could be matched by anyone
+    apps.get_model('recipes', 'ImageHash').objects.filter(user__isnull=True).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0020_import_job_progress'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='imagehash',
+            name='recipes_ima_backend_f0830b_idx',
+        ),
+        migrations.AddField(
+            model_name='imagehash',
+            name='user',
+            field=models.ForeignKey(blank=True, help_text='User who imported the image; only their own images are matched', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='image_hashes', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='imagehash',
+            index=models.Index(fields=['backend', 'user', 'id'], name='recipes_ima_backend_04d0dc_idx'),
+        ),
+        migrations.RunPython(delete_unscoped_hashes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-18 06:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0021_image_hash_user'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportPreview',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(help_text='Random token returned with the preview', max_length=64, unique=True)),
+                ('filename', models.CharField(help_text='Original filename', max_length=255)),
+                ('file_size', models.PositiveIntegerField(blank=True, help_text='File size in bytes', null=True)),
+                ('import_result', models.JSONField(help_text='Parts of the import result needed to save the recipe')),
+                ('expires_at', models.DateTimeField(db_index=True, help_text='The preview can no longer be committed after this time')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(help_text='User who requested the preview; only they can commit it', on_delete=django.db.models.deletion.CASCADE, related_name='import_previews', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
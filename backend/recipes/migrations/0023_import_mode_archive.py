@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 06:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0022_import_preview'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='importjob',
+            name='file',
+            field=models.FileField(blank=True, help_text='Uploaded PDF, image or ZIP archive waiting to be imported', null=True, upload_to='imports/%Y/%m/'),
+        ),
+        migrations.AlterField(
+            model_name='importjob',
+            name='mode',
+            field=models.CharField(choices=[('single', 'Single Recipe'), ('cookbook', 'Cookbook'), ('archive', 'ZIP Archive')], default='single', help_text='Import one recipe, split a cookbook PDF into many, or import every file of a ZIP archive', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='importjob',
+            name='progress',
+            field=models.JSONField(blank=True, default=dict, help_text='Saved batches of a cookbook or archive import, skipped when the job is retried'),
+        ),
+    ]
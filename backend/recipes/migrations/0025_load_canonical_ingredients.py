@@ -0,0 +1,29 @@
+from django.db import migrations
+
+
+def load_canonical_ingredients(apps, schema_editor):
+    # Same as load_dictionary, with the historical model: shopping lists only
+    # group by canonical ingredient once the dictionary has entries
+    from recipes.keyword_matcher import load_keyword_sets
+
+    CanonicalIngredient = apps.get_model('recipes', 'CanonicalIngredient')
+    entries = load_keyword_sets().get('canonical_ingredients', {})
+    existing = set(CanonicalIngredient.objects.values_list('name', flat=True))
+    CanonicalIngredient.objects.bulk_create(
+        [
+            CanonicalIngredient(name=name, aliases=sorted(set(aliases)))
+            for name, aliases in entries.items() if name not in existing
+        ],
+        ignore_conflicts=True
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0024_import_job_heartbeat'),
+    ]
+
+    operations = [
+        migrations.RunPython(load_canonical_ingredients, migrations.RunPython.noop),
+    ]
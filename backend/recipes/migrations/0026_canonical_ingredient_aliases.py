@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-18 07:21
+
+from django.db import migrations, models
+
+# Entries of the first dictionary that are now aliases
+MERGED_ENTRIES = {'rode ui': 'ui', 'red onion': 'onion'}
+
+
+def merge_red_onions(apps, schema_editor):
+    # Entries edited in the admin (given aliases) are left alone
+    CanonicalIngredient = apps.get_model('recipes', 'CanonicalIngredient')
+    for name, target_name in MERGED_ENTRIES.items():
+        entry = CanonicalIngredient.objects.filter(name=name).first()
+        target = CanonicalIngredient.objects.filter(name=target_name).first()
+        if entry is None or target is None or entry.aliases:
+            continue
+        entry.delete()
+        if name not in target.aliases:
+            target.aliases = sorted(target.aliases + [name])
+            target.save(update_fields=['aliases', 'updated_at'])
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0025_load_canonical_ingredients'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='canonicalingredient',
+            name='aliases',
+            field=models.JSONField(blank=True, default=list, help_text="Other names of the ingredient (e.g. 'rode ui'); plurals, notes and modifiers such as 'grote' need no alias"),
+        ),
+        migrations.RunPython(merge_red_onions, migrations.RunPython.noop),
+    ]
@@ -2,6 +2,7 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
 import uuid
+import zlib
 
 
 class RecipeSource(models.TextChoices):
@@ -188,7 +189,14 @@ class Ingredient(models.Model):
     unit = models.CharField(
         max_length=100, 
         blank=True,
-        help_text="Unit of measurement"
+        help_text="Canonical unit of measurement (e.g. 'g', 'tbsp'), see quantity_parser"
+    )
+    quantity = models.DecimalField(
+        max_digits=10,
+        decimal_places=3,
+        null=True,
+        blank=True,
+        help_text="Numeric quantity parsed from the amount, in unit"
     )
     notes = models.CharField(
         max_length=1000, 
@@ -256,16 +264,365 @@ class SourceMetadata(models.Model):
         default=list,
         help_text="List of errors during import"
     )
+    extraction_method = models.CharField(
+        max_length=50,
+        blank=True,
+        help_text="How the text was extracted (pdf_extraction, ocr, ...)"
+    )
+    text_size = models.PositiveIntegerField(
+        null=True, blank=True,
+        help_text="Size of the extracted text in bytes (UTF-8)"
+    )
+    stage_timings = models.JSONField(
+        default=dict,
+        help_text="Seconds spent per import pipeline stage"
+    )
     
     # Raw extracted text (for debugging/reprocessing)
     raw_text = models.TextField(
         blank=True,
         help_text="Raw text extracted from source"
     )
+    raw_text_compressed = models.BinaryField(
+        null=True, blank=True,
+        editable=False,
+        help_text="Full extracted text, zlib-compressed (see full_text)"
+    )
     
     class Meta:
         verbose_name = "Source Metadata"
         verbose_name_plural = "Source Metadata"
     
     def __str__(self):
-        return f"Metadata for {self.recipe.title}"
\ No newline at end of file
+        return f"Metadata for {self.recipe.title}"
+    
+    @property
+    def full_text(self):
+        """Full extracted text, None for imports from before it was kept"""
+        if self.raw_text_compressed is None:
+            return None
+        return zlib.decompress(self.raw_text_compressed).decode('utf-8')
+    
+    @full_text.setter
+    def full_text(self, text):
+        self.raw_text_compressed = zlib.compress(text.encode('utf-8')) if text else None
+
+
+class ImportJobStatus(models.TextChoices):
+    """Lifecycle states of an asynchronous import job"""
+    PENDING = 'pending', 'Pending'
+    RUNNING = 'running', 'Running'
+    SUCCEEDED = 'succeeded', 'Succeeded'
+    FAILED = 'failed', 'Failed'
+
+
+class ImportMode(models.TextChoices):
+    """How an uploaded file is turned into recipes"""
+    SINGLE = 'single', 'Single Recipe'
+    COOKBOOK = 'cookbook', 'Cookbook'
+    ARCHIVE = 'archive', 'ZIP Archive'
+
+
+class ImportJob(models.Model):
+    """Recipe import queued by the API and processed by the import worker"""
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='import_jobs',
+        help_text="User who requested the import"
+    )
+
+    # Uploaded file, kept until the job has been processed
+    file = models.FileField(
+        upload_to='imports/%Y/%m/',
+        null=True, blank=True,
+        help_text="Uploaded PDF, image or ZIP archive waiting to be imported"
+    )
+    original_filename = models.CharField(
+        max_length=255,
+        blank=True,
+        help_text="Original filename of the uploaded file"
+    )
+    file_size = models.PositiveIntegerField(
+        null=True, blank=True,
+        help_text="File size in bytes"
+    )
+    mode = models.CharField(
+        max_length=20,
+        choices=ImportMode.choices,
+        default=ImportMode.SINGLE,
+        help_text="Import one recipe, split a cookbook PDF into many, or import every file of a ZIP archive"
+    )
+
+    # Processing state
+    status = models.CharField(
+        max_length=20,
+        choices=ImportJobStatus.choices,
+        default=ImportJobStatus.PENDING,
+        help_text="Current state of the job"
+    )
+    attempts = models.PositiveIntegerField(
+        default=0,
+        help_text="Number of times a worker picked up this job"
+    )
+    worker = models.CharField(
+        max_length=100,
+        blank=True,
+        help_text="Worker that processed the job (host:pid)"
+    )
+
+    # Result
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name='import_jobs',
+        help_text="Recipe created by this job"
+    )
+    result = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Import metadata returned to the client"
+    )
+    error = models.TextField(
+        blank=True,
+        help_text="Error message if the job failed"
+    )
+    error_stage = models.CharField(
+        max_length=50,
+        blank=True,
+        help_text="Stage in which the job failed"
+    )
+    timings = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Durations per stage in seconds"
+    )
+    progress = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Saved batches of a cookbook or archive import, skipped when the job is retried"
+    )
+
+    # Metadata
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Last time the worker running the job reported it was still processing it"
+    )
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['user', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"Import {self.original_filename} ({self.status})"
+
+    @property
+    def is_finished(self):
+        """Return True when the job reached a final state"""
+        return self.status in (ImportJobStatus.SUCCEEDED, ImportJobStatus.FAILED)
+
+
+class ChunkedUploadPurpose(models.TextChoices):
+    """What a chunked upload is used for once complete"""
+    IMPORT = 'import', 'Recipe Import'
+    RECIPE_IMAGE = 'recipe_image', 'Recipe Image'
+    COOKBOOK = 'cookbook', 'Cookbook Import'
+
+
+class ChunkedUploadStatus(models.TextChoices):
+    """Lifecycle states of a chunked upload"""
+    UPLOADING = 'uploading', 'Uploading'
+    COMPLETE = 'complete', 'Complete'
+
+
+class ChunkedUpload(models.Model):
+    """Resumable upload whose chunks are spooled to a file on disk"""
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='chunked_uploads',
+        help_text="User uploading the file"
+    )
+    filename = models.CharField(
+        max_length=255,
+        help_text="Original filename"
+    )
+    size = models.PositiveIntegerField(
+        help_text="Total file size in bytes"
+    )
+    offset = models.PositiveIntegerField(
+        default=0,
+        help_text="Number of bytes received so far"
+    )
+    purpose = models.CharField(
+        max_length=20,
+        choices=ChunkedUploadPurpose.choices,
+        help_text="What the file is used for once complete"
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        null=True, blank=True,
+        related_name='chunked_uploads',
+        help_text="Recipe that receives the image (recipe_image uploads)"
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=ChunkedUploadStatus.choices,
+        default=ChunkedUploadStatus.UPLOADING,
+        help_text="Current state of the upload"
+    )
+
+    # Metadata
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'updated_at']),
+        ]
+
+    def __str__(self):
+        return f"Upload {self.filename} ({self.offset}/{self.size} bytes)"
+
+
+class ImportPreview(models.Model):
+    """Parsed import kept between a preview and its commit, see import_previews"""
+
+    token = models.CharField(
+        max_length=64,
+        unique=True,
+        help_text="Random token returned with the preview"
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='import_previews',
+        help_text="User who requested the preview; only they can commit it"
+    )
+    filename = models.CharField(
+        max_length=255,
+        help_text="Original filename"
+    )
+    file_size = models.PositiveIntegerField(
+        null=True, blank=True,
+        help_text="File size in bytes"
+    )
+    import_result = models.JSONField(
+        help_text="Parts of the import result needed to save the recipe"
+    )
+    expires_at = models.DateTimeField(
+        db_index=True,
+        help_text="The preview can no longer be committed after this time"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Preview of {self.filename}"
+
+
+class ImageHash(models.Model):
+    """OCR result of an imported image, found again by perceptual hash (see image_hash_index)"""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True, blank=True,
+        related_name='image_hashes',
+        help_text="User who imported the image; only their own images are matched"
+    )
+    hash = models.BigIntegerField(
+        help_text="64-bit difference hash (dHash) of the image, stored signed"
+    )
+    backend = models.CharField(
+        max_length=100,
+        help_text="OCR_BACKEND that produced the text"
+    )
+    text = models.TextField(
+        help_text="Text recognised in the image"
+    )
+    method = models.CharField(
+        max_length=50,
+        help_text="Name of the OCR engine"
+    )
+    confidence = models.CharField(
+        max_length=20,
+        blank=True,
+        help_text="Confidence reported with the text"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['backend', 'user', 'id']),
+        ]
+
+    def __str__(self):
+        return f"Image hash {self.hash & 0xFFFFFFFFFFFFFFFF:016x} ({self.backend})"
+
+
+class IngredientClassification(models.Model):
+    """Category of a canonical ingredient name, memoised by ingredient_classifier"""
+
+    name = models.CharField(
+        max_length=255,
+        unique=True,
+        help_text="Canonical ingredient name (lowercase, without accents or notes)"
+    )
+    category = models.CharField(
+        max_length=20,
+        choices=IngredientCategory.choices,
+        default=IngredientCategory.OTHER
+    )
+    lexicon_version = models.CharField(
+        max_length=16,
+        blank=True,
+        help_text="Lexicon the category was derived from, rows of older lexicons are classified again"
+    )
+    is_manual = models.BooleanField(
+        default=False,
+        help_text="Set by hand, kept when the lexicon changes"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return f"{self.name} -> {self.category}"
+
+
+class CanonicalIngredient(models.Model):
+    """Entry of the canonical ingredient dictionary that shopping lists group by, see ingredient_index"""
+
+    name = models.CharField(
+        max_length=200,
+        unique=True,
+        help_text="Name shown on shopping lists, singular and lowercase (e.g. 'ui')"
+    )
+    aliases = models.JSONField(
+        default=list,
+        blank=True,
+        help_text="Other names of the ingredient (e.g. 'rode ui'); plurals, notes and modifiers such as 'grote' need no alias"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,236 @@
+"""
+OCR for image imports in long-lived, pre-warmed worker processes
+
+Loading an OCR engine (EasyOCR loads its detection and recognition models)
+takes seconds, far longer than reading one recipe photo. The engine is
+therefore loaded once per process by load_backend and reused for every image:
+
+- Import worker processes (run_import_worker, and the pool of bulk_import)
+  load it in their initializer, so queued image imports run OCR in the
+  process that handles the job.
+- Other processes (web requests answering previews) send the image path to
+  the shared 'ocr' process pool, whose workers load the engine when they
+  start. Set OCR_WORKERS to 0 to run OCR in the requesting process instead.
+
+The engine is chosen with OCR_BACKEND: one of the names in BACKENDS or the
+dotted path of an OCRBackend subclass. An empty OCR_BACKEND disables OCR.
+StubOCRBackend is deterministic and needs no OCR library, for tests.
+
+Keep this module free of model imports: pool processes import it before
+Django is configured.
+"""
+import logging
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError, wait
+from typing import Any, Dict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+from PIL import Image
+
+from .image_preprocessing import preprocess_image
+from .workers import discard_shared_pool, get_shared_pool, init_worker
+
+logger = logging.getLogger(__name__)
+
+POOL_NAME = 'ocr'
+
+BACKENDS = {
+    'easyocr': 'recipes.ocr.EasyOCRBackend',
+    'tesseract': 'recipes.ocr.TesseractBackend',
+    'stub': 'recipes.ocr.StubOCRBackend',
+}
+
+# Backend loaded in this process, see load_backend
+_backend = None
+_backend_lock = threading.Lock()
+
+
+class OCRBackend:
+    """Base class for OCR engines"""
+
+    name = 'none'
+    confidence = 'medium'
+    # Whether images are thresholded and deskewed for this engine, see image_preprocessing
+    binarize = True
+
+    def load(self):
+        """Load models and libraries, called once per process"""
+
+    def read_text(self, image: Image.Image) -> str:
+        """
+        Recognise the text in an image
+
+        Args:
+            image: Grayscale image prepared by image_preprocessing.preprocess_image
+
+        Returns:
+            Recognised text
+        """
+        raise NotImplementedError
+
+
+class EasyOCRBackend(OCRBackend):
+    """EasyOCR, best results on recipe photos"""
+
+    name = 'easyocr'
+    confidence = 'high'
+    # The detection model works on grayscale, thresholding loses detail it uses
+    binarize = False
+
+    def load(self):
+        import easyocr
+        self.reader = easyocr.Reader(settings.OCR_LANGUAGES)
+
+    def read_text(self, image: Image.Image) -> str:
+        import numpy as np
+        results = self.reader.readtext(np.array(image))
+        return ' '.join(result[1] for result in results if result[2] > 0.5)
+
+
+class TesseractBackend(OCRBackend):
+    """Tesseract through pytesseract, on a thresholded and deskewed image"""
+
+    name = 'tesseract'
+    confidence = 'medium'
+
+    # Tesseract uses three-letter language codes
+    LANGUAGE_CODES = {'en': 'eng', 'nl': 'nld', 'fr': 'fra'}
+
+    def load(self):
+        import pytesseract
+        self.pytesseract = pytesseract
+        self.lang = '+'.join(self.LANGUAGE_CODES.get(code, code) for code in settings.OCR_LANGUAGES)
+
+    def read_text(self, image: Image.Image) -> str:
+        return self.pytesseract.image_to_string(image, lang=self.lang)
+
+
+class StubOCRBackend(OCRBackend):
+    """
+    Deterministic backend for tests
+
+    Returns the 'ocr_text' text chunk of a PNG (see PIL.PngImagePlugin.PngInfo),
+    or an empty string for images without one.
+    """
+
+    name = 'stub'
+    confidence = 'high'
+
+    def read_text(self, image: Image.Image) -> str:
+        return image.info.get('ocr_text', '')
+
+
+def ocr_enabled() -> bool:
+    """Check whether an OCR backend is configured"""
+    return bool(settings.OCR_BACKEND)
+
+
+def load_backend() -> OCRBackend:
+    """Return the OCR backend of this process, loading it on first use"""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            backend = import_string(BACKENDS.get(settings.OCR_BACKEND, settings.OCR_BACKEND))()
+            backend.load()
+            _backend = backend
+            logger.info(f"OCR backend {backend.name} loaded")
+        return _backend
+
+
+def init_ocr_worker():
+    """Initializer for pool processes that run OCR: configure Django and load the backend"""
+    init_worker()
+    if ocr_enabled():
+        load_backend()
+
+
+def recognize(path: str) -> Dict[str, Any]:
+    """
+    Run OCR on an image file with the backend of this process
+
+    Args:
+        path: Path of the image file
+
+    Returns:
+        Dictionary with text, method and confidence
+    """
+    backend = load_backend()
+    with Image.open(path) as image:
+        text = backend.read_text(preprocess_image(image, binarize=backend.binarize))
+    return {'text': text, 'method': backend.name, 'confidence': backend.confidence}
+
+
+def run_ocr(path: str) -> Dict[str, Any]:
+    """
+    Run OCR on an image in a process that already loaded the backend
+
+    Pool processes get the path rather than the pickled image, see
+    workers.worker_file_path.
+
+    Args:
+        path: Path of the image file
+
+    Returns:
+        Dictionary with text, method and confidence
+
+    Raises:
+        TimeoutError: If OCR took longer than OCR_TIMEOUT seconds
+    """
+    if _backend is not None or settings.OCR_WORKERS <= 0:
+        return _recognize_in_thread(path)
+
+    pool = get_shared_pool(POOL_NAME, settings.OCR_WORKERS, initializer=init_ocr_worker)
+    future = pool.submit(recognize, path)
+    try:
+        return future.result(timeout=settings.OCR_TIMEOUT)
+    except FutureTimeoutError:
+        # The stuck task keeps its worker busy, the next image gets a fresh pool
+        future.cancel()
+        discard_shared_pool(POOL_NAME)
+        raise
+
+
+def _recognize_in_thread(path: str) -> Dict[str, Any]:
+    """
+    Run recognize in this process, giving up after OCR_TIMEOUT seconds
+
+    A thread cannot be stopped, so a stuck engine call finishes in the
+    background; the caller (an import job or a request) is not held up by it.
+    """
+    outcome = {}
+
+    def target():
+        try:
+            outcome['result'] = recognize(path)
+        except Exception as e:
+            outcome['error'] = e
+
+    # A daemon thread never keeps the process from exiting
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(settings.OCR_TIMEOUT)
+    if thread.is_alive():
+        raise FutureTimeoutError(f"OCR took longer than {settings.OCR_TIMEOUT} seconds")
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome['result']
+
+
+def backend_name() -> str:
+    """Name of the loaded backend (used to warm up pool processes)"""
+    return load_backend().name
+
+
+def warm_up(pool, processes: int):
+    """
+    Start every process of a pool and wait until each loaded the backend
+
+    The executor starts a new process for each task submitted while no
+    process is idle, so submitting one task per process starts them all.
+
+    Args:
+        pool: Pool created with init_ocr_worker as initializer
+        processes: Number of processes in the pool
+    """
+    wait([pool.submit(backend_name) for _ in range(processes)])
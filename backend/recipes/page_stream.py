@@ -0,0 +1,119 @@
+"""
+Streaming page extraction for PDF imports
+
+Extraction used to read the first five pages of every PDF and join them
+before parsing. Pages are now extracted one at a time from the shared
+PDFDocument and IncrementalRecipeParser checks after every page whether the title,
+ingredients and instructions are complete, so the remaining pages of long
+(magazine-style) PDFs are never extracted or held in memory.
+
+A recipe counts as complete once all three sections have been found and
+either the next page did not change the ingredients or instructions, or the
+next page starts another recipe with its own ingredients header. In the
+latter case that page is left out of the text.
+"""
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+
+from .keyword_matcher import get_matcher
+from .parser_engine import RecipeDocument
+from .pdf_document import PDFDocument
+
+# Pages read at most per PDF, to avoid processing very long documents
+MAX_PDF_PAGES = 5
+
+
+def starts_new_recipe(page_text: str) -> bool:
+    """Check whether a page contains a line starting with an ingredients header"""
+    headers = get_matcher('ingredient_headers')
+    return any(headers.startswith(line.strip().lower()) for line in page_text.split('\n'))
+
+
+class IncrementalRecipeParser:
+    """Collects page texts until a parser engine finds a complete recipe"""
+
+    def __init__(self, engine):
+        """
+        Args:
+            engine: RecipeParserEngine or RecipeTextParserEngine deciding
+                which sections have been found
+        """
+        self.engine = engine
+        self.pages: List[str] = []
+        self.complete = False
+        self._sections: Optional[Tuple[list, list]] = None
+
+    @property
+    def text(self) -> str:
+        """Text of the accepted pages, joined like the full extraction did"""
+        return '\n'.join(self.pages)
+
+    def feed(self, page_text: str) -> bool:
+        """
+        Add the text of the next page
+
+        Args:
+            page_text: Extracted text of the page
+
+        Returns:
+            True when the recipe is complete and no more pages are needed
+        """
+        if self.complete:
+            return True
+        if not page_text.strip():
+            return False
+
+        if self._sections is not None and starts_new_recipe(page_text):
+            self.complete = True
+            return True
+
+        self.pages.append(page_text)
+        sections = self._find_sections(RecipeDocument(self.text))
+        if sections is not None and sections == self._sections:
+            self.complete = True
+        self._sections = sections
+        return self.complete
+
+    def _find_sections(self, document: RecipeDocument) -> Optional[Tuple[list, list]]:
+        """Ingredients and instructions, or None while any section is still missing"""
+        if self.engine.extract_title(document) == self.engine.default_title:
+            return None
+
+        ingredients = self.engine.extract_ingredients(document)
+        if not ingredients:
+            return None
+
+        instructions = self.engine.extract_instructions(document)
+        if not instructions:
+            return None
+
+        return ingredients, instructions
+
+
+def stream_recipe_text(document: PDFDocument, engine, max_pages: int = MAX_PDF_PAGES,
+                       skip_errors: bool = False) -> Tuple[str, int, bool]:
+    """
+    Extract pages until the recipe on them is complete
+
+    Args:
+        document: PDF being imported
+        engine: Parser engine used to decide when the recipe is complete
+        max_pages: Number of pages to read at most
+        skip_errors: Log and skip pages whose text cannot be extracted
+
+    Returns:
+        Tuple of (text, number of pages extracted, whether the recipe was
+        found complete)
+    """
+    parser = IncrementalRecipeParser(engine)
+    pages_read = 0
+    for page_number, page_text in document.iter_page_texts(max_pages, skip_errors):
+        pages_read = page_number
+        if not settings.PDF_EARLY_EXIT_ENABLED:
+            if page_text.strip():
+                parser.pages.append(page_text)
+        elif parser.feed(page_text):
+            break
+
+    return parser.text, pages_read, parser.complete
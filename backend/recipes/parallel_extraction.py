@@ -0,0 +1,144 @@
+"""
+Page-parallel text extraction for multi-page PDFs
+
+page.extract_text() is CPU-bound and runs serially in one thread. For
+documents whose every page is needed (cookbooks rather than single recipes),
+pages are fanned out to the shared 'pdf_pages' process pool and reassembled
+in page order, with only a small window of pages in flight at a time.
+
+Workers open the PDF from a file path, never from pickled bytes: uploads
+that only live in memory are spooled to a temporary file once. Each worker
+keeps the PdfReader of the last document it opened, so a document is parsed
+once per worker instead of once per page.
+
+Documents with fewer than PDF_PARALLEL_MIN_PAGES pages are extracted serially,
+because starting the tasks would cost more than it saves. A page that takes
+longer than PDF_PAGE_TIMEOUT seconds is given up and the pool is replaced,
+since a running task cannot be interrupted.
+"""
+import os
+import logging
+from collections import deque
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterator, Optional, Tuple
+
+import PyPDF2
+from django.conf import settings
+
+from .workers import discard_shared_pool, get_shared_pool, worker_file_path
+
+logger = logging.getLogger(__name__)
+
+POOL_NAME = 'pdf_pages'
+
+# (key, PdfReader) of the last document opened in this worker process
+_worker_reader = None
+
+
+def extract_page(path: str, index: int) -> str:
+    """
+    Extract the text of one page (runs inside a pool process)
+
+    Args:
+        path: Path of the PDF file
+        index: Page index starting at 0
+
+    Returns:
+        Extracted page text
+    """
+    global _worker_reader
+    stat = os.stat(path)
+    key = (path, stat.st_size, stat.st_mtime_ns)
+    if _worker_reader is None or _worker_reader[0] != key:
+        _worker_reader = (key, PyPDF2.PdfReader(path))
+    return _worker_reader[1].pages[index].extract_text()
+
+
+def use_parallel(page_count: int) -> bool:
+    """Check whether a document is large enough to be worth the process pool"""
+    return settings.PDF_PARALLEL_PROCESSES > 0 and page_count >= settings.PDF_PARALLEL_MIN_PAGES
+
+
+def iter_page_texts(document, max_pages: Optional[int] = None, skip_errors: bool = False,
+                    cache: bool = True) -> Iterator[Tuple[int, str]]:
+    """
+    Yield the text of every page in page order, in parallel for large documents
+
+    At most twice as many pages as there are workers are extracted ahead of
+    the consumer, so memory does not grow with the length of the document.
+
+    Args:
+        document: PDFDocument to extract
+        max_pages: Number of pages to read at most, all pages when None
+        skip_errors: Log and skip pages that fail or time out instead of raising
+        cache: Keep the page texts on the document, see PDFDocument.page_text
+
+    Yields:
+        Tuples of (page number starting at 1, page text)
+    """
+    page_count = _page_count(document, max_pages)
+    if not use_parallel(page_count):
+        yield from document.iter_page_texts(page_count, skip_errors, cache=cache)
+        return
+
+    path, is_temporary = worker_file_path(document.file, suffix='.pdf')
+    try:
+        yield from _iter_parallel(document, path, page_count, skip_errors, cache)
+    finally:
+        if is_temporary:
+            os.remove(path)
+
+
+def _iter_parallel(document, path: str, page_count: int, skip_errors: bool,
+                   cache: bool) -> Iterator[Tuple[int, str]]:
+    """Keep a window of pages in the pool and yield the results in page order"""
+    pool = get_shared_pool(POOL_NAME, settings.PDF_PARALLEL_PROCESSES)
+    window = settings.PDF_PARALLEL_PROCESSES * 2
+    futures = deque()
+    next_index = 0
+    stuck = False
+
+    try:
+        while futures or next_index < page_count:
+            index = next_index - len(futures)
+            try:
+                while next_index < page_count and len(futures) < window:
+                    futures.append(pool.submit(extract_page, path, next_index))
+                    next_index += 1
+                future = futures.popleft()
+                # Waiting starts when the previous page is done, so every page gets its own timeout
+                text = future.result(timeout=settings.PDF_PAGE_TIMEOUT)
+            except BrokenProcessPool:
+                # A worker died, finish the remaining pages in this process
+                logger.warning(f"Page pool broke at page {index + 1}, extracting the rest serially")
+                yield from document.iter_page_texts(page_count, skip_errors, start=index, cache=cache)
+                return
+            except FutureTimeoutError:
+                future.cancel()
+                stuck = True
+                if not skip_errors:
+                    raise ValueError(f"Extracting page {index + 1} timed out after {settings.PDF_PAGE_TIMEOUT}s")
+                logger.warning(f"Extracting page {index + 1} timed out after {settings.PDF_PAGE_TIMEOUT}s, skipping it")
+                continue
+            except Exception as e:
+                if not skip_errors:
+                    raise
+                logger.warning(f"Failed to extract text from page {index + 1}: {e}")
+                continue
+
+            if cache:
+                document.cache_page_text(index, text)
+            yield index + 1, text
+    finally:
+        # Pages not started yet are not needed when the consumer stops or an error is raised
+        for future in futures:
+            future.cancel()
+        if stuck:
+            # The timed-out tasks still occupy their workers
+            discard_shared_pool(POOL_NAME)
+
+
+def _page_count(document, max_pages: Optional[int]) -> int:
+    """Number of pages to extract"""
+    return document.page_count if max_pages is None else min(document.page_count, max_pages)
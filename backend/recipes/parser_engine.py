@@ -0,0 +1,859 @@
+"""
+Single-pass recipe text parser engine
+
+The text is tokenised once into a RecipeDocument: a list of lines with their
+offsets and an index of every keyword occurrence (section headers, time and
+servings labels), built with one scan using a precompiled pattern. Field
+extractors then only look at the lines and positions the index points them
+to, instead of running a dozen regexes over the whole text per field.
+
+RecipeParserEngine produces the output of RecipeParser (services.py) and
+RecipeTextParser (text_extraction_service.py) delegates to
+RecipeTextParserEngine. Both produce exactly the same dicts as the original
+regex implementations, which are kept in parser_reference.py for the tests
+and the benchmark_parser command.
+
+Every pattern runs in time linear in the length of the text: patterns that
+the original implementations let backtrack over runs of digits or
+whitespace are written with possessive quantifiers and lookbehind guards
+instead, matching the same text. On top of that each parse runs under a
+ParseBudget that limits the length of the text and the time spent; when a
+limit is hit the fields found so far are returned with a warning.
+"""
+import re
+import time
+import logging
+from bisect import bisect_left
+from heapq import merge
+from typing import Dict, List, Any, Optional
+
+from django.conf import settings
+
+from .keyword_matcher import get_matcher
+
+logger = logging.getLogger(__name__)
+
+# Every keyword a field extractor may anchor a pattern on. No entry is a prefix
+# of another, so each text position belongs to at most one keyword family.
+KEYWORD_FAMILIES = (
+    'ingr', 'instruct', 'method', 'méth', 'direction', 'prep', 'prép', 'bereiding', 'voor',
+    'cook', 'bake', 'serv', 'yield', 'make', 'portion', 'pour', 'person', 'people', 'for', 'dressing',
+)
+KEYWORD_SCAN = re.compile(
+    '(?=' + '|'.join(f'({family})' for family in KEYWORD_FAMILIES) + ')',
+    re.IGNORECASE
+)
+# The only characters that re.IGNORECASE matches differently from str.lower()
+# for the letters above. Text without them is indexed with str.find instead.
+CASE_FOLD_EXCEPTIONS = re.compile('[\u0130\u0131\u017f]')
+
+BULLET_CHARS = '●•*-'
+
+
+class ParseBudget:
+    """
+    Limits on the text length and time of one parse
+
+    Text beyond max_chars is cut off before it is tokenised, which also
+    bounds the memory of the RecipeDocument. The time is checked after every
+    field extractor and inside the loops over section matches: once it is up,
+    the field being extracted keeps what was found so far and the remaining
+    fields keep their empty defaults. Both limits leave a warning.
+    """
+
+    def __init__(self, max_chars: int = 0, time_limit: float = 0):
+        """
+        Args:
+            max_chars: Longest text that is parsed, 0 for no limit
+            time_limit: Seconds a parse may take, 0 for no limit
+        """
+        self.max_chars = max_chars
+        self.time_limit = time_limit
+        self.deadline = None
+        self.text_length = None
+        self.stopped_at = None
+        self.skipped = []
+
+    @classmethod
+    def from_settings(cls) -> 'ParseBudget':
+        """Budget configured by PARSER_MAX_CHARS and PARSER_TIME_BUDGET_MS"""
+        return cls(settings.PARSER_MAX_CHARS, settings.PARSER_TIME_BUDGET_MS / 1000)
+
+    def start(self, text: str) -> str:
+        """Start the clock and return the part of the text that is parsed"""
+        if self.time_limit:
+            self.deadline = time.monotonic() + self.time_limit
+        if self.max_chars and len(text) > self.max_chars:
+            self.text_length = len(text)
+            text = text[:self.max_chars]
+        return text
+
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() > self.deadline
+
+    def extract(self, document: 'RecipeDocument', recipe_data: Dict[str, Any], extractors):
+        """
+        Fill recipe_data by running (field, extractor) pairs in order until the time is up
+
+        Fields that are not extracted keep the value they have in recipe_data.
+        """
+        for field, extractor in extractors:
+            if self.stopped_at is not None:
+                self.skipped.append(field)
+                continue
+            recipe_data[field] = extractor(document)
+            if self.expired():
+                self.stopped_at = field
+
+    @property
+    def warnings(self) -> List[str]:
+        warnings = []
+        if self.text_length is not None:
+            warnings.append(
+                f"Text of {self.text_length} characters was cut off at {self.max_chars} characters for parsing"
+            )
+        if self.stopped_at is not None:
+            warning = f"Parsing took longer than {self.time_limit:g}s and stopped after the {self.stopped_at}"
+            if self.skipped:
+                warning += f", not extracted: {', '.join(self.skipped)}"
+            warnings.append(warning)
+        return warnings
+
+
+class DigitRunPattern:
+    """
+    Pattern whose matches start with a run of digits, with a linear finditer
+
+    re.finditer tries every position inside a run of digits, and each try
+    scans to the end of the run, which takes time quadratic in the run
+    length. A match that starts inside a run implies one that starts at the
+    first digit of the run, so only the position where the previous match
+    ended (which may be inside a run) and positions not preceded by a digit
+    are tried.
+    """
+
+    def __init__(self, pattern: str, flags: int = 0):
+        self.pattern = re.compile(pattern, flags)
+        self.run_start = re.compile(r'(?<!\d)' + pattern, flags)
+
+    def finditer(self, text: str):
+        position = 0
+        while position < len(text):
+            match = self.pattern.match(text, position) or self.run_start.search(text, position)
+            if not match:
+                return
+            yield match
+            position = match.end()
+
+
+class Line:
+    """A line of the document with its offsets"""
+
+    __slots__ = ('index', 'start', 'end', 'first', 'text')
+
+    def __init__(self, index: int, start: int, end: int, first: int, text: str):
+        self.index = index
+        self.start = start  # offset of the first character of the line
+        self.end = end      # offset of the newline (or end of text)
+        self.first = first  # offset of the first non-whitespace character
+        self.text = text    # stripped line
+
+
+class RecipeDocument:
+    """Recipe text tokenised into lines, with a keyword position index"""
+
+    def __init__(self, text: str, budget: Optional[ParseBudget] = None):
+        self.text = text
+        self.budget = budget or ParseBudget()
+        self.lines = []
+        self.hits = {}
+        self._lower = None
+        self._starts = None
+
+        start = 0
+        for index, raw in enumerate(text.split('\n')):
+            stripped = raw.lstrip()
+            self.lines.append(Line(
+                index, start, start + len(raw), start + len(raw) - len(stripped), stripped.rstrip()
+            ))
+            start += len(raw) + 1
+
+        lower = text.lower()
+        if len(lower) == len(text) and not CASE_FOLD_EXCEPTIONS.search(text):
+            self._lower = lower
+            for family in KEYWORD_FAMILIES:
+                position = lower.find(family)
+                if position != -1:
+                    positions = self.hits[family] = []
+                    while position != -1:
+                        positions.append(position)
+                        position = lower.find(family, position + 1)
+        else:
+            for match in KEYWORD_SCAN.finditer(text):
+                self.hits.setdefault(KEYWORD_FAMILIES[match.lastindex - 1], []).append(match.start())
+
+    @property
+    def lower(self) -> str:
+        if self._lower is None:
+            self._lower = self.text.lower()
+        return self._lower
+
+    @property
+    def nonblank_lines(self) -> List[str]:
+        return [line.text for line in self.lines if line.text]
+
+    def positions(self, *families: str):
+        """Positions of keyword occurrences of the given families, in text order"""
+        lists = [self.hits[family] for family in families if family in self.hits]
+        if len(lists) == 1:
+            return lists[0]
+        return merge(*lists)
+
+    def find(self, pattern, families, start: int = 0):
+        """
+        First match of `pattern` anchored at a keyword position at or after `start`
+
+        Equivalent to pattern.search(text, start) for patterns that begin with
+        one of the given keywords, without scanning the text again.
+        """
+        for position in self.positions(*families):
+            if position < start:
+                continue
+            match = pattern.match(self.text, position)
+            if match:
+                return match
+        return None
+
+    def line_at(self, offset: int) -> Line:
+        """Line containing the given offset"""
+        if self._starts is None:
+            self._starts = [line.start for line in self.lines]
+        return self.lines[max(bisect_left(self._starts, offset + 1) - 1, 0)]
+
+    def section_after(self, start: int, terminator) -> str:
+        """
+        Text from `start` up to the first later line that matches `terminator`
+
+        Equivalent to (.*?)(?=\\n\\s*terminator|$) with DOTALL, starting at `start`.
+        """
+        if start >= len(self.text):
+            return ''
+
+        first_line = self.line_at(start)
+        end = len(self.text)
+        previous_end = first_line.end
+        for line in self.lines[first_line.index + 1:]:
+            if not line.text:
+                continue
+            if terminator.match(self.text, line.first):
+                end = previous_end
+                break
+            previous_end = line.end
+
+        return self.text[start:end]
+
+    def end_of_text(self, start: int) -> int:
+        """Position where a non-MULTILINE $ first matches at or after start"""
+        if self.text.endswith('\n') and len(self.text) - 1 >= start:
+            return len(self.text) - 1
+        return len(self.text)
+
+
+def first_int(document: RecipeDocument, patterns) -> Optional[int]:
+    """Value of the first pattern (in priority order) that matches anywhere"""
+    for families, pattern in patterns:
+        match = document.find(pattern, families)
+        if match:
+            return int(match.group(1))
+    return None
+
+
+# ---------------------------------------------------------------------------
+# RecipeParser (services.py)
+# ---------------------------------------------------------------------------
+
+TITLE_SKIP_KEYWORDS = [
+    'page', 'ingredients', 'instructions', 'serves', 'prep time',
+    'ingrediënten', 'bereidingswijze', 'bereidingstijd',
+    'minuten', 'preparation', 'cooking time',
+    'bereiding', 'kooktijd', 'totale tijd', 'personen'
+]
+TITLE_SKIP_EXACT = set(TITLE_SKIP_KEYWORDS)
+TITLE_SKIP_SEARCH = re.compile('|'.join(re.escape(keyword) for keyword in TITLE_SKIP_KEYWORDS))
+TITLE_NUMERIC_LINE = re.compile(r'^[\d\s:\/\-\.]+$')
+TITLE_METADATA_PREFIX = re.compile(r'^(voor|serves?|prep|cook|bereiding|ingrediënten)', re.IGNORECASE)
+TITLE_PREFIX = re.compile(r'^(recept|recipe|gerecht)\s+', re.IGNORECASE)
+# A search starting inside a run of whitespace would scan the rest of the run
+# at every position, the (?<!\s) guard only tries its first character
+TITLE_END_PATTERNS = [
+    re.compile(r'(?<!\s)\s++voor\s++\d++\s++personen?', re.IGNORECASE),  # "Voor 2 personen"
+    re.compile(r'(?<!\s)\s++bereidingstijd:?', re.IGNORECASE),            # "Bereidingstijd:"
+    re.compile(r'(?<!\s)\s++ingrediënten:?', re.IGNORECASE),             # "Ingrediënten:"
+    re.compile(r'(?<!\s)\s++serves?\s++\d+', re.IGNORECASE),             # "Serves 4"
+    re.compile(r'(?<!\s)\s++prep\s++time:?', re.IGNORECASE),             # "Prep time:"
+]
+WHITESPACE = re.compile(r'\s+')
+
+PREP_TIME_PATTERNS = [
+    (('prep',), re.compile(r'prep(?:aration)?\s*time[:\s]*(\d+)\s*(?:min|minute|minutes)', re.IGNORECASE)),
+    (('prep',), re.compile(r'prep[:\s]*(\d+)\s*(?:min|minute|minutes)', re.IGNORECASE)),
+    (('prep',), re.compile(r'preparation[:\s]*(\d+)\s*(?:min|minute|minutes)', re.IGNORECASE)),
+    (('bereiding',), re.compile(r'bereidingstijd[:\s]*(\d+)\s*(?:min|minuten?)', re.IGNORECASE)),
+    (('bereiding',), re.compile(r'bereiding[:\s]*(\d+)\s*(?:min|minuten?)', re.IGNORECASE)),
+    (('voor',), re.compile(r'voorbereidingstijd[:\s]*(\d+)\s*(?:min|minuten?)', re.IGNORECASE)),
+    (('prép',), re.compile(r'préparation[:\s]*(\d+)\s*(?:min|minutes?)', re.IGNORECASE)),
+]
+COOK_TIME_PATTERNS = [
+    (('cook',), re.compile(r'cook(?:ing)?\s*time[:\s]*(\d+)\s*(?:min|minute|minutes)', re.IGNORECASE)),
+    (('cook',), re.compile(r'cook[:\s]*(\d+)\s*(?:min|minute|minutes)', re.IGNORECASE)),
+    (('bake',), re.compile(r'bake[:\s]*(\d+)\s*(?:min|minute|minutes)', re.IGNORECASE)),
+]
+SERVINGS_PATTERNS = [
+    (('serv',), re.compile(r'serves?[:\s]*(\d+)', re.IGNORECASE)),
+    (('serv',), re.compile(r'servings?[:\s]*(\d+)', re.IGNORECASE)),
+    (('yield',), re.compile(r'yield[:\s]*(\d+)', re.IGNORECASE)),
+    (('make',), re.compile(r'makes?[:\s]*(\d+)', re.IGNORECASE)),
+    (('voor',), re.compile(r'voor[:\s]*(\d+)\s*(?:personen?|people)', re.IGNORECASE)),
+    (None, re.compile(r'(\d+)\s*(?:personen?|people)', re.IGNORECASE)),  # anchored on the number
+    (('portion',), re.compile(r'portions?[:\s]*(\d+)', re.IGNORECASE)),
+    (('pour',), re.compile(r'pour[:\s]*(\d+)\s*(?:personnes?)', re.IGNORECASE)),
+]
+
+# Section header and terminator patterns, tried in order
+INGREDIENT_SECTIONS = [
+    (re.compile(r'ingredients?[:\s]*\n', re.IGNORECASE),
+     re.compile(r'(?:instructions?|method|directions?|preparation|bereidingswijze)\s*[:\n]', re.IGNORECASE)),
+    (re.compile(r'ingrediënten[:\s]*\n', re.IGNORECASE),
+     re.compile(r'(?:bereidingswijze|instructies?|methode|dressing)\s*[:\n]', re.IGNORECASE)),
+]
+# Inline variant: "Ingrediënten: ● 200 gram ... Bereidingswijze ..." without line breaks
+INGREDIENTS_INLINE_HEADER = re.compile(r'ingrediënten[:\s]*', re.IGNORECASE)
+INGREDIENTS_INLINE_END = re.compile(r'bereidingswijze|instructies?|methode|dressing', re.IGNORECASE)
+INGREDIENTS_INLINE_END_FAMILIES = ('bereiding', 'instruct', 'method', 'dressing')
+FRENCH_INGREDIENT_SECTION = (
+    re.compile(r'ingrédients[:\s]*\n', re.IGNORECASE),
+    re.compile(r'(?:préparation|instructions?|méthode)\s*[:\n]', re.IGNORECASE),
+)
+# Text that starts with a bullet list, up to the last instruction keyword
+LEADING_LIST_END = re.compile(r'bereidingswijze|instructions?|method', re.IGNORECASE)
+BULLET_RUN = re.compile(r'((?:^\s*[●•*-]\s*.+\n?)+)', re.MULTILINE)
+
+INGREDIENT_BULLET_SPLIT = re.compile(r'[●•]')
+INGREDIENT_SECTION_WORDS = ['ingrediënten', 'ingredients', 'ingrédients']
+NUMBERED_ITEM = re.compile(r'^\d+\.?\s')
+INGREDIENT_MARKER = re.compile(r'^[●•*\-\d\.]\s*')
+AMOUNT_PATTERNS = [
+    re.compile(r'^(\d+(?:[.,]\d+)?\s*(?:gram|g|ml|l|el|tl|theelepel|eetlepel|handjes?))\s+(.+)', re.IGNORECASE),
+    re.compile(r'^([\d\s/½¼¾]+(?:\s*(?:cups?|tbsp|tsp|oz|lb|g|kg|ml|l|gram|el|theelepel|eetlepel|handjes?))?)\s+(.+)', re.IGNORECASE),
+]
+INSTRUCTIONS_HEADER = re.compile(r'(?:instructions?|method|directions?|preparation)[:\s]*\n', re.IGNORECASE)
+INSTRUCTIONS_HEADER_FAMILIES = ('instruct', 'method', 'direction', 'prep')
+INSTRUCTIONS_END = re.compile(r'(?:notes?|tips?)\s*[:\n]', re.IGNORECASE)
+DUTCH_INSTRUCTIONS_HEADER = re.compile(r'bereidingswijze[:\s]*\n?', re.IGNORECASE)
+DUTCH_INSTRUCTIONS_END = re.compile(r'(?:opmerkingen?|tips?|dressing\s+ingrediënten)\s*[:\n]', re.IGNORECASE)
+FRENCH_INSTRUCTIONS_HEADER = re.compile(r'(?:préparation|instructions?|méthode)[:\s]*\n', re.IGNORECASE)
+FRENCH_INSTRUCTIONS_HEADER_FAMILIES = ('prép', 'instruct', 'méth')
+FRENCH_INSTRUCTIONS_END = re.compile(r'(?:notes?|conseils?)\s*[:\n]', re.IGNORECASE)
+SENTENCE_SPLIT = re.compile(r'\.(?=[A-Z])')
+STEP_NUMBER = re.compile(r'^\d+\.?\s*')
+STEP_BULLET = re.compile(r'^[●•\-]\s*')
+
+
+class RecipeParserEngine:
+    """Single-pass parser producing the structured output of RecipeParser"""
+
+    default_title = "Geïmporteerd Recept"
+
+    def parse(self, text: str, budget: Optional[ParseBudget] = None) -> Dict[str, Any]:
+        """
+        Parse recipe text into structured recipe data
+
+        Args:
+            text: Raw text extracted from PDF
+            budget: Limits for this parse, none by default
+
+        Returns:
+            Dictionary with parsed recipe data
+        """
+        budget = budget or ParseBudget()
+        document = RecipeDocument(budget.start(text), budget)
+        recipe_data = {
+            'title': self.default_title,
+            'description': '',
+            'prep_time': None,
+            'cook_time': None,
+            'servings': None,
+            'ingredients': [],
+            'instructions': [],
+            'categories': [],
+            'tags': [],
+        }
+        budget.extract(document, recipe_data, [
+            ('title', self.extract_title),
+            ('prep_time', self.extract_prep_time),
+            ('cook_time', self.extract_cook_time),
+            ('servings', self.extract_servings),
+            ('ingredients', self.extract_ingredients),
+            ('instructions', self.extract_instructions),
+            ('categories', self.extract_categories),
+            ('tags', self.extract_tags),
+        ])
+
+        # Calculate total time if both prep and cook times are available
+        if recipe_data['prep_time'] and recipe_data['cook_time']:
+            recipe_data['total_time'] = recipe_data['prep_time'] + recipe_data['cook_time']
+
+        return recipe_data
+
+    def extract_title(self, document: RecipeDocument) -> str:
+        """Extract recipe title from the first lines"""
+        lines = document.nonblank_lines
+
+        for i, line in enumerate(lines[:15]):
+            if len(line) < 4:
+                continue
+            if TITLE_NUMERIC_LINE.match(line):
+                continue
+            if line.lower() in TITLE_SKIP_EXACT:
+                continue
+            if TITLE_METADATA_PREFIX.match(line):
+                continue
+
+            # Remove common prefixes like "recept", "recipe", etc.
+            title = TITLE_PREFIX.sub('', line, count=1).strip()
+
+            # Cut off metadata that appears on the same line
+            for pattern in TITLE_END_PATTERNS:
+                match = pattern.search(line)
+                if match:
+                    title = line[:match.start()].strip()
+                    break
+
+            if title and 4 <= len(title) <= 100 and not TITLE_SKIP_SEARCH.search(title.lower()):
+                title = WHITESPACE.sub(' ', title)
+                logger.debug(f"Extracted title: '{title}' from line {i}: '{line}'")
+                return title
+
+        # Fallback: use first substantial line
+        for line in lines[:20]:
+            if 5 <= len(line) <= 100:
+                clean_title = WHITESPACE.sub(' ', line)
+                logger.warning(f"Using fallback title: '{clean_title}'")
+                return clean_title
+
+        logger.warning("Could not extract title, using default")
+        return self.default_title
+
+    def extract_prep_time(self, document: RecipeDocument) -> Optional[int]:
+        """Extract preparation time in minutes"""
+        return first_int(document, PREP_TIME_PATTERNS)
+
+    def extract_cook_time(self, document: RecipeDocument) -> Optional[int]:
+        """Extract cooking time in minutes"""
+        return first_int(document, COOK_TIME_PATTERNS)
+
+    def extract_servings(self, document: RecipeDocument) -> Optional[int]:
+        """Extract number of servings"""
+        for families, pattern in SERVINGS_PATTERNS:
+            if families is None:
+                match = self._find_count_before(document, pattern, ('person', 'people'))
+            else:
+                match = document.find(pattern, families)
+            if match:
+                return int(match.group(1))
+        return None
+
+    def _find_count_before(self, document: RecipeDocument, pattern, families):
+        """Match a '(\\d+)\\s*keyword' pattern by walking back from each keyword"""
+        text = document.text
+        for position in document.positions(*families):
+            start = position
+            while start > 0 and text[start - 1].isspace():
+                start -= 1
+            digits_end = start
+            while start > 0 and text[start - 1].isdecimal():
+                start -= 1
+            if start == digits_end:
+                continue
+            match = pattern.match(text, start)
+            if match:
+                return match
+        return None
+
+    def extract_ingredients(self, document: RecipeDocument) -> List[Dict[str, Any]]:
+        """Extract ingredients list"""
+        section = self._ingredients_section(document)
+        if section is None:
+            return []
+
+        ingredients_text = section.strip()
+
+        if '●' in ingredients_text or '•' in ingredients_text:
+            # Bullets on a single line
+            ingredient_items = [item.strip() for item in INGREDIENT_BULLET_SPLIT.split(ingredients_text) if item.strip()]
+
+            # Remove the first item if it's just the header (like "Ingrediënten:")
+            if ingredient_items and any(keyword in ingredient_items[0].lower() for keyword in INGREDIENT_SECTION_WORDS):
+                ingredient_items = ingredient_items[1:]
+        else:
+            ingredient_items = []
+            for line in ingredients_text.split('\n'):
+                line = line.strip()
+                if line and (line[0] in BULLET_CHARS or NUMBERED_ITEM.match(line)):
+                    ingredient_text = INGREDIENT_MARKER.sub('', line, count=1).strip()
+                    if ingredient_text:
+                        ingredient_items.append(ingredient_text)
+
+        ingredients = []
+        for ingredient_text in ingredient_items:
+            ingredient_text = ingredient_text.strip()
+            if not ingredient_text or not self.is_valid_ingredient(ingredient_text):
+                continue
+
+            amount = ''
+            name = ingredient_text
+            for pattern in AMOUNT_PATTERNS:
+                amount_match = pattern.match(ingredient_text)
+                if amount_match:
+                    amount = amount_match.group(1).strip()
+                    name = amount_match.group(2).strip()
+                    break
+
+            if self.is_valid_ingredient_name(name):
+                ingredients.append({
+                    'name': name,
+                    'amount': amount,
+                    'unit': '',
+                    'notes': '',
+                    'category': 'other',
+                    'order': len(ingredients)
+                })
+
+        return ingredients
+
+    def _ingredients_section(self, document: RecipeDocument) -> Optional[str]:
+        """Locate the ingredients section, trying the same formats in the same order as before"""
+        text = document.text
+
+        for header, terminator in INGREDIENT_SECTIONS:
+            match = document.find(header, ('ingr',))
+            if match:
+                return document.section_after(match.end(), terminator)
+
+        # Dutch header followed by the list on the same line
+        match = document.find(INGREDIENTS_INLINE_HEADER, ('ingr',))
+        if match:
+            end = document.find(INGREDIENTS_INLINE_END, INGREDIENTS_INLINE_END_FAMILIES, match.end())
+            if end:
+                return text[match.end():end.start()]
+
+        header, terminator = FRENCH_INGREDIENT_SECTION
+        match = document.find(header, ('ingr',))
+        if match:
+            return document.section_after(match.end(), terminator)
+
+        # Text starting with a bullet list, up to the last instruction keyword
+        first_line = next((line for line in document.lines if line.text), None)
+        if first_line and first_line.text[0] in BULLET_CHARS:
+            last_keyword = None
+            for position in document.positions('bereiding', 'instruct', 'method'):
+                if LEADING_LIST_END.match(text, position):
+                    last_keyword = position
+            if last_keyword is not None and last_keyword >= first_line.first + 2:
+                return text[:last_keyword]
+
+        # Any run of bullet lines
+        for line in document.lines:
+            if line.text and line.text[0] in BULLET_CHARS:
+                match = BULLET_RUN.match(text, line.start)
+                if match:
+                    return match.group(1)
+
+        return None
+
+    def extract_instructions(self, document: RecipeDocument) -> List[str]:
+        """Extract cooking instructions"""
+        section = self._instructions_section(document)
+        if section is None:
+            return []
+
+        instructions_text = section.strip()
+        lines = instructions_text.split('\n')
+
+        # If no newlines or very few, split into sentences
+        if len(lines) <= 2:
+            sentences = SENTENCE_SPLIT.split(instructions_text)
+            lines = [s.strip() + '.' for s in sentences if s.strip()]
+
+        instructions = []
+        current_step = []
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+
+            if NUMBERED_ITEM.match(line):
+                # New numbered step
+                if current_step:
+                    instructions.append(' '.join(current_step))
+                current_step = [STEP_NUMBER.sub('', line, count=1)]
+            elif line[0] in '-•●':
+                # Bullet point step
+                if current_step:
+                    instructions.append(' '.join(current_step))
+                current_step = [STEP_BULLET.sub('', line, count=1)]
+            elif current_step and len(line) > 20 and line[0].isupper():
+                # Likely a new step
+                instructions.append(' '.join(current_step))
+                current_step = [line]
+            else:
+                # Continuation of current step
+                current_step.append(line)
+
+        if current_step:
+            instructions.append(' '.join(current_step))
+
+        return instructions
+
+    def _instructions_section(self, document: RecipeDocument) -> Optional[str]:
+        """Locate the instructions section"""
+        match = document.find(INSTRUCTIONS_HEADER, INSTRUCTIONS_HEADER_FAMILIES)
+        if match:
+            return document.section_after(match.end(), INSTRUCTIONS_END)
+
+        match = document.find(DUTCH_INSTRUCTIONS_HEADER, ('bereiding',))
+        if match:
+            return document.section_after(match.end(), DUTCH_INSTRUCTIONS_END)
+
+        match = document.find(FRENCH_INSTRUCTIONS_HEADER, FRENCH_INSTRUCTIONS_HEADER_FAMILIES)
+        if match:
+            return document.section_after(match.end(), FRENCH_INSTRUCTIONS_END)
+
+        return None
+
+    def extract_categories(self, document: RecipeDocument) -> List[str]:
+        """Extract recipe categories"""
+        categories = get_matcher('recipe_categories').ordered_labels(document.lower)
+        return categories if categories else ['main course']
+
+    def extract_tags(self, document: RecipeDocument) -> List[str]:
+        """Extract recipe tags"""
+        return get_matcher('recipe_tags').ordered_labels(document.lower)
+
+    def is_valid_ingredient(self, text: str) -> bool:
+        """Check if text looks like a valid ingredient (not instructions)"""
+        if not text or len(text.strip()) < 2:
+            return False
+
+        if get_matcher('ingredient_instructions').search(text.lower().strip()):
+            return False
+
+        # Skip if it's too long (likely instructions)
+        if len(text) > 150:
+            return False
+
+        # Skip if it contains multiple sentences
+        if text.count('.') > 1 and len(text) > 50:
+            return False
+
+        return True
+
+    def is_valid_ingredient_name(self, name: str) -> bool:
+        """Validate that an ingredient name is reasonable"""
+        if not name or len(name.strip()) < 2:
+            return False
+
+        name = name.strip()
+        if len(name) > 100:
+            return False
+
+        return not get_matcher('ingredient_name_starters').startswith(name.lower())
+
+
+# ---------------------------------------------------------------------------
+# RecipeTextParser (text_extraction_service.py)
+# ---------------------------------------------------------------------------
+
+TEXT_TITLE_MEASUREMENT = re.compile(r'^\d+\s*(cups?|tbsp|tsp|ml|gram|kg)')
+TEXT_DESCRIPTION_MEASUREMENT = re.compile(r'^\d+\s*(cups?|tbsp|tsp)')
+TEXT_INGREDIENTS_HEADER = re.compile(r'INGREDIENTS?:?\s*', re.IGNORECASE)
+TEXT_SECTION_END = re.compile(r'INSTRUCTIONS?|METHOD|DIRECTIONS?', re.IGNORECASE)
+TEXT_SECTION_FAMILIES = ('instruct', 'method', 'direction')
+TEXT_INSTRUCTIONS_HEADER = re.compile(r'(?:INSTRUCTIONS?|METHOD|DIRECTIONS?):?\s*', re.IGNORECASE)
+
+# The ingredient patterns of RecipeTextParser, rewritten to run in linear time
+# with the same matches. The original
+#   (\d+(?:\s*\d+/\d+)?\s*UNIT\s+[^.]+?)(?=\d+(?:\s*\d+/\d+)?\s*UNIT|$)
+# backtracks through every split of a run of digits, and its lookahead is
+# tried at every digit of a run, which is cubic in the length of the run.
+# - A quantity is "1 1/2", "11/2" (read as 1 1/2) or "12". Only one of these
+#   can be followed by a unit, so each is matched possessively.
+# - The lookahead fails at every later digit of a run if it fails at the
+#   first one tried, so after the first item character it is only tried
+#   where a run starts.
+# - The item text is tried from the end of the whitespace first. Giving back
+#   whitespace only helps when the next item (or the end) follows it
+#   directly, which the last alternative covers.
+TEXT_UNIT = r'(?:cups?|tbsp|tsp|ml|gram|kg|oz|lb|g)'
+TEXT_QUANTITY = r'(?:\d++\s++\d++/\d++|\d\d++/\d++|\d++)\s*+' + TEXT_UNIT
+
+
+def item_text_until(next_item: str) -> str:
+    """Whitespace and lazily matched item text up to next_item or the end, see above"""
+    return (
+        r'(?:\s++[^.](?:(?=' + next_item + r'|$)|[^.]*?(?=(?<!\d)' + next_item + r'|$))'
+        r'|\s\s++(?=' + next_item + r'|$))'
+    )
+
+
+TEXT_INGREDIENT_PATTERNS = [
+    DigitRunPattern(r'(' + TEXT_QUANTITY + item_text_until(TEXT_QUANTITY) + r')', re.IGNORECASE),
+    DigitRunPattern(r'(\d++' + item_text_until(r'\d++\s') + r')', re.IGNORECASE),  # Simple number + ingredient
+    re.compile(r'([•-]\s*[^•-]+?)(?=[•-]|$)', re.IGNORECASE),  # Bullet points
+]
+# Searches that start inside a run of digits only need to try its first digit
+TEXT_MEASUREMENT_LINE = re.compile(r'(?<!\d)\d++\s*+(cups?|tbsp|tsp|ml|gram|kg|oz|lb)', re.IGNORECASE)
+TEXT_STEP = re.compile(r'((?<!\d)\d++\.\s*[^.]+?\.)')
+TEXT_STEP_NUMBER = re.compile(r'^\d+\.\s*')
+
+TEXT_PREP_TIME_PATTERNS = [
+    (('prep',), re.compile(r'prep(?:aration)?\s*time:?\s*(\d+)\s*(?:min|minutes?)', re.IGNORECASE)),
+    (('prep',), re.compile(r'prep:?\s*(\d+)\s*(?:min|minutes?)', re.IGNORECASE)),
+    (('prep',), re.compile(r'preparation:?\s*(\d+)\s*(?:min|minutes?)', re.IGNORECASE)),
+]
+TEXT_COOK_TIME_PATTERNS = [
+    (('cook',), re.compile(r'cook(?:ing)?\s*time:?\s*(\d+)\s*(?:min|minutes?)', re.IGNORECASE)),
+    (('cook',), re.compile(r'cook:?\s*(\d+)\s*(?:min|minutes?)', re.IGNORECASE)),
+    (('bake',), re.compile(r'bake:?\s*(\d+)\s*(?:min|minutes?)', re.IGNORECASE)),
+]
+TEXT_SERVINGS_PATTERNS = [
+    (('serv',), re.compile(r'serves?:?\s*(\d+)', re.IGNORECASE)),
+    (('serv',), re.compile(r'servings?:?\s*(\d+)', re.IGNORECASE)),
+    (('portion',), re.compile(r'portions?:?\s*(\d+)', re.IGNORECASE)),
+    (('for',), re.compile(r'for\s*(\d+)\s*people', re.IGNORECASE)),
+]
+
+
+class RecipeTextParserEngine:
+    """Single-pass parser producing the recipe_data of RecipeTextParser"""
+
+    default_title = "Imported Recipe"
+
+    def parse(self, text: str, budget: Optional[ParseBudget] = None) -> Dict[str, Any]:
+        """
+        Parse extracted text into recipe components
+
+        Args:
+            text: Raw extracted text
+            budget: Limits for this parse, none by default
+
+        Returns:
+            Dictionary with title, ingredients, instructions, times, servings and description
+        """
+        budget = budget or ParseBudget()
+        document = RecipeDocument(budget.start(text), budget)
+        recipe_data = {
+            'title': self.default_title,
+            'ingredients': [],
+            'instructions': [],
+            'prep_time': None,
+            'cook_time': None,
+            'servings': None,
+            'description': ''
+        }
+        budget.extract(document, recipe_data, [
+            ('title', self.extract_title),
+            ('ingredients', self.extract_ingredients),
+            ('instructions', self.extract_instructions),
+            ('prep_time', self.extract_prep_time),
+            ('cook_time', self.extract_cook_time),
+            ('servings', self.extract_servings),
+            ('description', self.extract_description),
+        ])
+        return recipe_data
+
+    def extract_title(self, document: RecipeDocument) -> str:
+        """Extract recipe title from the first lines"""
+        for line in document.lines[:5]:
+            title = line.text
+            if 5 < len(title) < 100:
+                # Skip lines that look like ingredients or instructions
+                if not TEXT_TITLE_MEASUREMENT.search(title.lower()):
+                    if not title.lower().startswith(('step', 'instruction', 'method')):
+                        return title
+
+        return self.default_title
+
+    def extract_ingredients(self, document: RecipeDocument) -> List[str]:
+        """Extract ingredients list from text"""
+        ingredients = []
+        text = document.text
+
+        header = document.find(TEXT_INGREDIENTS_HEADER, ('ingr',))
+        if header:
+            start = header.end()
+            end = document.find(TEXT_SECTION_END, TEXT_SECTION_FAMILIES, start)
+            ingredients_text = text[start:end.start() if end else document.end_of_text(start)]
+
+            seen = set()
+            for pattern in TEXT_INGREDIENT_PATTERNS:
+                for match in pattern.finditer(ingredients_text):
+                    if document.budget.expired():
+                        return ingredients[:20]
+                    ingredient = match.group(1).strip()
+                    if len(ingredient) > 3 and ingredient not in seen:
+                        seen.add(ingredient)
+                        ingredients.append(ingredient)
+
+        # Fallback: look for lines with measurements
+        if not ingredients:
+            for line in document.lines:
+                if TEXT_MEASUREMENT_LINE.search(line.text) and len(line.text) > 3:
+                    ingredients.append(line.text)
+
+        return ingredients[:20]  # Limit to 20 ingredients
+
+    def extract_instructions(self, document: RecipeDocument) -> List[str]:
+        """Extract cooking instructions from text"""
+        instructions = []
+
+        header = document.find(TEXT_INSTRUCTIONS_HEADER, TEXT_SECTION_FAMILIES)
+        if header:
+            instructions_text = document.text[header.end():document.end_of_text(header.end())]
+            for match in TEXT_STEP.finditer(instructions_text):
+                if document.budget.expired():
+                    return instructions[:15]
+                instruction = match.group(1).strip()
+                if len(instruction) > 10:
+                    instructions.append(TEXT_STEP_NUMBER.sub('', instruction, count=1).strip())
+
+        # Fallback: look for numbered lines
+        if not instructions:
+            for line in document.lines:
+                if TEXT_STEP_NUMBER.match(line.text) and len(line.text) > 10:
+                    instructions.append(TEXT_STEP_NUMBER.sub('', line.text, count=1).strip())
+
+        return instructions[:15]  # Limit to 15 steps
+
+    def extract_prep_time(self, document: RecipeDocument) -> Optional[int]:
+        """Extract preparation time in minutes"""
+        return first_int(document, TEXT_PREP_TIME_PATTERNS)
+
+    def extract_cook_time(self, document: RecipeDocument) -> Optional[int]:
+        """Extract cooking time in minutes"""
+        return first_int(document, TEXT_COOK_TIME_PATTERNS)
+
+    def extract_servings(self, document: RecipeDocument) -> Optional[int]:
+        """Extract number of servings"""
+        return first_int(document, TEXT_SERVINGS_PATTERNS)
+
+    def extract_description(self, document: RecipeDocument) -> str:
+        """Extract recipe description from the first lines"""
+        for line in document.lines[:3]:
+            if 20 < len(line.text) < 200:
+                # Skip title-like lines and ingredient lines
+                if not TEXT_DESCRIPTION_MEASUREMENT.search(line.text.lower()):
+                    if not line.text.isupper():  # Skip all-caps titles
+                        return line.text
+
+        return ""
@@ -0,0 +1,615 @@
+"""
+Reference implementations of the regex recipe parsers
+
+These are the multi-pass parsers that RecipeParser and RecipeTextParser used
+before they delegated to recipes.parser_engine. They are kept unchanged so the
+benchmark_parser command can measure the engine against them and the tests can
+check that both produce the same output. Do not use them in application code.
+"""
+import re
+import logging
+from typing import Dict, List, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ReferenceRecipeParser:
+    """RecipeParser as it was before delegating to the parser engine"""
+    
+    def parse_recipe(self, text: str) -> Dict[str, Any]:
+        """
+        Parse recipe text into structured recipe data
+        
+        Args:
+            text: Raw text extracted from PDF
+            
+        Returns:
+            Dictionary with parsed recipe data
+        """
+        recipe_data = {
+            'title': self._extract_title(text),
+            'description': '',
+            'prep_time': self._extract_prep_time(text),
+            'cook_time': self._extract_cook_time(text),
+            'servings': self._extract_servings(text),
+            'ingredients': self._extract_ingredients(text),
+            'instructions': self._extract_instructions(text),
+            'categories': self._extract_categories(text),
+            'tags': self._extract_tags(text),
+        }
+        
+        # Calculate total time if both prep and cook times are available
+        if recipe_data['prep_time'] and recipe_data['cook_time']:
+            recipe_data['total_time'] = recipe_data['prep_time'] + recipe_data['cook_time']
+        
+        return recipe_data
+    
+    def _extract_title(self, text: str) -> str:
+        """Extract recipe title from text"""
+        lines = [line.strip() for line in text.strip().split('\n') if line.strip()]
+        
+        # Skip keywords that indicate metadata, not titles
+        skip_keywords = [
+            'page', 'ingredients', 'instructions', 'serves', 'prep time',
+            'ingrediënten', 'bereidingswijze', 'bereidingstijd',
+            'minuten', 'preparation', 'cooking time',
+            'bereiding', 'kooktijd', 'totale tijd', 'personen'
+        ]
+        
+        # Try to find a title in the first few lines
+        for i, line in enumerate(lines[:15]):
+            # Skip very short lines
+            if len(line) < 4:
+                continue
+            
+            # Skip lines that are just numbers, times, or dates
+            if re.match(r'^[\d\s:\/\-\.]+$', line):
+                continue
+            
+            # Skip if line is just a keyword
+            if any(line.lower() == keyword for keyword in skip_keywords):
+                continue
+            
+            # Skip lines that start with common metadata patterns
+            if re.match(r'^(voor|serves?|prep|cook|bereiding|ingrediënten)', line, re.IGNORECASE):
+                continue
+            
+            # Extract title before common patterns that appear on same line
+            title = line
+            
+            # Remove common prefixes like "recept", "recipe", etc.
+            title = re.sub(r'^(recept|recipe|gerecht)\s+', '', title, flags=re.IGNORECASE).strip()
+            
+            title_end_patterns = [
+                r'\s+voor\s+\d+\s+personen?',  # "Voor 2 personen"
+                r'\s+bereidingstijd:?',         # "Bereidingstijd:"
+                r'\s+ingrediënten:?',          # "Ingrediënten:"
+                r'\s+serves?\s+\d+',           # "Serves 4"
+                r'\s+prep\s+time:?',           # "Prep time:"
+            ]
+            
+            for pattern in title_end_patterns:
+                match = re.search(pattern, line, re.IGNORECASE)
+                if match:
+                    title = line[:match.start()].strip()
+                    break
+            
+            # Check if this looks like a valid title
+            if title and 4 <= len(title) <= 100:
+                # Skip if it contains obvious non-title patterns
+                if not any(keyword in title.lower() for keyword in skip_keywords):
+                    # Clean up the title
+                    title = re.sub(r'\s+', ' ', title)  # Normalize whitespace
+                    logger.info(f"Extracted title: '{title}' from line {i}: '{line}'")
+                    return title
+        
+        # Fallback: use first substantial line
+        for line in lines[:20]:
+            if 5 <= len(line) <= 100:
+                clean_title = re.sub(r'\s+', ' ', line)
+                logger.warning(f"Using fallback title: '{clean_title}'")
+                return clean_title
+        
+        logger.warning("Could not extract title, using default")
+        return "Geïmporteerd Recept"
+    
+    def _extract_prep_time(self, text: str) -> Optional[int]:
+        """Extract preparation time in minutes"""
+        patterns = [
+            r'prep(?:aration)?\s*time[:\s]*(\d+)\s*(?:min|minute|minutes)',
+            r'prep[:\s]*(\d+)\s*(?:min|minute|minutes)',
+            r'preparation[:\s]*(\d+)\s*(?:min|minute|minutes)',
+            r'bereidingstijd[:\s]*(\d+)\s*(?:min|minuten?)',
+            r'bereiding[:\s]*(\d+)\s*(?:min|minuten?)',
+            r'voorbereidingstijd[:\s]*(\d+)\s*(?:min|minuten?)',
+            r'préparation[:\s]*(\d+)\s*(?:min|minutes?)',
+        ]
+        
+        for pattern in patterns:
+            match = re.search(pattern, text, re.IGNORECASE)
+            if match:
+                return int(match.group(1))
+        
+        return None
+    
+    def _extract_cook_time(self, text: str) -> Optional[int]:
+        """Extract cooking time in minutes"""
+        patterns = [
+            r'cook(?:ing)?\s*time[:\s]*(\d+)\s*(?:min|minute|minutes)',
+            r'cook[:\s]*(\d+)\s*(?:min|minute|minutes)',
+            r'bake[:\s]*(\d+)\s*(?:min|minute|minutes)',
+        ]
+        
+        for pattern in patterns:
+            match = re.search(pattern, text, re.IGNORECASE)
+            if match:
+                return int(match.group(1))
+        
+        return None
+    
+    def _extract_servings(self, text: str) -> Optional[int]:
+        """Extract number of servings"""
+        patterns = [
+            r'serves?[:\s]*(\d+)',
+            r'servings?[:\s]*(\d+)',
+            r'yield[:\s]*(\d+)',
+            r'makes?[:\s]*(\d+)',
+            r'voor[:\s]*(\d+)\s*(?:personen?|people)',
+            r'(\d+)\s*(?:personen?|people)',
+            r'portions?[:\s]*(\d+)',
+            r'pour[:\s]*(\d+)\s*(?:personnes?)',
+        ]
+        
+        for pattern in patterns:
+            match = re.search(pattern, text, re.IGNORECASE)
+            if match:
+                return int(match.group(1))
+        
+        return None
+    
+    def _extract_ingredients(self, text: str) -> List[Dict[str, Any]]:
+        """Extract ingredients list"""
+        ingredients = []
+        
+        # Find ingredients section - support multiple languages with better patterns
+        ingredients_patterns = [
+            # English patterns
+            r'ingredients?[:\s]*\n(.*?)(?=\n\s*(?:instructions?|method|directions?|preparation|bereidingswijze)\s*[:\n]|$)',
+            # Dutch patterns - more specific
+            r'ingrediënten[:\s]*\n(.*?)(?=\n\s*(?:bereidingswijze|instructies?|methode|dressing)\s*[:\n]|$)',
+            r'ingrediënten[:\s]*(.*?)(?=bereidingswijze|instructies?|methode|dressing)',
+            # French patterns
+            r'ingrédients[:\s]*\n(.*?)(?=\n\s*(?:préparation|instructions?|méthode)\s*[:\n]|$)',
+            # Fallback - look for bullet point sections before instructions
+            r'((?:^\s*[●•*\-]\s*.+\n?)+)(?=.*(?:bereidingswijze|instructions?|method))',
+        ]
+        
+        ingredients_match = None
+        for pattern in ingredients_patterns:
+            ingredients_match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
+            if ingredients_match:
+                break
+        
+        if not ingredients_match:
+            # Try alternative patterns - look for bullet points or numbered lists
+            ingredients_match = re.search(
+                r'((?:^\s*[●•*-]\s*.+\n?)+)',
+                text,
+                re.MULTILINE
+            )
+        
+        if ingredients_match:
+            ingredients_text = ingredients_match.group(1).strip()
+            
+            # Check if ingredients are separated by bullet points on a single line
+            if '●' in ingredients_text or '•' in ingredients_text:
+                # Split by bullet points using regex to preserve content
+                ingredient_items = re.split(r'[●•]', ingredients_text)
+                # Remove empty items and clean up
+                ingredient_items = [item.strip() for item in ingredient_items if item.strip()]
+                
+                # Remove the first item if it's just the header (like "Ingrediënten:")
+                if ingredient_items and any(keyword in ingredient_items[0].lower() for keyword in ['ingrediënten', 'ingredients', 'ingrédients']):
+                    ingredient_items = ingredient_items[1:]
+            else:
+                # Normal line-by-line format
+                lines = ingredients_text.split('\n')
+                ingredient_items = []
+                for line in lines:
+                    line = line.strip()
+                    if line and (line.startswith('-') or line.startswith('•') or line.startswith('*') or 
+                               line.startswith('●') or re.match(r'^\d+\.?\s', line)):
+                        # Clean up the line
+                        ingredient_text = re.sub(r'^[●•*\-\d\.]\s*', '', line).strip()
+                        if ingredient_text:
+                            ingredient_items.append(ingredient_text)
+            
+            # Process each ingredient item
+            order = 0
+            for ingredient_text in ingredient_items:
+                ingredient_text = ingredient_text.strip()
+                if ingredient_text and self._is_valid_ingredient(ingredient_text):
+                    # Try to parse amount and ingredient name - support metric units
+                    amount_patterns = [
+                        r'^(\d+(?:[.,]\d+)?\s*(?:gram|g|ml|l|el|tl|theelepel|eetlepel|handjes?))\s+(.+)',
+                        r'^([\d\s/½¼¾]+(?:\s*(?:cups?|tbsp|tsp|oz|lb|g|kg|ml|l|gram|el|theelepel|eetlepel|handjes?))?)\s+(.+)',
+                    ]
+                    
+                    amount = ''
+                    name = ingredient_text
+                    
+                    for pattern in amount_patterns:
+                        amount_match = re.match(pattern, ingredient_text, re.IGNORECASE)
+                        if amount_match:
+                            amount = amount_match.group(1).strip()
+                            name = amount_match.group(2).strip()
+                            break
+                    
+                    # Final validation of the ingredient name
+                    if self._is_valid_ingredient_name(name):
+                        ingredients.append({
+                            'name': name,
+                            'amount': amount,
+                            'unit': '',
+                            'notes': '',
+                            'category': 'other',
+                            'order': order
+                        })
+                        order += 1
+        
+        return ingredients
+    
+    def _extract_instructions(self, text: str) -> List[str]:
+        """Extract cooking instructions"""
+        instructions = []
+        
+        # Find instructions section - support multiple languages with better patterns
+        instructions_patterns = [
+            # English patterns
+            r'(?:instructions?|method|directions?|preparation)[:\s]*\n(.*?)(?=\n\s*(?:notes?|tips?)\s*[:\n]|$)',
+            # Dutch patterns - more specific
+            r'bereidingswijze[:\s]*\n?(.*?)(?=\n\s*(?:opmerkingen?|tips?|dressing\s+ingrediënten)\s*[:\n]|$)',
+            r'bereidingswijze[:\s]*(.*?)(?=dressing\s+ingrediënten|$)',
+            # French patterns
+            r'(?:préparation|instructions?|méthode)[:\s]*\n(.*?)(?=\n\s*(?:notes?|conseils?)\s*[:\n]|$)',
+        ]
+        
+        instructions_match = None
+        for pattern in instructions_patterns:
+            instructions_match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
+            if instructions_match:
+                break
+        
+        if instructions_match:
+            instructions_text = instructions_match.group(1).strip()
+            
+            # First, try to split by newlines
+            lines = instructions_text.split('\n')
+            
+            # If no newlines or very few, try to split by sentences (periods followed by capital letter)
+            if len(lines) <= 2:
+                # Split on period followed by capital letter or period at end
+                sentences = re.split(r'\.(?=[A-Z])', instructions_text)
+                lines = [s.strip() + '.' for s in sentences if s.strip()]
+            
+            current_step = []
+            for line in lines:
+                line = line.strip()
+                if not line:
+                    continue
+                    
+                if re.match(r'^\d+\.?\s', line):
+                    # New numbered step
+                    if current_step:
+                        instructions.append(' '.join(current_step))
+                    current_step = [re.sub(r'^\d+\.?\s*', '', line)]
+                elif line.startswith('-') or line.startswith('•') or line.startswith('●'):
+                    # Bullet point step
+                    if current_step:
+                        instructions.append(' '.join(current_step))
+                    current_step = [re.sub(r'^[●•\-]\s*', '', line)]
+                else:
+                    # Check if this looks like a new sentence/step
+                    if current_step and len(line) > 20 and line[0].isupper():
+                        # Likely a new step
+                        instructions.append(' '.join(current_step))
+                        current_step = [line]
+                    else:
+                        # Continuation of current step
+                        current_step.append(line)
+            
+            # Add the last step
+            if current_step:
+                instructions.append(' '.join(current_step))
+        
+        return instructions
+    
+    def _extract_categories(self, text: str) -> List[str]:
+        """Extract recipe categories"""
+        categories = []
+        
+        # Look for common category keywords
+        category_keywords = {
+            'breakfast': ['breakfast', 'morning'],
+            'lunch': ['lunch', 'midday'],
+            'dinner': ['dinner', 'evening', 'supper'],
+            'dessert': ['dessert', 'sweet', 'cake', 'cookie'],
+            'appetizer': ['appetizer', 'starter', 'hors d\'oeuvre'],
+            'main course': ['main', 'entree', 'entrée'],
+            'side dish': ['side', 'accompaniment'],
+            'soup': ['soup', 'broth', 'bisque'],
+            'salad': ['salad', 'greens'],
+        }
+        
+        text_lower = text.lower()
+        for category, keywords in category_keywords.items():
+            if any(keyword in text_lower for keyword in keywords):
+                categories.append(category)
+        
+        return categories if categories else ['main course']
+    
+    def _extract_tags(self, text: str) -> List[str]:
+        """Extract recipe tags"""
+        tags = []
+        
+        # Look for common tag keywords
+        tag_keywords = {
+            'quick': ['quick', 'fast', '15 min', '20 min', '30 min'],
+            'easy': ['easy', 'simple', 'basic'],
+            'healthy': ['healthy', 'nutritious', 'low fat', 'low calorie'],
+            'vegetarian': ['vegetarian', 'veggie'],
+            'vegan': ['vegan'],
+            'gluten-free': ['gluten free', 'gluten-free'],
+            'dairy-free': ['dairy free', 'dairy-free'],
+            'spicy': ['spicy', 'hot', 'chili', 'pepper'],
+        }
+        
+        text_lower = text.lower()
+        for tag, keywords in tag_keywords.items():
+            if any(keyword in text_lower for keyword in keywords):
+                tags.append(tag)
+        
+        return tags
+    
+    def _is_valid_ingredient(self, text: str) -> bool:
+        """Check if text looks like a valid ingredient (not instructions)"""
+        if not text or len(text.strip()) < 2:
+            return False
+            
+        text_lower = text.lower().strip()
+        
+        # Skip if it contains obvious instruction keywords
+        instruction_keywords = [
+            'bereidingswijze', 'bereiding', 'snijd de', 'voeg de', 'haal de', 
+            'doe de', 'meng de', 'bereid het', 'was en', 'verwijder',
+            'pureer', 'giet', 'bewaar', 'serveer', 'maak de', 'bestrooi',
+            'instructions', 'method', 'cook the', 'add the', 'mix the'
+        ]
+        
+        if any(keyword in text_lower for keyword in instruction_keywords):
+            return False
+            
+        # Skip if it's too long (likely instructions)
+        if len(text) > 150:
+            return False
+            
+        # Skip if it contains multiple sentences
+        if text.count('.') > 1 and len(text) > 50:
+            return False
+            
+        return True
+    
+    def _is_valid_ingredient_name(self, name: str) -> bool:
+        """Validate that an ingredient name is reasonable"""
+        if not name or len(name.strip()) < 2:
+            return False
+            
+        name = name.strip()
+        
+        # Skip very long names (likely contain instructions)
+        if len(name) > 100:
+            return False
+            
+        # Skip names that are clearly instructions
+        instruction_starters = [
+            'bereid het', 'snijd de', 'voeg de', 'haal de', 'doe de',
+            'meng de', 'was en', 'verwijder', 'pureer', 'giet',
+            'cook the', 'add the', 'mix the', 'heat the'
+        ]
+        
+        name_lower = name.lower()
+        if any(name_lower.startswith(starter) for starter in instruction_starters):
+            return False
+            
+        return True
+
+
+class ReferenceRecipeTextParser:
+    """RecipeTextParser as it was before delegating to the parser engine"""
+    
+    def parse_recipe_text(self, text: str) -> Dict[str, Any]:
+        """
+        Parse extracted text to identify recipe components
+        
+        Args:
+            text: Raw extracted text
+            
+        Returns:
+            Dictionary with parsed recipe components
+        """
+        if not text or not text.strip():
+            return {
+                'success': False,
+                'error': 'No text to parse',
+                'recipe_data': {}
+            }
+        
+        try:
+            recipe_data = {
+                'title': self._extract_title(text),
+                'ingredients': self._extract_ingredients(text),
+                'instructions': self._extract_instructions(text),
+                'prep_time': self._extract_prep_time(text),
+                'cook_time': self._extract_cook_time(text),
+                'servings': self._extract_servings(text),
+                'description': self._extract_description(text)
+            }
+            
+            return {
+                'success': True,
+                'recipe_data': recipe_data,
+                'raw_text': text[:500] + '...' if len(text) > 500 else text
+            }
+            
+        except Exception as e:
+            logger.error(f"Recipe text parsing failed: {e}")
+            return {
+                'success': False,
+                'error': str(e),
+                'recipe_data': {},
+                'raw_text': text[:500] + '...' if len(text) > 500 else text
+            }
+    
+    def _extract_title(self, text: str) -> str:
+        """Extract recipe title from text"""
+        lines = text.split('\n')
+        
+        # Look for title patterns
+        for line in lines[:5]:  # Check first 5 lines
+            line = line.strip()
+            if len(line) > 5 and len(line) < 100:
+                # Skip lines that look like ingredients or instructions
+                if not re.search(r'^\d+\s*(cups?|tbsp|tsp|ml|gram|kg)', line.lower()):
+                    if not line.lower().startswith(('step', 'instruction', 'method')):
+                        return line
+        
+        return "Imported Recipe"
+    
+    def _extract_ingredients(self, text: str) -> List[str]:
+        """Extract ingredients list from text"""
+        ingredients = []
+        
+        # First try to find ingredients section
+        ingredients_match = re.search(r'INGREDIENTS?:?\s*(.*?)(?:INSTRUCTIONS?|METHOD|DIRECTIONS?|$)', text, re.IGNORECASE | re.DOTALL)
+        
+        if ingredients_match:
+            ingredients_text = ingredients_match.group(1)
+            
+            # Split by common patterns and clean up
+            # Look for measurement patterns in continuous text
+            ingredient_patterns = [
+                r'(\d+(?:\s*\d+/\d+)?\s*(?:cups?|tbsp|tsp|ml|gram|kg|oz|lb|g)\s+[^.]+?)(?=\d+(?:\s*\d+/\d+)?\s*(?:cups?|tbsp|tsp|ml|gram|kg|oz|lb|g)|$)',
+                r'(\d+\s+[^.]+?)(?=\d+\s+|$)',  # Simple number + ingredient
+                r'([•-]\s*[^•-]+?)(?=[•-]|$)',  # Bullet points
+            ]
+            
+            for pattern in ingredient_patterns:
+                matches = re.findall(pattern, ingredients_text, re.IGNORECASE)
+                for match in matches:
+                    ingredient = match.strip()
+                    if len(ingredient) > 3 and ingredient not in ingredients:
+                        ingredients.append(ingredient)
+        
+        # Fallback: look for lines with measurements
+        if not ingredients:
+            lines = text.split('\n')
+            for line in lines:
+                line = line.strip()
+                if re.search(r'\d+\s*(cups?|tbsp|tsp|ml|gram|kg|oz|lb)', line, re.IGNORECASE):
+                    if len(line) > 3:
+                        ingredients.append(line)
+        
+        return ingredients[:20]  # Limit to 20 ingredients
+    
+    def _extract_instructions(self, text: str) -> List[str]:
+        """Extract cooking instructions from text"""
+        instructions = []
+        
+        # First try to find instructions section
+        instructions_match = re.search(r'(?:INSTRUCTIONS?|METHOD|DIRECTIONS?):?\s*(.*?)$', text, re.IGNORECASE | re.DOTALL)
+        
+        if instructions_match:
+            instructions_text = instructions_match.group(1)
+            
+            # Look for numbered steps in continuous text
+            step_pattern = r'(\d+\.\s*[^.]+?\.)'
+            matches = re.findall(step_pattern, instructions_text)
+            
+            for match in matches:
+                instruction = match.strip()
+                if len(instruction) > 10:
+                    # Clean up the instruction
+                    instruction = re.sub(r'^\d+\.\s*', '', instruction)  # Remove number
+                    instructions.append(instruction.strip())
+        
+        # Fallback: look for numbered lines
+        if not instructions:
+            lines = text.split('\n')
+            for line in lines:
+                line = line.strip()
+                if re.match(r'^\d+\.\s*', line) and len(line) > 10:
+                    instruction = re.sub(r'^\d+\.\s*', '', line)
+                    instructions.append(instruction.strip())
+        
+        return instructions[:15]  # Limit to 15 steps
+    
+    def _extract_prep_time(self, text: str) -> Optional[int]:
+        """Extract preparation time in minutes"""
+        patterns = [
+            r'prep(?:aration)?\s*time:?\s*(\d+)\s*(?:min|minutes?)',
+            r'prep:?\s*(\d+)\s*(?:min|minutes?)',
+            r'preparation:?\s*(\d+)\s*(?:min|minutes?)',
+        ]
+        
+        for pattern in patterns:
+            match = re.search(pattern, text, re.IGNORECASE)
+            if match:
+                return int(match.group(1))
+        
+        return None
+    
+    def _extract_cook_time(self, text: str) -> Optional[int]:
+        """Extract cooking time in minutes"""
+        patterns = [
+            r'cook(?:ing)?\s*time:?\s*(\d+)\s*(?:min|minutes?)',
+            r'cook:?\s*(\d+)\s*(?:min|minutes?)',
+            r'bake:?\s*(\d+)\s*(?:min|minutes?)',
+        ]
+        
+        for pattern in patterns:
+            match = re.search(pattern, text, re.IGNORECASE)
+            if match:
+                return int(match.group(1))
+        
+        return None
+    
+    def _extract_servings(self, text: str) -> Optional[int]:
+        """Extract number of servings"""
+        patterns = [
+            r'serves?:?\s*(\d+)',
+            r'servings?:?\s*(\d+)',
+            r'portions?:?\s*(\d+)',
+            r'for\s*(\d+)\s*people',
+        ]
+        
+        for pattern in patterns:
+            match = re.search(pattern, text, re.IGNORECASE)
+            if match:
+                return int(match.group(1))
+        
+        return None
+    
+    def _extract_description(self, text: str) -> str:
+        """Extract recipe description"""
+        lines = text.split('\n')
+        
+        # Look for description in first few lines
+        for line in lines[:3]:
+            line = line.strip()
+            if len(line) > 20 and len(line) < 200:
+                # Skip title-like lines and ingredient lines
+                if not re.search(r'^\d+\s*(cups?|tbsp|tsp)', line.lower()):
+                    if not line.isupper():  # Skip all-caps titles
+                        return line
+        
+        return ""
@@ -0,0 +1,174 @@
+"""
+Parsed PDF upload shared by validation, extraction and import
+
+Validation, preview and import each used to open the upload with their own
+PyPDF2.PdfReader and extract the text of the same pages again. A PDFDocument
+is created once per upload (per request or import job) and handed to all of
+them; it builds the reader, counts the pages, extracts page text and hashes
+the bytes at most once, and only when something asks for it.
+"""
+import logging
+from typing import Dict, Iterator, Optional, Tuple
+
+import PyPDF2
+
+from . import import_cache
+
+logger = logging.getLogger(__name__)
+
+
+class PDFDocument:
+    """Lazily parsed PDF upload"""
+
+    def __init__(self, file):
+        """
+        Args:
+            file: Uploaded PDF file (or any Django File)
+        """
+        self.file = file
+        self._reader = None
+        self._digest = None
+        self._page_texts: Dict[int, str] = {}
+
+    @classmethod
+    def of(cls, file) -> 'PDFDocument':
+        """Return the document for an upload, or the document itself when given one"""
+        return file if isinstance(file, cls) else cls(file)
+
+    @property
+    def name(self) -> str:
+        return self.file.name
+
+    @property
+    def size(self) -> Optional[int]:
+        return self.file.size
+
+    @property
+    def content_type(self) -> Optional[str]:
+        return getattr(self.file, 'content_type', None)
+
+    @property
+    def reader(self) -> PyPDF2.PdfReader:
+        """PdfReader over the upload, raises if the bytes are not a readable PDF"""
+        if self._reader is None:
+            self.file.seek(0)
+            self._reader = PyPDF2.PdfReader(self.file)
+        return self._reader
+
+    @property
+    def page_count(self) -> int:
+        return len(self.reader.pages)
+
+    @property
+    def digest(self) -> str:
+        """SHA-256 of the upload, see import_cache.file_digest"""
+        if self._digest is None:
+            self._digest = import_cache.file_digest(self.file)
+        return self._digest
+
+    @property
+    def declared_page_count(self) -> int:
+        """Page count from the /Count of the page tree root, without walking the tree"""
+        pages = self.reader.trailer['/Root'].get_object()['/Pages'].get_object()
+        count = pages.get('/Count')
+        return int(count) if count is not None else self.page_count
+
+    def read_bytes(self, offset: int, size: int) -> bytes:
+        """
+        Read raw bytes of the upload
+
+        Args:
+            offset: Position to read from, negative offsets count from the end
+            size: Number of bytes to read at most
+
+        Returns:
+            The bytes read
+        """
+        if offset < 0:
+            offset = max(0, self.size + offset)
+        self.file.seek(offset)
+        data = self.file.read(size)
+        self.file.seek(0)
+        return data
+
+    def first_page_has_fonts(self) -> bool:
+        """
+        Check whether the first page can contain a text layer
+
+        Only dictionaries are read: the page tree is followed to the first
+        leaf, and that page (or a form XObject it draws) must reference a
+        font. Content streams are not decoded, so a page whose fonts are
+        never used still counts as having text.
+        """
+        node = self.reader.trailer['/Root'].get_object()['/Pages'].get_object()
+        resources = node.get('/Resources')
+        while '/Kids' in node:
+            kids = node['/Kids']
+            if not kids:
+                return False
+            node = kids[0].get_object()
+            # Resources are inherited from the parent page tree nodes
+            resources = node.get('/Resources', resources)
+
+        if resources is None:
+            return False
+        resources = resources.get_object()
+        if resources.get('/Font'):
+            return True
+
+        xobjects = resources.get('/XObject')
+        if xobjects:
+            for xobject in xobjects.get_object().values():
+                xobject = xobject.get_object()
+                form_resources = xobject.get('/Resources')
+                if xobject.get('/Subtype') == '/Form' and form_resources and form_resources.get_object().get('/Font'):
+                    return True
+        return False
+
+    def page_text(self, index: int, cache: bool = True) -> str:
+        """
+        Text of a page, extracted on first access
+
+        Args:
+            index: Page index starting at 0
+            cache: Keep the text for later calls. Imports that walk a whole
+                document once pass False so only one page is held at a time
+
+        Returns:
+            Extracted page text
+        """
+        text = self._page_texts.get(index)
+        if text is None:
+            text = self.reader.pages[index].extract_text()
+            if cache:
+                self._page_texts[index] = text
+        return text
+
+    def cache_page_text(self, index: int, text: str):
+        """Keep the text of a page extracted elsewhere (e.g. in a pool process)"""
+        self._page_texts[index] = text
+
+    def iter_page_texts(self, max_pages: int, skip_errors: bool = False,
+                        start: int = 0, cache: bool = True) -> Iterator[Tuple[int, str]]:
+        """
+        Extract the text of the document page by page
+
+        Args:
+            max_pages: Number of pages to read at most
+            skip_errors: Log and skip pages whose text cannot be extracted
+                instead of raising
+            start: Index of the first page to extract
+            cache: Keep the extracted texts, see page_text
+
+        Yields:
+            Tuples of (page number starting at 1, page text)
+        """
+        for index in range(start, min(self.page_count, max_pages)):
+            try:
+                text = self.page_text(index, cache)
+            except Exception as e:
+                if not skip_errors:
+                    raise
+                logger.warning(f"Failed to extract text from page {index + 1}: {e}")
+                continue
+            yield index + 1, text
@@ -0,0 +1,281 @@
+"""
+Quantity and unit parsing for ingredients
+
+Imported ingredients arrive as whole lines ("- 2 el olijfolie"). The parser
+splits such a line into the amount as written ("2 el"), a numeric quantity
+(Decimal('2')), a canonical unit ('tbsp') and the name ("olijfolie"), so
+shopping lists can add up quantities in SQL instead of joining strings.
+
+Supported quantities: integers and decimals (with a point or the Dutch
+comma), fractions ("1/2", "1 1/2", "½", "1½"), ranges ("2-3", "2 tot 3",
+counted as their upper bound so a shopping list buys enough), packs
+("2 x 400 g" is 800 g) and number words ("een", "twee", "a", "half"),
+optionally after a word such as "ca." or "circa". The same amount in other
+units after a slash ("250g/8oz") is left out of the name. Units, number words and those words
+come from the ingredient_units, quantity_words and quantity_approximations
+keyword sets in recipes/keywords/, so a language adds its units in its own
+file; each alias maps to one canonical unit (metric symbols, 'pond',
+'tbsp', 'tsp', 'cup', 'pinch', 'clove', ...).
+
+All aliases and forms are compiled into one anchored regular expression on
+first use, so parsing a line is a single match plus a dict lookup.
+"""
+import re
+import logging
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from django.conf import settings
+
+from .keyword_matcher import load_keyword_sets
+
+logger = logging.getLogger(__name__)
+
+VULGAR_FRACTIONS = {
+    '½': '1/2', '¼': '1/4', '¾': '3/4', '⅓': '1/3', '⅔': '2/3',
+    '⅛': '1/8', '⅜': '3/8', '⅝': '5/8', '⅞': '7/8',
+}
+
+# Ingredient.quantity is a DecimalField(max_digits=10, decimal_places=3)
+QUANTITY_PLACES = Decimal('0.001')
+MAX_QUANTITY = Decimal('9999999')
+
+RANGE_SEPARATORS = ['-', '–', 'tot', 'to', 'à', 'a', 'or', 'of', 'ou']
+
+# Separators of a pack count and its contents ('2 x 400 g')
+PACK_SEPARATORS = 'x×*'
+
+
+class ParsedIngredient(NamedTuple):
+    """An ingredient line split into its parts"""
+    quantity: Optional[Decimal]
+    unit: str
+    amount: str
+    name: str
+
+
+@lru_cache(maxsize=None)
+def unit_aliases() -> Dict[str, str]:
+    """Lowercase alias -> canonical unit, from the ingredient_units keyword sets"""
+    aliases = {}
+    for unit, words in load_keyword_sets()['ingredient_units'].items():
+        aliases[unit] = unit
+        for word in words:
+            aliases[word.lower()] = unit
+    return aliases
+
+
+@lru_cache(maxsize=None)
+def quantity_words() -> Dict[str, Decimal]:
+    """Lowercase number word -> value, from the quantity_words keyword sets"""
+    return {
+        word.lower(): Decimal(value).quantize(QUANTITY_PLACES)
+        for value, words in load_keyword_sets()['quantity_words'].items()
+        for word in words
+    }
+
+
+@lru_cache(maxsize=None)
+def approximations() -> Tuple[str, ...]:
+    """Words before a quantity that do not change it ('ca.', 'circa'), from the quantity_approximations keyword sets"""
+    return tuple(word.lower() for word in load_keyword_sets().get('quantity_approximations', []))
+
+
+def _alternation(words) -> str:
+    """Regex alternation of words, longest first so 'eetlepels' wins over 'el'"""
+    return '|'.join(
+        re.escape(word).replace(r'\ ', r'\s+')
+        for word in sorted(words, key=len, reverse=True)
+    )
+
+
+@lru_cache(maxsize=None)
+def ingredient_pattern() -> re.Pattern:
+    """Compile the ingredient line pattern from the keyword sets"""
+    fractions = ''.join(VULGAR_FRACTIONS)
+    number = rf'(?:\d+\s*[{fractions}]|[{fractions}]|\d+\s+\d+/\d+|\d+/\d+|\d+(?:[.,]\d+)?)'
+    # Word separators only between two numbers: 'a' in '1 a 2' but not in 'a pinch of salt'
+    separator = rf'\s*(?:-|–|(?:{_alternation(RANGE_SEPARATORS[2:])})(?=\s+[\d{fractions}]))\s*'
+    unit = rf'(?:{_alternation(unit_aliases())})(?![^\W\d_])'
+    approximation = rf'(?:(?:{_alternation(approximations())})(?![^\W\d_])\s*(?=[\d{fractions}]))?'
+    pack = rf'(?:(?P<packs>\d+)\s*[{PACK_SEPARATORS}]\s*(?=[\d{fractions}]))?'
+
+    return re.compile(
+        r'^[\s\-–•*·]*'
+        r'(?P<amount>'
+        rf'(?:{approximation}{pack}(?P<quantity>{number})(?:{separator}(?P<upper>{number}))?'
+        rf'|(?P<word>{_alternation(quantity_words())})(?=\s))'
+        rf'(?:\s*(?P<unit>{unit})\.?)?'
+        rf'|(?P<bare_unit>{unit})\.?'
+        r')'
+        # The same amount in other units ('250g/8oz flour') is dropped
+        rf'(?:\s*/\s*{number}\s*{unit}\.?)?'
+        r'(?:\s+of(?=\s))?\s*'
+        r'(?P<name>.*?)\s*$',
+        re.IGNORECASE
+    )
+
+
+def to_number(text: str) -> Optional[Decimal]:
+    """
+    Convert a written number ('1,5', '1 1/2', '1½') to a Decimal
+
+    Returns:
+        The number rounded to QUANTITY_PLACES, None if it cannot be stored
+    """
+    for char, fraction in VULGAR_FRACTIONS.items():
+        text = text.replace(char, f' {fraction}')
+
+    total = Decimal(0)
+    try:
+        for part in text.split():
+            if '/' in part:
+                numerator, denominator = part.split('/')
+                total += Decimal(numerator) / Decimal(denominator)
+            else:
+                total += Decimal(part.replace(',', '.'))
+    except (InvalidOperation, ArithmeticError):
+        return None
+
+    if total > MAX_QUANTITY:
+        return None
+    return total.quantize(QUANTITY_PLACES)
+
+
+def canonical_unit(unit: str) -> str:
+    """Return the canonical unit for a unit as written, unknown units unchanged"""
+    unit = unit.strip()
+    return unit_aliases().get(unit.lower().rstrip('.'), unit)
+
+
+def _parse(text: str) -> Optional[ParsedIngredient]:
+    """Match the ingredient pattern, None when the text starts with no quantity or unit"""
+    match = ingredient_pattern().match(text)
+    if match is None:
+        return None
+
+    if match.group('word'):
+        quantity = quantity_words()[match.group('word').lower()]
+    elif match.group('quantity'):
+        quantity = to_number(match.group('upper') or match.group('quantity'))
+        if quantity is not None and match.group('packs'):
+            quantity = quantity * int(match.group('packs'))
+            quantity = quantity if quantity <= MAX_QUANTITY else None
+    else:
+        quantity = None
+
+    unit = match.group('unit') or match.group('bare_unit') or ''
+    return ParsedIngredient(
+        quantity=quantity,
+        unit=canonical_unit(unit) if unit else '',
+        amount=' '.join(match.group('amount').split()),
+        name=match.group('name'),
+    )
+
+
+def parse_ingredient_line(text: str) -> Optional[ParsedIngredient]:
+    """
+    Split an ingredient line into quantity, unit, amount and name
+
+    Args:
+        text: Ingredient line, e.g. '- 2 1/2 el olijfolie'
+
+    Returns:
+        ParsedIngredient, None when the line does not start with a quantity
+        or unit or has no name after it
+    """
+    parsed = _parse(text)
+    return parsed if parsed is not None and parsed.name else None
+
+
+def parse_amount(amount: str) -> Tuple[Optional[Decimal], str]:
+    """
+    Parse an amount as entered in the recipe form, e.g. '3 eetlepels'
+
+    Only a note in brackets or after a comma may follow the unit ('1 blik
+    (400 g)'); other text ('1e', '5 5 5', '2 grote') is not an amount.
+
+    Returns:
+        Tuple of (quantity or None, canonical unit or '')
+    """
+    parsed = _parse(amount)
+    if parsed is None or (parsed.name and parsed.name[0] not in '(,'):
+        return None, ''
+    return parsed.quantity, parsed.unit
+
+
+def fill_quantity(ingredient) -> bool:
+    """
+    Set quantity and canonical unit of an Ingredient from its text fields
+
+    An ingredient with an amount gets quantity and unit from it; one without
+    (a whole imported line) is split into amount, unit and name. A unit that
+    was set explicitly is kept, in its canonical spelling.
+
+    Args:
+        ingredient: Ingredient instance, changed in place
+
+    Returns:
+        True if any field changed
+    """
+    before = (ingredient.name, ingredient.amount, ingredient.unit, ingredient.quantity)
+
+    if ingredient.amount:
+        quantity, unit = parse_amount(ingredient.amount)
+    else:
+        parsed = parse_ingredient_line(ingredient.name)
+        quantity, unit = (parsed.quantity, parsed.unit) if parsed else (None, '')
+        if parsed is not None:
+            ingredient.name = parsed.name
+            ingredient.amount = parsed.amount
+
+    ingredient.quantity = quantity
+    ingredient.unit = canonical_unit(ingredient.unit) if ingredient.unit else unit
+
+    return (ingredient.name, ingredient.amount, ingredient.unit, ingredient.quantity) != before
+
+
+def backfill_quantities(queryset=None, batch_size: int = None, dry_run: bool = False) -> Dict[str, Any]:
+    """
+    Fill quantity and unit of stored ingredients, one bulk_update per batch
+
+    Args:
+        queryset: Ingredients to process, those without a quantity by default
+        batch_size: Rows read and written per batch, defaults to BULK_IMPORT_BATCH_SIZE
+        dry_run: Only count the changes
+
+    Returns:
+        Statistics: ingredients scanned, updated and with a quantity afterwards
+    """
+    from .models import Ingredient
+
+    batch_size = batch_size or settings.BULK_IMPORT_BATCH_SIZE
+    if queryset is None:
+        queryset = Ingredient.objects.filter(quantity__isnull=True)
+
+    stats = {'scanned': 0, 'updated': 0, 'with_quantity': 0}
+    rows = (
+        queryset
+        .only('id', 'name', 'amount', 'unit', 'quantity')
+        .order_by('pk')
+        .iterator(chunk_size=batch_size)
+    )
+
+    batch = []
+    for ingredient in rows:
+        stats['scanned'] += 1
+        if fill_quantity(ingredient):
+            stats['updated'] += 1
+            batch.append(ingredient)
+        if ingredient.quantity is not None:
+            stats['with_quantity'] += 1
+        if len(batch) >= batch_size:
+            if not dry_run:
+                Ingredient.objects.bulk_update(batch, ['name', 'amount', 'unit', 'quantity'])
+            batch = []
+    if batch and not dry_run:
+        Ingredient.objects.bulk_update(batch, ['name', 'amount', 'unit', 'quantity'])
+
+    logger.info(f"Backfilled quantities of {stats['updated']} of {stats['scanned']} ingredients")
+    return stats
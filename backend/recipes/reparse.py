@@ -0,0 +1,190 @@
+"""
+Re-run the current recipe parser over stored imports
+
+Imports keep their full extracted text, zlib-compressed, on
+SourceMetadata.raw_text_compressed. When the parser improves, RecipeReparser
+streams those rows with iterator(chunk_size=...), parses the texts in a
+process pool and writes the recipes whose result changed back in batches:
+one bulk_update for the recipes, and a delete plus bulk_create for their
+ingredients. A dry run only reports what would change.
+
+Imports from before the full text was kept (only the 1000-character
+preview in raw_text) are skipped, as are recipes edited after their import
+unless include_edited is set, so user changes are not overwritten.
+"""
+import logging
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+
+from .import_pipeline import classify_recipe
+from .models import Recipe, Ingredient, SourceMetadata
+from .text_extraction_service import EnhancedRecipeImportService, RecipeTextParser
+from .workers import create_process_pool
+
+logger = logging.getLogger(__name__)
+
+# Recipe fields filled from the parse result, see build_recipe_objects
+REPARSED_FIELDS = ['title', 'description', 'prep_time', 'cook_time', 'servings', 'instructions', 'categories', 'tags']
+
+INGREDIENT_FIELDS = ('name', 'amount', 'unit', 'quantity', 'notes')
+
+
+def parse_text(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Parse the text of one import (runs inside a pool process)
+
+    Returns:
+        Parsed recipe data, None when the text holds no recipe
+    """
+    result = RecipeTextParser().parse_recipe_text(text)
+    if not result['success']:
+        return None
+    classify_recipe(result['recipe_data'], text)
+    return result['recipe_data']
+
+
+class RecipeReparser:
+    """Parse stored import texts again and update the recipes that changed"""
+
+    def __init__(self, processes: int = None, batch_size: int = None,
+                 dry_run: bool = False, include_edited: bool = False):
+        """
+        Args:
+            processes: Parser processes, 0 parses in this process; defaults to BULK_IMPORT_PROCESSES
+            batch_size: Rows read and written per batch, defaults to BULK_IMPORT_BATCH_SIZE
+            dry_run: Only count the changes, write nothing
+            include_edited: Also reparse recipes changed after their import
+        """
+        self.processes = settings.BULK_IMPORT_PROCESSES if processes is None else processes
+        self.batch_size = batch_size or settings.BULK_IMPORT_BATCH_SIZE
+        self.dry_run = dry_run
+        self.include_edited = include_edited
+        self.service = EnhancedRecipeImportService()
+
+    def reparse(self, queryset=None) -> Dict[str, Any]:
+        """
+        Reparse the imports in a SourceMetadata queryset (all imports by default)
+
+        Returns:
+            Statistics: rows scanned, skipped, failed, unchanged and changed,
+            changes per recipe field and ingredients added and removed
+        """
+        queryset = SourceMetadata.objects.all() if queryset is None else queryset
+        stats = {
+            'scanned': 0,
+            'skipped_no_text': 0,
+            'skipped_edited': 0,
+            'failed': 0,
+            'unchanged': 0,
+            'changed': 0,
+            'fields': Counter(),
+            'ingredients_added': 0,
+            'ingredients_removed': 0,
+        }
+
+        rows = (
+            queryset
+            .select_related('recipe')
+            .prefetch_related('recipe__ingredients')
+            .order_by('pk')
+            .iterator(chunk_size=self.batch_size)
+        )
+
+        pool = create_process_pool(self.processes) if self.processes > 0 else None
+        try:
+            batch = []
+            for metadata in rows:
+                stats['scanned'] += 1
+                if metadata.raw_text_compressed is None:
+                    stats['skipped_no_text'] += 1
+                    continue
+                if not self.include_edited and metadata.recipe.updated_at > metadata.import_date:
+                    stats['skipped_edited'] += 1
+                    continue
+                batch.append(metadata)
+                if len(batch) >= self.batch_size:
+                    self._process_batch(batch, pool, stats)
+                    batch = []
+            self._process_batch(batch, pool, stats)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        stats['fields'] = dict(stats['fields'])
+        return stats
+
+    def _process_batch(self, batch: List[SourceMetadata], pool, stats: Dict[str, Any]):
+        """Parse a batch of imports and write the recipes that changed"""
+        if not batch:
+            return
+
+        texts = [metadata.full_text for metadata in batch]
+        if pool is None:
+            results = [parse_text(text) for text in texts]
+        else:
+            results = list(pool.map(parse_text, texts, chunksize=max(1, len(texts) // (self.processes * 4))))
+
+        changed_recipes, new_ingredients = [], []
+        for metadata, recipe_data in zip(batch, results):
+            if recipe_data is None:
+                stats['failed'] += 1
+                continue
+
+            recipe = metadata.recipe
+            fields, ingredients, added, removed = self._diff(recipe, recipe_data, metadata)
+            if not fields and ingredients is None:
+                stats['unchanged'] += 1
+                continue
+
+            stats['changed'] += 1
+            stats['fields'].update(fields)
+            if ingredients is not None:
+                stats['fields']['ingredients'] += 1
+                stats['ingredients_added'] += added
+                stats['ingredients_removed'] += removed
+                new_ingredients.append((recipe, ingredients))
+            changed_recipes.append(recipe)
+
+        if self.dry_run or not changed_recipes:
+            return
+
+        with transaction.atomic():
+            Recipe.objects.bulk_update(changed_recipes, REPARSED_FIELDS)
+            Ingredient.objects.filter(recipe__in=[recipe for recipe, _ in new_ingredients]).delete()
+            Ingredient.objects.bulk_create([ingredient for _, ingredients in new_ingredients for ingredient in ingredients])
+        logger.info(f"Reparsed {len(changed_recipes)} recipes")
+
+    def _diff(self, recipe: Recipe, recipe_data: Dict[str, Any],
+              metadata: SourceMetadata) -> Tuple[List[str], Optional[List[Ingredient]], int, int]:
+        """
+        Apply a parse result to a recipe in memory
+
+        Returns:
+            Tuple of (changed recipe fields, new ingredients or None when they
+            are unchanged, number of ingredients added, number removed)
+        """
+        # The parsed Recipe is only compared, it needs no user
+        parsed, ingredients, _ = self.service.build_recipe_objects(
+            {'recipe_data': recipe_data}, None, metadata.original_filename
+        )
+
+        fields = []
+        for field in REPARSED_FIELDS:
+            value = getattr(parsed, field)
+            if getattr(recipe, field) != value:
+                setattr(recipe, field, value)
+                fields.append(field)
+
+        old = [tuple(getattr(ingredient, field) for field in INGREDIENT_FIELDS) for ingredient in recipe.ingredients.all()]
+        new = [tuple(getattr(ingredient, field) for field in INGREDIENT_FIELDS) for ingredient in ingredients]
+        if old == new:
+            return fields, None, 0, 0
+
+        for ingredient in ingredients:
+            ingredient.recipe = recipe
+        added = sum((Counter(new) - Counter(old)).values())
+        removed = sum((Counter(old) - Counter(new)).values())
+        return fields, ingredients, added, removed
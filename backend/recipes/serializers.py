@@ -1,7 +1,28 @@
+import zipfile
+
 from rest_framework import serializers
 from django.conf import settings
-from .models import Recipe, Ingredient, SourceMetadata
+from .models import (
+    Recipe, Ingredient, SourceMetadata, ImportJob, ImportMode, ChunkedUpload, ChunkedUploadPurpose
+)
 from .image_utils import validate_image_file, get_image_url
+from .quantity_parser import fill_quantity
+from .ingredient_classifier import classify_ingredients
+
+
+def create_ingredients(recipe, ingredients_data):
+    """
+    Save ingredients with the quantity and canonical unit parsed from their amount
+
+    Ingredients left in the 'other' category are classified from their name.
+    """
+    ingredients = []
+    for ingredient_data in ingredients_data:
+        ingredient = Ingredient(recipe=recipe, **ingredient_data)
+        fill_quantity(ingredient)
+        ingredients.append(ingredient)
+    classify_ingredients(ingredients)
+    return Ingredient.objects.bulk_create(ingredients)
 
 
 class IngredientSerializer(serializers.ModelSerializer):
@@ -10,10 +31,10 @@ class IngredientSerializer(serializers.ModelSerializer):
     class Meta:
         model = Ingredient
         fields = [
-            'id', 'name', 'amount', 'unit', 'notes', 
+            'id', 'name', 'amount', 'unit', 'quantity', 'notes', 
             'category', 'order'
         ]
-        read_only_fields = ['id']
+        read_only_fields = ['id', 'quantity']
 
 
 class SourceMetadataSerializer(serializers.ModelSerializer):
@@ -24,7 +45,8 @@ class SourceMetadataSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'original_filename', 'file_size', 'page_count',
             'import_date', 'import_success', 'import_warnings', 
-            'import_errors', 'raw_text'
+            'import_errors', 'raw_text', 'extraction_method', 'text_size',
+            'stage_timings'
         ]
         read_only_fields = ['id', 'import_date']
 
@@ -69,8 +91,7 @@ class RecipeSerializer(serializers.ModelSerializer):
         ingredients_data = validated_data.pop('ingredients', [])
         recipe = Recipe.objects.create(**validated_data)
         
-        for ingredient_data in ingredients_data:
-            Ingredient.objects.create(recipe=recipe, **ingredient_data)
+        create_ingredients(recipe, ingredients_data)
         
         return recipe
     
@@ -89,8 +110,7 @@ class RecipeSerializer(serializers.ModelSerializer):
             instance.ingredients.all().delete()
             
             # Create new ingredients
-            for ingredient_data in ingredients_data:
-                Ingredient.objects.create(recipe=instance, **ingredient_data)
+            create_ingredients(instance, ingredients_data)
         
         return instance
 
@@ -116,6 +136,12 @@ class RecipeImportSerializer(serializers.Serializer):
     file = serializers.FileField(
         help_text="PDF or image file containing the recipe"
     )
+    # ZIP archives have their own endpoint (RecipeBulkImportSerializer)
+    mode = serializers.ChoiceField(
+        choices=[(mode.value, mode.label) for mode in (ImportMode.SINGLE, ImportMode.COOKBOOK)],
+        default=ImportMode.SINGLE,
+        help_text="'cookbook' splits a PDF with many recipes into one recipe each"
+    )
     
     def validate_file(self, value):
         """Validate the uploaded file"""
@@ -127,9 +153,73 @@ class RecipeImportSerializer(serializers.Serializer):
                 f"Only PDF and image files are allowed. Supported formats: {', '.join(allowed_extensions)}"
             )
         
+        return value
+    
+    def validate(self, attrs):
+        """Check the file size against the limit of the import mode"""
+        file = attrs['file']
+        
+        if attrs['mode'] == ImportMode.COOKBOOK:
+            if not file.name.lower().endswith('.pdf'):
+                raise serializers.ValidationError({'file': "Cookbook imports require a PDF file."})
+            if file.size > settings.COOKBOOK_IMPORT_MAX_SIZE:
+                raise serializers.ValidationError(
+                    {'file': f"Cookbook size cannot exceed {settings.COOKBOOK_IMPORT_MAX_SIZE // (1024 * 1024)}MB."}
+                )
         # Check file size (10MB limit)
-        if value.size > 10 * 1024 * 1024:
-            raise serializers.ValidationError("File size cannot exceed 10MB.")
+        elif file.size > 10 * 1024 * 1024:
+            raise serializers.ValidationError({'file': "File size cannot exceed 10MB."})
+        
+        return attrs
+
+
+class ImportedIngredientSerializer(serializers.Serializer):
+    """Ingredient as edited in an import preview"""
+    
+    name = serializers.CharField(max_length=1000)
+    amount = serializers.CharField(max_length=500, required=False, allow_blank=True)
+    unit = serializers.CharField(max_length=100, required=False, allow_blank=True)
+    notes = serializers.CharField(max_length=1000, required=False, allow_blank=True)
+
+
+class RecipeImportCommitSerializer(serializers.Serializer):
+    """Serializer for saving a previewed import, optionally with edited fields"""
+    
+    preview_token = serializers.CharField(
+        help_text="Token returned by the preview"
+    )
+    title = serializers.CharField(max_length=1000, required=False)
+    description = serializers.CharField(required=False, allow_blank=True)
+    prep_time = serializers.IntegerField(min_value=0, required=False, allow_null=True)
+    cook_time = serializers.IntegerField(min_value=0, required=False, allow_null=True)
+    servings = serializers.IntegerField(min_value=0, required=False, allow_null=True)
+    instructions = serializers.ListField(child=serializers.CharField(), required=False)
+    ingredients = ImportedIngredientSerializer(many=True, required=False)
+    categories = serializers.ListField(child=serializers.CharField(), required=False)
+    tags = serializers.ListField(child=serializers.CharField(), required=False)
+
+
+class RecipeBulkImportSerializer(serializers.Serializer):
+    """Serializer for bulk import of a ZIP archive with recipe files"""
+    
+    file = serializers.FileField(
+        help_text="ZIP archive containing PDF and image recipe files"
+    )
+    
+    def validate_file(self, value):
+        """Validate the uploaded archive"""
+        if not value.name.lower().endswith('.zip'):
+            raise serializers.ValidationError("Only ZIP archives are allowed.")
+        
+        if value.size > settings.BULK_IMPORT_MAX_SIZE:
+            raise serializers.ValidationError(
+                f"Archive size cannot exceed {settings.BULK_IMPORT_MAX_SIZE // (1024 * 1024)}MB."
+            )
+        
+        # Rejected here rather than by the import worker
+        if not zipfile.is_zipfile(value):
+            raise serializers.ValidationError("Invalid ZIP archive.")
+        value.seek(0)
         
         return value
 
@@ -143,6 +233,8 @@ class ImportValidationResultSerializer(serializers.Serializer):
     file_size_bytes = serializers.IntegerField()
     detected_content_type = serializers.CharField()
     page_count = serializers.IntegerField(required=False)
+    has_text_layer = serializers.BooleanField(required=False, allow_null=True)
+    validation_mode = serializers.CharField(required=False)
 
 
 class RecipeStatisticsSerializer(serializers.Serializer):
@@ -156,4 +248,70 @@ class RecipeStatisticsSerializer(serializers.Serializer):
     total_tags = serializers.IntegerField()
     last_import_date = serializers.DateTimeField(required=False, allow_null=True)
     most_popular_category = serializers.CharField(required=False, allow_null=True)
-    most_popular_tag = serializers.CharField(required=False, allow_null=True)
\ No newline at end of file
+    most_popular_tag = serializers.CharField(required=False, allow_null=True)
+
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    """Serializer for asynchronous import jobs"""
+    
+    recipe = RecipeSerializer(read_only=True)
+    
+    class Meta:
+        model = ImportJob
+        fields = [
+            'id', 'status', 'mode', 'original_filename', 'file_size', 'attempts',
+            'recipe', 'result', 'error', 'error_stage', 'timings',
+            'created_at', 'started_at', 'finished_at'
+        ]
+        read_only_fields = fields
+
+
+class ChunkedUploadSerializer(serializers.ModelSerializer):
+    """Serializer for starting and resuming chunked uploads"""
+    
+    chunk_size = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = ChunkedUpload
+        fields = [
+            'id', 'filename', 'size', 'purpose', 'recipe', 'offset',
+            'status', 'chunk_size', 'created_at', 'updated_at'
+        ]
+        read_only_fields = ['id', 'offset', 'status', 'chunk_size', 'created_at', 'updated_at']
+    
+    def get_chunk_size(self, obj):
+        """Largest chunk accepted per request"""
+        return settings.CHUNKED_UPLOAD_CHUNK_SIZE
+    
+    def validate(self, attrs):
+        """Apply the limits of the regular import and image uploads"""
+        filename = attrs['filename'].lower()
+        extension = '.' + filename.split('.')[-1] if '.' in filename else ''
+        
+        if attrs['purpose'] == ChunkedUploadPurpose.IMPORT:
+            allowed_extensions = ['.pdf', '.png', '.jpg', '.jpeg', '.tiff', '.bmp', '.webp']
+            max_size = 10 * 1024 * 1024
+        elif attrs['purpose'] == ChunkedUploadPurpose.COOKBOOK:
+            allowed_extensions = ['.pdf']
+            max_size = settings.COOKBOOK_IMPORT_MAX_SIZE
+        else:
+            allowed_extensions = getattr(settings, 'ALLOWED_IMAGE_EXTENSIONS', ['.jpg', '.jpeg', '.png', '.gif', '.webp'])
+            max_size = getattr(settings, 'MAX_IMAGE_SIZE', 5 * 1024 * 1024)
+            recipe = attrs.get('recipe')
+            if recipe is None:
+                raise serializers.ValidationError({'recipe': 'A recipe is required for recipe images.'})
+            if recipe.user != self.context['request'].user:
+                raise serializers.ValidationError({'recipe': 'You can only upload images for your own recipes.'})
+        
+        if extension not in allowed_extensions:
+            raise serializers.ValidationError(
+                {'filename': f"Supported formats: {', '.join(allowed_extensions)}"}
+            )
+        if attrs['size'] == 0:
+            raise serializers.ValidationError({'size': 'File is empty.'})
+        if attrs['size'] > max_size:
+            raise serializers.ValidationError(
+                {'size': f"File size cannot exceed {max_size // (1024 * 1024)}MB."}
+            )
+        
+        return attrs
@@ -1,26 +1,38 @@
-import PyPDF2
 import re
 import logging
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Union
 from django.core.files.uploadedfile import UploadedFile
-from .models import Recipe, Ingredient, SourceMetadata, RecipeSource
+from .models import Recipe, RecipeSource
+from . import import_cache
+from .page_stream import stream_recipe_text
+from .pdf_document import PDFDocument
+from .parser_engine import ParseBudget, RecipeDocument, RecipeParserEngine
 
 logger = logging.getLogger(__name__)
 
+PDF_HEADER = b'%PDF-'
+STARTXREF = re.compile(rb'startxref\s+(\d+)\s+%%EOF')
+XREF_START = re.compile(rb'\s*(?:xref|\d+\s+\d+\s+obj)')
+
 
 class PDFValidationService:
     """Service for validating PDF files before import"""
     
-    def validate_file(self, file: UploadedFile) -> Dict[str, Any]:
+    def validate_file(self, file: Union[UploadedFile, PDFDocument], full: bool = True) -> Dict[str, Any]:
         """
         Validate a PDF file for recipe import
         
         Args:
-            file: Uploaded PDF file
+            file: Uploaded PDF file, or the PDFDocument shared with the import
+            full: Extract the text of the first page to check it is readable.
+                When False only the header, trailer and page tree are read,
+                which takes a few milliseconds (see _check_structure)
             
         Returns:
             Dictionary with validation results
         """
+        document = PDFDocument.of(file)
+        file = document.file
         errors = []
         warnings = []
         
@@ -38,24 +50,35 @@ class PDFValidationService:
         
         # Try to read PDF content
         page_count = 0
+        has_text_layer = None
+        structure_errors = []
         try:
-            file.seek(0)  # Reset file pointer
-            pdf_reader = PyPDF2.PdfReader(file)
-            page_count = len(pdf_reader.pages)
+            if not full:
+                structure_errors, structure_warnings = self._check_structure(document)
+                errors.extend(structure_errors)
+                warnings.extend(structure_warnings)
             
-            if page_count == 0:
-                errors.append("PDF contains no pages")
-            elif page_count > 10:
-                warnings.append(f"PDF has {page_count} pages - only first few will be processed")
+            if not structure_errors:
+                page_count = document.page_count if full else document.declared_page_count
+                
+                if page_count == 0:
+                    errors.append("PDF contains no pages")
+                elif page_count > 10:
+                    warnings.append(f"PDF has {page_count} pages - only first few will be processed")
             
             # Try to extract some text to verify it's readable
-            if page_count > 0:
-                first_page = pdf_reader.pages[0]
-                text = first_page.extract_text()
+            if page_count > 0 and full:
+                text = document.page_text(0)
+                has_text_layer = bool(text.strip())
                 if not text.strip():
                     warnings.append("PDF appears to contain no readable text")
                 elif len(text.strip()) < 50:
                     warnings.append("PDF contains very little text")
+            elif page_count > 0:
+                # Only look for fonts, extracting text would decode the content stream
+                has_text_layer = document.first_page_has_fonts()
+                if not has_text_layer:
+                    warnings.append("PDF appears to contain no readable text")
                     
         except Exception as e:
             errors.append(f"Cannot read PDF file: {str(e)}")
@@ -68,38 +91,67 @@ class PDFValidationService:
             'warnings': warnings,
             'file_size_bytes': file.size,
             'detected_content_type': file.content_type or 'application/pdf',
-            'page_count': page_count
+            'page_count': page_count,
+            'has_text_layer': has_text_layer,
+            'validation_mode': 'full' if full else 'fast'
         }
+    
+    def _check_structure(self, document: PDFDocument):
+        """
+        Check the PDF header and trailer from the raw bytes
+        
+        Returns:
+            Tuple of (errors, warnings)
+        """
+        errors = []
+        warnings = []
+        
+        # The header must appear within the first 1024 bytes
+        if PDF_HEADER not in document.read_bytes(0, 1024):
+            errors.append("File is not a PDF (missing %PDF header)")
+            return errors, warnings
+        
+        # The file ends with startxref <offset> %%EOF, allow trailing garbage
+        matches = STARTXREF.findall(document.read_bytes(-2048, 2048))
+        if not matches:
+            errors.append("PDF is incomplete (missing trailer), the upload may have been cut off")
+            return errors, warnings
+        
+        offset = int(matches[-1])
+        if offset >= document.size:
+            errors.append("PDF cross-reference offset points past the end of the file")
+            return errors, warnings
+        
+        # A cross-reference table or stream must start at the offset. PyPDF2 can
+        # rebuild a damaged table, so this only slows the import down.
+        if not XREF_START.match(document.read_bytes(offset, 32)):
+            warnings.append("PDF cross-reference table is damaged, import may be slower")
+        
+        return errors, warnings
 
 
 class PDFTextExtractor:
     """Service for extracting text from PDF files"""
     
-    def extract_text(self, file: UploadedFile) -> str:
+    def __init__(self):
+        self.parser_engine = RecipeParserEngine()
+    
+    def extract_text(self, file: Union[UploadedFile, PDFDocument]) -> str:
         """
         Extract text from a PDF file
         
         Args:
-            file: Uploaded PDF file
+            file: Uploaded PDF file, or the PDFDocument shared with validation
             
         Returns:
             Extracted text content
         """
+        document = PDFDocument.of(file)
+        file = document.file
         try:
-            file.seek(0)
-            pdf_reader = PyPDF2.PdfReader(file)
-            
-            text_content = []
-            # Process up to 5 pages to avoid processing very long documents
-            max_pages = min(len(pdf_reader.pages), 5)
-            
-            for page_num in range(max_pages):
-                page = pdf_reader.pages[page_num]
-                text = page.extract_text()
-                if text.strip():
-                    text_content.append(text)
-            
-            return '\n'.join(text_content)
+            # Process pages until the recipe is complete (at most the first 5 pages)
+            text, _, _ = stream_recipe_text(document, self.parser_engine)
+            return text
             
         except Exception as e:
             logger.error(f"Error extracting text from PDF: {str(e)}")
@@ -111,412 +163,68 @@ class PDFTextExtractor:
 class RecipeParser:
     """Service for parsing recipe text into structured data"""
     
-    def parse_recipe(self, text: str) -> Dict[str, Any]:
+    def __init__(self):
+        self.engine = RecipeParserEngine()
+    
+    def parse_recipe(self, text: str, budget: Optional[ParseBudget] = None) -> Dict[str, Any]:
         """
         Parse recipe text into structured recipe data
         
         Args:
             text: Raw text extracted from PDF
+            budget: Limits for this parse, PARSER_MAX_CHARS and PARSER_TIME_BUDGET_MS by default
             
         Returns:
-            Dictionary with parsed recipe data
+            Dictionary with parsed recipe data, partial when the budget ran out
         """
-        recipe_data = {
-            'title': self._extract_title(text),
-            'description': '',
-            'prep_time': self._extract_prep_time(text),
-            'cook_time': self._extract_cook_time(text),
-            'servings': self._extract_servings(text),
-            'ingredients': self._extract_ingredients(text),
-            'instructions': self._extract_instructions(text),
-            'categories': self._extract_categories(text),
-            'tags': self._extract_tags(text),
-        }
-        
-        # Calculate total time if both prep and cook times are available
-        if recipe_data['prep_time'] and recipe_data['cook_time']:
-            recipe_data['total_time'] = recipe_data['prep_time'] + recipe_data['cook_time']
-        
+        budget = budget or ParseBudget.from_settings()
+        recipe_data = self.engine.parse(text, budget)
+        for warning in budget.warnings:
+            logger.warning(warning)
         return recipe_data
     
+    # Single-field helpers, each tokenises the text on its own.
+    # parse_recipe tokenises once for all fields.
+    
     def _extract_title(self, text: str) -> str:
         """Extract recipe title from text"""
-        lines = [line.strip() for line in text.strip().split('\n') if line.strip()]
-        
-        # Skip keywords that indicate metadata, not titles
-        skip_keywords = [
-            'page', 'ingredients', 'instructions', 'serves', 'prep time',
-            'ingrediënten', 'bereidingswijze', 'bereidingstijd',
-            'minuten', 'preparation', 'cooking time',
-            'bereiding', 'kooktijd', 'totale tijd', 'personen'
-        ]
-        
-        # Try to find a title in the first few lines
-        for i, line in enumerate(lines[:15]):
-            # Skip very short lines
-            if len(line) < 4:
-                continue
-            
-            # Skip lines that are just numbers, times, or dates
-            if re.match(r'^[\d\s:\/\-\.]+$', line):
-                continue
-            
-            # Skip if line is just a keyword
-            if any(line.lower() == keyword for keyword in skip_keywords):
-                continue
-            
-            # Skip lines that start with common metadata patterns
-            if re.match(r'^(voor|serves?|prep|cook|bereiding|ingrediënten)', line, re.IGNORECASE):
-                continue
-            
-            # Extract title before common patterns that appear on same line
-            title = line
-            
-            # Remove common prefixes like "recept", "recipe", etc.
-            title = re.sub(r'^(recept|recipe|gerecht)\s+', '', title, flags=re.IGNORECASE).strip()
-            
-            title_end_patterns = [
-                r'\s+voor\s+\d+\s+personen?',  # "Voor 2 personen"
-                r'\s+bereidingstijd:?',         # "Bereidingstijd:"
-                r'\s+ingrediënten:?',          # "Ingrediënten:"
-                r'\s+serves?\s+\d+',           # "Serves 4"
-                r'\s+prep\s+time:?',           # "Prep time:"
-            ]
-            
-            for pattern in title_end_patterns:
-                match = re.search(pattern, line, re.IGNORECASE)
-                if match:
-                    title = line[:match.start()].strip()
-                    break
-            
-            # Check if this looks like a valid title
-            if title and 4 <= len(title) <= 100:
-                # Skip if it contains obvious non-title patterns
-                if not any(keyword in title.lower() for keyword in skip_keywords):
-                    # Clean up the title
-                    title = re.sub(r'\s+', ' ', title)  # Normalize whitespace
-                    logger.info(f"Extracted title: '{title}' from line {i}: '{line}'")
-                    return title
-        
-        # Fallback: use first substantial line
-        for line in lines[:20]:
-            if 5 <= len(line) <= 100:
-                clean_title = re.sub(r'\s+', ' ', line)
-                logger.warning(f"Using fallback title: '{clean_title}'")
-                return clean_title
-        
-        logger.warning("Could not extract title, using default")
-        return "Geïmporteerd Recept"
+        return self.engine.extract_title(RecipeDocument(text))
     
     def _extract_prep_time(self, text: str) -> Optional[int]:
         """Extract preparation time in minutes"""
-        patterns = [
-            r'prep(?:aration)?\s*time[:\s]*(\d+)\s*(?:min|minute|minutes)',
-            r'prep[:\s]*(\d+)\s*(?:min|minute|minutes)',
-            r'preparation[:\s]*(\d+)\s*(?:min|minute|minutes)',
-            r'bereidingstijd[:\s]*(\d+)\s*(?:min|minuten?)',
-            r'bereiding[:\s]*(\d+)\s*(?:min|minuten?)',
-            r'voorbereidingstijd[:\s]*(\d+)\s*(?:min|minuten?)',
-            r'préparation[:\s]*(\d+)\s*(?:min|minutes?)',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                return int(match.group(1))
-        
-        return None
+        return self.engine.extract_prep_time(RecipeDocument(text))
     
     def _extract_cook_time(self, text: str) -> Optional[int]:
         """Extract cooking time in minutes"""
-        patterns = [
-            r'cook(?:ing)?\s*time[:\s]*(\d+)\s*(?:min|minute|minutes)',
-            r'cook[:\s]*(\d+)\s*(?:min|minute|minutes)',
-            r'bake[:\s]*(\d+)\s*(?:min|minute|minutes)',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                return int(match.group(1))
-        
-        return None
+        return self.engine.extract_cook_time(RecipeDocument(text))
     
     def _extract_servings(self, text: str) -> Optional[int]:
         """Extract number of servings"""
-        patterns = [
-            r'serves?[:\s]*(\d+)',
-            r'servings?[:\s]*(\d+)',
-            r'yield[:\s]*(\d+)',
-            r'makes?[:\s]*(\d+)',
-            r'voor[:\s]*(\d+)\s*(?:personen?|people)',
-            r'(\d+)\s*(?:personen?|people)',
-            r'portions?[:\s]*(\d+)',
-            r'pour[:\s]*(\d+)\s*(?:personnes?)',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                return int(match.group(1))
-        
-        return None
+        return self.engine.extract_servings(RecipeDocument(text))
     
     def _extract_ingredients(self, text: str) -> List[Dict[str, Any]]:
         """Extract ingredients list"""
-        ingredients = []
-        
-        # Find ingredients section - support multiple languages with better patterns
-        ingredients_patterns = [
-            # English patterns
-            r'ingredients?[:\s]*\n(.*?)(?=\n\s*(?:instructions?|method|directions?|preparation|bereidingswijze)\s*[:\n]|$)',
-            # Dutch patterns - more specific
-            r'ingrediënten[:\s]*\n(.*?)(?=\n\s*(?:bereidingswijze|instructies?|methode|dressing)\s*[:\n]|$)',
-            r'ingrediënten[:\s]*(.*?)(?=bereidingswijze|instructies?|methode|dressing)',
-            # French patterns
-            r'ingrédients[:\s]*\n(.*?)(?=\n\s*(?:préparation|instructions?|méthode)\s*[:\n]|$)',
-            # Fallback - look for bullet point sections before instructions
-            r'((?:^\s*[●•*\-]\s*.+\n?)+)(?=.*(?:bereidingswijze|instructions?|method))',
-        ]
-        
-        ingredients_match = None
-        for pattern in ingredients_patterns:
-            ingredients_match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
-            if ingredients_match:
-                break
-        
-        if not ingredients_match:
-            # Try alternative patterns - look for bullet points or numbered lists
-            ingredients_match = re.search(
-                r'((?:^\s*[●•*-]\s*.+\n?)+)',
-                text,
-                re.MULTILINE
-            )
-        
-        if ingredients_match:
-            ingredients_text = ingredients_match.group(1).strip()
-            
-            # Check if ingredients are separated by bullet points on a single line
-            if '●' in ingredients_text or '•' in ingredients_text:
-                # Split by bullet points using regex to preserve content
-                ingredient_items = re.split(r'[●•]', ingredients_text)
-                # Remove empty items and clean up
-                ingredient_items = [item.strip() for item in ingredient_items if item.strip()]
-                
-                # Remove the first item if it's just the header (like "Ingrediënten:")
-                if ingredient_items and any(keyword in ingredient_items[0].lower() for keyword in ['ingrediënten', 'ingredients', 'ingrédients']):
-                    ingredient_items = ingredient_items[1:]
-            else:
-                # Normal line-by-line format
-                lines = ingredients_text.split('\n')
-                ingredient_items = []
-                for line in lines:
-                    line = line.strip()
-                    if line and (line.startswith('-') or line.startswith('•') or line.startswith('*') or 
-                               line.startswith('●') or re.match(r'^\d+\.?\s', line)):
-                        # Clean up the line
-                        ingredient_text = re.sub(r'^[●•*\-\d\.]\s*', '', line).strip()
-                        if ingredient_text:
-                            ingredient_items.append(ingredient_text)
-            
-            # Process each ingredient item
-            order = 0
-            for ingredient_text in ingredient_items:
-                ingredient_text = ingredient_text.strip()
-                if ingredient_text and self._is_valid_ingredient(ingredient_text):
-                    # Try to parse amount and ingredient name - support metric units
-                    amount_patterns = [
-                        r'^(\d+(?:[.,]\d+)?\s*(?:gram|g|ml|l|el|tl|theelepel|eetlepel|handjes?))\s+(.+)',
-                        r'^([\d\s/½¼¾]+(?:\s*(?:cups?|tbsp|tsp|oz|lb|g|kg|ml|l|gram|el|theelepel|eetlepel|handjes?))?)\s+(.+)',
-                    ]
-                    
-                    amount = ''
-                    name = ingredient_text
-                    
-                    for pattern in amount_patterns:
-                        amount_match = re.match(pattern, ingredient_text, re.IGNORECASE)
-                        if amount_match:
-                            amount = amount_match.group(1).strip()
-                            name = amount_match.group(2).strip()
-                            break
-                    
-                    # Final validation of the ingredient name
-                    if self._is_valid_ingredient_name(name):
-                        ingredients.append({
-                            'name': name,
-                            'amount': amount,
-                            'unit': '',
-                            'notes': '',
-                            'category': 'other',
-                            'order': order
-                        })
-                        order += 1
-        
-        return ingredients
+        return self.engine.extract_ingredients(RecipeDocument(text))
     
     def _extract_instructions(self, text: str) -> List[str]:
         """Extract cooking instructions"""
-        instructions = []
-        
-        # Find instructions section - support multiple languages with better patterns
-        instructions_patterns = [
-            # English patterns
-            r'(?:instructions?|method|directions?|preparation)[:\s]*\n(.*?)(?=\n\s*(?:notes?|tips?)\s*[:\n]|$)',
-            # Dutch patterns - more specific
-            r'bereidingswijze[:\s]*\n?(.*?)(?=\n\s*(?:opmerkingen?|tips?|dressing\s+ingrediënten)\s*[:\n]|$)',
-            r'bereidingswijze[:\s]*(.*?)(?=dressing\s+ingrediënten|$)',
-            # French patterns
-            r'(?:préparation|instructions?|méthode)[:\s]*\n(.*?)(?=\n\s*(?:notes?|conseils?)\s*[:\n]|$)',
-        ]
-        
-        instructions_match = None
-        for pattern in instructions_patterns:
-            instructions_match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
-            if instructions_match:
-                break
-        
-        if instructions_match:
-            instructions_text = instructions_match.group(1).strip()
-            
-            # First, try to split by newlines
-            lines = instructions_text.split('\n')
-            
-            # If no newlines or very few, try to split by sentences (periods followed by capital letter)
-            if len(lines) <= 2:
-                # Split on period followed by capital letter or period at end
-                sentences = re.split(r'\.(?=[A-Z])', instructions_text)
-                lines = [s.strip() + '.' for s in sentences if s.strip()]
-            
-            current_step = []
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
-                    
-                if re.match(r'^\d+\.?\s', line):
-                    # New numbered step
-                    if current_step:
-                        instructions.append(' '.join(current_step))
-                    current_step = [re.sub(r'^\d+\.?\s*', '', line)]
-                elif line.startswith('-') or line.startswith('•') or line.startswith('●'):
-                    # Bullet point step
-                    if current_step:
-                        instructions.append(' '.join(current_step))
-                    current_step = [re.sub(r'^[●•\-]\s*', '', line)]
-                else:
-                    # Check if this looks like a new sentence/step
-                    if current_step and len(line) > 20 and line[0].isupper():
-                        # Likely a new step
-                        instructions.append(' '.join(current_step))
-                        current_step = [line]
-                    else:
-                        # Continuation of current step
-                        current_step.append(line)
-            
-            # Add the last step
-            if current_step:
-                instructions.append(' '.join(current_step))
-        
-        return instructions
+        return self.engine.extract_instructions(RecipeDocument(text))
     
     def _extract_categories(self, text: str) -> List[str]:
         """Extract recipe categories"""
-        categories = []
-        
-        # Look for common category keywords
-        category_keywords = {
-            'breakfast': ['breakfast', 'morning'],
-            'lunch': ['lunch', 'midday'],
-            'dinner': ['dinner', 'evening', 'supper'],
-            'dessert': ['dessert', 'sweet', 'cake', 'cookie'],
-            'appetizer': ['appetizer', 'starter', 'hors d\'oeuvre'],
-            'main course': ['main', 'entree', 'entrée'],
-            'side dish': ['side', 'accompaniment'],
-            'soup': ['soup', 'broth', 'bisque'],
-            'salad': ['salad', 'greens'],
-        }
-        
-        text_lower = text.lower()
-        for category, keywords in category_keywords.items():
-            if any(keyword in text_lower for keyword in keywords):
-                categories.append(category)
-        
-        return categories if categories else ['main course']
+        return self.engine.extract_categories(RecipeDocument(text))
     
     def _extract_tags(self, text: str) -> List[str]:
         """Extract recipe tags"""
-        tags = []
-        
-        # Look for common tag keywords
-        tag_keywords = {
-            'quick': ['quick', 'fast', '15 min', '20 min', '30 min'],
-            'easy': ['easy', 'simple', 'basic'],
-            'healthy': ['healthy', 'nutritious', 'low fat', 'low calorie'],
-            'vegetarian': ['vegetarian', 'veggie'],
-            'vegan': ['vegan'],
-            'gluten-free': ['gluten free', 'gluten-free'],
-            'dairy-free': ['dairy free', 'dairy-free'],
-            'spicy': ['spicy', 'hot', 'chili', 'pepper'],
-        }
-        
-        text_lower = text.lower()
-        for tag, keywords in tag_keywords.items():
-            if any(keyword in text_lower for keyword in keywords):
-                tags.append(tag)
-        
-        return tags
+        return self.engine.extract_tags(RecipeDocument(text))
     
     def _is_valid_ingredient(self, text: str) -> bool:
         """Check if text looks like a valid ingredient (not instructions)"""
-        if not text or len(text.strip()) < 2:
-            return False
-            
-        text_lower = text.lower().strip()
-        
-        # Skip if it contains obvious instruction keywords
-        instruction_keywords = [
-            'bereidingswijze', 'bereiding', 'snijd de', 'voeg de', 'haal de', 
-            'doe de', 'meng de', 'bereid het', 'was en', 'verwijder',
-            'pureer', 'giet', 'bewaar', 'serveer', 'maak de', 'bestrooi',
-            'instructions', 'method', 'cook the', 'add the', 'mix the'
-        ]
-        
-        if any(keyword in text_lower for keyword in instruction_keywords):
-            return False
-            
-        # Skip if it's too long (likely instructions)
-        if len(text) > 150:
-            return False
-            
-        # Skip if it contains multiple sentences
-        if text.count('.') > 1 and len(text) > 50:
-            return False
-            
-        return True
+        return self.engine.is_valid_ingredient(text)
     
     def _is_valid_ingredient_name(self, name: str) -> bool:
         """Validate that an ingredient name is reasonable"""
-        if not name or len(name.strip()) < 2:
-            return False
-            
-        name = name.strip()
-        
-        # Skip very long names (likely contain instructions)
-        if len(name) > 100:
-            return False
-            
-        # Skip names that are clearly instructions
-        instruction_starters = [
-            'bereid het', 'snijd de', 'voeg de', 'haal de', 'doe de',
-            'meng de', 'was en', 'verwijder', 'pureer', 'giet',
-            'cook the', 'add the', 'mix the', 'heat the'
-        ]
-        
-        name_lower = name.lower()
-        if any(name_lower.startswith(starter) for starter in instruction_starters):
-            return False
-            
-        return True
+        return self.engine.is_valid_ingredient_name(name)
 
 
 class RecipeImportService:
@@ -526,67 +234,40 @@ class RecipeImportService:
         self.text_extractor = PDFTextExtractor()
         self.parser = RecipeParser()
     
-    def import_from_pdf(self, file: UploadedFile, user) -> Recipe:
+    def import_from_pdf(self, file: Union[UploadedFile, PDFDocument], user) -> Recipe:
         """
         Import a recipe from a PDF file and save to database
         
         Args:
-            file: Uploaded PDF file
+            file: Uploaded PDF file or its PDFDocument
             user: User who owns this recipe
             
         Returns:
             Created Recipe instance
         """
-        try:
-            # Extract text from PDF
-            text = self.text_extractor.extract_text(file)
-            
-            # Parse recipe data
-            recipe_data = self.parser.parse_recipe(text)
-            
-            # Create recipe
-            ingredients_data = recipe_data.pop('ingredients', [])
-            recipe_data['source'] = RecipeSource.PDF
-            recipe_data['user'] = user
-            
-            recipe = Recipe.objects.create(**recipe_data)
-            
-            # Create ingredients
-            for ingredient_data in ingredients_data:
-                Ingredient.objects.create(recipe=recipe, **ingredient_data)
-            
-            # Create source metadata
-            SourceMetadata.objects.create(
-                recipe=recipe,
-                original_filename=file.name,
-                file_size=file.size,
-                raw_text=text,
-                import_success=True
-            )
-            
-            logger.info(f"Successfully imported recipe {recipe.id} from {file.name}")
-            return recipe
-            
-        except Exception as e:
-            logger.error(f"Error importing recipe from {file.name}: {str(e)}")
-            raise
+        from .import_pipeline import ImportContext, ImportPipeline
+        
+        # Same stages as the import endpoint, see import_pipeline
+        context = ImportPipeline.from_settings().run(ImportContext(file, user=user))
+        if not context.succeeded:
+            logger.error(f"Error importing recipe from {file.name}: {context.result['error']}")
+            raise ValueError(context.result['error'])
+        
+        logger.info(f"Successfully imported recipe {context.recipe.id} from {file.name}")
+        return context.recipe
     
-    def preview_from_pdf(self, file: UploadedFile) -> Dict[str, Any]:
+    def preview_from_pdf(self, file: Union[UploadedFile, PDFDocument]) -> Dict[str, Any]:
         """
         Preview a recipe from a PDF file without saving to database
         
         Args:
-            file: Uploaded PDF file
+            file: Uploaded PDF file or its PDFDocument
             
         Returns:
             Dictionary with parsed recipe data
         """
         try:
-            # Extract text from PDF
-            text = self.text_extractor.extract_text(file)
-            
-            # Parse recipe data
-            recipe_data = self.parser.parse_recipe(text)
+            text, recipe_data = self._extract_and_parse(file)
             recipe_data['source'] = RecipeSource.PDF
             
             logger.info(f"Successfully previewed recipe from {file.name}")
@@ -594,4 +275,29 @@ class RecipeImportService:
             
         except Exception as e:
             logger.error(f"Error previewing recipe from {file.name}: {str(e)}")
-            raise
\ No newline at end of file
+            raise
+    
+    def _extract_and_parse(self, file: Union[UploadedFile, PDFDocument]):
+        """
+        Extract and parse a PDF, reusing cached results for files seen before
+        
+        Returns:
+            Tuple of (extracted text, parsed recipe data)
+        """
+        document = PDFDocument.of(file)
+        digest = document.digest
+        cached = import_cache.get_extraction(digest)
+        if cached is not None:
+            text = cached['text']
+        else:
+            text = self.text_extractor.extract_text(document)
+            import_cache.set_extraction(digest, {'success': True, 'text': text, 'method': 'pdf_extraction'})
+        
+        recipe_data = import_cache.get_parse('recipe_parser', text)
+        if recipe_data is None:
+            budget = ParseBudget.from_settings()
+            recipe_data = self.parser.parse_recipe(text, budget)
+            if not budget.warnings:
+                import_cache.set_parse('recipe_parser', text, recipe_data)
+        
+        return text, recipe_data
@@ -9,8 +9,19 @@ Tests the PDF parsing functionality including:
 - Instructions parsing
 """
 
-from django.test import TestCase
+import itertools
+import logging
+from random import Random
+from unittest import mock
+
+from PyPDF2 import PageObject
+from django.test import TestCase, override_settings
 from recipes.services import RecipeParser, PDFTextExtractor, PDFValidationService
+from recipes.text_extraction_service import RecipeTextParser
+from recipes.parser_engine import ParseBudget, RecipeParserEngine, RecipeTextParserEngine
+from recipes.parser_reference import ReferenceRecipeParser, ReferenceRecipeTextParser
+from recipes.management.commands.benchmark_parser import ADVERSARIAL_INPUTS, ENGINES, SAMPLE_TEXTS, best_time
+from recipes.testing import make_pdf_bytes
 from io import BytesIO
 from django.core.files.uploadedfile import SimpleUploadedFile
 
@@ -323,6 +334,36 @@ class PDFValidationServiceTest(TestCase):
         
         self.assertFalse(result['is_valid'])
         self.assertIn('10MB', result['errors'][0])
+    
+    def test_fast_validation_skips_text_extraction(self):
+        """Test the fast check counts pages and finds the text layer without extracting text"""
+        content = make_pdf_bytes(['Pasta Pesto', 'Ingredients:'], ['Instructions:'])
+        file = SimpleUploadedFile("test.pdf", content, content_type="application/pdf")
+        with mock.patch.object(PageObject, 'extract_text') as extract_text:
+            result = self.validator.validate_file(file, full=False)
+        
+        extract_text.assert_not_called()
+        self.assertTrue(result['is_valid'])
+        self.assertEqual(result['page_count'], 2)
+        self.assertTrue(result['has_text_layer'])
+        self.assertEqual(result['validation_mode'], 'fast')
+    
+    def test_fast_validation_rejects_truncated_pdf(self):
+        """Test an upload cut off before the trailer is rejected"""
+        content = make_pdf_bytes(['Pasta Pesto'])
+        file = SimpleUploadedFile("test.pdf", content[:-60], content_type="application/pdf")
+        result = self.validator.validate_file(file, full=False)
+        
+        self.assertFalse(result['is_valid'])
+        self.assertIn('incomplete', result['errors'][0])
+    
+    def test_fast_validation_rejects_missing_header(self):
+        """Test files without the %PDF header are rejected"""
+        file = SimpleUploadedFile("test.pdf", b"<html>not a pdf</html>", content_type="application/pdf")
+        result = self.validator.validate_file(file, full=False)
+        
+        self.assertFalse(result['is_valid'])
+        self.assertIn('%PDF', result['errors'][0])
 
 
 class RecipeParserEdgeCasesTest(TestCase):
@@ -362,3 +403,105 @@ Ingrédients:
         
         recipe_data = self.parser.parse_recipe(text)
         self.assertIn('Crème', recipe_data['title'])
+
+
+class ParserEngineEquivalenceTest(TestCase):
+    """The parser engine must produce the same output as the previous regex parsers"""
+    
+    TEXTS = SAMPLE_TEXTS + [
+        "",
+        "Title\nIngredients:\nrandom text without structure\nmore random text",
+        "Crème Brûlée\nIngrédients:\n- 500 ml crème fraîche\n- 100 g sucre\nPréparation:\n1. Chauffer la crème\nConseils:\nServir froid",
+        "- 2 cups flour\n- 1 tsp salt\nMix and bake. Method follows\ninstructions",
+        "Soup\nPrep\n\n10\nmin\n4\npersonen\nIngredients:\nInstructions:\n- stir\nNotes:",
+        "Stew\n•\n200 gram beef\n  ● 2 onions\nCook time: 90 minutes, serves: 6, bake 10 min",
+        "INGREDIENTS 1 cup sugar 2 tbsp butter 100 g chocolate DIRECTIONS 1. Melt the butter. 2. Stir in the sugar.",
+        "Lasagne voor 4 personen Bereidingstijd: 45 min\nIngrediënten\n\n1. 500 gram gehakt\n2. 1 ui\nBereidingswijze Bak het gehakt.Voeg de ui toe.",
+        "ſerves 5\nİnstructions:\n1. Step one here",
+    ]
+    
+    def test_recipe_parser_matches_reference(self):
+        """Test RecipeParser output is unchanged"""
+        parser, reference = RecipeParser(), ReferenceRecipeParser()
+        for text in self.TEXTS:
+            with self.subTest(text=text[:40]):
+                self.assertEqual(parser.parse_recipe(text), reference.parse_recipe(text))
+    
+    def test_recipe_text_parser_matches_reference(self):
+        """Test RecipeTextParser output is unchanged"""
+        parser, reference = RecipeTextParser(), ReferenceRecipeTextParser()
+        for text in self.TEXTS:
+            with self.subTest(text=text[:40]):
+                self.assertEqual(parser.parse_recipe_text(text), reference.parse_recipe_text(text))
+    
+    def test_inline_bullet_ingredients(self):
+        """Test ingredients listed with bullets on one line"""
+        recipe_data = RecipeParser().parse_recipe(SAMPLE_TEXTS[2])
+        
+        names = [ingredient['name'] for ingredient in recipe_data['ingredients']]
+        self.assertEqual(names, ['pasta', 'pot pesto', 'pijnboompitten', 'basilicum'])
+        self.assertEqual(len(recipe_data['instructions']), 3)
+
+
+class ParserWorstCaseTest(TestCase):
+    """Parsing time must grow linearly with the input and stay within the parse budget"""
+    
+    TOKENS = [
+        'Title line', 'Ingredients:\n', 'Instructions:\n', 'Ingrediënten: ', 'Bereidingswijze\n',
+        '1', '2', '12', ' ', '  ', '\n', '.', '/', 'g ', 'cups ', 'gram', 'flour', '-', '•', '● ',
+        'voor', '4 personen', 'Serves ', 'Prep time: ', ' min',
+    ]
+    
+    def setUp(self):
+        # Inputs without a title make the engines log a warning per parse
+        logging.disable(logging.WARNING)
+        self.addCleanup(logging.disable, logging.NOTSET)
+    
+    def test_linear_time_on_adversarial_inputs(self):
+        """Test an 8 times longer adversarial input takes about 8 times as long"""
+        for name, engine_class in ENGINES.items():
+            parse = engine_class().parse
+            for label, make_text in ADVERSARIAL_INPUTS.items():
+                with self.subTest(engine=name, input=label):
+                    small = best_time(parse, make_text(2000))
+                    large = best_time(parse, make_text(16000))
+                    # Linear is x8 and quadratic x64, the constant absorbs timer noise
+                    self.assertLess(large, small * 24 + 0.01)
+    
+    def test_random_texts_match_reference(self):
+        """Test the linear-time patterns find the same matches as the regex parsers"""
+        random = Random(17)
+        reference, text_reference = ReferenceRecipeParser(), ReferenceRecipeTextParser()
+        for _ in range(500):
+            text = ''.join(random.choice(self.TOKENS) for _ in range(random.randint(1, 30)))
+            if not text.strip():
+                continue
+            with self.subTest(text=text):
+                self.assertEqual(RecipeParserEngine().parse(text), reference.parse_recipe(text))
+                self.assertEqual(
+                    RecipeTextParserEngine().parse(text), text_reference.parse_recipe_text(text)['recipe_data']
+                )
+    
+    def test_time_budget_returns_partial_result(self):
+        """Test fields after the budget ran out keep their defaults and a warning is given"""
+        clock = itertools.chain([0.0], itertools.repeat(10.0))
+        budget = ParseBudget(time_limit=1)
+        with mock.patch('recipes.parser_engine.time.monotonic', side_effect=clock):
+            recipe_data = RecipeTextParserEngine().parse(SAMPLE_TEXTS[1], budget)
+        
+        self.assertEqual(recipe_data['title'], 'Chicken Curry')
+        self.assertEqual(recipe_data['ingredients'], [])
+        self.assertIsNone(recipe_data['servings'])
+        self.assertEqual(len(budget.warnings), 1)
+        self.assertIn('stopped after the title, not extracted: ingredients, instructions', budget.warnings[0])
+    
+    @override_settings(PARSER_MAX_CHARS=60)
+    def test_long_text_is_cut_off(self):
+        """Test text beyond PARSER_MAX_CHARS is not parsed and the result carries a warning"""
+        result = RecipeTextParser().parse_recipe_text(SAMPLE_TEXTS[1])
+        
+        self.assertTrue(result['success'])
+        self.assertEqual(result['recipe_data']['title'], 'Chicken Curry')
+        self.assertEqual(result['recipe_data']['instructions'], [])
+        self.assertEqual(len(result['warnings']), 1)
+        self.assertIn('cut off at 60 characters', result['warnings'][0])
@@ -0,0 +1,50 @@
+"""
+Helpers for building test fixtures for the recipes app
+"""
+
+
+def make_pdf_bytes(*pages):
+    """
+    Build a minimal text PDF in memory
+
+    Args:
+        *pages: One list of text lines per page
+
+    Returns:
+        PDF file content as bytes
+    """
+    objects = []
+    page_ids = []
+    font_id = 3
+    next_id = 4
+    for lines in pages:
+        content = ['BT', '/F1 12 Tf', '14 TL', '50 750 Td']
+        for line in lines:
+            escaped = line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+            content.append(f'({escaped}) Tj T*')
+        content.append('ET')
+        stream = '\n'.join(content).encode('latin-1')
+        page_id, content_id = next_id, next_id + 1
+        next_id += 2
+        page_ids.append(page_id)
+        objects.append((page_id, (
+            f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+            f'/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {content_id} 0 R >>'
+        ).encode()))
+        objects.append((content_id, b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'\nendstream'))
+    kids = ' '.join(f'{pid} 0 R' for pid in page_ids)
+    objects.append((1, b'<< /Type /Catalog /Pages 2 0 R >>'))
+    objects.append((2, f'<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>'.encode()))
+    objects.append((font_id, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>'))
+    objects.sort()
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = {}
+    for obj_id, body in objects:
+        offsets[obj_id] = len(out)
+        out += b'%d 0 obj\n' % obj_id + body + b'\nendobj\n'
+    xref = len(out)
+    out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    for obj_id in range(1, len(objects) + 1):
+        out += b'%010d 00000 n \n' % offsets[obj_id]
+    out += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    return bytes(out)
@@ -1,8 +1,51 @@
-from django.test import TestCase
+import io
+import os
+import random
+import shutil
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+import PyPDF2
+from PIL import Image, ImageDraw, ImageEnhance, PngImagePlugin
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework.test import APITestCase
 from rest_framework import status
-from .models import Recipe, Ingredient, RecipeSource
+from .models import (
+    Recipe, Ingredient, IngredientCategory, IngredientClassification, RecipeSource, ImportJob, ImportJobStatus,
+    ImportMode, ImageHash, SourceMetadata, CanonicalIngredient, ChunkedUpload, ChunkedUploadStatus
+)
+from .chunked_uploads import complete_upload
+from .import_jobs import claim_next_job, enqueue_import, process_import_job, record_heartbeat, requeue_stale_jobs
+from .import_pipeline import ImportContext, ImportPipeline, ImportStage, ImportStageError
+from . import ingredient_classifier, ingredient_index
+from .image_preprocessing import adaptive_threshold, estimate_skew, preprocess_image
+from .bulk_import import BulkRecipeImporter
+from .cookbook_import import CookbookImporter, CookbookSplitter
+from . import image_hash_index, import_cache
+from .keyword_matcher import KeywordMatcher, get_matcher
+from .ocr import StubOCRBackend, run_ocr
+from .page_stream import IncrementalRecipeParser
+from .parallel_extraction import iter_page_texts
+from .pdf_document import PDFDocument
+from .parser_engine import RecipeTextParserEngine
+from .quantity_parser import parse_amount, parse_ingredient_line
+from .reparse import RecipeReparser
+from .services import PDFValidationService, RecipeImportService
+from .text_extraction_service import EnhancedRecipeImportService, RecipeTextParser, TextExtractionService
+from .testing import make_pdf_bytes
+from .workers import discard_shared_pool, get_shared_pool
 
 
 class RecipeModelTest(TestCase):
@@ -217,4 +260,1470 @@ class RecipeAPITest(APITestCase):
         response = self.client.get(url)
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertIn('healthy', response.data)
\ No newline at end of file
+        self.assertIn('healthy', response.data)
+
+
+SAMPLE_RECIPE_LINES = [
+    'Pasta Pesto',
+    'Voor 4 personen',
+    'Ingredients:',
+    '- 200 gram pasta',
+    '- 1 pot pesto',
+    'Instructions:',
+    '1. Kook de pasta 10 minuten tot hij beetgaar is.',
+    '2. Meng met de pesto en serveer direct.',
+]
+
+
+class ImportJobTest(APITestCase):
+    """Test asynchronous recipe import jobs"""
+    
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        
+        self.user = User.objects.create_user(username='importer', password='secret123')
+        self.client.force_authenticate(user=self.user)
+    
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+    
+    def _pdf_upload(self, name='pasta.pdf', content=None):
+        return SimpleUploadedFile(
+            name, content or make_pdf_bytes(SAMPLE_RECIPE_LINES), content_type='application/pdf'
+        )
+    
+    def test_import_endpoint_queues_job(self):
+        """Test POST /api/recipes/import/ returns 202 with a pending job"""
+        url = reverse('recipe-import-recipe')
+        response = self.client.post(url, {'file': self._pdf_upload()}, format='multipart')
+        
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], ImportJobStatus.PENDING)
+        self.assertEqual(Recipe.objects.count(), 0)
+        
+        job = ImportJob.objects.get(id=response.data['id'])
+        self.assertEqual(job.user, self.user)
+        self.assertEqual(job.original_filename, 'pasta.pdf')
+    
+    @override_settings(RECIPE_IMPORT_ASYNC=False)
+    def test_import_endpoint_synchronous_mode(self):
+        """Test imports still run inline when the queue is disabled"""
+        url = reverse('recipe-import-recipe')
+        response = self.client.post(url, {'file': self._pdf_upload()}, format='multipart')
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['recipe']['title'], 'Pasta Pesto')
+        self.assertEqual(ImportJob.objects.count(), 0)
+    
+    def test_process_job_creates_recipe(self):
+        """Test a worker turns a queued job into a recipe"""
+        enqueue_import(self._pdf_upload(), self.user)
+        job = claim_next_job('test-worker')
+        self.assertEqual(job.status, ImportJobStatus.RUNNING)
+        self.assertEqual(job.attempts, 1)
+        
+        process_import_job(job)
+        job.refresh_from_db()
+        
+        self.assertEqual(job.status, ImportJobStatus.SUCCEEDED)
+        self.assertEqual(job.recipe.title, 'Pasta Pesto')
+        self.assertEqual(job.recipe.user, self.user)
+        self.assertEqual(job.recipe.source, RecipeSource.PDF)
+        self.assertTrue(job.recipe.ingredients.exists())
+        self.assertEqual(job.recipe.source_metadata.original_filename, 'pasta.pdf')
+        for stage in ['queued', 'extraction', 'parsing', 'persist', 'total']:
+            self.assertIn(stage, job.timings)
+        self.assertFalse(job.file)
+    
+    def test_claim_is_exclusive(self):
+        """Test a job can only be claimed by one worker"""
+        enqueue_import(self._pdf_upload(), self.user)
+        
+        self.assertIsNotNone(claim_next_job('worker-1'))
+        self.assertIsNone(claim_next_job('worker-2'))
+    
+    def test_only_jobs_without_heartbeat_are_requeued(self):
+        """Test a long running job with heartbeats is left alone and a job of a dead worker is requeued"""
+        enqueue_import(self._pdf_upload(name='long.pdf'), self.user)
+        enqueue_import(self._pdf_upload(name='dead.pdf'), self.user)
+        long_running = claim_next_job('worker-1')
+        abandoned = claim_next_job('worker-2')
+        started = timezone.now() - timedelta(seconds=3600)
+        ImportJob.objects.update(started_at=started, heartbeat_at=started)
+        
+        record_heartbeat([long_running.id])
+        self.assertEqual(requeue_stale_jobs(600), 1)
+        long_running.refresh_from_db()
+        abandoned.refresh_from_db()
+        self.assertEqual(long_running.status, ImportJobStatus.RUNNING)
+        self.assertEqual(abandoned.status, ImportJobStatus.PENDING)
+        
+        # The jobs a worker is running itself are never requeued by it
+        ImportJob.objects.filter(id=long_running.id).update(heartbeat_at=started)
+        self.assertEqual(requeue_stale_jobs(600, exclude_ids=[long_running.id]), 0)
+    
+    def test_failed_job_records_error(self):
+        """Test extraction errors are stored on the job"""
+        enqueue_import(self._pdf_upload(content=b'not a pdf at all'), self.user)
+        job = process_import_job(claim_next_job('test-worker'))
+        
+        self.assertEqual(job.status, ImportJobStatus.FAILED)
+        self.assertEqual(job.error_stage, 'validation')
+        self.assertTrue(job.error)
+        self.assertIsNone(job.recipe)
+    
+    def test_poll_job_status(self):
+        """Test GET /api/import-jobs/{id}/ returns the created recipe"""
+        job = enqueue_import(self._pdf_upload(), self.user)
+        process_import_job(claim_next_job('test-worker'))
+        
+        url = reverse('importjob-detail', kwargs={'pk': job.id})
+        response = self.client.get(url)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], ImportJobStatus.SUCCEEDED)
+        self.assertEqual(response.data['recipe']['title'], 'Pasta Pesto')
+        self.assertEqual(response.data['result']['source_type'], RecipeSource.PDF)
+    
+    def test_jobs_are_private(self):
+        """Test users cannot see other users' import jobs"""
+        job = enqueue_import(self._pdf_upload(), self.user)
+        other_user = User.objects.create_user(username='other', password='secret123')
+        self.client.force_authenticate(user=other_user)
+        
+        url = reverse('importjob-detail', kwargs={'pk': job.id})
+        response = self.client.get(url)
+        
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_worker_restarts_broken_pool(self):
+        """Test the worker requeues the jobs of a pool whose process died and carries on with a new pool"""
+        job = enqueue_import(self._pdf_upload(), self.user)
+        pools = []
+        
+        class InlinePool:
+            """Runs jobs in this process; the first pool behaves like one whose process was killed"""
+            def __init__(self, *args, **kwargs):
+                self.broken = not pools
+                pools.append(self)
+            
+            def submit(self, function, *args):
+                future = Future()
+                if self.broken:
+                    future.set_exception(BrokenProcessPool('A process in the pool was terminated'))
+                else:
+                    future.set_result(function(*args))
+                return future
+            
+            def shutdown(self, **kwargs):
+                pass
+        
+        with mock.patch('recipes.management.commands.run_import_worker.create_process_pool', InlinePool), \
+                mock.patch('recipes.import_jobs.close_old_connections'):
+            call_command('run_import_worker', '--once', '--poll-interval', '0', stdout=io.StringIO())
+        
+        job.refresh_from_db()
+        self.assertEqual(len(pools), 2)
+        self.assertEqual(job.status, ImportJobStatus.SUCCEEDED)
+        self.assertEqual(job.attempts, 2)
+
+
+def make_zip_bytes(files):
+    """Build a ZIP archive from a {name: content} dict"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name, content in files.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+@override_settings(BULK_IMPORT_PROCESSES=0)
+class BulkImportTest(APITestCase):
+    """Test bulk recipe import from ZIP archives"""
+    
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        
+        self.user = User.objects.create_user(username='bulk', password='secret123')
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('recipe-import-zip')
+    
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+    
+    def _archive(self, files, name='recipes.zip'):
+        return SimpleUploadedFile(name, make_zip_bytes(files), content_type='application/zip')
+    
+    def test_import_zip_queues_job(self):
+        """Test POST /api/recipes/import-zip/ returns 202 with a pending archive job"""
+        response = self.client.post(
+            self.url, {'file': self._archive({'pasta.pdf': make_pdf_bytes(SAMPLE_RECIPE_LINES)})}, format='multipart'
+        )
+        
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], ImportJobStatus.PENDING)
+        self.assertEqual(response.data['mode'], ImportMode.ARCHIVE)
+        self.assertEqual(Recipe.objects.count(), 0)
+    
+    def test_import_zip_reports_every_file(self):
+        """Test the worker imports the recipes of an archive and reports failures on the job"""
+        archive = self._archive({
+            'dinner/pasta.pdf': make_pdf_bytes(SAMPLE_RECIPE_LINES),
+            'dinner/broken.pdf': b'not a pdf at all',
+            'notes.txt': b'shopping list',
+            '__MACOSX/dinner/._pasta.pdf': b'metadata',
+        })
+        response = self.client.post(self.url, {'file': archive}, format='multipart')
+        job = process_import_job(claim_next_job('test-worker'))
+        
+        self.assertEqual(str(job.id), response.data['id'])
+        self.assertEqual(job.status, ImportJobStatus.SUCCEEDED)
+        self.assertFalse(job.file)
+        report = job.result
+        self.assertEqual(report['total_files'], 3)
+        self.assertEqual(report['imported'], 1)
+        self.assertEqual(report['failed'], 1)
+        self.assertEqual(report['skipped'], 1)
+        
+        files = report['files']
+        self.assertEqual([f['filename'] for f in files], ['dinner/pasta.pdf', 'dinner/broken.pdf', 'notes.txt'])
+        self.assertEqual(files[0]['status'], 'imported')
+        self.assertEqual(files[1]['stage'], 'validation')
+        
+        recipe = Recipe.objects.get(id=files[0]['recipe_id'])
+        self.assertEqual(recipe.title, 'Pasta Pesto')
+        self.assertEqual(recipe.user, self.user)
+        self.assertTrue(recipe.ingredients.exists())
+        self.assertEqual(recipe.source_metadata.original_filename, 'pasta.pdf')
+    
+    def test_bulk_insert_in_batches(self):
+        """Test recipes are inserted with a fixed number of queries per batch"""
+        archive = io.BytesIO(make_zip_bytes({
+            f'recipe_{i}.pdf': make_pdf_bytes(SAMPLE_RECIPE_LINES) for i in range(5)
+        }))
+        importer = BulkRecipeImporter(self.user, processes=0, batch_size=10)
+        ingredient_classifier.reset_cache()
+        
+        # One transaction with a bulk insert per table, plus one read and one
+        # write of the ingredient category memo for the names of the first recipe
+        with self.assertNumQueries(7):
+            report = importer.import_archive(archive)
+        
+        self.assertEqual(report['imported'], 5)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 5)
+        ingredients_per_recipe = report['files'][0]['ingredients_found']
+        self.assertGreater(ingredients_per_recipe, 0)
+        self.assertEqual(Ingredient.objects.filter(recipe__user=self.user).count(), 5 * ingredients_per_recipe)
+    
+    def test_retried_job_skips_saved_files(self):
+        """Test a retried archive job does not import the files of saved batches again"""
+        archive = self._archive({f'recipe_{i}.pdf': make_pdf_bytes(SAMPLE_RECIPE_LINES) for i in range(2)})
+        job = enqueue_import(archive, self.user, mode=ImportMode.ARCHIVE)
+        
+        # The first attempt saved every file but died before finishing the job
+        with job.file.open('rb') as stored_file:
+            BulkRecipeImporter(self.user, processes=0, job=job).import_archive(stored_file)
+        self.assertEqual(len(job.progress['files']), 2)
+        
+        job = process_import_job(ImportJob.objects.get(id=job.id))
+        
+        self.assertEqual(job.status, ImportJobStatus.SUCCEEDED)
+        self.assertEqual(job.result['imported'], 2)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 2)
+    
+    def test_invalid_archive(self):
+        """Test a corrupt ZIP file is rejected before it is queued"""
+        archive = SimpleUploadedFile('recipes.zip', b'not a zip file', content_type='application/zip')
+        response = self.client.post(self.url, {'file': archive}, format='multipart')
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(ImportJob.objects.count(), 0)
+    
+    @override_settings(RECIPE_IMPORT_ASYNC=False)
+    def test_archive_without_recipes(self):
+        """Test an archive where nothing could be imported fails the job with the report"""
+        response = self.client.post(self.url, {'file': self._archive({'readme.md': b'hi'})}, format='multipart')
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['status'], ImportJobStatus.FAILED)
+        self.assertEqual(response.data['error_stage'], 'archive')
+        self.assertEqual(response.data['result']['skipped'], 1)
+    
+    @override_settings(BULK_IMPORT_MAX_FILES=2)
+    def test_too_many_files(self):
+        """Test archives over the file limit fail before any file is processed"""
+        archive = self._archive({f'recipe_{i}.pdf': b'%PDF' for i in range(3)})
+        self.client.post(self.url, {'file': archive}, format='multipart')
+        job = process_import_job(claim_next_job('test-worker'))
+        
+        self.assertEqual(job.status, ImportJobStatus.FAILED)
+        self.assertIn('more than 2', job.error)
+        self.assertEqual(Recipe.objects.count(), 0)
+
+
+class ImportCacheTest(TestCase):
+    """Test content-hash caching of extraction and parse results"""
+    
+    def setUp(self):
+        cache.clear()
+        self.content = make_pdf_bytes(SAMPLE_RECIPE_LINES)
+    
+    def _upload(self, name='pasta.pdf'):
+        return SimpleUploadedFile(name, self.content, content_type='application/pdf')
+    
+    def test_repeat_upload_skips_extraction(self):
+        """Test the same bytes are only extracted once, whatever the filename"""
+        service = EnhancedRecipeImportService()
+        with mock.patch.object(
+            TextExtractionService, 'extract_text_from_pdf',
+            autospec=True, side_effect=TextExtractionService.extract_text_from_pdf
+        ) as extract:
+            first = service.import_recipe_from_file(self._upload())
+            second = service.import_recipe_from_file(self._upload('copy of pasta.pdf'))
+        
+        self.assertEqual(extract.call_count, 1)
+        self.assertEqual(first['content_hash'], second['content_hash'])
+        self.assertEqual(second['cache_hits'], {'extraction': True, 'parsing': True})
+        self.assertEqual(first['recipe_data'], second['recipe_data'])
+    
+    def test_parse_memoised_by_normalized_text(self):
+        """Test text differing only in line endings shares one parse result"""
+        text = '\n'.join(SAMPLE_RECIPE_LINES)
+        import_cache.set_parse('recipe_text_parser', text, RecipeTextParser().parse_recipe_text(text))
+        
+        cached = import_cache.get_parse('recipe_text_parser', text.replace('\n', '  \r\n') + '\n')
+        self.assertEqual(cached['recipe_data']['title'], 'Pasta Pesto')
+        self.assertIsNone(import_cache.get_parse('recipe_parser', text))
+    
+    def test_failed_extraction_not_cached(self):
+        """Test failures are retried on the next upload"""
+        service = EnhancedRecipeImportService()
+        upload = SimpleUploadedFile('broken.pdf', b'not a pdf at all')
+        result = service.import_recipe_from_file(upload)
+        
+        self.assertFalse(result['success'])
+        self.assertIsNone(import_cache.get_extraction(import_cache.file_digest(upload)))
+    
+    @override_settings(IMPORT_CACHE_ENABLED=False)
+    def test_cache_can_be_disabled(self):
+        """Test IMPORT_CACHE_ENABLED=False always extracts"""
+        service = EnhancedRecipeImportService()
+        service.import_recipe_from_file(self._upload())
+        result = service.import_recipe_from_file(self._upload())
+        
+        self.assertEqual(result['cache_hits'], {'extraction': False, 'parsing': False})
+
+
+class KeywordMatcherTest(TestCase):
+    """Test the Aho–Corasick keyword matcher"""
+    
+    def test_overlapping_keywords(self):
+        """Test keywords found inside, across and as suffixes of each other"""
+        matcher = KeywordMatcher(['he', 'she', 'his', 'hers'])
+        
+        self.assertTrue(matcher.search('ushers'))
+        self.assertFalse(matcher.search('hi tree'))
+        self.assertEqual(matcher.labels('ushers'), {'she', 'he', 'hers'})
+    
+    def test_labels_and_startswith(self):
+        """Test labelled sets keep their order and prefix checks only match at the start"""
+        matcher = KeywordMatcher({'soup': ['soup', 'broth'], 'salad': ['salad', 'greens']})
+        
+        self.assertEqual(matcher.ordered_labels('greens with chicken broth'), ['soup', 'salad'])
+        self.assertTrue(matcher.startswith('salad dressing'))
+        self.assertFalse(matcher.startswith('green salad'))
+    
+    def test_keyword_sets_merged_across_languages(self):
+        """Test shared matchers combine the Dutch and English keyword files"""
+        matcher = get_matcher('ingredient_instructions')
+        
+        self.assertIs(matcher, get_matcher('ingredient_instructions'))
+        self.assertTrue(matcher.search('snijd de ui fijn'))
+        self.assertTrue(matcher.search('then add the flour'))
+        self.assertFalse(matcher.search('200 gram bloem'))
+        with self.assertRaises(KeyError):
+            get_matcher('unknown')
+
+
+class PageStreamTest(TestCase):
+    """Test early-exit page extraction of multi-page PDFs"""
+    
+    FILLER_PAGE = ['Advertentie', 'Bezoek onze website voor meer recepten']
+    NEXT_RECIPE_PAGE = ['Tomatensoep', 'Ingredients:', '- 1 kg tomaten', 'Instructions:', '1. Kook alles.']
+    
+    def _extract(self, *pages):
+        upload = SimpleUploadedFile('magazine.pdf', make_pdf_bytes(*pages), content_type='application/pdf')
+        return TextExtractionService().extract_text_from_pdf(upload)
+    
+    def test_stops_before_next_recipe(self):
+        """Test a page starting another recipe ends extraction and is left out"""
+        result = self._extract(SAMPLE_RECIPE_LINES, self.NEXT_RECIPE_PAGE, *[self.FILLER_PAGE] * 4)
+        
+        self.assertEqual(result['pages_processed'], 2)
+        self.assertEqual(result['total_pages'], 6)
+        self.assertTrue(result['recipe_complete'])
+        self.assertIn('Pasta Pesto', result['text'])
+        self.assertNotIn('Tomatensoep', result['text'])
+    
+    def test_reads_instructions_continued_on_next_page(self):
+        """Test extraction continues while pages still add instructions"""
+        continued = ['3. Bestrooi met geraspte kaas en serveer.']
+        result = self._extract(SAMPLE_RECIPE_LINES, continued, [], self.FILLER_PAGE, self.FILLER_PAGE)
+        
+        self.assertEqual(result['pages_processed'], 4)
+        self.assertIn('geraspte kaas', result['text'])
+        self.assertIn('Advertentie', result['text'])
+    
+    @override_settings(PDF_EARLY_EXIT_ENABLED=False)
+    def test_early_exit_can_be_disabled(self):
+        """Test the first five pages are always extracted when disabled"""
+        result = self._extract(SAMPLE_RECIPE_LINES, *[self.NEXT_RECIPE_PAGE] * 6)
+        
+        self.assertEqual(result['pages_processed'], 5)
+        self.assertFalse(result['recipe_complete'])
+        self.assertIn('Tomatensoep', result['text'])
+    
+    def test_incomplete_recipe_keeps_reading(self):
+        """Test pages are collected until title, ingredients and instructions are found"""
+        parser = IncrementalRecipeParser(RecipeTextParserEngine())
+        
+        self.assertFalse(parser.feed('\n'.join(SAMPLE_RECIPE_LINES[:5])))
+        self.assertFalse(parser.feed('\n'.join(SAMPLE_RECIPE_LINES[5:])))
+        self.assertTrue(parser.feed('\n'.join(self.FILLER_PAGE)))
+        self.assertTrue(parser.complete)
+
+
+class PDFDocumentTest(TestCase):
+    """Test one parsed document is shared by validation, preview and import"""
+    
+    def setUp(self):
+        cache.clear()
+        self.upload = SimpleUploadedFile(
+            'pasta.pdf', make_pdf_bytes(SAMPLE_RECIPE_LINES), content_type='application/pdf'
+        )
+    
+    def test_validate_and_preview_parse_once(self):
+        """Test the reader is built and page text extracted once per document"""
+        document = PDFDocument(self.upload)
+        with mock.patch('recipes.pdf_document.PyPDF2.PdfReader', wraps=PyPDF2.PdfReader) as reader, \
+                mock.patch.object(PyPDF2.PageObject, 'extract_text', autospec=True,
+                                  side_effect=PyPDF2.PageObject.extract_text) as extract:
+            validation = PDFValidationService().validate_file(document)
+            recipe_data = RecipeImportService().preview_from_pdf(document)
+        
+        self.assertTrue(validation['is_valid'])
+        self.assertEqual(validation['page_count'], 1)
+        self.assertEqual(recipe_data['title'], 'Pasta Pesto')
+        self.assertEqual(reader.call_count, 1)
+        self.assertEqual(extract.call_count, 1)
+    
+    def test_services_accept_uploads_and_documents(self):
+        """Test passing the upload or its document gives the same import"""
+        document = PDFDocument(self.upload)
+        from_upload = EnhancedRecipeImportService().import_recipe_from_file(self.upload)
+        cache.clear()
+        from_document = EnhancedRecipeImportService().import_recipe_from_file(document)
+        
+        self.assertIs(PDFDocument.of(document), document)
+        self.assertEqual(from_upload['content_hash'], document.digest)
+        self.assertEqual(from_upload['recipe_data'], from_document['recipe_data'])
+
+
+@override_settings(PDF_PARALLEL_PROCESSES=2, PDF_PARALLEL_MIN_PAGES=3, PDF_PAGE_TIMEOUT=30)
+class ParallelExtractionTest(TestCase):
+    """Test page-parallel extraction of multi-page PDFs"""
+    
+    def setUp(self):
+        self.pages = [[f'Recipe {number}', f'Page {number} text'] for number in range(1, 5)]
+        self.addCleanup(discard_shared_pool, 'pdf_pages')
+    
+    def _document(self, page_count):
+        return PDFDocument(SimpleUploadedFile('cookbook.pdf', make_pdf_bytes(*self.pages[:page_count])))
+    
+    def test_small_documents_are_extracted_serially(self):
+        """Test documents below PDF_PARALLEL_MIN_PAGES never start the pool"""
+        with mock.patch('recipes.parallel_extraction.get_shared_pool') as get_pool:
+            pages = list(iter_page_texts(self._document(2)))
+        
+        get_pool.assert_not_called()
+        self.assertEqual([number for number, _ in pages], [1, 2])
+    
+    def test_pages_are_extracted_in_pool_and_kept_in_order(self):
+        """Test the process pool returns the same text as serial extraction"""
+        document = self._document(4)
+        with mock.patch('recipes.parallel_extraction.get_shared_pool', wraps=get_shared_pool) as get_pool:
+            pages = list(iter_page_texts(document))
+        
+        get_pool.assert_called_once()
+        self.assertEqual([number for number, _ in pages], [1, 2, 3, 4])
+        with override_settings(PDF_PARALLEL_PROCESSES=0):
+            self.assertEqual(list(iter_page_texts(self._document(4))), pages)
+        self.assertIn('Page 3 text', document.page_text(2))
+    
+    @override_settings(PDF_PAGE_TIMEOUT=0.2)
+    def test_page_timeout_skips_page(self):
+        """Test a page that exceeds the timeout is left out instead of blocking the import"""
+        release = threading.Event()
+        
+        def extract(path, index):
+            if index == 1:
+                release.wait(5)
+            return f'page {index + 1}'
+        
+        pool = ThreadPoolExecutor(max_workers=2)
+        with mock.patch('recipes.parallel_extraction.get_shared_pool', return_value=pool), \
+                mock.patch('recipes.parallel_extraction.extract_page', side_effect=extract):
+            pages = list(iter_page_texts(self._document(3), skip_errors=True))
+        release.set()
+        pool.shutdown()
+        
+        self.assertEqual(pages, [(1, 'page 1'), (3, 'page 3')])
+
+
+def recipe_lines(title):
+    """SAMPLE_RECIPE_LINES with another title"""
+    return [title] + SAMPLE_RECIPE_LINES[1:]
+
+
+class CookbookImportTest(APITestCase):
+    """Test splitting a cookbook PDF into many recipes"""
+    
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root, PDF_PARALLEL_PROCESSES=0)
+        self.settings_override.enable()
+        
+        self.user = User.objects.create_user(username='cookbook', password='secret123')
+        self.client.force_authenticate(user=self.user)
+        
+        lasagne = recipe_lines('Lasagne Bolognese')
+        self.pages = [
+            ['Family Cookbook', 'Preface', 'These recipes were collected over many years.'],
+            recipe_lines('Pasta Pesto') + recipe_lines('Tomato Soup'),
+            lasagne[:5],
+            lasagne[5:],
+        ]
+    
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+    
+    def test_splitter_finds_recipe_boundaries(self):
+        """Test recipes are split at their title block, across pages, without the front matter"""
+        splitter = CookbookSplitter()
+        segments = []
+        for page_number, lines in enumerate(self.pages, start=1):
+            segments.extend(splitter.feed(page_number, '\n'.join(lines)))
+        segments.extend(splitter.finish())
+        
+        self.assertEqual([segment.text.split('\n')[0] for segment in segments],
+                         ['Pasta Pesto', 'Tomato Soup', 'Lasagne Bolognese'])
+        self.assertEqual([(segment.first_page, segment.last_page) for segment in segments],
+                         [(2, 2), (2, 2), (3, 4)])
+        self.assertEqual(segments[2].text, '\n'.join(recipe_lines('Lasagne Bolognese')))
+    
+    def test_sub_header_before_instructions_stays_in_recipe(self):
+        """Test an ingredients header before the instructions does not start a recipe"""
+        lines = [
+            'Stoofpot', 'Ingrediënten', '1 ui', '2 el olie', '500 gram rundvlees', '1 laurierblad',
+            'Ingrediënten voor de saus', '1 ui', '2 dl room',
+            'Bereiding', '1. Fruit de ui in de olie.', '2. Stoof het vlees twee uur.',
+        ] + recipe_lines('Pasta Pesto')
+        splitter = CookbookSplitter()
+        segments = list(splitter.feed(1, '\n'.join(lines))) + list(splitter.finish())
+        
+        self.assertEqual([segment.text.split('\n')[0] for segment in segments], ['Stoofpot', 'Pasta Pesto'])
+        self.assertIn('Ingrediënten voor de saus\n1 ui', segments[0].text)
+    
+    @override_settings(BULK_IMPORT_BATCH_SIZE=1)
+    def test_retried_job_skips_saved_batches(self):
+        """Test a cookbook job that failed halfway does not import its saved recipes again"""
+        upload = SimpleUploadedFile('cookbook.pdf', make_pdf_bytes(*self.pages), content_type='application/pdf')
+        job = enqueue_import(upload, self.user, mode=ImportMode.COOKBOOK)
+        parse = CookbookImporter._parse
+        
+        def fail_on_lasagne(importer, segment):
+            if segment.text.startswith('Lasagne'):
+                raise RuntimeError('Worker crashed')
+            return parse(importer, segment)
+        
+        with mock.patch.object(CookbookImporter, '_parse', fail_on_lasagne):
+            process_import_job(job)
+        self.assertEqual(job.status, ImportJobStatus.FAILED)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 2)
+        
+        job = ImportJob.objects.get(id=job.id)
+        with mock.patch.object(CookbookImporter, '_parse', autospec=True, side_effect=parse) as parsed:
+            process_import_job(job)
+        
+        self.assertEqual(job.status, ImportJobStatus.SUCCEEDED)
+        self.assertEqual(parsed.call_count, 1)
+        self.assertEqual(job.result['recipes_imported'], 3)
+        self.assertEqual(
+            sorted(Recipe.objects.filter(user=self.user).values_list('title', flat=True)),
+            ['Lasagne Bolognese', 'Pasta Pesto', 'Tomato Soup']
+        )
+    
+    @override_settings(RECIPE_IMPORT_ASYNC=False, BULK_IMPORT_BATCH_SIZE=2)
+    def test_cookbook_import_creates_recipe_per_segment(self):
+        """Test mode=cookbook imports every recipe in batches and reports them on the job"""
+        upload = SimpleUploadedFile('cookbook.pdf', make_pdf_bytes(*self.pages), content_type='application/pdf')
+        with mock.patch.object(Recipe.objects, 'bulk_create', wraps=Recipe.objects.bulk_create) as bulk_create:
+            response = self.client.post(
+                reverse('recipe-import-recipe'), {'file': upload, 'mode': 'cookbook'}, format='multipart'
+            )
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['mode'], 'cookbook')
+        self.assertEqual(response.data['result']['recipes_imported'], 3)
+        self.assertEqual(bulk_create.call_count, 2)
+        self.assertEqual(
+            sorted(Recipe.objects.filter(user=self.user).values_list('title', flat=True)),
+            ['Lasagne Bolognese', 'Pasta Pesto', 'Tomato Soup']
+        )
+        self.assertEqual(Recipe.objects.get(title='Lasagne Bolognese').source_metadata.page_count, 2)
+    
+    def test_cookbook_mode_requires_pdf(self):
+        """Test images cannot be imported as cookbooks"""
+        upload = SimpleUploadedFile('scan.png', b'not really an image', content_type='image/png')
+        response = self.client.post(
+            reverse('recipe-import-recipe'), {'file': upload, 'mode': 'cookbook'}, format='multipart'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+def make_png_bytes(ocr_text, image=None):
+    """PNG (blank unless an image is given) whose text the stub OCR backend returns"""
+    info = PngImagePlugin.PngInfo()
+    info.add_text('ocr_text', ocr_text)
+    buffer = io.BytesIO()
+    (image or Image.new('L', (64, 64), color=255)).save(buffer, 'PNG', pnginfo=info)
+    return buffer.getvalue()
+
+
+@override_settings(OCR_BACKEND='stub', OCR_WORKERS=0)
+class OCRWorkerTest(TestCase):
+    """Test OCR runs with a backend loaded once per process"""
+    
+    def setUp(self):
+        cache.clear()
+        backend_patch = mock.patch('recipes.ocr._backend', None)
+        backend_patch.start()
+        self.addCleanup(backend_patch.stop)
+    
+    def _upload(self, name='recipe.png'):
+        return SimpleUploadedFile(name, make_png_bytes('\n'.join(SAMPLE_RECIPE_LINES)), content_type='image/png')
+    
+    def _png_path(self, text):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        path = os.path.join(directory, 'recipe.png')
+        with open(path, 'wb') as image_file:
+            image_file.write(make_png_bytes(text))
+        return path
+    
+    def test_image_import_uses_backend(self):
+        """Test image imports parse the text of the configured backend"""
+        result = EnhancedRecipeImportService().import_recipe_from_file(self._upload())
+        
+        self.assertTrue(result['success'])
+        self.assertEqual(result['extraction_method'], 'stub')
+        self.assertEqual(result['recipe_data']['title'], 'Pasta Pesto')
+    
+    def test_ocr_gets_image_path(self):
+        """Test OCR is given a path, with in-memory uploads spooled to a temporary file that is removed"""
+        from recipes import ocr
+        with mock.patch.object(ocr, 'run_ocr', wraps=ocr.run_ocr) as run:
+            result = TextExtractionService().extract_text_from_file(self._upload())
+        
+        self.assertTrue(result['success'])
+        path = run.call_args.args[0]
+        self.assertTrue(path.endswith('.png'))
+        self.assertFalse(os.path.exists(path))
+    
+    def test_backend_is_loaded_once(self):
+        """Test the engine is not initialised again for every image"""
+        with mock.patch.object(StubOCRBackend, 'load') as load:
+            for name in ('one.png', 'two.png'):
+                cache.clear()
+                TextExtractionService().extract_text_from_file(self._upload(name))
+        load.assert_called_once()
+    
+    @override_settings(OCR_BACKEND='')
+    def test_disabled_ocr_fails_cleanly(self):
+        """Test images cannot be imported without a backend"""
+        result = TextExtractionService().extract_text_from_file(self._upload())
+        self.assertFalse(result['success'])
+        self.assertEqual(result['method'], 'none')
+    
+    @override_settings(OCR_WORKERS=1)
+    def test_ocr_runs_in_worker_pool(self):
+        """Test processes without a backend send images to the pre-warmed pool"""
+        self.addCleanup(discard_shared_pool, 'ocr')
+        # Pool processes load settings from the environment
+        with mock.patch.dict(os.environ, {'OCR_BACKEND': 'stub'}):
+            result = run_ocr(self._png_path('Pasta Pesto'))
+        
+        self.assertEqual(result, {'text': 'Pasta Pesto', 'method': 'stub', 'confidence': 'high'})
+        from recipes import ocr
+        self.assertIsNone(ocr._backend)
+    
+    @override_settings(OCR_WORKERS=1, OCR_TIMEOUT=1)
+    def test_timed_out_ocr_discards_pool(self):
+        """Test a stuck OCR task does not keep its pool slot"""
+        from recipes import ocr
+        future = mock.Mock()
+        future.result.side_effect = FutureTimeoutError()
+        pool = mock.Mock(submit=mock.Mock(return_value=future))
+        
+        with mock.patch.object(ocr, 'get_shared_pool', return_value=pool), \
+                mock.patch.object(ocr, 'discard_shared_pool') as discard:
+            with self.assertRaises(FutureTimeoutError):
+                run_ocr(self._png_path('Pasta Pesto'))
+        
+        discard.assert_called_once_with('ocr')
+    
+    @override_settings(OCR_TIMEOUT=0)
+    def test_timed_out_ocr_in_process(self):
+        """Test OCR in a process with the backend loaded gives up after OCR_TIMEOUT too"""
+        release = threading.Event()
+        self.addCleanup(release.set)
+        with mock.patch.object(StubOCRBackend, 'read_text', side_effect=lambda image: release.wait(5) and ''):
+            with self.assertRaises(FutureTimeoutError):
+                run_ocr(self._png_path('Pasta Pesto'))
+
+
+def make_page_image(width=800, height=600, angle=0):
+    """Grayscale page with dark text lines on a light gradient, rotated by angle degrees"""
+    page = Image.linear_gradient('L').resize((width, height)).point(lambda value: 255 - value // 3)
+    draw = ImageDraw.Draw(page)
+    for top in range(60, height - 60, 30):
+        draw.rectangle([60, top, width - 60, top + 12], fill=30)
+    return page.rotate(angle, fillcolor=255)
+
+
+class ImagePreprocessingTest(TestCase):
+    """Test photos are downscaled, turned upright, thresholded and deskewed before OCR"""
+    
+    def test_threshold_is_binary_despite_uneven_lighting(self):
+        """Test the dark corner of the page does not turn black"""
+        binary = adaptive_threshold(make_page_image())
+        
+        self.assertEqual(set(binary.flatten().tolist()), {0, 255})
+        # The margin right of the lines is white along the whole gradient
+        self.assertTrue((binary[:, -30:] == 255).all())
+    
+    def test_skew_is_estimated_and_undone(self):
+        """Test a rotated page is rotated back"""
+        binary = adaptive_threshold(make_page_image(angle=3))
+        self.assertAlmostEqual(estimate_skew(binary), -3, delta=0.2)
+        
+        straightened = preprocess_image(make_page_image(angle=3))
+        self.assertAlmostEqual(estimate_skew(adaptive_threshold(straightened)), 0, delta=0.2)
+    
+    def test_photo_is_downscaled_and_turned_upright(self):
+        """Test large JPEGs are scaled within the pixel budget and their EXIF orientation applied"""
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Rotated 90 degrees clockwise
+        buffer = io.BytesIO()
+        make_page_image(2400, 1600).convert('RGB').save(buffer, 'JPEG', exif=exif)
+        
+        with Image.open(buffer) as photo:
+            result = preprocess_image(photo, max_pixels=1_000_000, binarize=False)
+        
+        self.assertEqual(result.mode, 'L')
+        self.assertLessEqual(result.width * result.height, 1_000_000)
+        self.assertGreater(result.height, result.width)
+        self.assertNotIn('exif', result.info)
+    
+    def test_image_info_is_kept(self):
+        """Test metadata such as PNG text chunks survives preprocessing"""
+        with Image.open(io.BytesIO(make_png_bytes('Pasta Pesto'))) as image:
+            self.assertEqual(preprocess_image(image).info['ocr_text'], 'Pasta Pesto')
+
+
+def make_card_image(seed, width=640, height=480):
+    """Recipe card with lines of 'words' whose lengths depend on the seed"""
+    rng = random.Random(seed)
+    card = Image.new('L', (width, height), color=235)
+    draw = ImageDraw.Draw(card)
+    for top in range(40, height - 40, 28):
+        left = 40
+        while left < width - 80:
+            word = rng.randint(20, 90)
+            draw.rectangle([left, top, left + word, top + 12], fill=30)
+            left += word + rng.randint(10, 30)
+    return card
+
+
+@override_settings(OCR_BACKEND='stub', OCR_WORKERS=0, OCR_HASH_CACHE_ENABLED=True, OCR_HASH_CACHE_DISTANCE=8)
+class ImageHashCacheTest(TestCase):
+    """Test near-duplicate photos reuse OCR text through the perceptual-hash index"""
+    
+    def setUp(self):
+        cache.clear()
+        image_hash_index.reset_indexes()
+        self.addCleanup(image_hash_index.reset_indexes)
+        self.user = User.objects.create_user(username='photographer', password='secret123')
+    
+    def _extract(self, name, ocr_text, image, user=None):
+        upload = SimpleUploadedFile(name, make_png_bytes(ocr_text, image), content_type='image/png')
+        return TextExtractionService().extract_text_from_file(upload, user or self.user)
+    
+    def test_near_duplicate_photo_reuses_ocr_text(self):
+        """Test a brighter, larger shot of the same card gets the text of the first shot"""
+        first = self._extract('first.png', 'Pasta Pesto', make_card_image(1))
+        retake = ImageEnhance.Brightness(make_card_image(1)).enhance(1.1).resize((800, 600))
+        second = self._extract('second.png', 'Pasta Pest0', retake)
+        
+        self.assertFalse(first['ocr_cache_hit'])
+        self.assertTrue(second['ocr_cache_hit'])
+        self.assertEqual(second['text'], 'Pasta Pesto')
+        self.assertEqual(ImageHash.objects.count(), 1)
+    
+    def test_different_card_runs_ocr(self):
+        """Test another recipe card is not mistaken for a stored one"""
+        self._extract('first.png', 'Pasta Pesto', make_card_image(1))
+        other = self._extract('other.png', 'Tomato Soup', make_card_image(2))
+        
+        self.assertFalse(other['ocr_cache_hit'])
+        self.assertEqual(other['text'], 'Tomato Soup')
+    
+    def test_photos_of_other_users_are_not_reused(self):
+        """Test a near-duplicate photo never returns the text another user uploaded"""
+        other_user = User.objects.create_user(username='neighbour', password='secret123')
+        self._extract('first.png', 'Geheim familierecept', make_card_image(1))
+        retake = ImageEnhance.Brightness(make_card_image(1)).enhance(1.1)
+        
+        result = self._extract('retake.png', 'Pasta Pesto', retake, user=other_user)
+        
+        self.assertFalse(result['ocr_cache_hit'])
+        self.assertEqual(result['text'], 'Pasta Pesto')
+        self.assertEqual(ImageHash.objects.filter(user=other_user).count(), 1)
+    
+    def test_index_picks_up_rows_of_other_processes(self):
+        """Test hashes stored after the index was loaded are found"""
+        self.assertIsNone(image_hash_index.lookup(0x0F0F0F0F0F0F0F0F, self.user))
+        ImageHash.objects.create(
+            user=self.user, hash=image_hash_index.to_signed(0xF0F0F0F0F0F0F0F0), backend='stub',
+            text='Pasta Pesto', method='stub', confidence='high'
+        )
+        
+        result = image_hash_index.lookup(0xF0F0F0F0F0F0F0F1, self.user)
+        self.assertEqual(result['text'], 'Pasta Pesto')
+        self.assertEqual(result['hash_distance'], 1)
+    
+    def test_multi_index_hash_matches_linear_scan(self):
+        """Test index lookups return exactly the hashes a full scan finds"""
+        rng = random.Random(7)
+        hashes = [rng.getrandbits(64) for _ in range(2000)]
+        # Near copies of some hashes, with up to 2 bits flipped
+        hashes += [value ^ (1 << rng.randrange(64)) ^ (1 << rng.randrange(64)) for value in hashes[:200]]
+        hash_index = image_hash_index.MultiIndexHash()
+        for position, value in enumerate(hashes):
+            hash_index.add(value, position)
+        
+        for query in hashes[:50] + [rng.getrandbits(64) for _ in range(50)]:
+            expected = sorted(
+                position for position, value in enumerate(hashes)
+                if image_hash_index.hamming_distance(query, value) <= 8
+            )
+            self.assertEqual(sorted(position for _, position in hash_index.find(query, 8)), expected)
+
+
+class ReparseTest(TestCase):
+    """Test stored import texts are kept in full and can be parsed again"""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='reparser', password='secret123')
+        self.service = EnhancedRecipeImportService()
+    
+    def _import(self, lines=SAMPLE_RECIPE_LINES):
+        upload = SimpleUploadedFile('pasta.pdf', make_pdf_bytes(lines), content_type='application/pdf')
+        import_result = self.service.import_recipe_from_file(upload)
+        return self.service.save_recipe(import_result, self.user, 'pasta.pdf', upload.size)
+    
+    def _simulate_older_parser(self, recipe):
+        """Change the recipe like a worse parser would have, without marking it as edited"""
+        Recipe.objects.filter(pk=recipe.pk).update(title='Pasta')
+        recipe.ingredients.filter(order=2).delete()
+    
+    def test_full_text_is_kept_compressed(self):
+        """Test texts longer than the 1000 character preview survive the import"""
+        steps = [f'{number}. Roer de saus en laat hem nog een minuut zachtjes koken.' for number in range(3, 40)]
+        recipe = self._import(SAMPLE_RECIPE_LINES + steps)
+        metadata = recipe.source_metadata
+        
+        self.assertLessEqual(len(metadata.raw_text), 1000)
+        self.assertGreater(len(metadata.full_text), 2000)
+        self.assertIn('39. Roer de saus', metadata.full_text)
+        self.assertLess(len(metadata.raw_text_compressed), len(metadata.full_text.encode()) / 2)
+    
+    def test_dry_run_reports_changes_without_writing(self):
+        """Test the dry run counts changed fields and ingredients"""
+        recipe = self._import()
+        self._simulate_older_parser(recipe)
+        ingredient_count = recipe.ingredients.count()
+        output = io.StringIO()
+        
+        call_command('reparse_recipes', '--dry-run', '--processes', '0', stdout=output)
+        
+        self.assertIn('would change:         1', output.getvalue())
+        self.assertIn('title: 1', output.getvalue())
+        self.assertIn('Ingredients: +1 / -0', output.getvalue())
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'Pasta')
+        self.assertEqual(recipe.ingredients.count(), ingredient_count)
+    
+    def test_reparse_updates_recipes_in_pool(self):
+        """Test changed recipes are written back with their ingredients"""
+        recipe = self._import()
+        unchanged = self._import()
+        self._simulate_older_parser(recipe)
+        
+        stats = RecipeReparser(processes=1, batch_size=1).reparse()
+        
+        self.assertEqual((stats['changed'], stats['unchanged']), (1, 1))
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'Pasta Pesto')
+        self.assertEqual(
+            list(recipe.ingredients.values_list('name', flat=True)),
+            list(unchanged.ingredients.values_list('name', flat=True))
+        )
+    
+    def test_edited_and_old_imports_are_skipped(self):
+        """Test user edits are kept and imports without full text are left alone"""
+        edited = self._import()
+        edited.title = 'Pasta van oma'
+        edited.save()
+        old = self._import()
+        SourceMetadata.objects.filter(recipe=old).update(raw_text_compressed=None)
+        
+        stats = RecipeReparser(processes=0).reparse()
+        
+        self.assertEqual((stats['skipped_edited'], stats['skipped_no_text']), (1, 1))
+        edited.refresh_from_db()
+        self.assertEqual(edited.title, 'Pasta van oma')
+        
+        stats = RecipeReparser(processes=0, include_edited=True).reparse()
+        self.assertEqual(stats['changed'], 1)
+
+
+class ImportPreviewTest(APITestCase):
+    """Test saving a previewed import with its preview token"""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='previewer', password='secret123')
+        self.client.force_authenticate(user=self.user)
+    
+    def _preview(self):
+        upload = SimpleUploadedFile(
+            'pasta.pdf', make_pdf_bytes(SAMPLE_RECIPE_LINES), content_type='application/pdf'
+        )
+        response = self.client.post(
+            reverse('recipe-import-recipe'), {'file': upload, 'preview': 'true'}, format='multipart'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+    
+    def test_commit_saves_edited_preview_without_parsing_again(self):
+        """Test the commit creates the recipe from the cached parse plus edits"""
+        preview = self._preview()
+        self.assertEqual(Recipe.objects.count(), 0)
+        
+        with mock.patch.object(EnhancedRecipeImportService, 'import_recipe_from_file') as import_file:
+            response = self.client.post(reverse('recipe-import-commit'), {
+                'preview_token': preview['preview_token'],
+                'title': 'Pasta Pesto Verde',
+                'ingredients': [{'name': 'pasta', 'amount': '200', 'unit': 'gram'}],
+            }, format='json')
+        
+        import_file.assert_not_called()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=response.data['recipe']['id'])
+        self.assertEqual(recipe.title, 'Pasta Pesto Verde')
+        self.assertEqual(recipe.instructions, preview['instructions'])
+        self.assertEqual(list(recipe.ingredients.values_list('name', 'amount', 'unit')), [('pasta', '200', 'g')])
+        self.assertEqual(recipe.source_metadata.original_filename, 'pasta.pdf')
+        self.assertIn('extraction', recipe.source_metadata.stage_timings)
+        self.assertIn('persist', recipe.source_metadata.stage_timings)
+    
+    def test_token_can_only_be_committed_once(self):
+        """Test a second commit of the same preview is rejected"""
+        token = self._preview()['preview_token']
+        url = reverse('recipe-import-commit')
+        
+        self.assertEqual(self.client.post(url, {'preview_token': token}, format='json').status_code, 201)
+        self.assertEqual(self.client.post(url, {'preview_token': token}, format='json').status_code, 404)
+        self.assertEqual(Recipe.objects.count(), 1)
+    
+    def test_token_kept_when_save_fails(self):
+        """Test a commit that fails leaves the preview to be committed again"""
+        token = self._preview()['preview_token']
+        url = reverse('recipe-import-commit')
+        
+        with mock.patch.object(ImportPipeline, 'run', side_effect=RuntimeError('database went away')):
+            self.assertEqual(self.client.post(url, {'preview_token': token}, format='json').status_code, 400)
+        
+        self.assertEqual(self.client.post(url, {'preview_token': token}, format='json').status_code, 201)
+        self.assertEqual(Recipe.objects.count(), 1)
+    
+    def test_token_belongs_to_user(self):
+        """Test other users cannot commit someone else's preview"""
+        token = self._preview()['preview_token']
+        other = User.objects.create_user(username='other', password='secret123')
+        self.client.force_authenticate(user=other)
+        
+        response = self.client.post(reverse('recipe-import-commit'), {'preview_token': token}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ChunkedUploadTest(APITestCase):
+    """Test resumable uploads spooled to disk"""
+    
+    def setUp(self):
+        self.upload_dir = tempfile.mkdtemp()
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(
+            CHUNKED_UPLOAD_DIR=self.upload_dir, MEDIA_ROOT=self.media_root, CHUNKED_UPLOAD_CHUNK_SIZE=256
+        )
+        self.settings_override.enable()
+        
+        self.user = User.objects.create_user(username='uploader', password='secret123')
+        self.client.force_authenticate(user=self.user)
+        self.content = make_pdf_bytes(SAMPLE_RECIPE_LINES)
+    
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.upload_dir, ignore_errors=True)
+        shutil.rmtree(self.media_root, ignore_errors=True)
+    
+    def _start(self):
+        response = self.client.post(reverse('chunkedupload-list'), {
+            'filename': 'pasta.pdf', 'size': len(self.content), 'purpose': 'import'
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data['id']
+    
+    def _send(self, upload_id, offset, data):
+        return self.client.generic(
+            'PUT', reverse('chunkedupload-chunk', args=[upload_id]), data,
+            content_type='application/octet-stream', HTTP_UPLOAD_OFFSET=str(offset)
+        )
+    
+    def _send_all(self, upload_id):
+        for offset in range(0, len(self.content), 256):
+            self._send(upload_id, offset, self.content[offset:offset + 256])
+    
+    def test_upload_in_chunks_queues_import(self):
+        """Test chunks are appended in order and completing queues an import job"""
+        upload_id = self._start()
+        for offset in range(0, len(self.content), 256):
+            response = self._send(upload_id, offset, self.content[offset:offset + 256])
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['offset'], len(self.content))
+        
+        response = self.client.post(reverse('chunkedupload-complete', args=[upload_id]))
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job = ImportJob.objects.get(id=response.data['id'])
+        self.assertEqual(job.original_filename, 'pasta.pdf')
+        with job.file.open('rb') as stored:
+            self.assertEqual(stored.read(), self.content)
+        self.assertEqual(os.listdir(self.upload_dir), [])
+    
+    def test_wrong_offset_returns_expected_offset(self):
+        """Test a chunk that does not continue the upload is rejected with the offset to resume from"""
+        upload_id = self._start()
+        self._send(upload_id, 0, self.content[:256])
+        
+        response = self._send(upload_id, 0, self.content[:256])
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['offset'], 256)
+        
+        resumed = self.client.get(reverse('chunkedupload-detail', args=[upload_id]))
+        self.assertEqual(resumed.data['offset'], 256)
+    
+    def test_incomplete_upload_cannot_be_completed(self):
+        """Test completing before all bytes arrived is rejected"""
+        upload_id = self._start()
+        self._send(upload_id, 0, self.content[:256])
+        
+        response = self.client.post(reverse('chunkedupload-complete', args=[upload_id]))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(ImportJob.objects.count(), 0)
+    
+    def test_upload_is_queued_once(self):
+        """Test a completion that read the upload before another one finished does not queue it again"""
+        upload_id = self._start()
+        self._send_all(upload_id)
+        stale = ChunkedUpload.objects.get(id=upload_id)
+        
+        response = self.client.post(reverse('chunkedupload-complete', args=[upload_id]))
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        with self.assertRaisesMessage(ValueError, 'already complete'):
+            complete_upload(stale)
+        self.assertEqual(ImportJob.objects.count(), 1)
+    
+    def test_failed_hand_over_can_be_retried(self):
+        """Test an upload stays completable when queueing it fails"""
+        upload_id = self._start()
+        self._send_all(upload_id)
+        url = reverse('chunkedupload-complete', args=[upload_id])
+        
+        with mock.patch('recipes.import_jobs.enqueue_import', side_effect=OSError('disk full')):
+            self.assertEqual(self.client.post(url).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(ChunkedUpload.objects.get(id=upload_id).status, ChunkedUploadStatus.UPLOADING)
+        
+        self.assertEqual(self.client.post(url).status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(ImportJob.objects.count(), 1)
+
+
+class RejectUntitledStage(ImportStage):
+    """Pipeline stage plugged in by ImportPipelineTest"""
+    
+    name = 'review'
+    error_stage = 'review'
+    
+    def run(self, context):
+        if context.result['recipe_data']['title'] == 'Imported Recipe':
+            raise ImportStageError('Recipe has no title')
+
+
+class ImportPipelineTest(APITestCase):
+    """Test the staged import pipeline and its stored timings"""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='pipeline', password='secret123')
+        self.client.force_authenticate(user=self.user)
+    
+    def _upload(self, lines=SAMPLE_RECIPE_LINES):
+        return SimpleUploadedFile('pasta.pdf', make_pdf_bytes(lines), content_type='application/pdf')
+    
+    def _metadata(self, user, timings, days_ago=0):
+        recipe = Recipe.objects.create(user=user, title='Timed recipe')
+        metadata = SourceMetadata.objects.create(
+            recipe=recipe, original_filename='timed.pdf', file_size=1000,
+            text_size=200, extraction_method='pdf_extraction', stage_timings=timings
+        )
+        if days_ago:
+            SourceMetadata.objects.filter(pk=metadata.pk).update(
+                import_date=timezone.now() - timedelta(days=days_ago)
+            )
+    
+    def test_stage_timings_are_stored_on_metadata(self):
+        """Test every stage, the byte counts and the extraction method are recorded"""
+        upload = self._upload()
+        context = ImportPipeline.from_settings().run(ImportContext(upload, user=self.user))
+        
+        self.assertTrue(context.succeeded)
+        metadata = context.recipe.source_metadata
+        self.assertEqual(
+            list(metadata.stage_timings),
+            ['validation', 'extraction', 'parsing', 'classification', 'persist']
+        )
+        self.assertEqual(metadata.file_size, upload.size)
+        self.assertEqual(metadata.text_size, len(metadata.full_text.encode('utf-8')))
+        self.assertEqual(metadata.extraction_method, context.result['extraction_method'])
+        self.assertEqual(metadata.page_count, 1)
+        self.assertTrue(context.recipe.categories)
+    
+    def test_invalid_file_stops_at_validation(self):
+        """Test malformed PDFs are rejected before any extraction"""
+        upload = SimpleUploadedFile('pasta.pdf', b'not a pdf at all', content_type='application/pdf')
+        
+        with mock.patch.object(TextExtractionService, 'extract_text_from_file') as extract:
+            context = ImportPipeline.from_settings().run(ImportContext(upload, user=self.user))
+        
+        extract.assert_not_called()
+        self.assertEqual(context.result['stage'], 'validation')
+        self.assertEqual(list(context.timings), ['validation'])
+        self.assertEqual(Recipe.objects.count(), 0)
+    
+    @override_settings(IMPORT_PIPELINE_STAGES=[
+        'validation', 'extraction', 'parsing', 'recipes.tests.RejectUntitledStage', 'persist'
+    ])
+    def test_custom_stage_from_settings(self):
+        """Test stages given as dotted paths run in their configured position"""
+        untitled = self._upload(['200 gram pasta', 'Kook'])
+        context = ImportPipeline.from_settings().run(ImportContext(untitled, user=self.user))
+        
+        self.assertEqual(context.result['stage'], 'review')
+        self.assertNotIn('persist', context.timings)
+        self.assertEqual(Recipe.objects.count(), 0)
+        
+        context = ImportPipeline.from_settings().run(ImportContext(self._upload(), user=self.user))
+        self.assertEqual(list(context.timings), ['validation', 'extraction', 'parsing', 'review', 'persist'])
+    
+    def test_import_stats_percentiles(self):
+        """Test the endpoint reports p50/p95 per stage for the user's recent imports"""
+        for seconds in range(1, 21):
+            self._metadata(self.user, {'extraction': seconds / 10, 'parsing': 0.01})
+        self._metadata(self.user, {'extraction': 99.0, 'parsing': 0.01}, days_ago=60)
+        other = User.objects.create_user(username='other', password='secret123')
+        self._metadata(other, {'extraction': 99.0, 'parsing': 0.01})
+        
+        response = self.client.get(reverse('recipe-import-stats'))
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['imports'], 20)
+        stages = {row['stage']: row for row in response.data['stages']}
+        self.assertEqual(list(stages), ['extraction', 'parsing', 'total'])
+        self.assertAlmostEqual(stages['extraction']['p50'], 1.05)
+        self.assertAlmostEqual(stages['extraction']['p95'], 1.905)
+        self.assertEqual(stages['extraction']['max'], 2.0)
+        self.assertEqual(response.data['extraction_methods'], {'pdf_extraction': 20})
+        self.assertEqual(response.data['sizes']['text_size']['p50'], 200)
+        
+        response = self.client.get(reverse('recipe-import-stats'), {'days': 90})
+        self.assertEqual(response.data['imports'], 21)
+        self.assertEqual(self.client.get(reverse('recipe-import-stats'), {'days': 'x'}).status_code, 400)
+
+
+class QuantityParserTest(APITestCase):
+    """Test ingredient quantities and units are parsed at import and edit time"""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='measurer', password='secret123')
+        self.client.force_authenticate(user=self.user)
+    
+    def test_parse_ingredient_lines(self):
+        """Test fractions, ranges, number words and Dutch, metric and imperial units"""
+        cases = [
+            ('- 200 gram pasta', '200', 'g', '200 gram', 'pasta'),
+            ('2 el olijfolie', '2', 'tbsp', '2 el', 'olijfolie'),
+            ('½ tl zout', '0.5', 'tsp', '½ tl', 'zout'),
+            ('1½ kg aardappelen', '1.5', 'kg', '1½ kg', 'aardappelen'),
+            ('1 1/2 cups of flour', '1.5', 'cup', '1 1/2 cups', 'flour'),
+            ('1,5 liter melk', '1.5', 'l', '1,5 liter', 'melk'),
+            ('2-3 teentjes knoflook', '3', 'clove', '2-3 teentjes', 'knoflook'),
+            ('2 tot 3 uien', '3', '', '2 tot 3', 'uien'),
+            ('een snufje zout', '1', 'pinch', 'een snufje', 'zout'),
+            ('8 oz cheddar', '8', 'oz', '8 oz', 'cheddar'),
+            ('3 large eggs', '3', '', '3', 'large eggs'),
+            ('a pinch of salt', '1', 'pinch', 'a pinch', 'salt'),
+            ('1 a 2 uien', '2', '', '1 a 2', 'uien'),
+            ('250g/8oz flour', '250', 'g', '250g', 'flour'),
+            ('1 cup / 240 ml milk', '1', 'cup', '1 cup', 'milk'),
+        ]
+        for line, quantity, unit, amount, name in cases:
+            with self.subTest(line=line):
+                parsed = parse_ingredient_line(line)
+                self.assertEqual(parsed.quantity, Decimal(quantity))
+                self.assertEqual((parsed.unit, parsed.amount, parsed.name), (unit, amount, name))
+        
+        self.assertIsNone(parse_ingredient_line('Zout en peper'))
+        self.assertEqual(parse_ingredient_line('snufje peper')[:2], (None, 'pinch'))
+    
+    def test_parse_amounts(self):
+        """Test packs, approximate amounts and pounds, and that other text after a number is no amount"""
+        cases = {
+            '2 x 400 g': ('800', 'g'), '2x400g': ('800', 'g'), 'ca. 100 g': ('100', 'g'),
+            'circa 2 el': ('2', 'tbsp'), '1 pond': ('1', 'pond'), '1 blik (400 g)': ('1', 'can'),
+        }
+        for amount, (quantity, unit) in cases.items():
+            with self.subTest(amount=amount):
+                self.assertEqual(parse_amount(amount), (Decimal(quantity), unit))
+        
+        for amount in ['1e', '5 5 5', '2 grote', 'naar smaak']:
+            with self.subTest(amount=amount):
+                self.assertEqual(parse_amount(amount), (None, ''))
+    
+    def test_import_fills_quantity_and_unit(self):
+        """Test imported ingredient lines are split into amount, quantity, unit and name"""
+        upload = SimpleUploadedFile('pasta.pdf', make_pdf_bytes(SAMPLE_RECIPE_LINES), content_type='application/pdf')
+        context = ImportPipeline.from_settings().run(ImportContext(upload, user=self.user))
+        
+        ingredients = list(context.recipe.ingredients.values_list('name', 'amount', 'unit', 'quantity'))
+        self.assertIn(('pasta', '200 gram', 'g', Decimal('200')), ingredients)
+        self.assertIn(('pesto', '1 pot', 'jar', Decimal('1')), ingredients)
+    
+    def test_edit_parses_amount(self):
+        """Test amounts entered in the recipe form get a quantity and canonical unit"""
+        response = self.client.post(reverse('recipe-list'), {
+            'title': 'Salade',
+            'ingredients': [
+                {'name': 'olijfolie', 'amount': '3 eetlepels'},
+                {'name': 'rucola', 'amount': '75', 'unit': 'gram'},
+                {'name': 'peper', 'amount': 'naar smaak'},
+            ],
+        }, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=response.data['id'])
+        self.assertEqual(
+            list(recipe.ingredients.order_by('name').values_list('name', 'unit', 'quantity')),
+            [('olijfolie', 'tbsp', Decimal('3')), ('peper', '', None), ('rucola', 'g', Decimal('75'))]
+        )
+    
+    def test_backfill_command(self):
+        """Test stored whole-line ingredients are split in batches"""
+        recipe = Recipe.objects.create(user=self.user, title='Oud recept')
+        for order, line in enumerate(['500 g gehakt', '2 blikken tomaten', 'Zout'] * 3):
+            Ingredient.objects.create(recipe=recipe, name=line, order=order)
+        output = io.StringIO()
+        
+        call_command('backfill_ingredient_quantities', '--batch-size', '2', stdout=output)
+        
+        self.assertIn('Updated 6 ingredients', output.getvalue())
+        self.assertEqual(
+            set(recipe.ingredients.values_list('name', 'unit', 'quantity')),
+            {('gehakt', 'g', Decimal('500')), ('tomaten', 'can', Decimal('2')), ('Zout', '', None)}
+        )
+
+
+class IngredientClassifierTest(APITestCase):
+    """Test ingredients are sorted into shopping list categories"""
+    
+    def setUp(self):
+        cache.clear()
+        ingredient_classifier.reset_cache()
+        self.user = User.objects.create_user(username='shopper', password='secret123')
+        self.client.force_authenticate(user=self.user)
+    
+    def test_classify_names(self):
+        """Test plurals, diminutives, compounds, phrases and frozen markers"""
+        cases = [
+            ('tomaten', IngredientCategory.PRODUCE),
+            ('Tomaatjes (cherry), gehalveerd', IngredientCategory.PRODUCE),
+            ('tomatenpuree', IngredientCategory.PANTRY),
+            ('kipfilet in blokjes', IngredientCategory.MEAT),
+            ('olive oil', IngredientCategory.CONDIMENTS),
+            ('Crème fraîche', IngredientCategory.DAIRY),
+            ('eggs', IngredientCategory.DAIRY),
+            ('diepvries spinazie', IngredientCategory.FROZEN),
+            ('frozen peas', IngredientCategory.FROZEN),
+            ('kaneel', IngredientCategory.SPICES),
+            ('ijsbergsla', IngredientCategory.PRODUCE),
+            ('xylofoon', IngredientCategory.OTHER),
+        ]
+        categories = ingredient_classifier.classify_many(name for name, _ in cases)
+        for name, category in cases:
+            with self.subTest(name=name):
+                self.assertEqual(categories[name], category)
+    
+    def test_memoised_per_canonical_name(self):
+        """Test names are stored once and answered from the LRU afterwards"""
+        ingredient_classifier.classify_many(['Rode uien', 'rode uien, gesnipperd', 'melk'])
+        
+        self.assertEqual(
+            set(IngredientClassification.objects.values_list('name', 'category')),
+            {('rode uien', 'produce'), ('melk', 'dairy')}
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(ingredient_classifier.classify('RODE UIEN'), IngredientCategory.PRODUCE)
+    
+    def test_manual_category_wins(self):
+        """Test a category set by hand is used over the lexicon"""
+        IngredientClassification.objects.create(name='tofu', category=IngredientCategory.MEAT, is_manual=True)
+        IngredientClassification.objects.create(name='melk', category=IngredientCategory.FROZEN, lexicon_version='old')
+        
+        categories = ingredient_classifier.classify_many(['Tofu', 'melk'])
+        
+        self.assertEqual(categories, {'Tofu': IngredientCategory.MEAT, 'melk': IngredientCategory.DAIRY})
+        self.assertEqual(IngredientClassification.objects.get(name='melk').category, IngredientCategory.DAIRY)
+    
+    def test_import_and_edit_set_category(self):
+        """Test imported and entered ingredients are classified, chosen categories are kept"""
+        upload = SimpleUploadedFile('pasta.pdf', make_pdf_bytes(SAMPLE_RECIPE_LINES), content_type='application/pdf')
+        context = ImportPipeline.from_settings().run(ImportContext(upload, user=self.user))
+        self.assertEqual(context.recipe.ingredients.get(name='pasta').category, IngredientCategory.PANTRY)
+        
+        response = self.client.post(reverse('recipe-list'), {
+            'title': 'Salade',
+            'ingredients': [
+                {'name': 'rucola', 'amount': '75 gram'},
+                {'name': 'parmezaan', 'category': IngredientCategory.DAIRY},
+                {'name': 'croutons', 'category': IngredientCategory.BAKERY},
+            ],
+        }, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            dict(Recipe.objects.get(id=response.data['id']).ingredients.values_list('name', 'category')),
+            {'rucola': 'produce', 'parmezaan': 'dairy', 'croutons': 'bakery'}
+        )
+    
+    def test_classify_command(self):
+        """Test stored ingredients in 'other' are classified in batches"""
+        recipe = Recipe.objects.create(user=self.user, title='Oud recept')
+        for order, name in enumerate(['gehakt', 'bloem', 'xylofoon'] * 3):
+            Ingredient.objects.create(recipe=recipe, name=name, order=order)
+        output = io.StringIO()
+        
+        call_command('classify_ingredients', '--batch-size', '2', stdout=output)
+        
+        self.assertIn('Classified 6 ingredients', output.getvalue())
+        self.assertEqual(
+            set(recipe.ingredients.values_list('name', 'category')),
+            {('gehakt', 'meat'), ('bloem', 'pantry'), ('xylofoon', 'other')}
+        )
+
+
+class IngredientIndexTest(TestCase):
+    """Test free-text ingredient names resolve to the canonical ingredient dictionary"""
+    
+    def setUp(self):
+        ingredient_index.load_dictionary()
+        self.addCleanup(ingredient_index.reset_index)
+    
+    def test_variants_resolve_to_one_entry(self):
+        """Test plurals, modifiers, notes, aliases and typos resolve to the same ingredient"""
+        cases = {
+            'ui': 'ui', 'uien': 'ui', 'grote ui': 'ui', 'rode uien': 'ui', 'Ui (gesnipperd)': 'ui', 'uitjes': 'ui',
+            'knoflok': 'knoflook', 'teentjes knoflook': 'knoflook',
+            'champigons': 'champignon', 'Champignons, in plakjes': 'champignon',
+            'Tomaten (in blik)': 'tomaat', 'eieren': 'ei', 'Onions': 'onion', 'zalmfilet': 'zalm',
+            'paprikapoeder': 'paprikapoeder', 'gehakt': 'gehakt', 'xylofoon': None, '1.': None,
+        }
+        resolved = ingredient_index.resolve_many(cases)
+        for name, canonical in cases.items():
+            with self.subTest(name=name):
+                self.assertEqual(resolved[name] and resolved[name].name, canonical)
+    
+    def test_different_products_are_not_merged(self):
+        """Test names that share a word with an entry but are another product do not resolve to it"""
+        cases = {
+            'coconut milk': 'milk', 'onion powder': 'onion', 'spring onion': 'onion',
+            'sweet potato': 'potato', 'rode peper': 'peper', 'slagroom': 'boter',
+            'zure room': 'slagroom', 'zout en peper': 'peper', 'beter': 'boter',
+            'gepelde tomaten': 'passata',
+        }
+        resolved = ingredient_index.resolve_many(cases)
+        for name, wrong in cases.items():
+            with self.subTest(name=name):
+                self.assertNotEqual(resolved[name] and resolved[name].name, wrong)
+        self.assertIsNone(resolved['zout en peper'])
+        self.assertIsNone(resolved['beter'])
+    
+    def test_memoised_until_dictionary_changes(self):
+        """Test names are answered from the memo, and an edited dictionary is compiled again"""
+        self.assertIsNone(ingredient_index.resolve('pompoen'))
+        with self.assertNumQueries(1):
+            self.assertIsNone(ingredient_index.resolve('pompoen'))
+        
+        # Another process edits the dictionary without resetting this one's index
+        entry = CanonicalIngredient.objects.create(name='flespompoen', aliases=['pompoen'])
+        
+        self.assertEqual(ingredient_index.resolve('pompoenen'), (entry.id, 'flespompoen'))
+    
+    def test_load_keeps_edited_entries(self):
+        """Test loading the dictionary again only adds missing entries"""
+        CanonicalIngredient.objects.filter(name='ui').update(aliases=['sjalotje'])
+        CanonicalIngredient.objects.filter(name='prei').delete()
+        output = io.StringIO()
+        
+        call_command('load_canonical_ingredients', stdout=output)
+        
+        self.assertIn('Added 1 ingredients', output.getvalue())
+        self.assertEqual(CanonicalIngredient.objects.get(name='ui').aliases, ['sjalotje'])
+        self.assertEqual(ingredient_index.resolve('sjalotjes').name, 'ui')
@@ -2,43 +2,35 @@
 Enhanced text extraction service for recipes from PDFs and images
 """
 import os
-import re
 import logging
 from typing import Dict, List, Any, Optional, Union
 from django.core.files.uploadedfile import UploadedFile
 from PIL import Image
-import PyPDF2
 
-logger = logging.getLogger(__name__)
-
-# Disable OCR libraries in production to avoid import issues
-# These cause AttributeError with numpy/opencv compatibility issues
-TESSERACT_AVAILABLE = False
-EASYOCR_AVAILABLE = False
-OPENCV_AVAILABLE = False
+from . import image_hash_index, ocr
+from .page_stream import stream_recipe_text
+from .parser_engine import ParseBudget, RecipeDocument, RecipeTextParserEngine
+from .pdf_document import PDFDocument
+from .quantity_parser import fill_quantity, parse_ingredient_line
+from .workers import worker_file_path
+from .ingredient_classifier import classify_ingredients
 
-logger.info("OCR libraries disabled - using PyPDF2 text extraction only")
+logger = logging.getLogger(__name__)
 
 
 class TextExtractionService:
     """Service for extracting text from PDFs and images"""
     
     def __init__(self):
-        self.easyocr_reader = None
-        if EASYOCR_AVAILABLE:
-            try:
-                # Initialize EasyOCR reader for English and Dutch
-                self.easyocr_reader = easyocr.Reader(['en', 'nl'])
-            except Exception as e:
-                logger.warning(f"Failed to initialize EasyOCR: {e}")
-                self.easyocr_reader = None
+        self.parser_engine = RecipeTextParserEngine()
     
-    def extract_text_from_file(self, file: UploadedFile) -> Dict[str, Any]:
+    def extract_text_from_file(self, file: UploadedFile, user=None) -> Dict[str, Any]:
         """
         Extract text from uploaded file (PDF or image)
         
         Args:
             file: Uploaded file
+            user: User importing the file, whose earlier photos may be reused
             
         Returns:
             Dictionary with extracted text and metadata
@@ -48,7 +40,7 @@ class TextExtractionService:
         if file_extension == 'pdf':
             return self.extract_text_from_pdf(file)
         elif file_extension in ['png', 'jpg', 'jpeg', 'tiff', 'bmp', 'webp']:
-            return self.extract_text_from_image(file)
+            return self.extract_text_from_image(file, user)
         else:
             return {
                 'success': False,
@@ -57,35 +49,24 @@ class TextExtractionService:
                 'method': 'none'
             }
     
-    def extract_text_from_pdf(self, file: UploadedFile) -> Dict[str, Any]:
-        """Extract text from PDF file"""
+    def extract_text_from_pdf(self, file: Union[UploadedFile, PDFDocument]) -> Dict[str, Any]:
+        """Extract text from PDF file (or the PDFDocument shared with validation)"""
+        document = PDFDocument.of(file)
         try:
-            file.seek(0)
-            pdf_reader = PyPDF2.PdfReader(file)
-            
-            text_content = []
-            page_count = len(pdf_reader.pages)
-            
-            # Extract text from first 5 pages (to avoid processing huge documents)
-            max_pages = min(page_count, 5)
-            
-            for page_num in range(max_pages):
-                try:
-                    page = pdf_reader.pages[page_num]
-                    text = page.extract_text()
-                    if text.strip():
-                        text_content.append(text)
-                except Exception as e:
-                    logger.warning(f"Failed to extract text from page {page_num + 1}: {e}")
+            page_count = document.page_count
             
-            full_text = '\n'.join(text_content)
+            # Extract pages until the recipe is complete (at most the first 5 pages)
+            full_text, pages_processed, recipe_complete = stream_recipe_text(
+                document, self.parser_engine, skip_errors=True
+            )
             
             return {
                 'success': True,
                 'text': full_text,
                 'method': 'pdf_extraction',
-                'pages_processed': max_pages,
+                'pages_processed': pages_processed,
                 'total_pages': page_count,
+                'recipe_complete': recipe_complete,
                 'character_count': len(full_text)
             }
             
@@ -98,8 +79,8 @@ class TextExtractionService:
                 'method': 'pdf_extraction'
             }
     
-    def extract_text_from_image(self, file: UploadedFile) -> Dict[str, Any]:
-        """Extract text from image file using OCR"""
+    def extract_text_from_image(self, file: UploadedFile, user=None) -> Dict[str, Any]:
+        """Extract text from image file using OCR (see ocr for the worker processes)"""
         try:
             file.seek(0)
             logger.info(f"Opening image file: {file.name}, size: {file.size}, content_type: {file.content_type}")
@@ -111,79 +92,53 @@ class TextExtractionService:
             if file.size > 10 * 1024 * 1024:  # 10MB limit
                 raise ValueError("Image file too large (max 10MB)")
             
+            # Only the header is read here, the OCR worker decodes the pixels at full size
             image = Image.open(file)
+            image_size = image.size
             logger.info(f"Image opened successfully: {image.size}, mode: {image.mode}")
             
-            # Convert to RGB if necessary
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            # Try multiple OCR methods
-            results = []
-            
-            # Method 1: EasyOCR (best for recipe text)
-            if self.easyocr_reader:
-                try:
-                    import numpy as np
-                    img_array = np.array(image)
-                    ocr_results = self.easyocr_reader.readtext(img_array)
-                    
-                    # Extract text from EasyOCR results
-                    easyocr_text = ' '.join([result[1] for result in ocr_results if result[2] > 0.5])
-                    
-                    if easyocr_text.strip():
-                        results.append({
-                            'method': 'easyocr',
-                            'text': easyocr_text,
-                            'confidence': 'high'
-                        })
-                except Exception as e:
-                    logger.warning(f"EasyOCR failed: {e}")
-            
-            # Method 2: Tesseract OCR
-            if TESSERACT_AVAILABLE:
-                try:
-                    # Preprocess image for better OCR
-                    processed_image = self._preprocess_image_for_ocr(image)
-                    
-                    # Extract text with Tesseract
-                    tesseract_text = pytesseract.image_to_string(processed_image, lang='eng+nld')
-                    
-                    if tesseract_text.strip():
-                        results.append({
-                            'method': 'tesseract',
-                            'text': tesseract_text,
-                            'confidence': 'medium'
-                        })
-                except Exception as e:
-                    logger.warning(f"Tesseract OCR failed: {e}")
-            
-            # Choose the best result
-            if results:
-                # Prefer EasyOCR if available, otherwise use Tesseract
-                best_result = results[0]
-                for result in results:
-                    if result['method'] == 'easyocr':
-                        best_result = result
-                        break
-                
+            if not ocr.ocr_enabled():
                 return {
-                    'success': True,
-                    'text': best_result['text'],
-                    'method': best_result['method'],
-                    'confidence': best_result['confidence'],
-                    'image_size': image.size,
-                    'available_methods': [r['method'] for r in results]
+                    'success': False,
+                    'error': 'No OCR methods available or all methods failed',
+                    'text': '',
+                    'method': 'none',
+                    'ocr_backend': ''
                 }
+            
+            # A near-duplicate photo of the same user (same card, another shot) reuses its OCR text
+            use_hash = image_hash_index.cache_enabled() and user is not None
+            image_hash = image_hash_index.dhash(image) if use_hash else None
+            result = image_hash_index.lookup(image_hash, user) if image_hash is not None else None
+            if result is None:
+                path, is_temporary = worker_file_path(file, suffix=os.path.splitext(file.name or '')[1])
+                try:
+                    result = ocr.run_ocr(path)
+                finally:
+                    if is_temporary:
+                        os.remove(path)
+                if image_hash is not None:
+                    image_hash_index.store(image_hash, result, user)
             else:
+                logger.info(f"Reusing OCR text of a near-duplicate image ({result['hash_distance']} bits apart)")
+            
+            if not result['text'].strip():
                 return {
                     'success': False,
-                    'error': 'No OCR methods available or all methods failed',
+                    'error': 'No text found in image',
                     'text': '',
-                    'method': 'none',
-                    'tesseract_available': TESSERACT_AVAILABLE,
-                    'easyocr_available': EASYOCR_AVAILABLE
+                    'method': result['method']
                 }
+            
+            return {
+                'success': True,
+                'text': result['text'],
+                'method': result['method'],
+                'confidence': result['confidence'],
+                'image_size': image_size,
+                'available_methods': [result['method']],
+                'ocr_cache_hit': 'hash_distance' in result
+            }
                 
         except Exception as e:
             logger.error(f"Image text extraction failed: {e}")
@@ -193,53 +148,14 @@ class TextExtractionService:
                 'text': '',
                 'method': 'image_ocr'
             }
-    
-    def _preprocess_image_for_ocr(self, image: Image.Image) -> Image.Image:
-        """Preprocess image to improve OCR accuracy"""
-        try:
-            if not OPENCV_AVAILABLE:
-                # Basic preprocessing without OpenCV
-                # Convert to grayscale
-                if image.mode != 'L':
-                    image = image.convert('L')
-                
-                # Enhance contrast
-                from PIL import ImageEnhance
-                enhancer = ImageEnhance.Contrast(image)
-                image = enhancer.enhance(2.0)
-                
-                return image
-            
-            # Advanced preprocessing with OpenCV
-            import numpy as np
-            
-            # Convert PIL to OpenCV format
-            img_array = np.array(image)
-            if len(img_array.shape) == 3:
-                img_array = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
-            
-            # Apply image processing techniques
-            # 1. Noise reduction
-            img_array = cv2.medianBlur(img_array, 3)
-            
-            # 2. Threshold to get better contrast
-            _, img_array = cv2.threshold(img_array, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-            
-            # 3. Morphological operations to clean up
-            kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (2, 2))
-            img_array = cv2.morphologyEx(img_array, cv2.MORPH_CLOSE, kernel)
-            
-            # Convert back to PIL
-            return Image.fromarray(img_array)
-            
-        except Exception as e:
-            logger.warning(f"Image preprocessing failed: {e}")
-            return image
 
 
 class RecipeTextParser:
     """Parse extracted text to identify recipe components"""
     
+    def __init__(self):
+        self.engine = RecipeTextParserEngine()
+    
     def parse_recipe_text(self, text: str) -> Dict[str, Any]:
         """
         Parse extracted text to identify recipe components
@@ -258,21 +174,20 @@ class RecipeTextParser:
             }
         
         try:
-            recipe_data = {
-                'title': self._extract_title(text),
-                'ingredients': self._extract_ingredients(text),
-                'instructions': self._extract_instructions(text),
-                'prep_time': self._extract_prep_time(text),
-                'cook_time': self._extract_cook_time(text),
-                'servings': self._extract_servings(text),
-                'description': self._extract_description(text)
-            }
+            budget = ParseBudget.from_settings()
+            recipe_data = self.engine.parse(text, budget)
             
-            return {
+            result = {
                 'success': True,
                 'recipe_data': recipe_data,
                 'raw_text': text[:500] + '...' if len(text) > 500 else text
             }
+            if budget.warnings:
+                # Partial result, the fields found within the budget
+                for warning in budget.warnings:
+                    logger.warning(warning)
+                result['warnings'] = budget.warnings
+            return result
             
         except Exception as e:
             logger.error(f"Recipe text parsing failed: {e}")
@@ -285,147 +200,31 @@ class RecipeTextParser:
     
     def _extract_title(self, text: str) -> str:
         """Extract recipe title from text"""
-        lines = text.split('\n')
-        
-        # Look for title patterns
-        for line in lines[:5]:  # Check first 5 lines
-            line = line.strip()
-            if len(line) > 5 and len(line) < 100:
-                # Skip lines that look like ingredients or instructions
-                if not re.search(r'^\d+\s*(cups?|tbsp|tsp|ml|gram|kg)', line.lower()):
-                    if not line.lower().startswith(('step', 'instruction', 'method')):
-                        return line
-        
-        return "Imported Recipe"
+        return self.engine.extract_title(RecipeDocument(text))
     
     def _extract_ingredients(self, text: str) -> List[str]:
         """Extract ingredients list from text"""
-        ingredients = []
-        
-        # First try to find ingredients section
-        ingredients_match = re.search(r'INGREDIENTS?:?\s*(.*?)(?:INSTRUCTIONS?|METHOD|DIRECTIONS?|$)', text, re.IGNORECASE | re.DOTALL)
-        
-        if ingredients_match:
-            ingredients_text = ingredients_match.group(1)
-            
-            # Split by common patterns and clean up
-            # Look for measurement patterns in continuous text
-            ingredient_patterns = [
-                r'(\d+(?:\s*\d+/\d+)?\s*(?:cups?|tbsp|tsp|ml|gram|kg|oz|lb|g)\s+[^.]+?)(?=\d+(?:\s*\d+/\d+)?\s*(?:cups?|tbsp|tsp|ml|gram|kg|oz|lb|g)|$)',
-                r'(\d+\s+[^.]+?)(?=\d+\s+|$)',  # Simple number + ingredient
-                r'([•-]\s*[^•-]+?)(?=[•-]|$)',  # Bullet points
-            ]
-            
-            for pattern in ingredient_patterns:
-                matches = re.findall(pattern, ingredients_text, re.IGNORECASE)
-                for match in matches:
-                    ingredient = match.strip()
-                    if len(ingredient) > 3 and ingredient not in ingredients:
-                        ingredients.append(ingredient)
-        
-        # Fallback: look for lines with measurements
-        if not ingredients:
-            lines = text.split('\n')
-            for line in lines:
-                line = line.strip()
-                if re.search(r'\d+\s*(cups?|tbsp|tsp|ml|gram|kg|oz|lb)', line, re.IGNORECASE):
-                    if len(line) > 3:
-                        ingredients.append(line)
-        
-        return ingredients[:20]  # Limit to 20 ingredients
+        return self.engine.extract_ingredients(RecipeDocument(text))
     
     def _extract_instructions(self, text: str) -> List[str]:
         """Extract cooking instructions from text"""
-        instructions = []
-        
-        # First try to find instructions section
-        instructions_match = re.search(r'(?:INSTRUCTIONS?|METHOD|DIRECTIONS?):?\s*(.*?)$', text, re.IGNORECASE | re.DOTALL)
-        
-        if instructions_match:
-            instructions_text = instructions_match.group(1)
-            
-            # Look for numbered steps in continuous text
-            step_pattern = r'(\d+\.\s*[^.]+?\.)'
-            matches = re.findall(step_pattern, instructions_text)
-            
-            for match in matches:
-                instruction = match.strip()
-                if len(instruction) > 10:
-                    # Clean up the instruction
-                    instruction = re.sub(r'^\d+\.\s*', '', instruction)  # Remove number
-                    instructions.append(instruction.strip())
-        
-        # Fallback: look for numbered lines
-        if not instructions:
-            lines = text.split('\n')
-            for line in lines:
-                line = line.strip()
-                if re.match(r'^\d+\.\s*', line) and len(line) > 10:
-                    instruction = re.sub(r'^\d+\.\s*', '', line)
-                    instructions.append(instruction.strip())
-        
-        return instructions[:15]  # Limit to 15 steps
+        return self.engine.extract_instructions(RecipeDocument(text))
     
     def _extract_prep_time(self, text: str) -> Optional[int]:
         """Extract preparation time in minutes"""
-        patterns = [
-            r'prep(?:aration)?\s*time:?\s*(\d+)\s*(?:min|minutes?)',
-            r'prep:?\s*(\d+)\s*(?:min|minutes?)',
-            r'preparation:?\s*(\d+)\s*(?:min|minutes?)',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                return int(match.group(1))
-        
-        return None
+        return self.engine.extract_prep_time(RecipeDocument(text))
     
     def _extract_cook_time(self, text: str) -> Optional[int]:
         """Extract cooking time in minutes"""
-        patterns = [
-            r'cook(?:ing)?\s*time:?\s*(\d+)\s*(?:min|minutes?)',
-            r'cook:?\s*(\d+)\s*(?:min|minutes?)',
-            r'bake:?\s*(\d+)\s*(?:min|minutes?)',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                return int(match.group(1))
-        
-        return None
+        return self.engine.extract_cook_time(RecipeDocument(text))
     
     def _extract_servings(self, text: str) -> Optional[int]:
         """Extract number of servings"""
-        patterns = [
-            r'serves?:?\s*(\d+)',
-            r'servings?:?\s*(\d+)',
-            r'portions?:?\s*(\d+)',
-            r'for\s*(\d+)\s*people',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                return int(match.group(1))
-        
-        return None
+        return self.engine.extract_servings(RecipeDocument(text))
     
     def _extract_description(self, text: str) -> str:
         """Extract recipe description"""
-        lines = text.split('\n')
-        
-        # Look for description in first few lines
-        for line in lines[:3]:
-            line = line.strip()
-            if len(line) > 20 and len(line) < 200:
-                # Skip title-like lines and ingredient lines
-                if not re.search(r'^\d+\s*(cups?|tbsp|tsp)', line.lower()):
-                    if not line.isupper():  # Skip all-caps titles
-                        return line
-        
-        return ""
+        return self.engine.extract_description(RecipeDocument(text))
 
 
 # Combined service for easy use
@@ -436,44 +235,149 @@ class EnhancedRecipeImportService:
         self.text_extractor = TextExtractionService()
         self.recipe_parser = RecipeTextParser()
     
-    def import_recipe_from_file(self, file: UploadedFile) -> Dict[str, Any]:
+    def import_recipe_from_file(self, file: Union[UploadedFile, PDFDocument]) -> Dict[str, Any]:
         """
         Import recipe from uploaded file (PDF or image)
         
         Args:
-            file: Uploaded file
+            file: Uploaded file, or the PDFDocument of an uploaded PDF
             
         Returns:
             Dictionary with import results and parsed recipe data
         """
-        # Step 1: Extract text
-        extraction_result = self.text_extractor.extract_text_from_file(file)
+        from .import_pipeline import ImportContext, ImportPipeline
         
-        if not extraction_result['success']:
-            return {
-                'success': False,
-                'error': extraction_result['error'],
-                'stage': 'text_extraction'
-            }
+        # Validation, extraction, parsing and classification, see import_pipeline
+        return ImportPipeline.from_settings(persist=False).run(ImportContext(file)).result
+    
+    def save_recipe(self, import_result: Dict[str, Any], user, filename: str,
+                    file_size: Optional[int] = None):
+        """
+        Create a Recipe with its ingredients and source metadata from an import result
         
-        # Step 2: Parse recipe components
-        parsing_result = self.recipe_parser.parse_recipe_text(extraction_result['text'])
+        Args:
+            import_result: Successful result of import_recipe_from_file
+            user: User who owns the recipe
+            filename: Original filename of the upload
+            file_size: Size of the upload in bytes
+            
+        Returns:
+            Created Recipe instance
+        """
+        from django.db import transaction
         
-        if not parsing_result['success']:
-            return {
-                'success': False,
-                'error': parsing_result['error'],
-                'stage': 'recipe_parsing',
-                'extraction_result': extraction_result
-            }
+        recipe, ingredients, source_metadata = self.build_recipe_objects(
+            import_result, user, filename, file_size
+        )
         
-        return {
-            'success': True,
-            'recipe_data': parsing_result['recipe_data'],
-            'extraction_method': extraction_result.get('method', 'unknown'),
-            'extraction_metadata': {
-                k: v for k, v in extraction_result.items() 
-                if k not in ['success', 'text', 'error']
-            },
-            'raw_text_preview': parsing_result.get('raw_text', '')
-        }
\ No newline at end of file
+        with transaction.atomic():
+            recipe.save()
+            for ingredient in ingredients:
+                ingredient.save()
+            source_metadata.save()
+        
+        return recipe
+    
+    def build_recipe_objects(self, import_result: Dict[str, Any], user, filename: str,
+                             file_size: Optional[int] = None):
+        """
+        Build unsaved Recipe, Ingredient and SourceMetadata instances for an import result
+        
+        Used directly by bulk imports, which insert many recipes with bulk_create.
+        
+        Returns:
+            Tuple of (recipe, list of ingredients, source metadata)
+        """
+        from .models import Recipe, Ingredient, IngredientCategory, SourceMetadata
+        
+        recipe_data = import_result['recipe_data']
+        
+        # Text is truncated to prevent database errors
+        recipe = Recipe(
+            user=user,
+            title=safe_truncate(recipe_data.get('title', 'Imported Recipe'), 1000),
+            description=safe_truncate(recipe_data.get('description', ''), 2000),  # TextField, but still limit
+            prep_time=recipe_data.get('prep_time'),
+            cook_time=recipe_data.get('cook_time'),
+            servings=recipe_data.get('servings'),
+            instructions=recipe_data.get('instructions', []),
+            categories=recipe_data.get('categories', []),
+            tags=recipe_data.get('tags', []),
+            source=get_recipe_source(filename)
+        )
+        
+        # Parsed ingredients are plain text, ingredients edited in a preview are dicts
+        ingredients = []
+        for i, ingredient in enumerate(recipe_data.get('ingredients', [])):
+            if not isinstance(ingredient, dict):
+                ingredient = {'name': ingredient}
+            ingredient = Ingredient(
+                recipe=recipe,
+                name=safe_truncate(ingredient['name'], 1000),
+                amount=safe_truncate(ingredient.get('amount', ''), 500),
+                unit=safe_truncate(ingredient.get('unit', ''), 100),
+                notes=safe_truncate(ingredient.get('notes', ''), 1000),
+                category=ingredient.get('category') or IngredientCategory.OTHER,
+                order=i + 1
+            )
+            # Split "200 gram pasta" into amount, quantity, unit and name
+            fill_quantity(ingredient)
+            ingredients.append(ingredient)
+        
+        # One memo lookup for all ingredients still in 'other'
+        classify_ingredients(ingredients)
+        
+        source_metadata = SourceMetadata(
+            recipe=recipe,
+            original_filename=safe_truncate(filename, 255),
+            file_size=file_size,
+            import_success=True,
+            import_warnings=import_result.get('warnings', []),
+            extraction_method=import_result.get('extraction_method', ''),
+            text_size=import_result.get('text_size'),
+            page_count=import_result.get('page_count'),
+            stage_timings=import_result.get('timings', {}),
+            raw_text=import_result.get('raw_text_preview', '')[:1000],  # Limit to 1000 chars
+            full_text=import_result.get('raw_text')  # Kept compressed for reparsing
+        )
+        
+        return recipe, ingredients, source_metadata
+
+
+IMAGE_EXTENSIONS = ['png', 'jpg', 'jpeg', 'tiff', 'bmp', 'webp']
+
+
+def get_recipe_source(filename: str) -> str:
+    """Return the RecipeSource value for an uploaded filename"""
+    from .models import RecipeSource
+    
+    file_extension = filename.lower().split('.')[-1] if '.' in filename else ''
+    return RecipeSource.IMAGE if file_extension in IMAGE_EXTENSIONS else RecipeSource.PDF
+
+
+def safe_truncate(text, max_length):
+    """Safely truncate text to max_length"""
+    if not text:
+        return text
+    return text[:max_length] if len(text) > max_length else text
+
+
+def preview_ingredient(text: str) -> Dict[str, str]:
+    """Split a parsed ingredient line for the import preview, like build_recipe_objects does"""
+    parsed = parse_ingredient_line(text)
+    if parsed is None:
+        return {'name': safe_truncate(text, 1000), 'amount': '', 'unit': '', 'notes': ''}
+    return {'name': safe_truncate(parsed.name, 1000), 'amount': parsed.amount, 'unit': parsed.unit, 'notes': ''}
+
+
+def build_import_metadata(import_result: Dict[str, Any], source: str) -> Dict[str, Any]:
+    """Summarise an import result for API responses"""
+    from .models import RecipeSource
+    
+    recipe_data = import_result.get('recipe_data', {})
+    return {
+        'extraction_method': 'OCR' if source == RecipeSource.IMAGE else 'PDF',
+        'source_type': source,
+        'ingredients_found': len(recipe_data.get('ingredients', [])),
+        'instructions_found': len(recipe_data.get('instructions', []))
+    }
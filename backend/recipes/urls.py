@@ -1,10 +1,12 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import RecipeViewSet
+from .views import RecipeViewSet, ImportJobViewSet, ChunkedUploadViewSet
 from .views_media_test import test_media_upload, media_info
 
 router = DefaultRouter()
 router.register(r'recipes', RecipeViewSet)
+router.register(r'import-jobs', ImportJobViewSet)
+router.register(r'uploads', ChunkedUploadViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -1,21 +1,35 @@
-from rest_framework import viewsets, status, filters
+from rest_framework import viewsets, mixins, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
+from django.conf import settings
 from django.db.models import Q, Count
 from django.utils import timezone
 from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter
 from drf_spectacular.types import OpenApiTypes
 import logging
 
-from .models import Recipe, RecipeSource, Ingredient, SourceMetadata
+from django.core.exceptions import ValidationError as DjangoValidationError
+
+from .models import (
+    Recipe, RecipeSource, Ingredient, SourceMetadata, ImportJob, ImportMode, ChunkedUpload, ImportPreview
+)
 from .serializers import (
-    RecipeSerializer, RecipeListSerializer, RecipeImportSerializer,
-    ImportValidationResultSerializer, RecipeStatisticsSerializer
+    RecipeSerializer, RecipeListSerializer, RecipeImportSerializer, RecipeBulkImportSerializer,
+    RecipeImportCommitSerializer, ChunkedUploadSerializer,
+    ImportValidationResultSerializer, RecipeStatisticsSerializer, ImportJobSerializer
 )
 from .services import RecipeImportService, PDFValidationService
+from .pdf_document import PDFDocument
+from .text_extraction_service import (
+    build_import_metadata, get_recipe_source, preview_ingredient, safe_truncate
+)
+from .import_jobs import enqueue_import, process_import_job
+from .import_pipeline import ImportContext, ImportPipeline, stage_statistics
+from .import_previews import claim_preview, store_preview
+from .chunked_uploads import UploadOffsetError, append_chunk, complete_upload, discard_spool, start_upload
 
 logger = logging.getLogger(__name__)
 
@@ -206,7 +220,9 @@ class RecipeViewSet(viewsets.ModelViewSet):
     @extend_schema(
         tags=['Recipes'],
         summary='Import recipe from PDF or image',
-        description='Import a recipe by uploading a PDF or image file. The system will extract recipe information automatically using OCR for images.',
+        description='Import a recipe by uploading a PDF or image file. The system will extract recipe information automatically using OCR for images. '
+                    'Imports are queued and return 202 with an import job to poll at /api/import-jobs/{id}/; '
+                    'preview requests are answered directly.',
         request={
             'multipart/form-data': {
                 'type': 'object',
@@ -215,12 +231,18 @@ class RecipeViewSet(viewsets.ModelViewSet):
                         'type': 'string',
                         'format': 'binary',
                         'description': 'PDF or image file to import (max 10MB). Supported formats: PDF, PNG, JPG, JPEG, TIFF, BMP, WebP'
+                    },
+                    'mode': {
+                        'type': 'string',
+                        'enum': ['single', 'cookbook'],
+                        'description': "'cookbook' splits a PDF into one recipe per recipe found, the job result lists them"
                     }
                 }
             }
         },
         responses={
             201: RecipeSerializer,
+            202: ImportJobSerializer,
             400: {'description': 'Invalid file or extraction failed'}
         }
     )
@@ -246,21 +268,47 @@ class RecipeViewSet(viewsets.ModelViewSet):
         uploaded_file = serializer.validated_data['file']
         file_extension = uploaded_file.name.lower().split('.')[-1] if '.' in uploaded_file.name else ''
         
+        import_mode = serializer.validated_data['mode']
+        
         # Check if this is a preview request
         is_preview = request.data.get('preview', '').lower() == 'true'
+        if is_preview and import_mode == ImportMode.COOKBOOK:
+            return Response(
+                {'error': 'Cookbook imports cannot be previewed'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Real imports are queued for the import worker so the request returns immediately.
+        # Cookbooks always go through a job, which holds the report of all recipes found.
+        if not is_preview and (settings.RECIPE_IMPORT_ASYNC or import_mode == ImportMode.COOKBOOK):
+            try:
+                job = enqueue_import(uploaded_file, request.user, mode=import_mode)
+                if not settings.RECIPE_IMPORT_ASYNC:
+                    job = process_import_job(job)
+            except Exception as e:
+                logger.error(f"Error queueing import for {uploaded_file.name}: {str(e)}")
+                return Response(
+                    {
+                        'error': 'Import failed',
+                        'details': str(e)
+                    },
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            job_serializer = ImportJobSerializer(job, context={'request': request})
+            response_status = status.HTTP_201_CREATED if job.is_finished else status.HTTP_202_ACCEPTED
+            return Response(job_serializer.data, status=response_status)
         
         try:
             logger.info(f"Starting recipe {'preview' if is_preview else 'import'} for file: {uploaded_file.name} (type: {file_extension})")
             logger.info(f"File size: {uploaded_file.size}, content_type: {uploaded_file.content_type}")
             
-            # Use the enhanced import service
-            from .text_extraction_service import EnhancedRecipeImportService
-            import_service = EnhancedRecipeImportService()
+            # Validate, extract, parse and classify; save too unless this is a preview
+            pipeline = ImportPipeline.from_settings(persist=not is_preview)
+            context = pipeline.run(ImportContext(uploaded_file, user=request.user))
+            import_result = context.result
             
-            # Extract and parse recipe data
-            import_result = import_service.import_recipe_from_file(uploaded_file)
-            
-            if not import_result['success']:
+            if not context.succeeded:
                 logger.warning(f"Recipe import failed for {uploaded_file.name}: {import_result['error']}")
                 return Response(
                     {
@@ -271,22 +319,17 @@ class RecipeViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            # Create recipe from parsed data
             recipe_data = import_result['recipe_data']
-            
-            # Determine source type
-            source = RecipeSource.IMAGE if file_extension in ['png', 'jpg', 'jpeg', 'tiff', 'bmp', 'webp'] else RecipeSource.PDF
+            source = import_result['source']
             
             # If this is a preview request, return the parsed data without saving
             if is_preview:
                 logger.info(f"Returning preview data for {uploaded_file.name}")
                 
-                # Helper function for safe truncation
-                def safe_truncate(text, max_length):
-                    """Safely truncate text to max_length"""
-                    if not text:
-                        return text
-                    return text[:max_length] if len(text) > max_length else text
+                # Keep the parse so the commit call does not need the file again
+                preview_token = store_preview(
+                    request.user, import_result, uploaded_file.name, uploaded_file.size
+                )
                 
                 return Response({
                     'title': safe_truncate(recipe_data.get('title', 'Imported Recipe'), 1000),
@@ -295,61 +338,24 @@ class RecipeViewSet(viewsets.ModelViewSet):
                     'cook_time': recipe_data.get('cook_time'),
                     'servings': recipe_data.get('servings'),
                     'instructions': recipe_data.get('instructions', []),
-                    'ingredients': [{'name': safe_truncate(ing, 1000), 'amount': '', 'notes': ''} for ing in recipe_data.get('ingredients', [])],
-                    'categories': [],
-                    'tags': [],
+                    'ingredients': [preview_ingredient(ing) for ing in recipe_data.get('ingredients', [])],
+                    'categories': recipe_data.get('categories', []),
+                    'tags': recipe_data.get('tags', []),
                     'source_type': source,
                     'extraction_method': 'OCR' if source == RecipeSource.IMAGE else 'PDF',
-                    'raw_text_preview': import_result.get('raw_text_preview', '')[:500]
+                    'raw_text_preview': import_result.get('raw_text_preview', '')[:500],
+                    'preview_token': preview_token,
+                    'preview_expires_in': settings.IMPORT_PREVIEW_TIMEOUT
                 }, status=status.HTTP_200_OK)
             
-            # Create the recipe with text truncation to prevent database errors
-            def safe_truncate(text, max_length):
-                """Safely truncate text to max_length"""
-                if not text:
-                    return text
-                return text[:max_length] if len(text) > max_length else text
-            
-            recipe = Recipe.objects.create(
-                user=request.user,
-                title=safe_truncate(recipe_data.get('title', 'Imported Recipe'), 1000),
-                description=safe_truncate(recipe_data.get('description', ''), 2000),  # TextField, but still limit
-                prep_time=recipe_data.get('prep_time'),
-                cook_time=recipe_data.get('cook_time'),
-                servings=recipe_data.get('servings'),
-                instructions=recipe_data.get('instructions', []),
-                source=source
-            )
-            
-            # Create ingredients with text truncation
-            for i, ingredient_text in enumerate(recipe_data.get('ingredients', [])):
-                Ingredient.objects.create(
-                    recipe=recipe,
-                    name=safe_truncate(ingredient_text, 1000),
-                    order=i + 1
-                )
-            
-            # Create source metadata
-            SourceMetadata.objects.create(
-                recipe=recipe,
-                original_filename=uploaded_file.name,
-                file_size=uploaded_file.size,
-                import_success=True,
-                raw_text=import_result.get('raw_text_preview', '')[:1000]  # Limit to 1000 chars
-            )
-            
+            recipe = context.recipe
             logger.info(f"Successfully imported recipe {recipe.id} from {uploaded_file.name}")
             
             # Return the created recipe
             recipe_serializer = RecipeSerializer(recipe)
             return Response({
                 'recipe': recipe_serializer.data,
-                'import_metadata': {
-                    'extraction_method': 'OCR' if source == RecipeSource.IMAGE else 'PDF',
-                    'source_type': source,
-                    'ingredients_found': len(recipe_data.get('ingredients', [])),
-                    'instructions_found': len(recipe_data.get('instructions', []))
-                }
+                'import_metadata': build_import_metadata(import_result, source)
             }, status=status.HTTP_201_CREATED)
             
         except Exception as e:
@@ -362,6 +368,132 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
     
+    @extend_schema(
+        tags=['Recipes'],
+        summary='Save a previewed recipe import',
+        description='Create the recipe from a preview token, applying any fields edited in the preview. '
+                    'The file is not uploaded or parsed again.',
+        request=RecipeImportCommitSerializer,
+        responses={
+            201: {'description': 'Recipe created'},
+            400: {'description': 'Invalid edited fields'},
+            404: {'description': 'Preview expired or already saved'}
+        }
+    )
+    @action(detail=False, methods=['post'], url_path='import/commit')
+    def import_commit(self, request):
+        """
+        Save a recipe from an import preview
+        """
+        serializer = RecipeImportCommitSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        edits = dict(serializer.validated_data)
+        token = edits.pop('preview_token')
+        filename = None
+        
+        try:
+            # The token is only used up when the recipe is saved
+            with claim_preview(token, request.user) as preview:
+                filename = preview.filename
+                import_result = dict(preview.import_result)
+                import_result['recipe_data'] = {**import_result['recipe_data'], **edits}
+                
+                # Only the persist stages, the preview ran the others
+                context = ImportPipeline.from_settings(process=False).run(ImportContext(
+                    user=request.user, filename=filename,
+                    file_size=preview.file_size, result=import_result
+                ))
+                if not context.succeeded:
+                    raise ValueError(context.result['error'])
+                recipe = context.recipe
+        except ImportPreview.DoesNotExist:
+            return Response(
+                {
+                    'error': 'Preview not found',
+                    'details': 'The preview has expired or was already saved, please upload the file again'
+                },
+                status=status.HTTP_404_NOT_FOUND
+            )
+        except Exception as e:
+            logger.error(f"Error saving previewed recipe from {filename}: {str(e)}")
+            return Response(
+                {
+                    'error': 'Import failed',
+                    'details': str(e)
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        logger.info(f"Saved previewed recipe {recipe.id} from {filename}")
+        
+        source = get_recipe_source(filename)
+        recipe_serializer = RecipeSerializer(recipe)
+        return Response({
+            'recipe': recipe_serializer.data,
+            'import_metadata': build_import_metadata(import_result, source)
+        }, status=status.HTTP_201_CREATED)
+    
+    @extend_schema(
+        tags=['Recipes'],
+        summary='Bulk import recipes from a ZIP archive',
+        description='Queue every PDF and image file in a ZIP archive for import. Returns 202 with an import job '
+                    'to poll at /api/import-jobs/{id}/; its result is a report with the outcome per file.',
+        request={
+            'multipart/form-data': {
+                'type': 'object',
+                'properties': {
+                    'file': {
+                        'type': 'string',
+                        'format': 'binary',
+                        'description': 'ZIP archive with PDF or image files (max 10MB per file)'
+                    }
+                }
+            }
+        },
+        responses={
+            201: ImportJobSerializer,
+            202: ImportJobSerializer,
+            400: {'description': 'Invalid archive'}
+        }
+    )
+    @action(
+        detail=False,
+        methods=['post'],
+        parser_classes=[MultiPartParser, FormParser],
+        url_path='import-zip'
+    )
+    def import_zip(self, request):
+        """
+        Import all recipes from a ZIP archive
+        """
+        serializer = RecipeBulkImportSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        archive = serializer.validated_data['file']
+        
+        # Archives are imported by the import worker, the job result holds the report
+        try:
+            logger.info(f"Queueing bulk import for archive: {archive.name} ({archive.size} bytes)")
+            job = enqueue_import(archive, request.user, mode=ImportMode.ARCHIVE)
+            if not settings.RECIPE_IMPORT_ASYNC:
+                job = process_import_job(job)
+        except Exception as e:
+            logger.error(f"Error queueing bulk import of {archive.name}: {str(e)}")
+            return Response(
+                {
+                    'error': 'Import failed',
+                    'details': str(e)
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        job_serializer = ImportJobSerializer(job, context={'request': request})
+        response_status = status.HTTP_201_CREATED if job.is_finished else status.HTTP_202_ACCEPTED
+        return Response(job_serializer.data, status=response_status)
+    
     @extend_schema(
         tags=['Recipes'],
         summary='Preview recipe from PDF',
@@ -402,9 +534,12 @@ class RecipeViewSet(viewsets.ModelViewSet):
         try:
             logger.info(f"Starting PDF preview for file: {pdf_file.name}")
             
+            # Parse the upload once for validation and preview
+            document = PDFDocument(pdf_file)
+            
             # Validate the PDF file first
             validation_service = PDFValidationService()
-            validation_result = validation_service.validate_file(pdf_file)
+            validation_result = validation_service.validate_file(document)
             
             if not validation_result['is_valid']:
                 logger.warning(f"PDF validation failed for preview {pdf_file.name}: {validation_result['errors']}")
@@ -418,7 +553,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
             
             # Preview the recipe (don't save to database)
             import_service = RecipeImportService()
-            recipe_data = import_service.preview_from_pdf(pdf_file)
+            recipe_data = import_service.preview_from_pdf(document)
             
             logger.info(f"Successfully previewed recipe from {pdf_file.name}")
             
@@ -443,18 +578,22 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def validate_pdf(self, request):
         """
         Validate a PDF file for recipe import
+        
+        Only the header, trailer and page tree are checked unless `full=true`
+        is sent, which also extracts the text of the first page.
         """
         serializer = RecipeImportSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
         pdf_file = serializer.validated_data['file']
+        full = str(request.data.get('full', request.query_params.get('full', ''))).lower() == 'true'
         
         try:
             logger.info(f"Validating PDF file: {pdf_file.name}")
             
             validation_service = PDFValidationService()
-            validation_result = validation_service.validate_file(pdf_file)
+            validation_result = validation_service.validate_file(pdf_file, full=full)
             
             logger.info(f"PDF validation completed for {pdf_file.name}: "
                        f"Valid={validation_result['is_valid']}, "
@@ -543,6 +682,41 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
+    @extend_schema(
+        tags=['Recipes'],
+        summary='Import pipeline timings',
+        description='p50/p95 duration per import stage (validation, extraction, parsing, classification, '
+                    'persist) of recent imports, with file and text sizes and extraction methods. '
+                    'Staff users see the imports of all users.',
+        parameters=[
+            OpenApiParameter('days', OpenApiTypes.INT, description='Only imports from the last this many days (default 30)')
+        ],
+        responses={
+            200: {'description': 'Stage statistics'},
+            400: {'description': 'Invalid days parameter'}
+        }
+    )
+    @action(detail=False, methods=['get'], url_path='import-stats')
+    def import_stats(self, request):
+        """
+        Get per-stage timings of recent imports
+        """
+        try:
+            days = int(request.query_params.get('days', 30))
+        except ValueError:
+            days = 0
+        if days < 1:
+            return Response(
+                {'error': 'days must be a positive number'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        queryset = SourceMetadata.objects.all()
+        if not request.user.is_staff:
+            queryset = queryset.filter(recipe__user=request.user)
+
+        return Response(stage_statistics(queryset, days=days), status=status.HTTP_200_OK)
+
     @action(detail=False, methods=['get'], url_path='categories')
     def categories(self, request):
         """
@@ -620,4 +794,155 @@ class RecipeViewSet(viewsets.ModelViewSet):
                     'details': str(e)
                 },
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
\ No newline at end of file
+            )
+
+
+@extend_schema_view(
+    list=extend_schema(
+        tags=['Recipes'],
+        summary='List import jobs',
+        description='Get the current user\'s recipe import jobs, newest first'
+    ),
+    retrieve=extend_schema(
+        tags=['Recipes'],
+        summary='Get import job',
+        description='Poll the status of a queued recipe import. Once succeeded, the created recipe is included.'
+    )
+)
+class ImportJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    ViewSet for polling asynchronous recipe import jobs
+    """
+    queryset = ImportJob.objects.all()  # Base queryset for DRF router
+    serializer_class = ImportJobSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['status']
+    ordering = ['-created_at']
+    
+    def get_queryset(self):
+        """Only show the current user's import jobs"""
+        return ImportJob.objects.filter(user=self.request.user).select_related('recipe')
+
+
+@extend_schema_view(
+    create=extend_schema(
+        tags=['Recipes'],
+        summary='Start a chunked upload',
+        description='Announce a recipe import or recipe image upload. The file is then sent in chunks '
+                    'with PUT /api/uploads/{id}/chunk/ and finished with POST /api/uploads/{id}/complete/.'
+    ),
+    retrieve=extend_schema(
+        tags=['Recipes'],
+        summary='Get chunked upload',
+        description='Returns the offset to resume an interrupted upload from'
+    ),
+    destroy=extend_schema(
+        tags=['Recipes'],
+        summary='Cancel chunked upload',
+        description='Discard an unfinished upload and its spooled data'
+    )
+)
+class ChunkedUploadViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin,
+                           mixins.DestroyModelMixin, viewsets.GenericViewSet):
+    """
+    ViewSet for resumable uploads that are spooled to disk
+    """
+    queryset = ChunkedUpload.objects.all()  # Base queryset for DRF router
+    serializer_class = ChunkedUploadSerializer
+    permission_classes = [IsAuthenticated]
+    
+    def get_queryset(self):
+        """Only show the current user's uploads"""
+        return ChunkedUpload.objects.filter(user=self.request.user)
+    
+    def perform_create(self, serializer):
+        serializer.instance = start_upload(
+            ChunkedUpload(user=self.request.user, **serializer.validated_data)
+        )
+    
+    def perform_destroy(self, instance):
+        discard_spool(instance)
+        instance.delete()
+    
+    @extend_schema(
+        tags=['Recipes'],
+        summary='Upload a chunk',
+        description='Send the next part of the file as the raw request body (application/octet-stream). '
+                    'The Upload-Offset header must equal the offset of the upload; on 409 resume from the '
+                    'returned offset.',
+        parameters=[
+            OpenApiParameter('Upload-Offset', OpenApiTypes.INT, OpenApiParameter.HEADER, required=True)
+        ],
+        responses={
+            200: ChunkedUploadSerializer,
+            400: {'description': 'Chunk too large or incomplete'},
+            409: {'description': 'Chunk does not continue the upload'}
+        }
+    )
+    @action(detail=True, methods=['put'], url_path='chunk')
+    def chunk(self, request, pk=None):
+        """
+        Append a chunk to the spooled file
+        """
+        upload = self.get_object()
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+            length = int(request.headers.get('Content-Length') or 0)
+        except ValueError:
+            return Response(
+                {'error': 'Upload-Offset and Content-Length headers are required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            # Read the body from the request stream, request.data would buffer it
+            upload = append_chunk(upload.id, offset, request.stream, length)
+        except UploadOffsetError as e:
+            return Response(
+                {'error': str(e), 'offset': e.expected},
+                status=status.HTTP_409_CONFLICT
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(self.get_serializer(upload).data, status=status.HTTP_200_OK)
+    
+    @extend_schema(
+        tags=['Recipes'],
+        summary='Complete a chunked upload',
+        description='Queue the uploaded file for import (returns the import job) or attach it as '
+                    'the recipe image (returns the recipe).',
+        request=None,
+        responses={
+            201: {'description': 'Recipe imported (when imports run synchronously)'},
+            202: ImportJobSerializer,
+            200: RecipeSerializer,
+            400: {'description': 'Upload incomplete or file rejected'}
+        }
+    )
+    @action(detail=True, methods=['post'], url_path='complete')
+    def complete(self, request, pk=None):
+        """
+        Hand the spooled file to the import queue or the recipe
+        """
+        upload = self.get_object()
+        try:
+            result = complete_upload(upload)
+        except (ValueError, DjangoValidationError, OSError) as e:
+            message = e.messages[0] if isinstance(e, DjangoValidationError) else str(e)
+            logger.warning(f"Completing upload {upload.id} failed: {message}")
+            return Response(
+                {'error': 'Upload failed', 'details': message},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if isinstance(result, Recipe):
+            return Response(
+                RecipeSerializer(result, context={'request': request}).data,
+                status=status.HTTP_200_OK
+            )
+        
+        job_serializer = ImportJobSerializer(result, context={'request': request})
+        response_status = status.HTTP_202_ACCEPTED if not result.is_finished else status.HTTP_201_CREATED
+        return Response(job_serializer.data, status=response_status)
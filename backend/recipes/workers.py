@@ -0,0 +1,131 @@
+"""
+Process pool helpers for CPU-bound recipe work (imports, extraction, parsing)
+
+Worker processes are started with the 'spawn' method so they never share
+database connections or file handles with the parent process. Each worker
+runs Django setup once in its initializer and is reused for many tasks.
+
+Keep this module free of model imports: it is imported by freshly spawned
+processes before Django is configured.
+"""
+import os
+import atexit
+import threading
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Tuple
+
+_shared_pools = {}
+_shared_pools_lock = threading.Lock()
+
+
+def init_worker():
+    """Initializer for pool processes: configure Django once per process"""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'recipe_meal_planner.settings')
+
+    import django
+    django.setup()
+
+
+def create_process_pool(max_workers: int, initializer=init_worker) -> ProcessPoolExecutor:
+    """
+    Create a pool of Django-ready worker processes
+
+    Args:
+        max_workers: Number of worker processes
+        initializer: Function run once per process, must call init_worker
+            when replacing it (e.g. ocr.init_ocr_worker)
+
+    Returns:
+        ProcessPoolExecutor using the spawn start method
+    """
+    return ProcessPoolExecutor(
+        max_workers=max(1, max_workers),
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=initializer,
+    )
+
+
+def get_shared_pool(name: str, max_workers: int, initializer=init_worker) -> ProcessPoolExecutor:
+    """
+    Return a long-lived pool shared by all requests in this process
+
+    Starting worker processes costs a Django setup each, so request handlers
+    reuse one pool per purpose instead of creating a new pool per request.
+    A pool that broke (e.g. a worker was killed) is replaced transparently.
+
+    Args:
+        name: Purpose of the pool, e.g. 'bulk_import'
+        max_workers: Number of worker processes for a newly created pool
+        initializer: Function run once per process of a newly created pool
+
+    Returns:
+        ProcessPoolExecutor
+    """
+    with _shared_pools_lock:
+        pool = _shared_pools.get(name)
+        if pool is None or getattr(pool, '_broken', False):
+            pool = create_process_pool(max_workers, initializer)
+            _shared_pools[name] = pool
+        return pool
+
+
+def discard_shared_pool(name: str):
+    """
+    Stop a shared pool whose workers may be stuck
+
+    A running task cannot be cancelled, so the worker processes are
+    terminated. The next get_shared_pool call starts a fresh pool.
+
+    Args:
+        name: Purpose of the pool
+    """
+    with _shared_pools_lock:
+        pool = _shared_pools.pop(name, None)
+    if pool is None:
+        return
+    for process in list((getattr(pool, '_processes', None) or {}).values()):
+        process.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+@atexit.register
+def shutdown_shared_pools():
+    """Stop shared pools when the process exits"""
+    with _shared_pools_lock:
+        for pool in _shared_pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        _shared_pools.clear()
+
+
+def worker_file_path(file, suffix: str = '') -> Tuple[str, bool]:
+    """
+    Path a pool process can open an uploaded or stored file from
+
+    Workers get a path instead of the pickled file content; uploads that only
+    live in memory are spooled to a temporary file once.
+
+    Args:
+        file: Uploaded file or stored FieldFile
+        suffix: Extension of the temporary copy, e.g. '.pdf'
+
+    Returns:
+        Tuple of (path, whether it is a temporary copy to remove afterwards)
+    """
+    if hasattr(file, 'temporary_file_path'):
+        return file.temporary_file_path(), False
+    try:
+        # Stored files (e.g. ImportJob.file) on the local filesystem
+        path = file.path
+        if os.path.exists(path):
+            return path, False
+    except (AttributeError, NotImplementedError, ValueError):
+        pass
+
+    file.seek(0)
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as spool:
+        for chunk in iter(lambda: file.read(64 * 1024), b''):
+            spool.write(chunk)
+    file.seek(0)
+    return spool.name, True
@@ -0,0 +1,20 @@
+#!/bin/sh
+# Start the background workers next to the web server of a single-container
+# deployment (Dockerfile, start.sh). A worker that exits is restarted.
+# Set RUN_BACKGROUND_WORKERS=false when they run as separate services
+# (see Procfile).
+
+if [ "${RUN_BACKGROUND_WORKERS:-true}" != "true" ]; then
+  exit 0
+fi
+
+keep_running() {
+  while true; do
+    python manage.py "$@"
+    echo "$1 exited, restarting in 5 seconds"
+    sleep 5
+  done
+}
+
+keep_running run_import_worker &
+keep_running run_shopping_list_worker &
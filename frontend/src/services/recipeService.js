@@ -32,7 +32,7 @@ export class RecipeService extends BaseApiService {
       console.log(`🔄 Importing ${isImage ? 'image' : isPdf ? 'PDF' : 'file'} recipe with mobile API...`)
 
       // Use mobile API for better reliability
-      const result = await mobileApi.makeRequest(async () => {
+      let result = await mobileApi.makeRequest(async () => {
         const config = {
           headers: {
             'Content-Type': 'multipart/form-data',
@@ -45,12 +45,18 @@ export class RecipeService extends BaseApiService {
         }
 
         const response = await api.post(`${this.baseEndpoint}import/`, formData, config)
-        return response.data
+        // 202 means the import was queued; the worker creates the recipe
+        return response.status === 202 ? { importJob: response.data } : response.data
       }, {
         maxRetries: 2, // Fewer retries for file uploads
         onProgress: onUploadProgress
       })
 
+      if (result.importJob) {
+        console.log(`⏳ Import queued as job ${result.importJob.id}, waiting for the worker...`)
+        result = await this.waitForImportJob(result.importJob.id)
+      }
+
       console.log(`✅ ${isImage ? 'Image' : isPdf ? 'PDF' : 'File'} import successful:`, result)
       return result
     } catch (error) {
@@ -78,6 +84,34 @@ export class RecipeService extends BaseApiService {
     }
   }
 
+  /**
+   * Poll a queued import job until the worker has finished it
+   * Resolves with the same shape as a synchronous import: { recipe, import_metadata }
+   */
+  async waitForImportJob(jobId, { interval = 1000, timeout = 120000 } = {}) {
+    const deadline = Date.now() + timeout
+
+    while (Date.now() < deadline) {
+      const response = await api.get(`import-jobs/${jobId}/`)
+      const job = response.data
+
+      if (job.status === 'succeeded') {
+        return { recipe: job.recipe, import_metadata: job.result }
+      }
+      if (job.status === 'failed') {
+        const error = new Error(job.error || 'Import failed')
+        error.response = { status: 400, data: { error: 'Import failed', details: job.error, stage: job.error_stage } }
+        throw error
+      }
+
+      await new Promise((resolve) => setTimeout(resolve, interval))
+    }
+
+    const error = new Error('Import timed out')
+    error.code = 'ECONNABORTED'
+    throw error
+  }
+
   /**
    * Import recipe from PDF file (backward compatibility)
    */
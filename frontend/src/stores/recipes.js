@@ -352,6 +352,30 @@ export const useRecipeStore = defineStore('recipes', {
       }
     },
 
+    /**
+     * Save a previewed recipe from its preview token, with the edited fields
+     */
+    async commitPreview(previewToken, recipeData = {}) {
+      this.loading = true
+      this.error = null
+
+      try {
+        const response = await api.post('/recipes/import/commit/', {
+          ...recipeData,
+          preview_token: previewToken,
+        })
+        const recipe = response.data.recipe
+        this.recipes.unshift(recipe)
+        return recipe
+      } catch (error) {
+        this.error = error.response?.data?.details || error.message || 'Failed to save recipe'
+        console.error('Error saving previewed recipe:', error)
+        throw error
+      } finally {
+        this.loading = false
+      }
+    },
+
     /**
      * Preview recipe from PDF (backward compatibility)
      */
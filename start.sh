@@ -20,4 +20,6 @@ fi
 echo "Database is ready, running migrations..."
 python manage.py migrate
 python manage.py collectstatic --noinput
-gunicorn recipe_meal_planner.wsgi:application --bind 0.0.0.0:$PORT --timeout 120 --workers 2
\ No newline at end of file
+# Import worker in the background, see backend/start_workers.sh
+sh start_workers.sh
+exec gunicorn recipe_meal_planner.wsgi:application --bind 0.0.0.0:$PORT --timeout 120 --workers 2
\ No newline at end of file